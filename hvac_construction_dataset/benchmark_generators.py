@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the HVAC dataset generator.
+
+Times every generate_* stage, each output writer (on pre-generated
+RecordBuffer tables) and the end-to-end pipeline at several scale factors
+(project counts) and project durations, and reports rows/sec, wall time,
+peak traced memory and output bytes per table. Each case is timed as the best of several repeats, each repeat
+running the case as often as it takes to fill a minimum wall time, so
+millisecond-long cases are not at the mercy of timer noise. Results are
+saved as JSON and can be compared against a stored baseline (recorded with
+the same engines and worker count) to catch regressions. Everything runs
+offline in a temporary directory.
+
+    python benchmark_generators.py --scales 1,5,20 --save-baseline bench_baseline.json
+    python benchmark_generators.py --scales 1,5,20 --baseline bench_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from dataset_specs import IdAllocator, derive_seed, table_rng, work_calendar
+from generate_hvac_dataset import (
+    DEFAULT_SEED, ENGINE_BATCH_PROJECTS, OUTPUT_FORMATS, DatasetWriter, GenerationOptions,
+    generate_billing_history, generate_change_orders, generate_contract_value, generate_field_notes,
+    generate_labor_logs, generate_material_deliveries, generate_rfis, generate_sov, iter_dataset_tables,
+    project_specs,
+)
+from record_buffer import RecordBuffer
+
+DEFAULT_SCALES = [1, 5, 20]
+DEFAULT_WRITERS = ["csv", "json", "ndjson"]
+
+# A stage counts as regressed when its rows/sec falls this far below baseline
+DEFAULT_THRESHOLD = 0.15
+
+# Each case is timed as the best of DEFAULT_REPEATS repeats; a repeat runs the
+# case as many times as it takes to fill DEFAULT_MIN_TIME seconds
+DEFAULT_REPEATS = 5
+DEFAULT_MIN_TIME = 0.2
+
+# Run settings a baseline must share to be compared against
+CONFIG_ARGS = ("labor_engine", "billing_engine", "workers")
+
+
+@dataclass
+class StageInput:
+    """Everything a generate_* stage needs for one project, built outside the timed region."""
+    project: Dict
+    contract_value: float
+    sov_lines: List[Dict]
+    start_date: datetime
+    calendar: Any
+    shard: int
+
+
+def benchmark_projects(scale: float, duration: Optional[int], seed: int = DEFAULT_SEED) -> Iterator[Dict]:
+    """Project specs for a case, with duration_months overridden if given."""
+    for project in project_specs(scale, seed):
+        yield project if duration is None else dict(project, duration_months=duration)
+
+
+def build_inputs(scale: float, duration: Optional[int], seed: int = DEFAULT_SEED) -> List[StageInput]:
+    """Projects for a case plus their contracts and SOVs."""
+    inputs = []
+    for shard, project in enumerate(benchmark_projects(scale, duration, seed)):
+        contract = generate_contract_value(project, table_rng(seed, project["id"], "contracts"))
+        contract_value = contract["original_contract_value"]
+        inputs.append(StageInput(
+            project, contract_value,
+            generate_sov(project, contract_value, table_rng(seed, project["id"], "sov")),
+            datetime.strptime(contract["contract_date"], "%Y-%m-%d"),
+            work_calendar(project["location"]), shard,
+        ))
+    return inputs
+
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+# Each stage generates one table for every project of a case, as the pipeline
+# would with the given engines, and yields its records
+
+def _numpy_rng(seed: int, s: StageInput, table: str):
+    import numpy as np
+    return np.random.default_rng(derive_seed(seed, s.project["id"], table))
+
+
+def stage_labor_logs(inputs: List[StageInput], seed: int, options: GenerationOptions) -> Iterator[Dict]:
+    for s in inputs:
+        ids = IdAllocator(seed, "labor_logs", s.shard)
+        if options.labor_engine == "numpy":
+            from vectorized_engines import generate_labor_logs_numpy
+            yield from generate_labor_logs_numpy(s.project, s.sov_lines, s.start_date,
+                                                 _numpy_rng(seed, s, "labor_logs"), ids, s.calendar)
+        else:
+            yield from generate_labor_logs(s.project, s.sov_lines, s.start_date, seed, ids, s.calendar)
+
+
+def stage_billing_history(inputs: List[StageInput], seed: int, options: GenerationOptions) -> Iterator[Dict]:
+    if options.billing_engine == "numpy":
+        from vectorized_engines import generate_billing_history_batch
+        for start in range(0, len(inputs), ENGINE_BATCH_PROJECTS):
+            batch = inputs[start:start + ENGINE_BATCH_PROJECTS]
+            jobs = [(s.project, s.sov_lines, s.start_date, s.calendar) for s in batch]
+            for records in generate_billing_history_batch(jobs, [_numpy_rng(seed, s, "billing_history")
+                                                                 for s in batch]):
+                yield from records
+        return
+    for s in inputs:
+        yield from generate_billing_history(s.project, s.sov_lines, s.contract_value, s.start_date,
+                                            table_rng(seed, s.project["id"], "billing_history"), s.calendar)
+
+
+def _per_project(generate: Callable[[StageInput, random.Random, int], Iterable[Dict]], table: str):
+    """A stage calling generate(input, the table's RNG, seed) for each project."""
+    def stage(inputs: List[StageInput], seed: int, options: GenerationOptions) -> Iterator[Dict]:
+        for s in inputs:
+            yield from generate(s, table_rng(seed, s.project["id"], table), seed)
+    return stage
+
+
+STAGES: Dict[str, Callable[[List[StageInput], int, GenerationOptions], Iterable[Dict]]] = {
+    "contracts": _per_project(lambda s, rng, seed: [generate_contract_value(s.project, rng)], "contracts"),
+    "sov": _per_project(lambda s, rng, seed: generate_sov(s.project, s.contract_value, rng), "sov"),
+    "labor_logs": stage_labor_logs,
+    "material_deliveries": _per_project(lambda s, rng, seed: generate_material_deliveries(
+        s.project, s.sov_lines, s.start_date, rng, IdAllocator(seed, "material_deliveries", s.shard), s.calendar),
+        "material_deliveries"),
+    "change_orders": _per_project(lambda s, rng, seed: generate_change_orders(
+        s.project, s.contract_value, s.sov_lines, s.start_date, rng, calendar=s.calendar), "change_orders"),
+    "rfis": _per_project(lambda s, rng, seed: generate_rfis(s.project, s.start_date, rng, calendar=s.calendar),
+                         "rfis"),
+    "field_notes": _per_project(lambda s, rng, seed: generate_field_notes(
+        s.project, s.start_date, seed, IdAllocator(seed, "field_notes", s.shard), calendar=s.calendar),
+        "field_notes"),
+    "billing_history": stage_billing_history,
+}
+
+
+def _measure(run: Callable[[], int], memory: bool, repeats: int = DEFAULT_REPEATS,
+             min_time: float = DEFAULT_MIN_TIME) -> Dict[str, Any]:
+    """Best-of-repeats wall time per run() and its row count; with memory, a traced run gives the peak.
+
+    Each repeat calls run() until min_time has passed (at least once) and
+    counts the mean time per call, so short cases are averaged over many
+    calls; the fastest repeat is reported. The first repeat doubles as the
+    warm-up.
+    """
+    best = float("inf")
+    runs = 0
+    for _ in range(max(repeats, 1)):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            rows = run()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+        runs += calls
+    result = {"rows": rows, "wall_s": round(best, 6), "rows_per_s": round(rows / max(best, 1e-9), 1), "runs": runs}
+    if memory:
+        tracemalloc.start()
+        run()
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+
+def bench_stage(stage: str, inputs: List[StageInput], seed: int, options: GenerationOptions,
+                memory: bool, repeats: int = DEFAULT_REPEATS, min_time: float = DEFAULT_MIN_TIME) -> Dict[str, Any]:
+    generate = STAGES[stage]
+
+    def run() -> int:
+        return sum(1 for _ in generate(inputs, seed, options))
+
+    return _measure(run, memory, repeats, min_time)
+
+
+def _output_bytes(output_dir: str) -> Dict[str, int]:
+    """Bytes per table (file name up to the first dot) written to output_dir."""
+    sizes = {}
+    for name in sorted(os.listdir(output_dir)):
+        table = name.split(".", 1)[0]
+        sizes[table] = sizes.get(table, 0) + os.path.getsize(os.path.join(output_dir, name))
+    return sizes
+
+
+def bench_writer(fmt: str, tables: List[Tuple[str, RecordBuffer]], memory: bool, repeats: int = DEFAULT_REPEATS,
+                 min_time: float = DEFAULT_MIN_TIME) -> Dict[str, Any]:
+    """Write pre-generated tables in one format; bytes are per output table."""
+    output_dir = tempfile.mkdtemp(prefix=f"hvac_bench_{fmt}_")
+
+    def run() -> int:
+        shutil.rmtree(output_dir)
+        with DatasetWriter(output_dir, [fmt]) as writer:
+            for table_name, table in tables:
+                writer.write_table(table_name, table)
+        return sum(len(table) for _, table in tables)
+
+    try:
+        result = _measure(run, memory, repeats, min_time)
+        result["bytes"] = _output_bytes(output_dir)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return result
+
+
+def bench_pipeline(scale: float, duration: Optional[int], seed: int, workers: int, formats: List[str],
+                   options: GenerationOptions, memory: bool, repeats: int = DEFAULT_REPEATS,
+                   min_time: float = DEFAULT_MIN_TIME) -> Dict[str, Any]:
+    """Generate and write every table, as main() does (minus its console output)."""
+    output_dir = tempfile.mkdtemp(prefix="hvac_bench_pipeline_")
+
+    def run() -> int:
+        shutil.rmtree(output_dir)
+        with DatasetWriter(output_dir, formats, compact_text=options.compact_text) as writer:
+            for _, tables in iter_dataset_tables(benchmark_projects(scale, duration, seed), seed, workers, options):
+                for table_name, table in tables:
+                    writer.write_table(table_name, table)
+        return sum(writer.counts.values())
+
+    try:
+        result = _measure(run, memory, repeats, min_time)
+        result["bytes"] = _output_bytes(output_dir)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return result
+
+
+def collect_tables(scale: float, duration: Optional[int], seed: int) -> List[Tuple[str, RecordBuffer]]:
+    """Every project's tables of a case, generated up front for the writer benchmarks."""
+    tables = []
+    for _, project_tables in iter_dataset_tables(benchmark_projects(scale, duration, seed), seed):
+        tables.extend(project_tables)
+    return tables
+
+
+# =============================================================================
+# SUITE
+# =============================================================================
+
+def run_suite(scales: List[float], durations: List[Optional[int]], seed: int = DEFAULT_SEED,
+              stages: Iterable[str] = STAGES, writers: Iterable[str] = DEFAULT_WRITERS,
+              pipeline_formats: Optional[List[str]] = None, workers: int = 1,
+              options: Optional[GenerationOptions] = None, memory: bool = True,
+              log: Callable[[str], Any] = print, repeats: int = DEFAULT_REPEATS,
+              min_time: float = DEFAULT_MIN_TIME) -> List[Dict[str, Any]]:
+    """Run every stage, writer and the pipeline for each (scale, duration) case."""
+    options = options or GenerationOptions()
+    pipeline_formats = pipeline_formats or ["csv", "json"]
+    config = {"labor_engine": options.labor_engine, "billing_engine": options.billing_engine, "workers": workers}
+    results = []
+
+    def record(kind: str, name: str, scale: float, duration: Optional[int], projects: int, result: Dict):
+        entry = {"kind": kind, "name": name, "scale": scale, "duration": duration, "projects": projects,
+                 "config": config, **result}
+        results.append(entry)
+        log(format_result(entry))
+
+    for scale in scales:
+        for duration in durations:
+            inputs = build_inputs(scale, duration, seed)
+            for stage in stages:
+                record("stage", stage, scale, duration, len(inputs),
+                       bench_stage(stage, inputs, seed, options, memory, repeats, min_time))
+            if writers:
+                tables = collect_tables(scale, duration, seed)
+                for fmt in writers:
+                    record("writer", fmt, scale, duration, len(inputs),
+                           bench_writer(fmt, tables, memory, repeats, min_time))
+                del tables
+            record("pipeline", "+".join(pipeline_formats), scale, duration, len(inputs),
+                   bench_pipeline(scale, duration, seed, workers, pipeline_formats, options, memory,
+                                  repeats, min_time))
+    return results
+
+
+def result_key(entry: Dict) -> Tuple:
+    """A case's identity: what was run, at what size, with which engines and worker count."""
+    config = entry.get("config", {})
+    return (entry["kind"], entry["name"], entry["scale"], entry["duration"],
+            *(config.get(name) for name in CONFIG_ARGS))
+
+
+def config_mismatch(args: Dict, baseline_args: Dict) -> List[str]:
+    """The CONFIG_ARGS on which a baseline's run differs from this one."""
+    return [name for name in CONFIG_ARGS if baseline_args.get(name) != args.get(name)]
+
+
+def format_result(entry: Dict, change: Optional[float] = None) -> str:
+    duration = "native" if entry["duration"] is None else f"{entry['duration']}mo"
+    line = (f"{entry['kind']:>8} {entry['name']:<20} scale={entry['scale']:<6g} {duration:<7}"
+            f"{entry['rows']:>10,} rows {entry['wall_s']:>8.3f}s {entry['rows_per_s']:>12,.0f} rows/s")
+    if "peak_mb" in entry:
+        line += f" {entry['peak_mb']:>8.1f} MB"
+    if "bytes" in entry:
+        line += f" {sum(entry['bytes'].values()) / 2**20:>8.1f} MB out"
+    if change is not None:
+        line += f" {change:+7.1%}"
+    return line
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Print each case's rows/sec change against the baseline; return the regressions."""
+    previous = {result_key(entry): entry for entry in baseline}
+    regressions = []
+    print(f"\nComparison with baseline (regression: rows/s down more than {threshold:.0%}):")
+    for entry in results:
+        base = previous.get(result_key(entry))
+        if base is None or not base["rows_per_s"]:
+            continue
+        change = entry["rows_per_s"] / base["rows_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(dict(entry, baseline_rows_per_s=base["rows_per_s"], change=round(change, 4)))
+            flag = "  REGRESSION"
+        if entry["rows"] != base["rows"]:
+            flag += f"  (rows {base['rows']:,} -> {entry['rows']:,})"
+        print(format_result(entry, change) + flag)
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def _parse_durations(value: str) -> List[Optional[int]]:
+    return [None if d == "native" else int(d) for d in value.split(",")]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the HVAC dataset generator stages and writers.")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated scale factors (scale 1 = 5 projects).")
+    parser.add_argument("--durations", default="native",
+                        help="Comma-separated project durations in months; 'native' keeps each project's own.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Generator stages: {', '.join(STAGES)}.")
+    parser.add_argument("--writers", default=",".join(DEFAULT_WRITERS),
+                        help=f"Output writers benchmarked on pre-generated records: {', '.join(OUTPUT_FORMATS)}.")
+    parser.add_argument("--pipeline-formats", default="csv,json", help="Formats written by the end-to-end run.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the end-to-end run.")
+    parser.add_argument("--labor-engine", choices=["python", "numpy"], default="python")
+    parser.add_argument("--billing-engine", choices=["python", "numpy"], default="python")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="Time each case this many times and keep the fastest.")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="Seconds each repeat runs its case for (repeating short cases).")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the traced second run that measures peak memory.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to save the results.")
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on regressions.")
+    parser.add_argument("--save-baseline", help="Also save the results as this baseline file.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fractional rows/s drop that counts as a regression.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    stages = [s for s in args.stages.split(",") if s]
+    writers = [w for w in args.writers.split(",") if w]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {sorted(unknown)}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = config_mismatch(vars(args), baseline.get("args", {}))
+        if mismatch:
+            print("Baseline was recorded with different " + ", ".join(
+                f"--{name.replace('_', '-')} ({baseline.get('args', {}).get(name)} vs {getattr(args, name)})"
+                for name in mismatch) + "; not comparing", file=sys.stderr)
+            return 2
+
+    options = GenerationOptions(labor_engine=args.labor_engine, billing_engine=args.billing_engine)
+    results = run_suite([float(s) for s in args.scales.split(",")], _parse_durations(args.durations), args.seed,
+                        stages, writers, args.pipeline_formats.split(","), args.workers, options,
+                        memory=not args.no_memory, repeats=args.repeats, min_time=args.min_time)
+    report = {"environment": environment(), "args": vars(args), "results": results}
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Columnar export backends for the HVAC dataset generator.
+
+Tables are buffered in batches and written as Parquet or Arrow IPC files via
+pyarrow when it is installed, or as a NumPy .npz archive when it is not.
+Low-cardinality columns are dictionary-encoded against a per-table dictionary
+that grows as new values appear, dates are stored as day-resolution dates and
+numbers keep their integer/float types. Column types come from the
+TABLE_SCHEMAS mapping in generate_hvac_dataset.py.
+"""
+
+import json
+import warnings
+import zipfile
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "npz": ".npz"}
+
+DEFAULT_BATCH_ROWS = 65536
+
+# npz stores nulls in these kinds as a fill value plus a .mask array
+NPZ_FILL = {"int": 0, "bool": False}
+NPZ_DTYPES = {"int": np.int64, "bool": bool} if np is not None else {}
+
+
+def resolve_columnar_format(fmt: str) -> str:
+    """Return the backend to use for a requested format.
+
+    Parquet and Arrow need pyarrow; without it they fall back to npz, with a
+    RuntimeWarning (shown once per format under the default warning filters).
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    if fmt in ("parquet", "arrow") and pa is None:
+        warnings.warn(f"pyarrow not installed - writing npz instead of {fmt}", RuntimeWarning, stacklevel=2)
+        fmt = "npz"
+    if fmt == "npz" and np is None:
+        raise ImportError("Columnar export needs pyarrow or numpy")
+    return fmt
+
+
+# =============================================================================
+# SINK
+# =============================================================================
+
+class ColumnarTableSink:
+    """Streams one table to a columnar file in batches of batch_rows rows.
+
+    Category columns are interned into integer codes as rows arrive; each
+    batch is written against the dictionary accumulated so far, so only new
+    values are ever added (Arrow IPC writes them as dictionary deltas).
+    """
+
+    def __init__(self, path_base: str, schema: Dict[str, str], fmt: str = "parquet",
+                 batch_rows: int = DEFAULT_BATCH_ROWS):
+        self.fmt = resolve_columnar_format(fmt)
+        self.path = path_base + COLUMNAR_FORMATS[self.fmt]
+        self.schema = schema
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._columns = {name: [] for name in schema}
+        self._categories = {name: {} for name, kind in schema.items() if kind == "category"}
+        self._writer = None
+        self._parts = 0
+
+    def write(self, record: Dict):
+        for name, kind in self.schema.items():
+            value = record.get(name)
+            if kind == "category":
+                if value is not None:
+                    codes = self._categories[name]
+                    code = codes.get(value)
+                    if code is None:
+                        code = codes[value] = len(codes)
+                    value = code
+            elif kind == "json" and value is not None:
+                value = json.dumps(value)
+            elif kind == "list" and value is not None and self.fmt == "npz":
+                value = json.dumps(value)
+            self._columns[name].append(value)
+
+        if len(self._columns[next(iter(self.schema))]) >= self.batch_rows:
+            self._flush()
+
+    def write_columns(self, columns: Dict[str, Sequence]):
+        """Append whole columns (name -> equal-length values), converted as write() converts each value."""
+        rows = len(next(iter(columns.values()), ()))
+        for name, kind in self.schema.items():
+            values = columns.get(name)
+            if values is None:
+                values = [None] * rows
+            elif kind == "category":
+                # Code each distinct value once (in first-seen order, as write() would), then map the column
+                codes = self._categories[name]
+                distinct = dict.fromkeys(values)
+                for value in distinct:
+                    if value is not None and value not in codes:
+                        codes[value] = len(codes)
+                distinct = {value: codes.get(value) for value in distinct}
+                values = list(map(distinct.__getitem__, values))
+            elif kind == "json" or kind == "list" and self.fmt == "npz":
+                values = [None if value is None else json.dumps(value) for value in values]
+            self._columns[name].extend(values)
+
+        if len(self._columns[next(iter(self.schema))]) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        n = len(self._columns[next(iter(self.schema))])
+        if n == 0:
+            return
+        if self.fmt == "npz":
+            self._flush_npz()
+        else:
+            self._flush_arrow()
+        self.rows_written += n
+        self._columns = {name: [] for name in self.schema}
+
+    # -- pyarrow --------------------------------------------------------------
+
+    def _arrow_schema(self):
+        type_map = {
+            "string": pa.string(),
+            "category": pa.dictionary(pa.int32(), pa.string()),
+            "date": pa.date32(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "bool": pa.bool_(),
+            "list": pa.list_(pa.string()),
+            "json": pa.string(),
+        }
+        return pa.schema([(name, type_map[kind]) for name, kind in self.schema.items()])
+
+    def _flush_arrow(self):
+        schema = self._arrow_schema()
+        arrays = []
+        for name, kind in self.schema.items():
+            values = self._columns[name]
+            if kind == "category":
+                dictionary = pa.array(list(self._categories[name]), pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int32()), dictionary))
+            elif kind == "date":
+                arrays.append(pa.array(values, pa.string()).cast(pa.date32()))
+            else:
+                arrays.append(pa.array(values, schema.field(name).type))
+        batch = pa.record_batch(arrays, schema=schema)
+
+        if self._writer is None:
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+            else:
+                options = pa_ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True)
+                self._writer = pa_ipc.new_file(self.path, schema, options=options)
+        self._writer.write_batch(batch)
+
+    # -- numpy fallback ---------------------------------------------------------
+
+    def _flush_npz(self):
+        if self._writer is None:
+            self._writer = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        prefix = f"p{self._parts:05d}"
+        for name, kind in self.schema.items():
+            values = self._columns[name]
+            mask = None
+            if kind == "category":
+                array = np.array([-1 if v is None else v for v in values], dtype=np.int32)
+            elif kind == "date":
+                array = np.array(["NaT" if v is None else v for v in values], dtype="datetime64[D]")
+            elif kind == "float":
+                array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                if any(v is None for v in values):
+                    mask = np.array([v is None for v in values], dtype=bool)
+                if kind in NPZ_FILL:
+                    fill = NPZ_FILL[kind]
+                    array = np.array([fill if v is None else v for v in values], dtype=NPZ_DTYPES[kind])
+                else:
+                    array = np.array(["" if v is None else v for v in values], dtype=str)
+            _write_npy(self._writer, f"{prefix}.{name}", array)
+            if mask is not None:
+                _write_npy(self._writer, f"{prefix}.{name}.mask", mask)
+        self._parts += 1
+
+    def close(self):
+        self._flush()
+        if self.fmt == "npz":
+            if self._writer is None:
+                self._writer = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+            for name, codes in self._categories.items():
+                _write_npy(self._writer, f"categories.{name}", np.array(list(codes), dtype=str))
+            meta = {"schema": self.schema, "parts": self._parts, "rows": self.rows_written}
+            _write_npy(self._writer, "meta", np.array(json.dumps(meta)))
+            self._writer.close()
+        elif self._writer is not None:
+            self._writer.close()
+
+
+def _write_npy(zf: zipfile.ZipFile, name: str, array: Any):
+    with zf.open(name + ".npy", "w", force_zip64=True) as f:
+        np.lib.format.write_array(f, array, allow_pickle=False)
+
+
+# =============================================================================
+# READERS
+# =============================================================================
+
+class Categorical(NamedTuple):
+    """Dictionary-encoded column from an npz table (-1 codes are null)."""
+    codes: Any
+    categories: Any
+
+    def decode(self):
+        values = self.categories[self.codes].astype(object)
+        values[self.codes < 0] = None
+        return values
+
+
+def read_npz_table(path: str, columns: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Read selected columns of an npz table into NumPy arrays.
+
+    Category columns come back as Categorical(codes, categories); int, bool,
+    string, list and json columns holding nulls come back as object arrays
+    with None for nulls. List and json columns hold the decoded lists and
+    objects.
+    Only the requested columns are decompressed.
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["meta"]))
+        schema = meta["schema"]
+        names = list(columns) if columns is not None else list(schema)
+        result = {}
+        for name in names:
+            kind = schema[name]
+            parts = [npz[f"p{i:05d}.{name}"] for i in range(meta["parts"])]
+            if parts:
+                array = np.concatenate(parts)
+            else:
+                array = np.array([], dtype=np.int32 if kind == "category" else object)
+            if kind == "category":
+                result[name] = Categorical(array, npz[f"categories.{name}"])
+                continue
+            masks = [(i, f"p{i:05d}.{name}.mask") for i in range(len(parts))]
+            masks = [(i, key) for i, key in masks if key in npz.files]
+            if masks or kind in ("string", "list", "json"):
+                array = array.astype(object)
+                starts = np.cumsum([0] + [len(part) for part in parts])
+                for i, key in masks:
+                    array[starts[i]:starts[i + 1]][npz[key]] = None
+            if kind in ("list", "json"):
+                # Written as JSON text; decoded back to the lists and objects that were written
+                for i, value in enumerate(array):
+                    if value is not None:
+                        array[i] = json.loads(value)
+            result[name] = array
+        return result
+
+
+def read_columnar(path: str, columns: Optional[List[str]] = None):
+    """Read a columnar table written by ColumnarTableSink.
+
+    Returns a pyarrow.Table for .parquet/.arrow files and a dict of NumPy
+    arrays (see read_npz_table) for .npz files.
+    """
+    if path.endswith(".npz"):
+        return read_npz_table(path, columns)
+    if pa is None:
+        raise ImportError("Reading Parquet/Arrow files needs pyarrow")
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=columns)
+    with pa_ipc.open_file(path) as reader:
+        table = reader.read_all()
+    return table.select(columns) if columns is not None else table
@@ -0,0 +1,920 @@
+#!/usr/bin/env python3
+"""
+Reference data, work calendars, RNG streams and table specs of the HVAC dataset.
+
+Holds what every generator of the dataset shares: the SOV template, crew
+roles and text templates, the working-day calendars, per-project/per-table
+RNG seeds and the deterministic record ID allocator, and the table_specs.py
+specs of the built-in contracts, SOV, labor log, RFI and field note tables.
+generate_hvac_dataset.py, vectorized_engines.py and
+gemini_synthetic_data_script.py import it; it only needs the standard
+library and table_specs.py.
+"""
+
+import base64
+import hashlib
+import random
+import string
+import struct
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+from table_specs import (
+    Bernoulli, Choice, Column, ColumnFn, Constant, DateAfter, DayOffset, DayString, Derived, Distinct, IntRange,
+    Lookup, Numbered, ParentLookup, PickFrom, ProjectField, RecordIds, RowIndex, SpecContext, TableSpec, Template,
+    Uniform, Workdays, check_table_spec,
+)
+
+# Upper bound on project floors; per-project floor vocabularies are prefixes of range(1, MAX_FLOORS + 1)
+MAX_FLOORS = 120
+
+# =============================================================================
+# REFERENCE DATA
+# =============================================================================
+
+SOV_TEMPLATE = [
+    {"code": "01", "description": "General Conditions & Project Management", "pct_range": (0.06, 0.09)},
+    {"code": "02", "description": "Submittals & Engineering", "pct_range": (0.02, 0.04)},
+    {"code": "03", "description": "Ductwork - Fabrication", "pct_range": (0.08, 0.12)},
+    {"code": "04", "description": "Ductwork - Installation", "pct_range": (0.10, 0.14)},
+    {"code": "05", "description": "Piping - Hydronic Systems", "pct_range": (0.08, 0.12)},
+    {"code": "06", "description": "Piping - Refrigerant", "pct_range": (0.04, 0.07)},
+    {"code": "07", "description": "Equipment - RTUs/AHUs", "pct_range": (0.12, 0.18)},
+    {"code": "08", "description": "Equipment - Chillers/Boilers", "pct_range": (0.08, 0.14)},
+    {"code": "09", "description": "Equipment - Terminal Units (VAV/FCU)", "pct_range": (0.06, 0.10)},
+    {"code": "10", "description": "Controls - DDC/BAS Installation", "pct_range": (0.06, 0.10)},
+    {"code": "11", "description": "Controls - Programming & Commissioning", "pct_range": (0.03, 0.05)},
+    {"code": "12", "description": "Insulation", "pct_range": (0.04, 0.06)},
+    {"code": "13", "description": "Testing, Adjusting & Balancing (TAB)", "pct_range": (0.02, 0.04)},
+    {"code": "14", "description": "Startup & Commissioning Support", "pct_range": (0.02, 0.03)},
+    {"code": "15", "description": "Closeout Documentation & Training", "pct_range": (0.01, 0.02)},
+]
+
+CREW_ROLES = [
+    {"role": "Foreman", "hourly_rate": 85.50, "burden_rate": 1.42},
+    {"role": "Journeyman Sheet Metal", "hourly_rate": 72.00, "burden_rate": 1.42},
+    {"role": "Journeyman Pipefitter", "hourly_rate": 74.50, "burden_rate": 1.42},
+    {"role": "Apprentice 4th Year", "hourly_rate": 52.00, "burden_rate": 1.38},
+    {"role": "Apprentice 2nd Year", "hourly_rate": 38.00, "burden_rate": 1.38},
+    {"role": "Controls Technician", "hourly_rate": 68.00, "burden_rate": 1.40},
+    {"role": "Insulator", "hourly_rate": 58.00, "burden_rate": 1.40},
+    {"role": "Helper/Laborer", "hourly_rate": 32.00, "burden_rate": 1.35},
+]
+
+MATERIAL_CATEGORIES = [
+    {"category": "Ductwork", "items": ["Galvanized Sheet Metal 22ga", "Galvanized Sheet Metal 20ga", "Flex Duct 8\"", "Flex Duct 10\"", "Flex Duct 12\"", "Spiral Duct 12\"", "Spiral Duct 16\"", "Spiral Duct 24\"", "Duct Sealant", "Hanging Hardware"]},
+    {"category": "Piping", "items": ["Copper Type L 1\"", "Copper Type L 1.5\"", "Copper Type L 2\"", "Black Steel Sch40 2\"", "Black Steel Sch40 4\"", "PVC Sch40 4\"", "Pipe Hangers Assorted", "Brazing Alloy", "Flux", "Refrigerant R-410A"]},
+    {"category": "Equipment", "items": ["RTU 15-Ton", "RTU 25-Ton", "AHU Custom", "Chiller 200-Ton", "Boiler 2000MBH", "VAV Box 12\"", "VAV Box 16\"", "FCU 2-Pipe", "FCU 4-Pipe", "Split System 3-Ton"]},
+    {"category": "Controls", "items": ["DDC Controller", "VAV Controller", "Temp Sensor", "Pressure Sensor", "Actuator 24V", "Damper Motor", "Control Valve 1\"", "Control Valve 2\"", "BACnet Gateway", "Touchscreen Interface"]},
+    {"category": "Insulation", "items": ["Fiberglass Duct Wrap R-8", "Fiberglass Duct Liner R-6", "Pipe Insulation 1\" Armaflex", "Pipe Insulation 2\" Armaflex", "Insulation Adhesive", "Vapor Barrier Tape"]},
+]
+
+RFI_SUBJECTS = [
+    "Coordination conflict with electrical conduit at grid {grid}",
+    "Clarification needed on diffuser layout for {room}",
+    "Structural penetration approval required at {location}",
+    "Equipment access clearance insufficient per spec",
+    "Ductwork routing conflicts with beam at elevation {elev}",
+    "Control sequence clarification for {system}",
+    "Pipe sleeve size discrepancy at {location}",
+    "Seismic bracing requirements for equipment over {weight} lbs",
+    "Fire damper location verification needed",
+    "Insulation spec clarification for exterior application",
+    "VAV box sizing appears undersized for zone CFM",
+    "Refrigerant piping routing through {area} - approval needed",
+    "Existing conditions differ from drawings at {location}",
+    "Thermostat location conflicts with furniture layout",
+    "Access panel requirements for concealed valves",
+]
+
+CHANGE_ORDER_REASONS = [
+    ("Owner Request", "Added {item} per owner directive"),
+    ("Design Error", "Drawings showed incorrect {dimension} - field correction required"),
+    ("Unforeseen Condition", "Discovered {condition} not shown on documents"),
+    ("Coordination", "Rerouting required due to {trade} conflict"),
+    ("Code Compliance", "Inspector required {requirement}"),
+    ("Value Engineering", "Substitution approved: {old_item} to {new_item}"),
+    ("Scope Gap", "Work not clearly defined in bid documents"),
+    ("Acceleration", "Premium time to maintain schedule"),
+]
+
+FIELD_NOTE_TEMPLATES = [
+    "Crew arrived {time}. Weather: {weather}. {crew_count} workers on site. Focus today: {task}. {observation}",
+    "Safety meeting held at start of shift - topic: {safety_topic}. All PPE verified. {work_description}",
+    "Received delivery of {material} - {qty} units. {receipt_note}. Staged at {location}.",
+    "Met with {trade} foreman re: coordination. {meeting_outcome}. Action items: {actions}",
+    "GC weekly meeting - discussed {topics}. Schedule status: {schedule_status}. RFIs pending: {rfi_count}.",
+    "Installed {qty} {units} on floor {floor}. {quality_note}. Inspections needed: {inspections}.",
+    "Equipment startup for {equipment}. {startup_result}. Punch list items: {punch_items}.",
+    "{issue_type} encountered: {issue_description}. Resolution: {resolution}. Impact: {impact}.",
+    "Working in {area} - {progress_pct}% complete this zone. Remaining: {remaining_work}.",
+    "TAB contractor on site - balancing {system}. Initial readings: {readings}. Adjustments: {adjustments}.",
+]
+
+# Per-project tables of the dataset, in output order
+TABLE_NAMES = [
+    "contracts", "sov", "labor_logs", "material_deliveries", "change_orders",
+    "rfis", "field_notes", "billing_history", "bid_estimates",
+]
+
+
+# =============================================================================
+# TEXT TEMPLATES
+# =============================================================================
+
+class SlotProduct:
+    """Indexable cartesian product of vocabularies, formatted with a pattern.
+
+    The first part is the most significant digit, so restricting it to a
+    prefix (e.g. floors 1..n) yields a prefix of the full product.
+    """
+
+    def __init__(self, pattern: str, *parts: Sequence):
+        self.pattern = pattern
+        self.parts = parts
+        self._size = 1
+        for part in parts:
+            self._size *= len(part)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        values = []
+        for part in reversed(self.parts):
+            index, i = divmod(index, len(part))
+            values.append(part[i])
+        return self.pattern.format(*reversed(values))
+
+
+class TemplateSet:
+    """Precompiled str.format templates over a shared slot vocabulary table.
+
+    Each template is parsed once into literal fragments and the slots it
+    references. A text is sampled as (template_id, slot indices), drawing only
+    the slots that template uses, and rendered from those indices on demand.
+    """
+
+    def __init__(self, templates: List[str], slots: Dict[str, Any]):
+        self.templates = templates
+        self.slots = slots
+        self.compiled = [self._compile(template) for template in templates]
+
+    @staticmethod
+    def _compile(template: str) -> Tuple[List[str], List[str], List[int]]:
+        """Split a template into literals, unique slot names and placeholder order.
+
+        literals always has one more entry than order, so rendering is a
+        strict literal/value alternation.
+        """
+        literals, names, order = [], [], []
+        for literal, field, _spec, _conversion in string.Formatter().parse(template):
+            if len(literals) > len(order):
+                literals[-1] += literal
+            else:
+                literals.append(literal)
+            if field is not None:
+                if field not in names:
+                    names.append(field)
+                order.append(names.index(field))
+        if len(literals) == len(order):
+            literals.append("")
+        return literals, names, order
+
+    def slot_names(self, template_id: int) -> List[str]:
+        return self.compiled[template_id][1]
+
+    def vocabulary(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Slot table with per-project overrides applied."""
+        return {**self.slots, **overrides} if overrides else self.slots
+
+    def sample(self, rng: random.Random, vocab: Optional[Dict[str, Any]] = None) -> Tuple[int, Tuple[int, ...]]:
+        """Draw a template and an index for each slot it references."""
+        vocab = vocab or self.slots
+        template_id = rng.randrange(len(self.compiled))
+        return template_id, tuple(rng.randrange(len(vocab[name])) for name in self.compiled[template_id][1])
+
+    def render(self, template_id: int, indices: Sequence[int], vocab: Optional[Dict[str, Any]] = None) -> str:
+        vocab = vocab or self.slots
+        literals, names, order = self.compiled[template_id]
+        values = [str(vocab[name][i]) for name, i in zip(names, indices)]
+        parts = [literals[0]]
+        for slot, literal in zip(order, literals[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        return "".join(parts)
+
+    def render_batch(self, rng: random.Random, n: int, overrides: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Sample and render n texts against one resolved vocabulary."""
+        vocab = self.vocabulary(overrides)
+        render, sample = self.render, self.sample
+        return [render(*sample(rng, vocab), vocab) for _ in range(n)]
+
+    def render_codes(self, codes: Iterable[int]) -> List[str]:
+        """Render a batch of compact codes (see encode)."""
+        render, decode = self.render, self.decode
+        return [render(*decode(code)) for code in codes]
+
+    # -- Compact encoding -------------------------------------------------------
+    # A text is stored as one integer: the template id plus its slot indices
+    # in mixed radix over the global slot sizes. Codes for all templates in
+    # this repo fit in 3 bytes.
+
+    def encode(self, template_id: int, indices: Sequence[int]) -> int:
+        code = 0
+        for name, i in zip(reversed(self.compiled[template_id][1]), reversed(indices)):
+            code = code * len(self.slots[name]) + i
+        return code * len(self.compiled) + template_id
+
+    def decode(self, code: int) -> Tuple[int, Tuple[int, ...]]:
+        code, template_id = divmod(code, len(self.compiled))
+        indices = []
+        for name in self.compiled[template_id][1]:
+            code, i = divmod(code, len(self.slots[name]))
+            indices.append(i)
+        return template_id, tuple(indices)
+
+    def sample_code(self, rng: random.Random, vocab: Optional[Dict[str, Any]] = None) -> int:
+        return self.encode(*self.sample(rng, vocab))
+
+    def render_code(self, code: int) -> str:
+        return self.render(*self.decode(code))
+
+    def slot_values(self, code: int) -> Dict[str, Any]:
+        """Decoded slot values of a code, e.g. for filtering by slot."""
+        template_id, indices = self.decode(code)
+        return {name: self.slots[name][i] for name, i in zip(self.compiled[template_id][1], indices)}
+
+# Slot vocabularies, indexable by position. Tuples are choice lists, ranges
+# are integer slots and SlotProducts are formatted combinations. Slots that
+# depend on the project (floor, location) are sampled from a per-project
+# override that is a prefix of the global vocabulary, so slot indices always
+# decode against these shared tables.
+FIELD_NOTE_SLOTS = {
+    "time": ("0600", "0630", "0700"),
+    "weather": ("Clear, 72°F", "Partly cloudy, 65°F", "Rain - indoor work only", "Hot, 95°F - heat protocol", "Cold, 35°F"),
+    "crew_count": range(4, 17),
+    "task": (
+        "ductwork installation Floor 3", "piping rough-in mechanical room",
+        "hanging VAV boxes wing B", "controls wiring", "insulation west side",
+        "equipment rigging", "startup AHU-2", "TAB work zones 1-4"
+    ),
+    "observation": (
+        "Good progress.", "Behind schedule due to material delay.",
+        "Ahead of plan.", "Coordination issues with electrical - resolved on site.",
+        "Waiting on RFI response to proceed.", "Inspection passed."
+    ),
+    "safety_topic": (
+        "ladder safety", "PPE requirements", "fall protection",
+        "hot work permits", "lockout/tagout", "confined space entry"
+    ),
+    "work_description": (
+        "Continued ductwork installation per plan.",
+        "Completed piping pressure test - passed.",
+        "Set 3 VAV boxes, awaiting controls.",
+        "Ran refrigerant lines to condensers."
+    ),
+    "material": ("sheet metal", "copper piping", "VAV boxes", "RTU", "insulation"),
+    "qty": range(10, 201),
+    "receipt_note": ("Matched PO", "Short 2 boxes - claim filed", "All accounted for"),
+    "location": ("laydown area A", "mechanical room", "loading dock", "floor 3 staging"),
+    "trade": ("electrical", "plumbing", "fire protection", "drywall"),
+    "meeting_outcome": (
+        "Agreed on sequence for ceiling close-in",
+        "Resolved duct routing conflict",
+        "Scheduled joint walkthrough Friday"
+    ),
+    "actions": (
+        "HVAC to relocate diffuser 6 inches east",
+        "FP to adjust sprinkler head locations",
+        "Awaiting revised drawings"
+    ),
+    "topics": (
+        "schedule recovery, material lead times, inspections",
+        "safety incident review, upcoming inspections, manpower",
+        "change orders, RFI backlog, coordination"
+    ),
+    "schedule_status": ("on track", "3 days behind", "ahead 2 days", "critical - recovery plan in place"),
+    "rfi_count": range(2, 16),
+    "units": ("VAV boxes", "diffusers", "LF of duct", "pipe hangers"),
+    "floor": range(1, MAX_FLOORS + 1),
+    "quality_note": ("Passed QC inspection", "Minor punch items noted", "Rework required grid C-4"),
+    "inspections": ("rough-in Friday", "pressure test Monday", "none"),
+    "equipment": ("RTU-1", "AHU-2", "Chiller", "Boiler", "FCU bank west"),
+    "startup_result": (
+        "Successful - all parameters normal",
+        "Minor vibration issue - balancing tomorrow",
+        "Delayed - controls not ready"
+    ),
+    "punch_items": ("none", "3 minor items", "damper actuator adjustment", "sensor calibration"),
+    "issue_type": ("Coordination conflict", "Material issue", "Design discrepancy", "Access issue"),
+    "issue_description": (
+        "sprinkler head conflicts with diffuser at B-7",
+        "wrong size fittings delivered",
+        "field conditions don't match drawings",
+        "ceiling access restricted by other trade"
+    ),
+    "resolution": (
+        "RFI submitted", "Resolved on site with GC", "Awaiting engineer response", "Workaround implemented"
+    ),
+    "impact": ("none", "1 day delay", "cost impact TBD", "schedule neutral"),
+    "area": ("Zone 3", "mechanical room", "penthouse", "basement", "floors 4-6"),
+    "progress_pct": range(40, 96),
+    "remaining_work": (
+        "diffusers and connections", "insulation and startup",
+        "controls terminations", "final connections"
+    ),
+    "system": ("VAV system floor 2", "AHU-1 supply", "FCU loop", "exhaust system"),
+    "readings": (
+        "CFM within 5% of design", "static pressure high",
+        "flow low on 3 boxes", "all zones balanced"
+    ),
+    "adjustments": (
+        "sheave change AHU", "damper repositioning", "none required", "VFD reprogramming"
+    ),
+}
+
+GRID_LINES = SlotProduct("{}-{}", "ABCDEFGH", range(1, 13))
+
+RFI_SUBJECT_SLOTS = {
+    "grid": GRID_LINES,
+    "room": SlotProduct("Room {}", range(100, 601)),
+    "location": SlotProduct("Floor {}, Grid {}", range(1, MAX_FLOORS + 1), GRID_LINES),
+    "elev": SlotProduct("+{}'-0\"", range(10, 51)),
+    "system": ("AHU-1", "CHW Loop", "HW Loop", "Exhaust System", "VAV Zone 3"),
+    "area": ("mechanical room", "ceiling plenum", "exterior wall", "elevator shaft"),
+    "weight": ("500", "1000", "2000"),
+}
+
+CHANGE_ORDER_SLOTS = {
+    "item": ("exhaust fan", "VAV boxes", "chilled water piping", "controls points"),
+    "dimension": ("duct size", "pipe elevation", "equipment clearance"),
+    "condition": ("existing ductwork", "abandoned piping", "structural conflict", "asbestos insulation"),
+    "trade": ("electrical", "plumbing", "fire protection", "structural"),
+    "requirement": ("additional smoke detectors", "seismic upgrades", "fire dampers", "access panels"),
+    "old_item": ("Carrier RTU", "Trane chiller", "copper piping"),
+    "new_item": ("Daikin RTU", "York chiller", "steel piping"),
+}
+
+FIELD_NOTE_TEXT = TemplateSet(FIELD_NOTE_TEMPLATES, FIELD_NOTE_SLOTS)
+RFI_SUBJECT_TEXT = TemplateSet(RFI_SUBJECTS, RFI_SUBJECT_SLOTS)
+# Template ids line up with CHANGE_ORDER_REASONS, so the id also gives reason_category
+CHANGE_ORDER_TEXT = TemplateSet([template for _, template in CHANGE_ORDER_REASONS], CHANGE_ORDER_SLOTS)
+
+# Text columns that --compact-text stores as template codes: table -> (text column, code column, templates)
+COMPACT_TEXT_COLUMNS = {
+    "field_notes": ("content", "content_code", FIELD_NOTE_TEXT),
+    "rfis": ("subject", "subject_code", RFI_SUBJECT_TEXT),
+    "change_orders": ("description", "description_code", CHANGE_ORDER_TEXT),
+}
+
+
+# =============================================================================
+# WORK CALENDARS
+# =============================================================================
+
+def _observed(day: date) -> date:
+    """Shift a fixed-date holiday falling on a weekend to the nearest weekday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth weekday (Monday=0) of a month; n=-1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+HOLIDAY_RULES = {
+    "new_years_day": lambda y: _observed(date(y, 1, 1)),
+    "mlk_day": lambda y: _nth_weekday(y, 1, 0, 3),
+    "cesar_chavez_day": lambda y: _observed(date(y, 3, 31)),
+    "memorial_day": lambda y: _nth_weekday(y, 5, 0, -1),
+    "juneteenth": lambda y: _observed(date(y, 6, 19)),
+    "independence_day": lambda y: _observed(date(y, 7, 4)),
+    "labor_day": lambda y: _nth_weekday(y, 9, 0, 1),
+    "veterans_day": lambda y: _observed(date(y, 11, 11)),
+    "thanksgiving": lambda y: _nth_weekday(y, 11, 3, 4),
+    "day_after_thanksgiving": lambda y: _nth_weekday(y, 11, 3, 4) + timedelta(days=1),
+    "christmas": lambda y: _observed(date(y, 12, 25)),
+}
+
+# Holidays observed on every job site (typical union construction calendar)
+CONSTRUCTION_HOLIDAYS = [
+    "new_years_day", "memorial_day", "independence_day", "labor_day",
+    "thanksgiving", "day_after_thanksgiving", "christmas",
+]
+
+# Extra holidays observed by local crews, by project location
+LOCATION_HOLIDAYS = {
+    "Phoenix, AZ": ["mlk_day"],
+    "Denver, CO": ["cesar_chavez_day"],
+    "Austin, TX": ["juneteenth"],
+    "Ashburn, VA": ["juneteenth"],
+    "Seattle, WA": ["juneteenth", "veterans_day"],
+}
+
+# weekdays: Monday-Friday; holidays: minus CONSTRUCTION_HOLIDAYS; local: also minus LOCATION_HOLIDAYS
+CALENDAR_MODES = ["weekdays", "holidays", "local"]
+
+
+class WorkCalendar:
+    """Working days (Monday-Friday minus holidays) for one job site.
+
+    Days are proleptic ordinals (date.toordinal()) so the generators can step
+    through them with integer arithmetic. Runs of working days are computed
+    once per (start, count) and shared by every table of a project.
+    """
+
+    def __init__(self, name: str, holiday_rules: Sequence[str] = ()):
+        self.name = name
+        self.holiday_rules = tuple(holiday_rules)
+        self._holidays = {}
+        self._runs = {}
+
+    def holidays(self, year: int) -> frozenset:
+        """Holiday ordinals for one year."""
+        days = self._holidays.get(year)
+        if days is None:
+            days = frozenset(HOLIDAY_RULES[rule](year).toordinal() for rule in self.holiday_rules)
+            self._holidays[year] = days
+        return days
+
+    def is_workday(self, day: int) -> bool:
+        # Ordinal 1 (0001-01-01) is a Monday
+        if (day - 1) % 7 >= 5:
+            return False
+        return not self.holiday_rules or day not in self.holidays(date.fromordinal(day).year)
+
+    def workdays(self, start: date, count: int) -> List[int]:
+        """The first count working days on or after start (shared, do not modify)."""
+        key = (start.toordinal(), count)
+        run = self._runs.get(key)
+        if run is None:
+            run = []
+            day = key[0]
+            while len(run) < count:
+                if self.is_workday(day):
+                    run.append(day)
+                day += 1
+            self._runs[key] = run
+        return run
+
+    def roll_forward(self, day: int) -> int:
+        """The first working day on or after day."""
+        while not self.is_workday(day):
+            day += 1
+        return day
+
+    def roll_back(self, day: int) -> int:
+        """The last working day on or before day."""
+        while not self.is_workday(day):
+            day -= 1
+        return day
+
+
+@lru_cache(maxsize=None)
+def work_calendar(location: str, mode: str = "weekdays") -> WorkCalendar:
+    """The (per-process, cached) calendar for a project location."""
+    if mode == "weekdays":
+        rules = []
+    elif mode == "holidays":
+        rules = CONSTRUCTION_HOLIDAYS
+    elif mode == "local":
+        rules = CONSTRUCTION_HOLIDAYS + LOCATION_HOLIDAYS.get(location, [])
+    else:
+        raise ValueError(f"Unknown calendar mode: {mode}")
+    return WorkCalendar(f"{location} ({mode})", rules)
+
+
+@lru_cache(maxsize=None)
+def day_string(day: int) -> str:
+    """YYYY-MM-DD for an ordinal day, formatted once per distinct day."""
+    return date.fromordinal(day).isoformat()
+
+
+# =============================================================================
+# RNG STREAMS & RECORD IDS
+# =============================================================================
+
+def derive_seed(master_seed: int, *keys: Any) -> int:
+    """Derive a stable 64-bit seed from the master seed and a key path.
+
+    Uses SHA-256 rather than hash() so the result is identical across
+    processes and interpreter runs (hash randomization does not apply).
+    """
+    material = ":".join(str(k) for k in (master_seed,) + keys)
+    return int.from_bytes(hashlib.sha256(material.encode("utf-8")).digest()[:8], "big")
+
+
+def table_rng(master_seed: int, project_id: str, table: str) -> random.Random:
+    """Independent RNG stream for one table of one project."""
+    return random.Random(derive_seed(master_seed, project_id, table))
+
+
+def block_rng(master_seed: int, project_id: str, table: str, block: int) -> random.Random:
+    """Independent RNG stream for one block of working days of a table (see table_specs.Workdays)."""
+    return random.Random(derive_seed(master_seed, project_id, table, block))
+
+
+def encode_rng_state(rng: random.Random) -> Dict:
+    """JSON-friendly form of a random.Random state (Mersenne Twister words as base64)."""
+    version, internal, gauss_next = rng.getstate()
+    words = base64.b64encode(struct.pack(f"<{len(internal)}I", *internal)).decode("ascii")
+    return {"version": version, "mt": words, "gauss_next": gauss_next}
+
+
+def decode_rng_state(state: Dict) -> Tuple:
+    """Inverse of encode_rng_state(), for random.Random.setstate()."""
+    raw = base64.b64decode(state["mt"])
+    return state["version"], struct.unpack(f"<{len(raw) // 4}I", raw), state["gauss_next"]
+
+
+# Record IDs are 48-bit: SHARD_BITS of shard (project position in the run)
+# and SEQUENCE_BITS of per-table sequence number, so every (table, shard)
+# allocates from its own disjoint range without coordination.
+ID_BITS = 48
+SHARD_BITS = 20
+SEQUENCE_BITS = ID_BITS - SHARD_BITS
+_ID_MASK = (1 << ID_BITS) - 1
+_ID_MULT_1 = 0x9E3779B97F4B
+_ID_MULT_2 = 0xC2B2AE3D27D5
+
+
+def permute_id(value, key: int):
+    """Seed-keyed bijection on 48-bit integers (xor, odd multiply, xorshift).
+
+    value is an int or a numpy uint64 array; arrays wrap at 64 bits, which
+    the 48-bit mask makes agree with Python's unbounded ints.
+    """
+    value = ((value ^ key) * _ID_MULT_1) & _ID_MASK
+    value ^= value >> 23
+    value = (value * _ID_MULT_2) & _ID_MASK
+    return value ^ (value >> 29)
+
+
+class IdAllocator:
+    """Deterministic, collision-free record IDs for one table of one shard.
+
+    IDs are (shard << SEQUENCE_BITS | sequence) passed through a bijection
+    keyed by the master seed and table, then formatted as 12 hex characters.
+    Distinct (shard, sequence) pairs therefore give distinct IDs by
+    construction, the same seed always gives the same IDs, and no two
+    workers can collide as long as they use different shards.
+
+    IDs are handed out in bulk blocks: take(n) reserves n sequence numbers
+    at once, and iteration formats block_size IDs at a time. start resumes
+    allocation after the first start sequence numbers (see issued).
+    """
+
+    def __init__(self, master_seed: int, table: str, shard: int = 0, block_size: int = 1024, start: int = 0):
+        if not 0 <= shard < (1 << SHARD_BITS):
+            raise ValueError(f"Shard {shard} outside 0..{(1 << SHARD_BITS) - 1}")
+        self.key = derive_seed(master_seed, "ids", table) & _ID_MASK
+        self.shard = shard
+        self.block_size = block_size
+        self.next_sequence = start
+        self._block = []
+
+    @property
+    def issued(self) -> int:
+        """Sequence numbers used so far (buffered, unissued IDs excluded)."""
+        return self.next_sequence - len(self._block)
+
+    def reserve(self, n: int) -> range:
+        """Reserve the next n sequence numbers and return their raw ID range."""
+        start = self.next_sequence
+        if start + n > (1 << SEQUENCE_BITS):
+            raise OverflowError(f"Shard {self.shard} exhausted its {1 << SEQUENCE_BITS} IDs")
+        self.next_sequence += n
+        base = self.shard << SEQUENCE_BITS
+        return range(base + start, base + start + n)
+
+    def take(self, n: int) -> List[str]:
+        """Allocate a block of n formatted IDs."""
+        key = self.key
+        return [f"{permute_id(raw, key):012x}" for raw in self.reserve(n)]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self._block:
+            self._block = self.take(self.block_size)
+            self._block.reverse()
+        return self._block.pop()
+
+
+# =============================================================================
+# TABLE SPECS
+# =============================================================================
+
+# Contracts, SOV, labor logs, RFIs and field notes are declared as
+# table_specs.py specs and drawn column by column by its engine; the other
+# tables are generated row by row in generate_hvac_dataset.py.
+
+# Working days per block of the labor log and field note frames: each block
+# draws from its own stream, so --through/--append can resume mid-project
+# by redrawing one block
+BLOCK_DAYS = 66
+
+# Base cost per SF by project type, adjusted for complexity
+COST_PER_SF = {
+    "Healthcare": (85, 120),
+    "Commercial Office": (45, 65),
+    "K-12 Education": (55, 75),
+    "Data Center": (180, 280),
+    "Multifamily Residential": (35, 50),
+}
+COMPLEXITY_MULT = {"low": 0.9, "medium": 1.0, "high": 1.15}
+CONTRACT_BASE_DATE = date(2024, 1, 1)
+
+
+def _contract_values(ctx: SpecContext, costs_per_sf: List[float]) -> List[int]:
+    project = ctx.project
+    return [round(project["sq_ft"] * cost * COMPLEXITY_MULT[project["complexity"]] / 1000) * 1000
+            for cost in costs_per_sf]
+
+
+CONTRACTS_SPEC = check_table_spec(TableSpec(
+    name="contracts",
+    rows=lambda project, rng: 1,
+    date_column="contract_date",
+    columns=(
+        Column("project_id", "string", ProjectField("id")),
+        Column("project_name", "string", ProjectField("name")),
+        Column("cost_per_sf", "float", Uniform(lambda project: COST_PER_SF[project["type"]][0],
+                                               lambda project: COST_PER_SF[project["type"]][1], None), output=False),
+        Column("original_contract_value", "int", ColumnFn(_contract_values, ("cost_per_sf",))),
+        Column("contract_date", "date", DayOffset(0, 90, CONTRACT_BASE_DATE, roll=False)),
+        Column("substantial_completion_date", "date", DayOffset(
+            lambda project: project["duration_months"] * 30, lambda project: project["duration_months"] * 30 + 90,
+            CONTRACT_BASE_DATE, roll=False)),
+        Column("retention_pct", "float", Constant(0.10)),
+        Column("payment_terms", "category", Constant("Net 30")),
+        Column("gc_name", "category", Choice(["Turner Construction", "DPR Construction", "Skanska USA", "JE Dunn",
+                                              "Mortenson"])),
+        Column("architect", "category", Choice(["Gensler", "HOK", "Perkins&Will", "HKS", "SmithGroup"])),
+        Column("engineer_of_record", "category", Choice(["WSP", "ARUP", "Syska Hennessy", "Henderson Engineers",
+                                                         "AEI"])),
+    ),
+), TABLE_NAMES)
+
+# Labor and material shares of equipment lines differ from the other SOV lines
+_SOV_EQUIPMENT = ["Equipment" in item["description"] for item in SOV_TEMPLATE]
+
+
+def _scheduled_values(ctx: SpecContext, raw_pcts: List[float]) -> List[int]:
+    """Line values from the drawn shares: normalized, rounded to $100, last line absorbing the rounding."""
+    contract_value = ctx.parents["contracts"]["original_contract_value"][0]
+    total_pct = sum(raw_pcts)
+    values = [round(contract_value * pct / total_pct / 100) * 100 for pct in raw_pcts]
+    values[-1] += contract_value - sum(values)
+    return values
+
+
+SOV_SPEC = check_table_spec(TableSpec(
+    name="sov",
+    rows=lambda project, rng: len(SOV_TEMPLATE),
+    parents=("contracts",),
+    columns=(
+        Column("item", "int", RowIndex(), output=False),
+        Column("project_id", "category", ProjectField("id")),
+        Column("code", "string", Lookup([item["code"] for item in SOV_TEMPLATE], "item"), output=False),
+        Column("sov_line_id", "string", Template("{project_id}-SOV-{code}")),
+        Column("line_number", "int", Lookup([int(item["code"]) for item in SOV_TEMPLATE], "item")),
+        Column("description", "category", Lookup([item["description"] for item in SOV_TEMPLATE], "item")),
+        Column("pct_low", "float", Lookup([item["pct_range"][0] for item in SOV_TEMPLATE], "item"), output=False),
+        Column("pct_high", "float", Lookup([item["pct_range"][1] for item in SOV_TEMPLATE], "item"), output=False),
+        Column("raw_pct", "float", Uniform("pct_low", "pct_high", None), output=False),
+        Column("scheduled_value", "int", ColumnFn(_scheduled_values, ("raw_pct",))),
+        Column("labor_low", "float", Lookup([0.15 if eq else 0.55 for eq in _SOV_EQUIPMENT], "item"), output=False),
+        Column("labor_high", "float", Lookup([0.30 if eq else 0.75 for eq in _SOV_EQUIPMENT], "item"), output=False),
+        Column("labor_pct", "float", Uniform("labor_low", "labor_high", None)),
+        Column("material_low", "float", Lookup([0.70 if eq else 0.25 for eq in _SOV_EQUIPMENT], "item"), output=False),
+        Column("material_high", "float", Lookup([0.85 if eq else 0.45 for eq in _SOV_EQUIPMENT], "item"),
+               output=False),
+        Column("material_pct", "float", Uniform("material_low", "material_high", None)),
+    ),
+), TABLE_NAMES)
+
+# Labor crew size (low, high) by phase: mobilization/submittals until
+# MOBILIZATION_END of the schedule, peak production until CLOSEOUT_START, closeout
+MOBILIZATION_END = 0.15
+CLOSEOUT_START = 0.75
+MOBILIZATION_CREW = (2, 5)
+PEAK_CREW_HIGH = (8, 18)  # high-complexity projects
+PEAK_CREW = (5, 12)
+CLOSEOUT_CREW = (3, 7)
+
+# SOV lines worked in each labor phase, by the phase's upper bound
+SOV_PHASE_BOUNDS = [0.10, 0.30, 0.60, 0.85]
+SOV_PHASE_LINES = [[1, 2], [1, 2, 3, 4, 5], [1, 3, 4, 5, 6, 7, 8, 9], [1, 9, 10, 11, 12], [1, 11, 13, 14, 15]]
+
+COMMON_ROLES = [r for r in CREW_ROLES if "Journeyman" in r["role"] or "Apprentice" in r["role"]]
+
+
+def _crew_range(project: Dict, phase_pct: float) -> Tuple[int, int]:
+    if phase_pct < MOBILIZATION_END:
+        return MOBILIZATION_CREW
+    if phase_pct < CLOSEOUT_START:
+        return PEAK_CREW_HIGH if project["complexity"] == "high" else PEAK_CREW
+    return CLOSEOUT_CREW
+
+
+def _crew_low(ctx: SpecContext, phases: List[float]) -> List[int]:
+    return [_crew_range(ctx.project, phase)[0] for phase in phases]
+
+
+def _crew_high(ctx: SpecContext, phases: List[float]) -> List[int]:
+    return [_crew_range(ctx.project, phase)[1] for phase in phases]
+
+
+def sov_phase_lines(numbers: Sequence[int]) -> List[Tuple[int, ...]]:
+    """The SOV line numbers worked in each phase, of a project whose SOV has numbers.
+
+    A phase none of whose lines are in the SOV works the first line.
+    """
+    numbers = list(numbers)
+    return [tuple(n for n in numbers if n in lines) or tuple(numbers[:1]) for lines in SOV_PHASE_LINES]
+
+
+def _active_sov_lines(ctx: SpecContext, phases: List[float]) -> List[Tuple[int, ...]]:
+    """The SOV line numbers worked on each day."""
+    by_phase = sov_phase_lines(ctx.parents["sov"]["line_number"])
+    return [by_phase[bisect_right(SOV_PHASE_BOUNDS, phase)] for phase in phases]
+
+
+LABOR_LOGS_SPEC = check_table_spec(TableSpec(
+    name="labor_logs",
+    frame=Workdays(lambda project: project["duration_months"] * 22, BLOCK_DAYS),  # ~22 work days per month
+    date_column="date",
+    parents=("sov",),
+    frame_columns=(
+        Column("crew_low", "int", ColumnFn(_crew_low, ("phase",)), output=False),
+        Column("crew_high", "int", ColumnFn(_crew_high, ("phase",)), output=False),
+        Column("crew", "int", IntRange("crew_low", "crew_high"), output=False),
+        Column("active_lines", "list", ColumnFn(_active_sov_lines, ("phase",)), output=False),
+    ),
+    repeat="crew",
+    columns=(
+        Column("project_id", "category", ProjectField("id")),
+        Column("log_id", "string", RecordIds()),
+        Column("date", "date", DayString("day")),
+        # Each role at most once a day until every role is on site, then extra journeymen/apprentices
+        Column("worker", "json", Distinct(CREW_ROLES, COMMON_ROLES), output=False),
+        Column("employee", "int", IntRange(1000, 9999), output=False),
+        Column("employee_id", "category", Template("EMP-{employee}")),
+        Column("role", "category", Derived(itemgetter("role"), ("worker",))),
+        Column("cost_code", "int", PickFrom("active_lines")),
+        Column("sov_line_id", "category", ParentLookup("sov", "sov_line_id", key="line_number", on="cost_code")),
+        # Hours - typically 8, 15% with overtime, else 10% short or long days
+        Column("overtime", "bool", Bernoulli(0.15), output=False),
+        Column("overtime_hours", "int", Choice([2, 4]), output=False),
+        Column("odd_day", "bool", Bernoulli(0.1), output=False),
+        Column("odd_day_hours", "int", Choice([4, 6, 10]), output=False),
+        Column("hours_st", "int", Derived(lambda overtime, odd, hours: hours if odd and not overtime else 8,
+                                          ("overtime", "odd_day", "odd_day_hours"))),
+        Column("hours_ot", "int", Derived(lambda overtime, hours: hours if overtime else 0,
+                                          ("overtime", "overtime_hours"))),
+        Column("hourly_rate", "float", Derived(itemgetter("hourly_rate"), ("worker",))),
+        Column("burden_multiplier", "float", Derived(itemgetter("burden_rate"), ("worker",))),
+        Column("floor", "int", IntRange(1, itemgetter("floors")), output=False),
+        Column("work_area", "category", Template("Floor {floor}")),
+    ),
+    output=("project_id", "log_id", "date", "employee_id", "role", "sov_line_id", "hours_st", "hours_ot",
+            "hourly_rate", "burden_multiplier", "work_area", "cost_code"),
+), TABLE_NAMES)
+
+
+@dataclass(frozen=True)
+class TemplateCode:
+    """Compact text codes of a TemplateSet (see TemplateSet.encode), drawn column-wise.
+
+    Template ids are drawn for the whole column, then each slot's indices
+    for the rows whose template uses it. overrides(project) gives
+    per-project slot vocabularies (prefixes of the global ones).
+    """
+    templates: TemplateSet
+    overrides: Optional[Callable[[Dict], Dict[str, Any]]] = None
+
+    def sample(self, ctx: SpecContext) -> List[int]:
+        templates = self.templates
+        vocab = templates.vocabulary(self.overrides(ctx.project) if self.overrides else None)
+        template_ids = ctx.rng.ints(0, len(templates.compiled) - 1, ctx.n)
+        uses = dict.fromkeys(templates.slots, 0)
+        for template_id in template_ids:
+            for name in templates.slot_names(template_id):
+                uses[name] += 1
+        # One draw per slot, in vocabulary order; rows take their indices in row order
+        drawn = {name: iter(ctx.rng.ints(0, len(vocab[name]) - 1, count)) for name, count in uses.items()}
+        encode, slot_names = templates.encode, templates.slot_names
+        return [encode(template_id, [next(drawn[name]) for name in slot_names(template_id)])
+                for template_id in template_ids]
+
+
+RFI_COUNTS = {"low": (15, 30), "medium": (30, 60), "high": (50, 100)}
+RFI_RESPONSES = [
+    "Proceed as noted in attached sketch.",
+    "Refer to ASI-{asi} for clarification.",
+    "Approved as submitted.",
+    "Revise per attached markup.",
+    "Coordinate with {trade} contractor.",
+]
+
+
+def _rfi_response(responded: Optional[str], response: int, asi: int, trade: str) -> Optional[str]:
+    return RFI_RESPONSES[response].format(asi=asi, trade=trade) if responded else None
+
+
+RFIS_SPEC = check_table_spec(TableSpec(
+    name="rfis",
+    rows=lambda project, rng: rng.randint(*RFI_COUNTS[project["complexity"]]),
+    date_column="date_submitted",
+    columns=(
+        Column("project_id", "category", ProjectField("id")),
+        Column("rfi_number", "string", Numbered("RFI-{n:03d}")),
+        Column("date_submitted", "date", DayOffset(14, lambda project: project["duration_months"] * 30 - 14)),
+        Column("subject_code", "int", TemplateCode(RFI_SUBJECT_TEXT, lambda project: {
+            "location": SlotProduct("Floor {}, Grid {}", range(1, project["floors"] + 1), GRID_LINES),
+        }), output=False),
+        Column("subject", "string", Derived(RFI_SUBJECT_TEXT.render_code, ("subject_code",))),
+        Column("submitted_by", "category", Choice(["J. Martinez - Project Manager", "K. Thompson - Foreman",
+                                                   "R. Williams - Engineer"])),
+        Column("assigned_to", "category", Choice(["Architect", "MEP Engineer", "Structural Engineer", "Owner"])),
+        Column("priority", "category", Choice(["Low", "Medium", "High", "Critical"], [0.2, 0.45, 0.25, 0.10])),
+        # Response time varies; None is never answered
+        Column("response_days", "int", Choice([3, 5, 7, 10, 14, 21, None],
+                                              [0.15, 0.25, 0.25, 0.15, 0.10, 0.05, 0.05]), output=False),
+        Column("date_responded", "date", DateAfter("date_submitted", "response_days")),
+        Column("open_status", "category", Choice(["Open", "Pending Response"]), output=False),
+        Column("status", "category", Derived(lambda responded, status: "Closed" if responded else status,
+                                             ("date_responded", "open_status"))),
+        Column("required_days", "int", IntRange(7, 21), output=False),
+        Column("date_required", "date", DateAfter("date_submitted", "required_days")),
+        Column("response", "int", IntRange(0, len(RFI_RESPONSES) - 1), output=False),
+        Column("asi", "int", IntRange(1, 20), output=False),
+        Column("trade", "category", Choice(["electrical", "plumbing", "structural"]), output=False),
+        Column("response_summary", "category", Derived(_rfi_response, ("date_responded", "response", "asi", "trade"))),
+        Column("cost_impact", "bool", Bernoulli(0.25)),
+        Column("schedule_impact", "bool", Bernoulli(0.2)),
+    ),
+    output=("project_id", "rfi_number", "date_submitted", "subject", "submitted_by", "assigned_to", "priority",
+            "status", "date_required", "date_responded", "response_summary", "cost_impact", "schedule_impact"),
+), TABLE_NAMES)
+
+FIELD_NOTES_SPEC = check_table_spec(TableSpec(
+    name="field_notes",
+    frame=Workdays(lambda project: project["duration_months"] * 22, BLOCK_DAYS),
+    date_column="date",
+    frame_columns=(
+        Column("has_note", "bool", Bernoulli(0.7), output=False),  # 70% of days have notes
+    ),
+    repeat="has_note",
+    columns=(
+        Column("project_id", "category", ProjectField("id")),
+        Column("note_id", "string", RecordIds()),
+        Column("date", "date", DayString("day")),
+        Column("author", "category", Choice(["J. Martinez", "K. Thompson", "R. Williams", "M. Chen"])),
+        Column("note_type", "category", Choice(["Daily Report", "Safety Log", "Coordination Note", "Inspection Note",
+                                                "Issue Log"])),
+        Column("content_code", "int", TemplateCode(
+            FIELD_NOTE_TEXT, lambda project: {"floor": range(1, project["floors"] + 1)}), output=False),
+        Column("content", "string", Derived(FIELD_NOTE_TEXT.render_code, ("content_code",))),
+        Column("photos_attached", "int", IntRange(0, 5)),
+        Column("weather", "category", Choice(["Clear", "Cloudy", "Rain", "Hot", "Cold"])),
+        Column("temp_high", "int", IntRange(55, 100)),
+        Column("temp_low", "int", IntRange(35, 75)),
+    ),
+), TABLE_NAMES)
+
+
+def compact_text_spec(spec: TableSpec) -> TableSpec:
+    """spec writing its text column as template codes (see COMPACT_TEXT_COLUMNS), without rendering the text."""
+    text_column, code_column, _ = COMPACT_TEXT_COLUMNS[spec.name]
+    return replace(
+        spec,
+        columns=tuple(replace(column, output=True) if column.name == code_column else column
+                      for column in spec.columns if column.name != text_column),
+        output=tuple(code_column if name == text_column else name for name in spec.output_columns()),
+    )
+
+
+COMPACT_TEXT_SPECS = {spec.name: compact_text_spec(spec) for spec in (RFIS_SPEC, FIELD_NOTES_SPEC)}
+
+
+def text_spec(spec: TableSpec, compact_text: bool) -> TableSpec:
+    return COMPACT_TEXT_SPECS[spec.name] if compact_text else spec
+
@@ -1,15 +1,24 @@
+import argparse
+import math
+import os
 import pandas as pd
 import numpy as np
+import faker
 from faker import Faker
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-fake = Faker()
-Faker.seed(42)  # For reproducibility
+from dataset_specs import WorkCalendar, table_rng
+from table_specs import (
+    Choice, Column, ColumnFn, Constant, Derived, Distinct, ForeignKey, IntRange, Lookup, Numbered, ProjectField,
+    RecordIds, RowIndex, SpecEnv, TableSpec, Template, Uniform, Workdays, check_table_spec, column_records,
+    concat_columns, generate_columns,
+)
 
 # --- CONFIGURATION ---
 NUM_PROJECTS = 5
 START_DATE_RANGE = (datetime(2023, 1, 1), datetime(2023, 6, 1))
+SEED = 42
 
 # HVAC Specific Terminology
 hvac_tasks = [
@@ -23,76 +32,97 @@ materials = [
     "Refrigerant R-410A (lbs)", "VAV Units (ea)", "Hangers & Struts (box)"
 ]
 
-# --- 1. PROJECTS & BID ASSUMPTIONS ---
-projects = []
-for i in range(1, NUM_PROJECTS + 1):
-    start_date = fake.date_between(start_date=START_DATE_RANGE[0], end_date=START_DATE_RANGE[1])
-    duration = random.randint(60, 180)
-    end_date = start_date + timedelta(days=duration)
-    
-    contract_val = random.randint(50000, 2000000)
-    margin = random.uniform(0.15, 0.30)
-    estimated_cost = contract_val * (1 - margin)
-    
-    projects.append({
-        "Project_ID": f"PROJ-{1000+i}",
-        "Project_Name": f"{fake.company()} HQ HVAC Retrofit",
-        "Contract_Value": contract_val,
-        "Start_Date": start_date,
-        "End_Date": end_date,
-        "Bid_Margin_Target": round(margin, 2),
-        "Bid_Assumption_Labor_Rate": random.choice([85, 95, 110]),
-        "Bid_Assumption_Escalation": "3%"
-    })
-
-df_projects = pd.DataFrame(projects)
+crew_types = ["Foreman", "Journeyman", "Apprentice"]
+OVERTIME_HOURS = [0, 2, 4]
+OVERTIME_WEIGHTS = [80, 15, 5]
 
-# --- 2. SCHEDULE OF VALUES (SOV) ---
-sov_items = []
-for proj in projects:
-    total_val = proj['Contract_Value']
-    # Split contract into chunks
-    splits = np.random.dirichlet(np.ones(len(hvac_tasks)), size=1)[0]
-    
-    for task, split in zip(hvac_tasks, splits):
-        sov_items.append({
-            "SOV_ID": fake.uuid4()[:8],
-            "Project_ID": proj['Project_ID'],
-            "Description": task,
-            "Scheduled_Value": round(total_val * split, 2),
-            "Cost_Code": f"023-{random.randint(100,999)}"
-        })
-
-df_sov = pd.DataFrame(sov_items)
+# Faker value pools (see load_value_pools)
+POOL_SIZE = 20000
+POOL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hvac_faker_pools")
 
-# --- 3. LABOR LOGS (Daily Crew Hours) ---
-labor_logs = []
-crew_types = ["Foreman", "Journeyman", "Apprentice"]
+# Labor is logged Monday-Friday
+WEEKDAYS = WorkCalendar("weekdays")
 
-for proj in projects:
-    current_date = proj['Start_Date']
-    while current_date <= proj['End_Date']:
-        if current_date.weekday() < 5: # Mon-Fri only
-            for _ in range(random.randint(1, 3)): # 1-3 entries per day
-                labor_logs.append({
-                    "Log_ID": fake.uuid4()[:8],
-                    "Project_ID": proj['Project_ID'],
-                    "Date": current_date,
-                    "Employee_ID": f"EMP-{random.randint(10, 50)}",
-                    "Role": random.choice(crew_types),
-                    "Hours_Regular": random.randint(4, 8),
-                    "Hours_Overtime": random.choices([0, 2, 4], weights=[80, 15, 5])[0],
-                    "Cost_Code": random.choice(df_sov[df_sov['Project_ID'] == proj['Project_ID']]['Cost_Code'].values)
-                })
-        current_date += timedelta(days=1)
-
-df_labor = pd.DataFrame(labor_logs)
 
-# --- 4. FIELD NOTES (Unstructured Text) ---
-field_notes = []
+# --- 0. VALUE POOLS ---
+def build_value_pools(seed=SEED, size=POOL_SIZE):
+    """Draw size first names, companies and 8-char IDs from a Faker instance seeded with seed."""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    return {
+        "first_name": np.array([pool_fake.first_name() for _ in range(size)]),
+        "company": np.array([pool_fake.company() for _ in range(size)]),
+        "id": np.unique([pool_fake.uuid4()[:8] for _ in range(size)]),
+    }
+
+
+def load_value_pools(seed=SEED, size=POOL_SIZE, cache_dir=POOL_CACHE_DIR):
+    """Value pools for (seed, size), read from the on-disk cache or built and cached.
+
+    The cache file name includes the Faker version, since pools drawn by a
+    different Faker release are not the same. Pass cache_dir=None to skip
+    the cache.
+    """
+    if cache_dir is None:
+        return build_value_pools(seed, size)
+    path = os.path.join(cache_dir, f"pools-seed{seed}-n{size}-faker{faker.VERSION}.npz")
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as npz:
+            return {name: npz[name] for name in npz.files}
+    pools = build_value_pools(seed, size)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path + ".tmp.npz", **pools)
+    os.replace(path + ".tmp.npz", path)
+    return pools
+
+
+class PoolIds:
+    """Distinct 8-char IDs, taken in order from a seeded shuffle of the ID pool, then random hex once it runs out.
+
+    Hands out IDs to the spec engine (table_specs.RecordIds) for every table.
+    """
+
+    def __init__(self, pool, rng):
+        self.ids = [str(value) for value in pool]
+        rng.shuffle(self.ids)
+        self.rng = rng
+        self.seen = set(self.ids)
+        self.issued = 0
+
+    def take(self, n):
+        ids = self.ids[self.issued:self.issued + n]
+        while len(ids) < n:
+            value = f"{self.rng.getrandbits(32):08x}"
+            if value not in self.seen:
+                self.seen.add(value)
+                ids.append(value)
+        self.issued += n
+        return ids
+
+
+def project_days(ctx, offsets):
+    """Dates offsets days after the project's Start_Date."""
+    start = ctx.project['Start_Date']
+    return [start + timedelta(days=offset) for offset in offsets]
+
+
+def calendar_days(project):
+    return (project['End_Date'] - project['Start_Date']).days
+
+
+def weekdays(project):
+    """Mon-Fri days from Start_Date to End_Date inclusive."""
+    return sum(1 for offset in range(calendar_days(project) + 1)
+               if (project['Start_Date'] + timedelta(days=offset)).weekday() < 5)
+
+
+# --- TABLE SPECS ---
+# Every table is a table_specs.py spec drawn column by column by the same
+# engine as generate_hvac_dataset.py, one project at a time from that
+# project's own stream per table.
 note_templates = [
-    "Delay due to {reason}.", 
-    "Completed {task} ahead of schedule.", 
+    "Delay due to {reason}.",
+    "Completed {task} ahead of schedule.",
     "Site access blocked by {blocker}.",
     "Crew short staffed, {name} called out sick.",
     "Material delivery damaged: {material}."
@@ -100,59 +130,239 @@ note_templates = [
 reasons = ["GC not ready", "rain", "missing lift", "inspection failure"]
 blockers = ["drywall stacks", "electricians", "painters"]
 
-for proj in projects:
-    # Generate random notes for 30% of project days
-    project_days = pd.date_range(proj['Start_Date'], proj['End_Date'])
-    note_days = random.sample(list(project_days), int(len(project_days) * 0.3))
-    
-    for day in note_days:
-        template = random.choice(note_templates)
-        note_text = template.format(
-            reason=random.choice(reasons),
-            task=random.choice(hvac_tasks),
-            blocker=random.choice(blockers),
-            name=fake.first_name(),
-            material=random.choice(materials).split(' ')[0]
-        )
-        field_notes.append({
-            "Note_ID": fake.uuid4()[:8],
-            "Project_ID": proj['Project_ID'],
-            "Date": day,
-            "Author": "Site Super",
-            "Note_Text": note_text
-        })
-
-df_notes = pd.DataFrame(field_notes)
+
+def build_specs(pools):
+    """The script's table specs, with Faker pools as value lists."""
+    def note_text(template, reason, task, blocker, name, material):
+        return note_templates[template].format(reason=reason, task=task, blocker=blocker, name=name,
+                                               material=material)
+
+    def scheduled_values(ctx, weights):
+        # Dirichlet(1, ..., 1) shares: normalized exponential draws
+        total = sum(weights)
+        return [round(ctx.project['Contract_Value'] * weight / total, 2) for weight in weights]
+
+    specs = [
+        TableSpec(
+            name="projects",
+            rows=lambda project, rng: 1,
+            columns=(
+                Column("Project_ID", "string", ProjectField("Project_ID")),
+                Column("company", "string", Choice(pools["company"].tolist()), output=False),
+                Column("Project_Name", "string", Template("{company} HQ HVAC Retrofit")),
+                Column("Contract_Value", "int", IntRange(50000, 2000000)),
+                Column("start_offset", "int", IntRange(0, (START_DATE_RANGE[1] - START_DATE_RANGE[0]).days),
+                       output=False),
+                Column("Start_Date", "date", Derived(lambda offset: START_DATE_RANGE[0].date() + timedelta(days=offset),
+                                                     ("start_offset",))),
+                Column("duration", "int", IntRange(60, 180), output=False),
+                Column("End_Date", "date", Derived(lambda start, days: start + timedelta(days=days),
+                                                   ("Start_Date", "duration"))),
+                Column("Bid_Margin_Target", "float", Uniform(0.15, 0.30, 2)),
+                Column("Bid_Assumption_Labor_Rate", "int", Choice([85, 95, 110])),
+                Column("Bid_Assumption_Escalation", "string", Constant("3%")),
+            ),
+        ),
+        TableSpec(
+            name="sov",
+            rows=lambda project, rng: len(hvac_tasks),
+            columns=(
+                Column("task", "int", RowIndex(), output=False),
+                Column("SOV_ID", "string", RecordIds()),
+                Column("Project_ID", "string", ProjectField("Project_ID")),
+                Column("Description", "string", Lookup(hvac_tasks, "task")),
+                Column("unit", "float", Uniform(0.0, 1.0, None), output=False),
+                Column("weight", "float", Derived(lambda u: -math.log1p(-u), ("unit",)), output=False),
+                Column("Scheduled_Value", "float", ColumnFn(scheduled_values, ("weight",))),
+                Column("code", "int", IntRange(100, 999), output=False),
+                Column("Cost_Code", "string", Template("023-{code}")),
+            ),
+        ),
+        TableSpec(
+            name="labor_logs",
+            frame=Workdays(weekdays),
+            parents=("sov",),
+            frame_columns=(
+                Column("entries", "int", IntRange(1, 3), output=False),  # 1-3 entries per day
+            ),
+            repeat="entries",
+            columns=(
+                Column("Log_ID", "string", RecordIds()),
+                Column("Project_ID", "string", ProjectField("Project_ID")),
+                Column("Date", "date", Derived(date.fromordinal, ("day",))),
+                Column("employee", "int", IntRange(10, 50), output=False),
+                Column("Employee_ID", "string", Template("EMP-{employee}")),
+                Column("Role", "string", Choice(crew_types)),
+                Column("Hours_Regular", "int", IntRange(4, 8)),
+                Column("Hours_Overtime", "int", Choice(OVERTIME_HOURS, OVERTIME_WEIGHTS)),
+                Column("Cost_Code", "string", ForeignKey("sov", "Cost_Code")),
+            ),
+        ),
+        TableSpec(
+            name="field_notes",
+            # Notes on 30% of project days, no day twice
+            rows=lambda project, rng: int((calendar_days(project) + 1) * 0.3),
+            date_column="Date",
+            columns=(
+                Column("Note_ID", "string", RecordIds()),
+                Column("Project_ID", "string", ProjectField("Project_ID")),
+                Column("offset", "int", Distinct(lambda project: range(calendar_days(project) + 1)), output=False),
+                Column("Date", "date", ColumnFn(project_days, ("offset",))),
+                Column("Author", "string", Constant("Site Super")),
+                Column("template", "int", IntRange(0, len(note_templates) - 1), output=False),
+                Column("reason", "string", Choice(reasons), output=False),
+                Column("task", "string", Choice(hvac_tasks), output=False),
+                Column("blocker", "string", Choice(blockers), output=False),
+                Column("name", "string", Choice(pools["first_name"].tolist()), output=False),
+                Column("material", "string", Choice([material.split(' ')[0] for material in materials]),
+                       output=False),
+                Column("Note_Text", "string", Derived(note_text, ("template", "reason", "task", "blocker", "name",
+                                                                  "material"))),
+            ),
+        ),
+        TableSpec(
+            name="rfis",
+            rows=lambda project, rng: rng.randint(2, 10),
+            date_column="Date_Submitted",
+            columns=(
+                Column("RFI_ID", "string", Numbered("RFI-{project[Project_ID]}-{n:03d}")),
+                Column("Project_ID", "string", ProjectField("Project_ID")),
+                Column("offset", "int", IntRange(0, calendar_days), output=False),
+                Column("Date_Submitted", "date", ColumnFn(project_days, ("offset",))),
+                Column("task", "string", Choice(hvac_tasks), output=False),
+                Column("Subject", "string", Template("Clarification on {task}")),
+                Column("sheet", "int", IntRange(100, 500), output=False),
+                Column("clash", "string", Choice(['beams', 'fire sprinklers', 'lighting']), output=False),
+                Column("Question", "string", Template("Drawing A-{sheet} shows clash with {clash}. "
+                                                      "Please advise on rerouting.")),
+                Column("Status", "string", Choice(["Open", "Closed", "Void"])),
+                Column("impact", "bool", Choice([False, False, True]), output=False),
+                Column("amount", "int", IntRange(500, 5000), output=False),
+                Column("Cost_Impact", "int", Derived(lambda impact, amount: amount if impact else 0,
+                                                     ("impact", "amount"))),
+            ),
+        ),
+    ]
+    return {spec.name: check_table_spec(spec, ("sov",)) for spec in specs}
+
+
+def generate_table(spec, project, seed, ids=None, parents=None):
+    """One project's rows of spec, as a dict of columns."""
+    start = project.get('Start_Date')
+    return generate_columns(spec, SpecEnv(project, table_rng(seed, project['Project_ID'], spec.name), start,
+                                          WEEKDAYS, parents or {}, ids))
+
+
+# --- 1. PROJECTS & BID ASSUMPTIONS ---
+def generate_projects(specs, seed, num_projects=NUM_PROJECTS):
+    return [column_records(generate_table(specs["projects"], {"Project_ID": f"PROJ-{1000+i}"}, seed))[0]
+            for i in range(1, num_projects + 1)]
+
+
+# --- 2. SCHEDULE OF VALUES (SOV) ---
+def generate_sov(projects, specs, seed, ids):
+    return {proj['Project_ID']: generate_table(specs["sov"], proj, seed, ids) for proj in projects}
+
+
+def cost_code_index(df_sov):
+    """Project_ID -> array of that project's cost codes, built in one pass over the SOV."""
+    return {pid: group.to_numpy() for pid, group in df_sov.groupby('Project_ID', sort=False)['Cost_Code']}
+
+
+# --- 3. LABOR LOGS (Daily Crew Hours) ---
+def generate_labor_logs_rows(projects, df_sov, ids):
+    """Row-at-a-time labor logs (the original loop, with cost codes looked up in an index).
+
+    Log IDs are taken from ids in one block at the end, as the spec engine does.
+    """
+    cost_codes = cost_code_index(df_sov)
+    labor_logs = []
+    for proj in projects:
+        project_codes = cost_codes[proj['Project_ID']]
+        current_date = proj['Start_Date']
+        while current_date <= proj['End_Date']:
+            if current_date.weekday() < 5: # Mon-Fri only
+                for _ in range(random.randint(1, 3)): # 1-3 entries per day
+                    labor_logs.append({
+                        "Project_ID": proj['Project_ID'],
+                        "Date": current_date,
+                        "Employee_ID": f"EMP-{random.randint(10, 50)}",
+                        "Role": random.choice(crew_types),
+                        "Hours_Regular": random.randint(4, 8),
+                        "Hours_Overtime": random.choices(OVERTIME_HOURS, weights=OVERTIME_WEIGHTS)[0],
+                        "Cost_Code": random.choice(project_codes)
+                    })
+            current_date += timedelta(days=1)
+    df_labor = pd.DataFrame(labor_logs)
+    df_labor.insert(0, "Log_ID", ids.take(len(df_labor)))
+    return df_labor
+
+
+def generate_labor_logs(projects, sov_tables, specs, seed, ids):
+    """Column-wise labor logs from the labor_logs spec: one frame row per weekday, 1-3 rows each."""
+    return [generate_table(specs["labor_logs"], proj, seed, ids, {"sov": sov_tables[proj['Project_ID']]})
+            for proj in projects]
+
+
+# --- 4. FIELD NOTES (Unstructured Text) ---
+def generate_field_notes(projects, specs, seed, ids):
+    return [generate_table(specs["field_notes"], proj, seed, ids) for proj in projects]
+
 
 # --- 5. RFI LOGS ---
-rfis = []
-for proj in projects:
-    num_rfis = random.randint(2, 10)
-    for i in range(num_rfis):
-        date_sent = fake.date_between(start_date=proj['Start_Date'], end_date=proj['End_Date'])
-        rfis.append({
-            "RFI_ID": f"RFI-{proj['Project_ID']}-{i+1:03d}",
-            "Project_ID": proj['Project_ID'],
-            "Date_Submitted": date_sent,
-            "Subject": f"Clarification on {random.choice(hvac_tasks)}",
-            "Question": f"Drawing A-{random.randint(100,500)} shows clash with {random.choice(['beams', 'fire sprinklers', 'lighting'])}. Please advise on rerouting.",
-            "Status": random.choice(["Open", "Closed", "Void"]),
-            "Cost_Impact": random.choice([0, 0, random.randint(500, 5000)])
-        })
-
-df_rfis = pd.DataFrame(rfis)
+def generate_rfis(projects, specs, seed):
+    return [generate_table(specs["rfis"], proj, seed) for proj in projects]
+
 
 # --- OUTPUT ---
-print("Dataset Generation Complete.")
-print(f"Projects: {len(df_projects)}")
-print(f"SOV Lines: {len(df_sov)}")
-print(f"Labor Logs: {len(df_labor)}")
-print(f"Field Notes: {len(df_notes)}")
-print(f"RFIs: {len(df_rfis)}")
-
-# Example: Save to CSV
-# df_projects.to_csv("hvac_projects.csv", index=False)
-# df_sov.to_csv("hvac_sov.csv", index=False)
-# df_labor.to_csv("hvac_labor.csv", index=False)
-# df_notes.to_csv("hvac_field_notes.csv", index=False)
-# df_rfis.to_csv("hvac_rfis.csv", index=False)
+def main(num_projects=NUM_PROJECTS, labor_engine="vectorized", seed=SEED, output_dir=None,
+         pool_size=POOL_SIZE, pool_cache_dir=POOL_CACHE_DIR):
+    random.seed(seed)
+    pools = load_value_pools(seed, pool_size, pool_cache_dir)
+    specs = build_specs(pools)
+    ids = PoolIds(pools["id"], random.Random(seed))
+
+    projects = generate_projects(specs, seed, num_projects)
+    df_projects = pd.DataFrame(projects)
+    sov_tables = generate_sov(projects, specs, seed, ids)
+    df_sov = pd.DataFrame(concat_columns(list(sov_tables.values())))
+    if labor_engine == "rows":
+        df_labor = generate_labor_logs_rows(projects, df_sov, ids)
+    else:
+        df_labor = pd.DataFrame(concat_columns(generate_labor_logs(projects, sov_tables, specs, seed, ids)))
+    df_notes = pd.DataFrame(concat_columns(generate_field_notes(projects, specs, seed, ids)))
+    df_rfis = pd.DataFrame(concat_columns(generate_rfis(projects, specs, seed)))
+
+    print("Dataset Generation Complete.")
+    print(f"Projects: {len(df_projects)}")
+    print(f"SOV Lines: {len(df_sov)}")
+    print(f"Labor Logs: {len(df_labor)}")
+    print(f"Field Notes: {len(df_notes)}")
+    print(f"RFIs: {len(df_rfis)}")
+
+    if output_dir:
+        df_projects.to_csv(f"{output_dir}/hvac_projects.csv", index=False)
+        df_sov.to_csv(f"{output_dir}/hvac_sov.csv", index=False)
+        df_labor.to_csv(f"{output_dir}/hvac_labor.csv", index=False)
+        df_notes.to_csv(f"{output_dir}/hvac_field_notes.csv", index=False)
+        df_rfis.to_csv(f"{output_dir}/hvac_rfis.csv", index=False)
+
+    return df_projects, df_sov, df_labor, df_notes, df_rfis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quick pandas-based synthetic HVAC dataset.")
+    parser.add_argument("--num-projects", type=int, default=NUM_PROJECTS)
+    parser.add_argument("--labor-engine", choices=["vectorized", "rows"], default="vectorized",
+                        help="Column-wise labor logs from the table_specs.py engine, or the original "
+                             "row-at-a-time loop.")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output-dir", help="Write the tables as CSVs to this (existing) directory.")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE,
+                        help="Values per Faker pool (names, companies, IDs).")
+    parser.add_argument("--pool-cache-dir", default=POOL_CACHE_DIR,
+                        help="Where value pools are cached between runs.")
+    parser.add_argument("--no-pool-cache", action="store_true", help="Rebuild the value pools without the cache.")
+    args = parser.parse_args()
+    main(args.num_projects, args.labor_engine, args.seed, args.output_dir,
+         args.pool_size, None if args.no_pool_cache else args.pool_cache_dir)
@@ -5,16 +5,56 @@ Generates realistic synthetic data for mechanical contracting projects with
 proper interrelationships between all data categories.
 """
 
+import argparse
 import json
+import os
 import random
-import csv
-from datetime import datetime, timedelta
+import shutil
+import sys
+import time
+import tracemalloc
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from datetime import date, datetime, timedelta
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
-import uuid
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+from dataset_specs import (
+    CALENDAR_MODES, CHANGE_ORDER_REASONS, CHANGE_ORDER_TEXT, COMPACT_TEXT_COLUMNS, CONTRACTS_SPEC, FIELD_NOTES_SPEC,
+    LABOR_LOGS_SPEC, MATERIAL_CATEGORIES, MAX_FLOORS, RFIS_SPEC, SOV_SPEC, TABLE_NAMES, IdAllocator, WorkCalendar,
+    block_rng, day_string, decode_rng_state, derive_seed, encode_rng_state, table_rng, text_spec, work_calendar,
+)
+from instrumentation import (
+    RUN_REPORT_FILE, ProgressReporter, StageStats, max_rss_mb, output_file_sizes, write_run_report,
+)
+from record_buffer import RecordBuffer
+from table_sinks import (
+    COMPRESSORS, MANIFEST_FILE, PARTITION_DATE_COLUMNS, PARTITION_FORMATS, CsvTableSink, JsonDatasetSink,
+    NdjsonTableSink, PartitionedTableSink, load_manifest,
+)
+from table_specs import (
+    SpecEnv, TableSpec, TABLE_SPECS, column_records, generate_columns, resolve_specs, table_columns,
+)
 
 # Seed for reproducibility
-random.seed(42)
+DEFAULT_SEED = 42
+random.seed(DEFAULT_SEED)
+
+DEFAULT_OUTPUT_DIR = "hvac_dataset"
+
+
+OUTPUT_FORMATS = ["json", "csv", "ndjson", "parquet", "arrow", "npz"]
+DEFAULT_FORMATS = ["json", "csv"]
+# Formats that --append can extend in place
+APPENDABLE_FORMATS = ["csv", "ndjson"]
+
+# Written to the output directory by runs with --through; read by --append
+CHECKPOINT_FILE = "checkpoint.json"
+
 
 # =============================================================================
 # CONFIGURATION & CONSTANTS
@@ -73,249 +113,160 @@ PROJECTS = [
     }
 ]
 
-SOV_TEMPLATE = [
-    {"code": "01", "description": "General Conditions & Project Management", "pct_range": (0.06, 0.09)},
-    {"code": "02", "description": "Submittals & Engineering", "pct_range": (0.02, 0.04)},
-    {"code": "03", "description": "Ductwork - Fabrication", "pct_range": (0.08, 0.12)},
-    {"code": "04", "description": "Ductwork - Installation", "pct_range": (0.10, 0.14)},
-    {"code": "05", "description": "Piping - Hydronic Systems", "pct_range": (0.08, 0.12)},
-    {"code": "06", "description": "Piping - Refrigerant", "pct_range": (0.04, 0.07)},
-    {"code": "07", "description": "Equipment - RTUs/AHUs", "pct_range": (0.12, 0.18)},
-    {"code": "08", "description": "Equipment - Chillers/Boilers", "pct_range": (0.08, 0.14)},
-    {"code": "09", "description": "Equipment - Terminal Units (VAV/FCU)", "pct_range": (0.06, 0.10)},
-    {"code": "10", "description": "Controls - DDC/BAS Installation", "pct_range": (0.06, 0.10)},
-    {"code": "11", "description": "Controls - Programming & Commissioning", "pct_range": (0.03, 0.05)},
-    {"code": "12", "description": "Insulation", "pct_range": (0.04, 0.06)},
-    {"code": "13", "description": "Testing, Adjusting & Balancing (TAB)", "pct_range": (0.02, 0.04)},
-    {"code": "14", "description": "Startup & Commissioning Support", "pct_range": (0.02, 0.03)},
-    {"code": "15", "description": "Closeout Documentation & Training", "pct_range": (0.01, 0.02)},
-]
+# Tables written one-to-one as CSV (billing is flattened separately)
+CSV_TABLES = ["contracts", "sov", "labor_logs", "material_deliveries", "change_orders", "rfis", "field_notes"]
 
-CREW_ROLES = [
-    {"role": "Foreman", "hourly_rate": 85.50, "burden_rate": 1.42},
-    {"role": "Journeyman Sheet Metal", "hourly_rate": 72.00, "burden_rate": 1.42},
-    {"role": "Journeyman Pipefitter", "hourly_rate": 74.50, "burden_rate": 1.42},
-    {"role": "Apprentice 4th Year", "hourly_rate": 52.00, "burden_rate": 1.38},
-    {"role": "Apprentice 2nd Year", "hourly_rate": 38.00, "burden_rate": 1.38},
-    {"role": "Controls Technician", "hourly_rate": 68.00, "burden_rate": 1.40},
-    {"role": "Insulator", "hourly_rate": 58.00, "burden_rate": 1.40},
-    {"role": "Helper/Laborer", "hourly_rate": 32.00, "burden_rate": 1.35},
-]
+# Tables written by the columnar backends (flat billing plus bid estimates)
+COLUMNAR_TABLES = CSV_TABLES + ["billing_history", "billing_line_items", "bid_estimates"]
 
-MATERIAL_CATEGORIES = [
-    {"category": "Ductwork", "items": ["Galvanized Sheet Metal 22ga", "Galvanized Sheet Metal 20ga", "Flex Duct 8\"", "Flex Duct 10\"", "Flex Duct 12\"", "Spiral Duct 12\"", "Spiral Duct 16\"", "Spiral Duct 24\"", "Duct Sealant", "Hanging Hardware"]},
-    {"category": "Piping", "items": ["Copper Type L 1\"", "Copper Type L 1.5\"", "Copper Type L 2\"", "Black Steel Sch40 2\"", "Black Steel Sch40 4\"", "PVC Sch40 4\"", "Pipe Hangers Assorted", "Brazing Alloy", "Flux", "Refrigerant R-410A"]},
-    {"category": "Equipment", "items": ["RTU 15-Ton", "RTU 25-Ton", "AHU Custom", "Chiller 200-Ton", "Boiler 2000MBH", "VAV Box 12\"", "VAV Box 16\"", "FCU 2-Pipe", "FCU 4-Pipe", "Split System 3-Ton"]},
-    {"category": "Controls", "items": ["DDC Controller", "VAV Controller", "Temp Sensor", "Pressure Sensor", "Actuator 24V", "Damper Motor", "Control Valve 1\"", "Control Valve 2\"", "BACnet Gateway", "Touchscreen Interface"]},
-    {"category": "Insulation", "items": ["Fiberglass Duct Wrap R-8", "Fiberglass Duct Liner R-6", "Pipe Insulation 1\" Armaflex", "Pipe Insulation 2\" Armaflex", "Insulation Adhesive", "Vapor Barrier Tape"]},
-]
 
-RFI_SUBJECTS = [
-    "Coordination conflict with electrical conduit at grid {grid}",
-    "Clarification needed on diffuser layout for {room}",
-    "Structural penetration approval required at {location}",
-    "Equipment access clearance insufficient per spec",
-    "Ductwork routing conflicts with beam at elevation {elev}",
-    "Control sequence clarification for {system}",
-    "Pipe sleeve size discrepancy at {location}",
-    "Seismic bracing requirements for equipment over {weight} lbs",
-    "Fire damper location verification needed",
-    "Insulation spec clarification for exterior application",
-    "VAV box sizing appears undersized for zone CFM",
-    "Refrigerant piping routing through {area} - approval needed",
-    "Existing conditions differ from drawings at {location}",
-    "Thermostat location conflicts with furniture layout",
-    "Access panel requirements for concealed valves",
-]
+# Column types for every table as written (billing_history in its flattened
+# CSV form). Types: string, category (low-cardinality, dictionary-encoded),
+# date (YYYY-MM-DD), int, float, bool, list (of strings), json (nested object).
+TABLE_SCHEMAS = {
+    "contracts": {
+        "project_id": "string", "project_name": "string", "original_contract_value": "int",
+        "contract_date": "date", "substantial_completion_date": "date", "retention_pct": "float",
+        "payment_terms": "category", "gc_name": "category", "architect": "category",
+        "engineer_of_record": "category",
+    },
+    "sov": {
+        "project_id": "category", "sov_line_id": "string", "line_number": "int",
+        "description": "category", "scheduled_value": "int", "labor_pct": "float",
+        "material_pct": "float",
+    },
+    "labor_logs": {
+        "project_id": "category", "log_id": "string", "date": "date", "employee_id": "category",
+        "role": "category", "sov_line_id": "category", "hours_st": "int", "hours_ot": "int",
+        "hourly_rate": "float", "burden_multiplier": "float", "work_area": "category",
+        "cost_code": "int",
+    },
+    "material_deliveries": {
+        "project_id": "category", "delivery_id": "string", "date": "date", "sov_line_id": "category",
+        "material_category": "category", "item_description": "category", "quantity": "int",
+        "unit": "category", "unit_cost": "float", "total_cost": "float", "po_number": "string",
+        "vendor": "category", "received_by": "category", "condition_notes": "category",
+    },
+    "change_orders": {
+        "project_id": "category", "co_number": "string", "date_submitted": "date",
+        "reason_category": "category", "description": "string", "amount": "int",
+        "status": "category", "related_rfi": "string", "affected_sov_lines": "list",
+        "labor_hours_impact": "int", "schedule_impact_days": "int", "submitted_by": "category",
+        "approved_by": "category",
+    },
+    "rfis": {
+        "project_id": "category", "rfi_number": "string", "date_submitted": "date",
+        "subject": "string", "submitted_by": "category", "assigned_to": "category",
+        "priority": "category", "status": "category", "date_required": "date",
+        "date_responded": "date", "response_summary": "category", "cost_impact": "bool",
+        "schedule_impact": "bool",
+    },
+    "field_notes": {
+        "project_id": "category", "note_id": "string", "date": "date", "author": "category",
+        "note_type": "category", "content": "string", "photos_attached": "int",
+        "weather": "category", "temp_high": "int", "temp_low": "int",
+    },
+    "billing_history": {
+        "project_id": "category", "application_number": "int", "period_end": "date",
+        "period_total": "int", "cumulative_billed": "int", "retention_held": "float",
+        "net_payment_due": "float", "status": "category", "payment_date": "date",
+        "line_item_count": "int",
+    },
+    "billing_line_items": {
+        "sov_line_id": "category", "description": "category", "scheduled_value": "int",
+        "previous_billed": "int", "this_period": "int", "total_billed": "int",
+        "pct_complete": "float", "balance_to_finish": "int", "project_id": "category",
+        "application_number": "int",
+    },
+    "bid_estimates": {
+        "project_id": "string", "bid_date": "date", "bid_amount": "int", "estimator": "category",
+        "labor_assumptions": "json", "material_assumptions": "json",
+        "subcontractor_assumptions": "json", "general_conditions": "json", "markup": "json",
+        "risk_allowances": "json", "key_assumptions": "list", "exclusions": "list",
+        "clarifications": "list",
+    },
+}
 
-CHANGE_ORDER_REASONS = [
-    ("Owner Request", "Added {item} per owner directive"),
-    ("Design Error", "Drawings showed incorrect {dimension} - field correction required"),
-    ("Unforeseen Condition", "Discovered {condition} not shown on documents"),
-    ("Coordination", "Rerouting required due to {trade} conflict"),
-    ("Code Compliance", "Inspector required {requirement}"),
-    ("Value Engineering", "Substitution approved: {old_item} to {new_item}"),
-    ("Scope Gap", "Work not clearly defined in bid documents"),
-    ("Acceleration", "Premium time to maintain schedule"),
-]
 
-FIELD_NOTE_TEMPLATES = [
-    "Crew arrived {time}. Weather: {weather}. {crew_count} workers on site. Focus today: {task}. {observation}",
-    "Safety meeting held at start of shift - topic: {safety_topic}. All PPE verified. {work_description}",
-    "Received delivery of {material} - {qty} units. {receipt_note}. Staged at {location}.",
-    "Met with {trade} foreman re: coordination. {meeting_outcome}. Action items: {actions}",
-    "GC weekly meeting - discussed {topics}. Schedule status: {schedule_status}. RFIs pending: {rfi_count}.",
-    "Installed {qty} {units} on floor {floor}. {quality_note}. Inspections needed: {inspections}.",
-    "Equipment startup for {equipment}. {startup_result}. Punch list items: {punch_items}.",
-    "{issue_type} encountered: {issue_description}. Resolution: {resolution}. Impact: {impact}.",
-    "Working in {area} - {progress_pct}% complete this zone. Remaining: {remaining_work}.",
-    "TAB contractor on site - balancing {system}. Initial readings: {readings}. Adjustments: {adjustments}.",
-]
+
+def table_schema(table_name: str, compact_text: bool = False) -> Dict[str, str]:
+    """Column types of a table as written, with compact text columns swapped in."""
+    if table_name not in TABLE_SCHEMAS:
+        return TABLE_SPECS[table_name].schema()
+    schema = TABLE_SCHEMAS[table_name]
+    if not compact_text or table_name not in COMPACT_TEXT_COLUMNS:
+        return schema
+    text_column, code_column, _ = COMPACT_TEXT_COLUMNS[table_name]
+    return {(code_column if k == text_column else k): ("int" if k == text_column else v) for k, v in schema.items()}
+
+
+def expand_text_codes(table_name: str, record: Dict) -> Dict:
+    """Decoder API: return a record with its template code rendered back to text.
+
+    Records without a code column (already text, or other tables) are
+    returned unchanged.
+    """
+    spec = COMPACT_TEXT_COLUMNS.get(table_name)
+    if spec is None or spec[1] not in record:
+        return record
+    text_column, code_column, templates = spec
+    return {
+        (text_column if k == code_column else k): (templates.render_code(v) if k == code_column else v)
+        for k, v in record.items()
+    }
+
+
+def expand_text_columns(table_name: str, names: List[str], columns: List[List]) -> Tuple[List[str], List[List]]:
+    """expand_text_codes for a table held as columns (names and their value lists)."""
+    spec = COMPACT_TEXT_COLUMNS.get(table_name)
+    if spec is None or spec[1] not in names:
+        return names, columns
+    text_column, code_column, templates = spec
+    i = names.index(code_column)
+    return (names[:i] + [text_column] + names[i + 1:],
+            columns[:i] + [list(map(templates.render_code, columns[i]))] + columns[i + 1:])
+
 
 # =============================================================================
 # DATA GENERATION FUNCTIONS
 # =============================================================================
 
-def generate_contract_value(project: Dict) -> Dict:
-    """Generate base contract value based on project characteristics."""
-    # Base cost per SF varies by project type
-    cost_per_sf = {
-        "Healthcare": random.uniform(85, 120),
-        "Commercial Office": random.uniform(45, 65),
-        "K-12 Education": random.uniform(55, 75),
-        "Data Center": random.uniform(180, 280),
-        "Multifamily Residential": random.uniform(35, 50),
-    }
-    
-    base_cost = project["sq_ft"] * cost_per_sf[project["type"]]
-    
-    # Complexity adjustment
-    complexity_mult = {"low": 0.9, "medium": 1.0, "high": 1.15}
-    base_cost *= complexity_mult[project["complexity"]]
-    
-    # Round to realistic contract value
-    base_cost = round(base_cost / 1000) * 1000
-    
-    return {
-        "project_id": project["id"],
-        "project_name": project["name"],
-        "original_contract_value": base_cost,
-        "contract_date": (datetime(2024, 1, 1) + timedelta(days=random.randint(0, 90))).strftime("%Y-%m-%d"),
-        "substantial_completion_date": (datetime(2024, 1, 1) + timedelta(days=random.randint(0, 90) + project["duration_months"] * 30)).strftime("%Y-%m-%d"),
-        "retention_pct": 0.10,
-        "payment_terms": "Net 30",
-        "gc_name": random.choice(["Turner Construction", "DPR Construction", "Skanska USA", "JE Dunn", "Mortenson"]),
-        "architect": random.choice(["Gensler", "HOK", "Perkins&Will", "HKS", "SmithGroup"]),
-        "engineer_of_record": random.choice(["WSP", "ARUP", "Syska Hennessy", "Henderson Engineers", "AEI"]),
-    }
+def generate_contract_value(project: Dict, rng: Optional[random.Random] = None) -> Dict:
+    """Generate base contract value based on project characteristics (CONTRACTS_SPEC)."""
+    return column_records(generate_columns(CONTRACTS_SPEC, SpecEnv(project, rng or random)))[0]
 
 
-def generate_sov(project: Dict, contract_value: float) -> List[Dict]:
-    """Generate Schedule of Values line items that sum to contract value."""
-    sov_lines = []
-    
-    # Generate percentages ensuring they sum to 1.0
-    raw_pcts = []
-    for item in SOV_TEMPLATE:
-        pct = random.uniform(item["pct_range"][0], item["pct_range"][1])
-        raw_pcts.append(pct)
-    
-    # Normalize to sum to 1.0
-    total_pct = sum(raw_pcts)
-    normalized_pcts = [p / total_pct for p in raw_pcts]
-    
-    for i, item in enumerate(SOV_TEMPLATE):
-        line_value = contract_value * normalized_pcts[i]
-        # Round to nearest $100
-        line_value = round(line_value / 100) * 100
-        
-        sov_lines.append({
-            "project_id": project["id"],
-            "sov_line_id": f"{project['id']}-SOV-{item['code']}",
-            "line_number": int(item["code"]),
-            "description": item["description"],
-            "scheduled_value": line_value,
-            "labor_pct": random.uniform(0.55, 0.75) if "Equipment" not in item["description"] else random.uniform(0.15, 0.30),
-            "material_pct": random.uniform(0.25, 0.45) if "Equipment" not in item["description"] else random.uniform(0.70, 0.85),
-        })
-    
-    # Adjust last line to make sum exact
-    current_total = sum(line["scheduled_value"] for line in sov_lines)
-    sov_lines[-1]["scheduled_value"] += (contract_value - current_total)
-    
-    return sov_lines
+def generate_sov(project: Dict, contract_value: float, rng: Optional[random.Random] = None) -> List[Dict]:
+    """Generate Schedule of Values line items that sum to contract value (SOV_SPEC)."""
+    env = SpecEnv(project, rng or random, parents={"contracts": {"original_contract_value": [contract_value]}})
+    return column_records(generate_columns(SOV_SPEC, env))
 
 
-def generate_labor_logs(project: Dict, sov_lines: List[Dict], start_date: datetime) -> List[Dict]:
-    """Generate daily labor logs with realistic crew patterns."""
-    logs = []
-    project_duration_days = project["duration_months"] * 22  # ~22 work days per month
-    
-    # Track cumulative hours by SOV line for realistic progression
-    sov_labor_budgets = {}
-    for line in sov_lines:
-        labor_value = line["scheduled_value"] * line["labor_pct"]
-        # Estimate hours based on blended rate of ~$65/hr
-        sov_labor_budgets[line["sov_line_id"]] = labor_value / 65
-    
-    current_date = start_date
-    day_count = 0
-    
-    while day_count < project_duration_days:
-        # Skip weekends
-        if current_date.weekday() >= 5:
-            current_date += timedelta(days=1)
-            continue
-        
-        # Determine crew size based on project phase
-        phase_pct = day_count / project_duration_days
-        if phase_pct < 0.15:  # Mobilization/submittals
-            base_crew = random.randint(2, 5)
-        elif phase_pct < 0.75:  # Peak production
-            base_crew = random.randint(8, 18) if project["complexity"] == "high" else random.randint(5, 12)
-        else:  # Closeout
-            base_crew = random.randint(3, 7)
-        
-        # Determine which SOV lines are active
-        active_sov_lines = []
-        if phase_pct < 0.10:
-            active_sov_lines = [l for l in sov_lines if l["line_number"] in [1, 2]]
-        elif phase_pct < 0.30:
-            active_sov_lines = [l for l in sov_lines if l["line_number"] in [1, 2, 3, 4, 5]]
-        elif phase_pct < 0.60:
-            active_sov_lines = [l for l in sov_lines if l["line_number"] in [1, 3, 4, 5, 6, 7, 8, 9]]
-        elif phase_pct < 0.85:
-            active_sov_lines = [l for l in sov_lines if l["line_number"] in [1, 9, 10, 11, 12]]
-        else:
-            active_sov_lines = [l for l in sov_lines if l["line_number"] in [1, 11, 13, 14, 15]]
-        
-        if not active_sov_lines:
-            active_sov_lines = [sov_lines[0]]
-        
-        # Generate individual worker entries for the day
-        workers_assigned = random.sample(CREW_ROLES, min(base_crew, len(CREW_ROLES)))
-        
-        # Possibly add duplicates of common roles
-        if base_crew > len(CREW_ROLES):
-            common_roles = [r for r in CREW_ROLES if "Journeyman" in r["role"] or "Apprentice" in r["role"]]
-            for _ in range(base_crew - len(CREW_ROLES)):
-                workers_assigned.append(random.choice(common_roles))
-        
-        for worker in workers_assigned:
-            # Assign to an SOV line
-            assigned_sov = random.choice(active_sov_lines)
-            
-            # Hours - typically 8, sometimes OT
-            if random.random() < 0.15:  # 15% chance of OT
-                hours_st = 8
-                hours_ot = random.choice([2, 4])
-            else:
-                hours_st = 8 if random.random() > 0.1 else random.choice([4, 6, 10])
-                hours_ot = 0
-            
-            logs.append({
-                "project_id": project["id"],
-                "log_id": str(uuid.uuid4())[:8],
-                "date": current_date.strftime("%Y-%m-%d"),
-                "employee_id": f"EMP-{random.randint(1000, 9999)}",
-                "role": worker["role"],
-                "sov_line_id": assigned_sov["sov_line_id"],
-                "hours_st": hours_st,
-                "hours_ot": hours_ot,
-                "hourly_rate": worker["hourly_rate"],
-                "burden_multiplier": worker["burden_rate"],
-                "work_area": f"Floor {random.randint(1, project['floors'])}",
-                "cost_code": assigned_sov["line_number"],
-            })
-        
-        current_date += timedelta(days=1)
-        day_count += 1
-    
-    return logs
+def generate_labor_logs(project: Dict, sov_lines: List[Dict], start_date: datetime, master_seed: int = DEFAULT_SEED,
+                        ids: Optional[IdAllocator] = None, calendar: Optional[WorkCalendar] = None,
+                        through_day: Optional[int] = None, progress: Optional[Dict] = None) -> "RecordBuffer":
+    """Generate daily labor logs with realistic crew patterns (LABOR_LOGS_SPEC).
+
+    Returns a RecordBuffer with one row per worker-day in date order, one day per working day
+    of the project calendar. Days are drawn BLOCK_DAYS at a time, each block
+    from its own block_rng stream; generation stops after the block holding
+    through_day (an ordinal - later days of that block are the caller's to
+    drop), and progress tracks the block to continue from (see
+    table_specs.generate_columns).
+    """
+    env = SpecEnv(project, table_rng(master_seed, project["id"], "labor_logs"), start_date,
+                  calendar or work_calendar(project["location"]), {"sov": table_columns(sov_lines)},
+                  ids or IdAllocator(master_seed, "labor_logs"), partial(block_rng, master_seed, project["id"], "labor_logs"))
+    return RecordBuffer.from_columns(generate_columns(LABOR_LOGS_SPEC, env, progress, through_day))
 
 
-def generate_material_deliveries(project: Dict, sov_lines: List[Dict], start_date: datetime) -> List[Dict]:
-    """Generate material delivery records with realistic timing and quantities."""
+def generate_material_deliveries(project: Dict, sov_lines: List[Dict], start_date: datetime, rng: Optional[random.Random] = None,
+                                 ids: Optional[IdAllocator] = None, calendar: Optional[WorkCalendar] = None) -> "RecordBuffer":
+    """Generate material delivery records with realistic timing and quantities, as a RecordBuffer in date order."""
+    rng = rng or random
+    ids = ids or IdAllocator(DEFAULT_SEED, "material_deliveries")
+    calendar = calendar or work_calendar(project["location"])
+    start_day = start_date.toordinal()
     deliveries = []
     project_duration_days = project["duration_months"] * 30
     
@@ -339,11 +290,11 @@ def generate_material_deliveries(project: Dict, sov_lines: List[Dict], start_dat
         material_budget = sov_line["scheduled_value"] * sov_line["material_pct"]
         
         # Generate 3-8 deliveries per SOV line
-        num_deliveries = random.randint(3, 8)
+        num_deliveries = rng.randint(3, 8)
         delivery_values = []
         
         for _ in range(num_deliveries):
-            delivery_values.append(random.random())
+            delivery_values.append(rng.random())
         
         # Normalize
         total = sum(delivery_values)
@@ -352,51 +303,51 @@ def generate_material_deliveries(project: Dict, sov_lines: List[Dict], start_dat
         for i, value in enumerate(delivery_values):
             # Delivery timing based on SOV line number (phase)
             if sov_line["line_number"] <= 4:
-                day_offset = random.randint(15, int(project_duration_days * 0.4))
+                day_offset = rng.randint(15, int(project_duration_days * 0.4))
             elif sov_line["line_number"] <= 9:
-                day_offset = random.randint(int(project_duration_days * 0.15), int(project_duration_days * 0.7))
+                day_offset = rng.randint(int(project_duration_days * 0.15), int(project_duration_days * 0.7))
             else:
-                day_offset = random.randint(int(project_duration_days * 0.4), int(project_duration_days * 0.9))
+                day_offset = rng.randint(int(project_duration_days * 0.4), int(project_duration_days * 0.9))
             
-            delivery_date = start_date + timedelta(days=day_offset)
+            delivery_date = day_string(calendar.roll_forward(start_day + day_offset))
             
             # Select items
-            item = random.choice(cat_info["items"])
+            item = rng.choice(cat_info["items"])
             
             # Generate realistic quantities
             if "RTU" in item or "Chiller" in item or "Boiler" in item or "AHU" in item:
-                qty = random.randint(1, 4)
+                qty = rng.randint(1, 4)
                 unit = "EA"
                 unit_cost = value / qty
             elif "Sheet Metal" in item:
-                qty = random.randint(20, 100)
+                qty = rng.randint(20, 100)
                 unit = "SHEET"
                 unit_cost = value / qty
             elif "Duct" in item:
-                qty = random.randint(50, 500)
+                qty = rng.randint(50, 500)
                 unit = "LF"
                 unit_cost = value / qty
             elif "Pipe" in item or "Copper" in item or "Steel" in item:
-                qty = random.randint(100, 1000)
+                qty = rng.randint(100, 1000)
                 unit = "LF"
                 unit_cost = value / qty
             elif "VAV" in item or "FCU" in item:
-                qty = random.randint(5, 40)
+                qty = rng.randint(5, 40)
                 unit = "EA"
                 unit_cost = value / qty
             elif "Controller" in item or "Sensor" in item or "Actuator" in item:
-                qty = random.randint(10, 100)
+                qty = rng.randint(10, 100)
                 unit = "EA"
                 unit_cost = value / qty
             else:
-                qty = random.randint(5, 50)
+                qty = rng.randint(5, 50)
                 unit = "EA"
                 unit_cost = value / qty
             
             deliveries.append({
                 "project_id": project["id"],
-                "delivery_id": f"DEL-{project['id'][-3:]}-{str(uuid.uuid4())[:6]}",
-                "date": delivery_date.strftime("%Y-%m-%d"),
+                "delivery_id": f"DEL-{project['id'][-3:]}-{next(ids)}",
+                "date": delivery_date,
                 "sov_line_id": sov_line["sov_line_id"],
                 "material_category": material_cat,
                 "item_description": item,
@@ -404,284 +355,154 @@ def generate_material_deliveries(project: Dict, sov_lines: List[Dict], start_dat
                 "unit": unit,
                 "unit_cost": round(unit_cost, 2),
                 "total_cost": round(value, 2),
-                "po_number": f"PO-{random.randint(10000, 99999)}",
-                "vendor": random.choice(["Ferguson Supply", "Winsupply", "RE Michel", "ACR Group", "Carrier Enterprise", "Johnstone Supply"]),
-                "received_by": random.choice(["J. Martinez", "K. Thompson", "R. Williams", "M. Chen", "D. Patel"]),
-                "condition_notes": random.choice(["Good condition", "Good condition", "Good condition", "Minor packaging damage - product OK", "Partial shipment - backorder pending", "Good condition"]),
+                "po_number": f"PO-{rng.randint(10000, 99999)}",
+                "vendor": rng.choice(["Ferguson Supply", "Winsupply", "RE Michel", "ACR Group", "Carrier Enterprise", "Johnstone Supply"]),
+                "received_by": rng.choice(["J. Martinez", "K. Thompson", "R. Williams", "M. Chen", "D. Patel"]),
+                "condition_notes": rng.choice(["Good condition", "Good condition", "Good condition", "Minor packaging damage - product OK", "Partial shipment - backorder pending", "Good condition"]),
             })
     
-    return sorted(deliveries, key=lambda x: x["date"])
+    return RecordBuffer(sorted(deliveries, key=lambda x: x["date"]))
+
+
+def generate_change_orders(project: Dict, contract_value: float, sov_lines: List[Dict], start_date: datetime, rng: Optional[random.Random] = None,
+                           compact_text: bool = False, calendar: Optional[WorkCalendar] = None,
+                           rfis: Optional[Sequence[Mapping]] = None) -> "RecordBuffer":
+    """Generate change order requests with realistic reasons and values, as a RecordBuffer in date order.
 
+    With compact_text the description is stored as description_code (see
+    CHANGE_ORDER_TEXT) instead of rendered text. Given the project's RFI log
+    (sorted by date, as generate_rfis returns it), related_rfi only refers to
+    RFIs submitted on or before the change order; without it, it is a
+    made-up RFI-001..RFI-030.
 
-def generate_change_orders(project: Dict, contract_value: float, sov_lines: List[Dict], start_date: datetime) -> List[Dict]:
-    """Generate change order requests with realistic reasons and values."""
+    status is the change order's final outcome (Approved or Rejected), so
+    the output does not depend on the day it is generated; see snapshots.py
+    for the status as of a given day.
+    """
+    rng = rng or random
+    calendar = calendar or work_calendar(project["location"])
+    start_day = start_date.toordinal()
     change_orders = []
+    description_key = "description_code" if compact_text else "description"
     
     # Number of COs based on project complexity and size
     num_cos = {
-        "low": random.randint(3, 6),
-        "medium": random.randint(6, 12),
-        "high": random.randint(10, 20),
+        "low": rng.randint(3, 6),
+        "medium": rng.randint(6, 12),
+        "high": rng.randint(10, 20),
     }[project["complexity"]]
     
     project_duration_days = project["duration_months"] * 30
+    rfi_dates = None
+    if rfis is not None:
+        rfi_dates = rfis.column("date_submitted") if hasattr(rfis, "column") else [rfi["date_submitted"] for rfi in rfis]
     
     for i in range(num_cos):
-        reason_type, reason_template = random.choice(CHANGE_ORDER_REASONS)
+        reason_code = CHANGE_ORDER_TEXT.sample_code(rng)
+        reason_type = CHANGE_ORDER_REASONS[CHANGE_ORDER_TEXT.decode(reason_code)[0]][0]
         
         # CO value - mix of adds and credits
         if reason_type == "Value Engineering":
             # Credits are typically smaller
-            co_value = -1 * random.uniform(0.002, 0.015) * contract_value
+            co_value = -1 * rng.uniform(0.002, 0.015) * contract_value
         elif reason_type in ["Owner Request", "Scope Gap"]:
-            co_value = random.uniform(0.005, 0.04) * contract_value
+            co_value = rng.uniform(0.005, 0.04) * contract_value
         else:
-            co_value = random.uniform(0.002, 0.025) * contract_value
+            co_value = rng.uniform(0.002, 0.025) * contract_value
         
         # Round to nearest $100
         co_value = round(co_value / 100) * 100
         
         # Timing
-        day_offset = random.randint(30, project_duration_days - 30)
-        co_date = start_date + timedelta(days=day_offset)
+        day_offset = rng.randint(30, project_duration_days - 30)
+        co_day = calendar.roll_forward(start_day + day_offset)
         
-        # Status based on age
-        age_days = (datetime.now() - co_date).days
-        if age_days < 14:
-            status = random.choice(["Pending", "Under Review"])
-        elif age_days < 45:
-            status = random.choice(["Under Review", "Approved", "Rejected"])
-        else:
-            status = random.choice(["Approved", "Approved", "Approved", "Rejected"])
+        # Final outcome; the status on a given day is resolved by snapshots.py
+        status = rng.choice(["Approved", "Approved", "Approved", "Rejected"])
         
-        # Fill in template
-        reason_text = reason_template.format(
-            item=random.choice(["exhaust fan", "VAV boxes", "chilled water piping", "controls points"]),
-            dimension=random.choice(["duct size", "pipe elevation", "equipment clearance"]),
-            condition=random.choice(["existing ductwork", "abandoned piping", "structural conflict", "asbestos insulation"]),
-            trade=random.choice(["electrical", "plumbing", "fire protection", "structural"]),
-            requirement=random.choice(["additional smoke detectors", "seismic upgrades", "fire dampers", "access panels"]),
-            old_item=random.choice(["Carrier RTU", "Trane chiller", "copper piping"]),
-            new_item=random.choice(["Daikin RTU", "York chiller", "steel piping"]),
-        )
+        related_rfi = None
+        if rng.random() > 0.4:
+            if rfi_dates is None:
+                related_rfi = f"RFI-{rng.randint(1, 30):03d}"
+            else:
+                submitted = bisect_right(rfi_dates, day_string(co_day))
+                related_rfi = rfis[rng.randrange(submitted)]["rfi_number"] if submitted else None
         
         change_orders.append({
             "project_id": project["id"],
             "co_number": f"CO-{str(i+1).zfill(3)}",
-            "date_submitted": co_date.strftime("%Y-%m-%d"),
+            "date_submitted": day_string(co_day),
             "reason_category": reason_type,
-            "description": reason_text,
+            description_key: reason_code if compact_text else CHANGE_ORDER_TEXT.render_code(reason_code),
             "amount": co_value,
             "status": status,
-            "related_rfi": f"RFI-{random.randint(1, 30):03d}" if random.random() > 0.4 else None,
-            "affected_sov_lines": random.sample([l["sov_line_id"] for l in sov_lines], random.randint(1, 3)),
-            "labor_hours_impact": random.randint(8, 200) if co_value > 0 else -random.randint(8, 100),
-            "schedule_impact_days": random.choice([0, 0, 0, 0, 2, 5, 7, 14]) if co_value > 0 else 0,
-            "submitted_by": random.choice(["J. Martinez", "K. Thompson", "R. Williams"]),
-            "approved_by": random.choice(["Project Manager", "Owner Rep", None]),
+            "related_rfi": related_rfi,
+            "affected_sov_lines": rng.sample([l["sov_line_id"] for l in sov_lines], rng.randint(1, 3)),
+            "labor_hours_impact": rng.randint(8, 200) if co_value > 0 else -rng.randint(8, 100),
+            "schedule_impact_days": rng.choice([0, 0, 0, 0, 2, 5, 7, 14]) if co_value > 0 else 0,
+            "submitted_by": rng.choice(["J. Martinez", "K. Thompson", "R. Williams"]),
+            "approved_by": rng.choice(["Project Manager", "Owner Rep", None]),
         })
     
-    return sorted(change_orders, key=lambda x: x["date_submitted"])
+    return RecordBuffer(sorted(change_orders, key=lambda x: x["date_submitted"]))
 
 
-def generate_rfis(project: Dict, start_date: datetime) -> List[Dict]:
-    """Generate RFI log with realistic construction questions."""
-    rfis = []
-    
-    num_rfis = {
-        "low": random.randint(15, 30),
-        "medium": random.randint(30, 60),
-        "high": random.randint(50, 100),
-    }[project["complexity"]]
-    
-    project_duration_days = project["duration_months"] * 30
-    
-    for i in range(num_rfis):
-        day_offset = random.randint(14, project_duration_days - 14)
-        submit_date = start_date + timedelta(days=day_offset)
-        
-        # Response time varies
-        response_days = random.choices(
-            [3, 5, 7, 10, 14, 21, None],
-            weights=[0.15, 0.25, 0.25, 0.15, 0.10, 0.05, 0.05]
-        )[0]
-        
-        response_date = (submit_date + timedelta(days=response_days)).strftime("%Y-%m-%d") if response_days else None
-        
-        # Generate subject from template
-        subject_template = random.choice(RFI_SUBJECTS)
-        subject = subject_template.format(
-            grid=f"{random.choice('ABCDEFGH')}-{random.randint(1, 12)}",
-            room=f"Room {random.randint(100, 600)}",
-            location=f"Floor {random.randint(1, project['floors'])}, Grid {random.choice('ABCDEFGH')}-{random.randint(1, 12)}",
-            elev=f"+{random.randint(10, 50)}'-0\"",
-            system=random.choice(["AHU-1", "CHW Loop", "HW Loop", "Exhaust System", "VAV Zone 3"]),
-            area=random.choice(["mechanical room", "ceiling plenum", "exterior wall", "elevator shaft"]),
-            weight=random.choice(["500", "1000", "2000"]),
-        )
-        
-        status = "Closed" if response_date else random.choice(["Open", "Pending Response"])
-        
-        rfis.append({
-            "project_id": project["id"],
-            "rfi_number": f"RFI-{str(i+1).zfill(3)}",
-            "date_submitted": submit_date.strftime("%Y-%m-%d"),
-            "subject": subject,
-            "submitted_by": random.choice(["J. Martinez - Project Manager", "K. Thompson - Foreman", "R. Williams - Engineer"]),
-            "assigned_to": random.choice(["Architect", "MEP Engineer", "Structural Engineer", "Owner"]),
-            "priority": random.choices(["Low", "Medium", "High", "Critical"], weights=[0.2, 0.45, 0.25, 0.10])[0],
-            "status": status,
-            "date_required": (submit_date + timedelta(days=random.randint(7, 21))).strftime("%Y-%m-%d"),
-            "date_responded": response_date,
-            "response_summary": random.choice([
-                "Proceed as noted in attached sketch.",
-                "Refer to ASI-{} for clarification.".format(random.randint(1, 20)),
-                "Approved as submitted.",
-                "Revise per attached markup.",
-                "Coordinate with {} contractor.".format(random.choice(["electrical", "plumbing", "structural"])),
-            ]) if response_date else None,
-            "cost_impact": random.choice([True, False, False, False]),
-            "schedule_impact": random.choice([True, False, False, False, False]),
-        })
-    
-    return sorted(rfis, key=lambda x: x["date_submitted"])
+def generate_rfis(project: Dict, start_date: datetime, rng: Optional[random.Random] = None,
+                  compact_text: bool = False, calendar: Optional[WorkCalendar] = None) -> "RecordBuffer":
+    """Generate RFI log with realistic construction questions (RFIS_SPEC), as a RecordBuffer in date order.
 
+    With compact_text the subject is stored as subject_code (see
+    RFI_SUBJECT_TEXT) instead of rendered text.
+    """
+    env = SpecEnv(project, rng or random, start_date, calendar or work_calendar(project["location"]))
+    return RecordBuffer.from_columns(generate_columns(text_spec(RFIS_SPEC, compact_text), env))
 
-def generate_field_notes(project: Dict, start_date: datetime) -> List[Dict]:
-    """Generate unstructured field notes/daily reports."""
-    notes = []
-    
-    project_duration_days = project["duration_months"] * 22  # Work days
-    current_date = start_date
-    day_count = 0
-    
-    while day_count < project_duration_days:
-        # Skip weekends
-        if current_date.weekday() >= 5:
-            current_date += timedelta(days=1)
-            continue
-        
-        # Not every day has detailed notes
-        if random.random() < 0.7:  # 70% of days have notes
-            template = random.choice(FIELD_NOTE_TEMPLATES)
-            
-            note_text = template.format(
-                time=random.choice(["0600", "0630", "0700"]),
-                weather=random.choice(["Clear, 72°F", "Partly cloudy, 65°F", "Rain - indoor work only", "Hot, 95°F - heat protocol", "Cold, 35°F"]),
-                crew_count=random.randint(4, 16),
-                task=random.choice([
-                    "ductwork installation Floor 3", "piping rough-in mechanical room",
-                    "hanging VAV boxes wing B", "controls wiring", "insulation west side",
-                    "equipment rigging", "startup AHU-2", "TAB work zones 1-4"
-                ]),
-                observation=random.choice([
-                    "Good progress.", "Behind schedule due to material delay.",
-                    "Ahead of plan.", "Coordination issues with electrical - resolved on site.",
-                    "Waiting on RFI response to proceed.", "Inspection passed."
-                ]),
-                safety_topic=random.choice([
-                    "ladder safety", "PPE requirements", "fall protection",
-                    "hot work permits", "lockout/tagout", "confined space entry"
-                ]),
-                work_description=random.choice([
-                    "Continued ductwork installation per plan.",
-                    "Completed piping pressure test - passed.",
-                    "Set 3 VAV boxes, awaiting controls.",
-                    "Ran refrigerant lines to condensers."
-                ]),
-                material=random.choice(["sheet metal", "copper piping", "VAV boxes", "RTU", "insulation"]),
-                qty=random.randint(10, 200),
-                receipt_note=random.choice(["Matched PO", "Short 2 boxes - claim filed", "All accounted for"]),
-                location=random.choice(["laydown area A", "mechanical room", "loading dock", "floor 3 staging"]),
-                trade=random.choice(["electrical", "plumbing", "fire protection", "drywall"]),
-                meeting_outcome=random.choice([
-                    "Agreed on sequence for ceiling close-in",
-                    "Resolved duct routing conflict",
-                    "Scheduled joint walkthrough Friday"
-                ]),
-                actions=random.choice([
-                    "HVAC to relocate diffuser 6 inches east",
-                    "FP to adjust sprinkler head locations",
-                    "Awaiting revised drawings"
-                ]),
-                topics=random.choice([
-                    "schedule recovery, material lead times, inspections",
-                    "safety incident review, upcoming inspections, manpower",
-                    "change orders, RFI backlog, coordination"
-                ]),
-                schedule_status=random.choice(["on track", "3 days behind", "ahead 2 days", "critical - recovery plan in place"]),
-                rfi_count=random.randint(2, 15),
-                qty2=random.randint(5, 25),
-                units=random.choice(["VAV boxes", "diffusers", "LF of duct", "pipe hangers"]),
-                floor=random.randint(1, project["floors"]),
-                quality_note=random.choice(["Passed QC inspection", "Minor punch items noted", "Rework required grid C-4"]),
-                inspections=random.choice(["rough-in Friday", "pressure test Monday", "none"]),
-                equipment=random.choice(["RTU-1", "AHU-2", "Chiller", "Boiler", "FCU bank west"]),
-                startup_result=random.choice([
-                    "Successful - all parameters normal",
-                    "Minor vibration issue - balancing tomorrow",
-                    "Delayed - controls not ready"
-                ]),
-                punch_items=random.choice(["none", "3 minor items", "damper actuator adjustment", "sensor calibration"]),
-                issue_type=random.choice(["Coordination conflict", "Material issue", "Design discrepancy", "Access issue"]),
-                issue_description=random.choice([
-                    "sprinkler head conflicts with diffuser at B-7",
-                    "wrong size fittings delivered",
-                    "field conditions don't match drawings",
-                    "ceiling access restricted by other trade"
-                ]),
-                resolution=random.choice([
-                    "RFI submitted", "Resolved on site with GC", "Awaiting engineer response", "Workaround implemented"
-                ]),
-                impact=random.choice(["none", "1 day delay", "cost impact TBD", "schedule neutral"]),
-                area=random.choice(["Zone 3", "mechanical room", "penthouse", "basement", "floors 4-6"]),
-                progress_pct=random.randint(40, 95),
-                remaining_work=random.choice([
-                    "diffusers and connections", "insulation and startup",
-                    "controls terminations", "final connections"
-                ]),
-                system=random.choice(["VAV system floor 2", "AHU-1 supply", "FCU loop", "exhaust system"]),
-                readings=random.choice([
-                    "CFM within 5% of design", "static pressure high",
-                    "flow low on 3 boxes", "all zones balanced"
-                ]),
-                adjustments=random.choice([
-                    "sheave change AHU", "damper repositioning", "none required", "VFD reprogramming"
-                ]),
-            )
-            
-            notes.append({
-                "project_id": project["id"],
-                "note_id": str(uuid.uuid4())[:8],
-                "date": current_date.strftime("%Y-%m-%d"),
-                "author": random.choice(["J. Martinez", "K. Thompson", "R. Williams", "M. Chen"]),
-                "note_type": random.choice(["Daily Report", "Safety Log", "Coordination Note", "Inspection Note", "Issue Log"]),
-                "content": note_text,
-                "photos_attached": random.randint(0, 5),
-                "weather": random.choice(["Clear", "Cloudy", "Rain", "Hot", "Cold"]),
-                "temp_high": random.randint(55, 100),
-                "temp_low": random.randint(35, 75),
-            })
-        
-        current_date += timedelta(days=1)
-        day_count += 1
-    
-    return notes
+
+def generate_field_notes(project: Dict, start_date: datetime, master_seed: int = DEFAULT_SEED,
+                         ids: Optional[IdAllocator] = None, compact_text: bool = False,
+                         calendar: Optional[WorkCalendar] = None, through_day: Optional[int] = None,
+                         progress: Optional[Dict] = None) -> "RecordBuffer":
+    """Generate unstructured field notes/daily reports (FIELD_NOTES_SPEC).
+
+    Returns a RecordBuffer with one row per note in date order, drawn in blocks of working
+    days like generate_labor_logs(). With compact_text the note is stored as
+    content_code (see FIELD_NOTE_TEXT) instead of rendered text.
+    """
+    env = SpecEnv(project, table_rng(master_seed, project["id"], "field_notes"), start_date,
+                  calendar or work_calendar(project["location"]), ids=ids or IdAllocator(master_seed, "field_notes"),
+                  block_rng=partial(block_rng, master_seed, project["id"], "field_notes"))
+    return RecordBuffer.from_columns(generate_columns(text_spec(FIELD_NOTES_SPEC, compact_text), env, progress,
+                                                      through_day))
 
 
-def generate_billing_history(project: Dict, sov_lines: List[Dict], contract_value: float, start_date: datetime) -> List[Dict]:
-    """Generate progress billing history with realistic draw patterns."""
-    billing = []
+def generate_billing_history(project: Dict, sov_lines: List[Dict], contract_value: float, start_date: datetime, rng: Optional[random.Random] = None,
+                             calendar: Optional[WorkCalendar] = None, through_day: Optional[int] = None,
+                             progress: Optional[Dict] = None) -> Iterator[Dict]:
+    """Generate progress billing history with realistic draw patterns.
+
+    Yields one pay application (with nested line_items) per billed month.
+    Periods end on the last working day on or before day 30 * month + 25.
+    Like generate_labor_logs, stops before the first period ending after
+    through_day; progress carries the next month and cumulative billing per
+    SOV line between calls.
+    """
+    rng = rng or random
+    calendar = calendar or work_calendar(project["location"])
+    start_day = start_date.toordinal()
     
     project_duration_months = project["duration_months"]
     
     # Track cumulative billing per SOV line
-    sov_billing = {line["sov_line_id"]: 0 for line in sov_lines}
+    progress = progress if progress is not None else {}
+    sov_billing = progress.setdefault("sov_billing", {line["sov_line_id"]: 0 for line in sov_lines})
     sov_values = {line["sov_line_id"]: line["scheduled_value"] for line in sov_lines}
     sov_numbers = {line["sov_line_id"]: line["line_number"] for line in sov_lines}
     
-    for month in range(project_duration_months + 1):
-        billing_date = start_date + timedelta(days=30 * month + 25)
+    for month in range(progress.get("month", 0), project_duration_months + 1):
+        billing_day = calendar.roll_back(start_day + 30 * month + 25)
+        if through_day is not None and billing_day > through_day:
+            break
+        progress["month"] = month + 1
         
         # Determine progress percentage based on S-curve
         month_pct = month / project_duration_months
@@ -719,7 +540,7 @@ def generate_billing_history(project: Dict, sov_lines: List[Dict], contract_valu
             period_billing = max(target_amount - sov_billing[sov_id], 0)
             
             # Add some randomness
-            period_billing *= random.uniform(0.85, 1.0)
+            period_billing *= rng.uniform(0.85, 1.0)
             period_billing = round(period_billing / 100) * 100
             
             # Don't exceed scheduled value
@@ -745,24 +566,23 @@ def generate_billing_history(project: Dict, sov_lines: List[Dict], contract_valu
             cumulative = sum(sov_billing.values())
             retention = cumulative * 0.10
             
-            billing.append({
+            yield {
                 "project_id": project["id"],
                 "application_number": month + 1,
-                "period_end": billing_date.strftime("%Y-%m-%d"),
+                "period_end": day_string(billing_day),
                 "period_total": period_total,
                 "cumulative_billed": cumulative,
                 "retention_held": retention,
                 "net_payment_due": cumulative - retention,
-                "status": random.choice(["Paid", "Paid", "Paid", "Pending", "Approved"]) if month < project_duration_months - 1 else "Pending",
-                "payment_date": (billing_date + timedelta(days=random.randint(25, 40))).strftime("%Y-%m-%d") if random.random() > 0.2 else None,
+                "status": rng.choice(["Paid", "Paid", "Paid", "Pending", "Approved"]) if month < project_duration_months - 1 else "Pending",
+                "payment_date": day_string(calendar.roll_forward(billing_day + rng.randint(25, 40))) if rng.random() > 0.2 else None,
                 "line_items": line_items,
-            })
-    
-    return billing
+            }
 
 
-def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[Dict]) -> Dict:
+def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[Dict], rng: Optional[random.Random] = None) -> Dict:
     """Generate original bid estimate assumptions."""
+    rng = rng or random
     
     # Labor assumptions
     total_labor_hours = sum(
@@ -771,36 +591,36 @@ def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[
     )
     
     # Calculate what contract should have been at current rates
-    bid_date = datetime(2023, 10, 1) + timedelta(days=random.randint(0, 60))
+    bid_date = datetime(2023, 10, 1) + timedelta(days=rng.randint(0, 60))
     
     return {
         "project_id": project["id"],
         "bid_date": bid_date.strftime("%Y-%m-%d"),
         "bid_amount": contract_value,
-        "estimator": random.choice(["S. Johnson", "M. Rodriguez", "T. Wilson"]),
+        "estimator": rng.choice(["S. Johnson", "M. Rodriguez", "T. Wilson"]),
         
         "labor_assumptions": {
             "total_hours_estimated": round(total_labor_hours),
             "blended_labor_rate": 65.00,
-            "productivity_factor": random.uniform(0.85, 0.95),
+            "productivity_factor": rng.uniform(0.85, 0.95),
             "crew_mix": {
                 "foreman_pct": 0.08,
                 "journeyman_pct": 0.45,
                 "apprentice_pct": 0.35,
                 "helper_pct": 0.12,
             },
-            "overtime_allowance_pct": random.uniform(0.05, 0.12),
+            "overtime_allowance_pct": rng.uniform(0.05, 0.12),
             "shift_premium": 0.0,
         },
         
         "material_assumptions": {
-            "escalation_factor_pct": random.uniform(0.02, 0.05),
-            "waste_factor_pct": random.uniform(0.03, 0.08),
-            "freight_pct": random.uniform(0.02, 0.04),
+            "escalation_factor_pct": rng.uniform(0.02, 0.05),
+            "waste_factor_pct": rng.uniform(0.03, 0.08),
+            "freight_pct": rng.uniform(0.02, 0.04),
             "key_material_quotes": [
-                {"item": "Major Equipment", "vendor": random.choice(["Carrier", "Trane", "Daikin"]), "quote_date": bid_date.strftime("%Y-%m-%d"), "validity_days": 60},
+                {"item": "Major Equipment", "vendor": rng.choice(["Carrier", "Trane", "Daikin"]), "quote_date": bid_date.strftime("%Y-%m-%d"), "validity_days": 60},
                 {"item": "Sheet Metal", "vendor": "Local Fab Shop", "quote_date": bid_date.strftime("%Y-%m-%d"), "validity_days": 30},
-                {"item": "Controls", "vendor": random.choice(["Siemens", "Johnson Controls", "Honeywell"]), "quote_date": bid_date.strftime("%Y-%m-%d"), "validity_days": 45},
+                {"item": "Controls", "vendor": rng.choice(["Siemens", "Johnson Controls", "Honeywell"]), "quote_date": bid_date.strftime("%Y-%m-%d"), "validity_days": 45},
             ],
         },
         
@@ -819,16 +639,16 @@ def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[
         },
         
         "markup": {
-            "overhead_pct": random.uniform(0.08, 0.12),
-            "profit_pct": random.uniform(0.04, 0.08),
+            "overhead_pct": rng.uniform(0.08, 0.12),
+            "profit_pct": rng.uniform(0.04, 0.08),
             "bond_pct": 0.015,
-            "insurance_pct": random.uniform(0.02, 0.035),
+            "insurance_pct": rng.uniform(0.02, 0.035),
         },
         
         "risk_allowances": {
-            "design_contingency_pct": random.uniform(0.02, 0.05),
-            "escalation_contingency_pct": random.uniform(0.02, 0.04),
-            "schedule_risk_pct": random.uniform(0.01, 0.03),
+            "design_contingency_pct": rng.uniform(0.02, 0.05),
+            "escalation_contingency_pct": rng.uniform(0.02, 0.04),
+            "schedule_risk_pct": rng.uniform(0.01, 0.03),
         },
         
         "key_assumptions": [
@@ -836,10 +656,10 @@ def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[
             f"Work performed during normal hours (7:00 AM - 3:30 PM)",
             "GC to provide adequate laydown area and hoisting",
             "MEP coordination via BIM - 3 weeks prior to each floor",
-            f"Equipment access via {random.choice(['loading dock', 'temporary opening', 'roof hatch'])}",
+            f"Equipment access via {rng.choice(['loading dock', 'temporary opening', 'roof hatch'])}",
             "Fire watch by GC when required",
             "Temporary power and water by GC",
-            f"Assumes {random.choice(['union', 'open shop'])} labor",
+            f"Assumes {rng.choice(['union', 'open shop'])} labor",
         ],
         
         "exclusions": [
@@ -863,122 +683,958 @@ def generate_bid_estimate(project: Dict, contract_value: float, sov_lines: List[
 
 
 # =============================================================================
-# MAIN EXECUTION
+# PROJECT SYNTHESIS
 # =============================================================================
 
-def main():
-    """Generate complete dataset for all projects."""
+# Spec distributions per project type. sq_ft is drawn log-uniformly, floors
+# follow from a typical floor plate, and duration grows with size.
+PROJECT_TYPE_PROFILES = {
+    "Healthcare": {
+        "weight": 0.20, "sq_ft": (40000, 450000), "floor_plate": (30000, 60000), "months": (10, 30),
+        "complexity": (0.05, 0.35, 0.60),
+        "names": ["{} Medical Center", "{} General Hospital", "{} Surgical Pavilion", "{} Cancer Institute"],
+        "scopes": ["HVAC Modernization", "New Patient Tower", "OR Suite Renovation", "Central Plant Upgrade"],
+    },
+    "Commercial Office": {
+        "weight": 0.30, "sq_ft": (50000, 900000), "floor_plate": (15000, 30000), "months": (10, 30),
+        "complexity": (0.20, 0.50, 0.30),
+        "names": ["{} Office Tower", "{} Corporate Campus", "{} Plaza", "{} Commerce Center"],
+        "scopes": ["Core & Shell MEP", "Tenant Improvement", "HVAC Replacement", "New Construction"],
+    },
+    "K-12 Education": {
+        "weight": 0.20, "sq_ft": (40000, 250000), "floor_plate": (40000, 90000), "months": (9, 20),
+        "complexity": (0.30, 0.55, 0.15),
+        "names": ["{} Elementary School", "{} Middle School", "{} High School", "{} STEM Academy"],
+        "scopes": ["New Construction", "HVAC Modernization", "Gymnasium Addition", "Summer Renovation"],
+    },
+    "Data Center": {
+        "weight": 0.10, "sq_ft": (20000, 250000), "floor_plate": (40000, 125000), "months": (8, 18),
+        "complexity": (0.00, 0.20, 0.80),
+        "names": ["{} Data Center", "{} Technology Park", "{} Colocation Facility"],
+        "scopes": ["Phase 2 Expansion", "Data Hall Fit-Out", "Cooling Plant Upgrade", "New Build"],
+    },
+    "Multifamily Residential": {
+        "weight": 0.20, "sq_ft": (60000, 600000), "floor_plate": (20000, 45000), "months": (12, 26),
+        "complexity": (0.35, 0.50, 0.15),
+        "names": ["{} Condominiums", "{} Apartments", "{} Lofts", "{} Senior Living"],
+        "scopes": ["New Construction", "2 Buildings", "3 Buildings", "Mixed-Use Podium"],
+    },
+}
+
+SYNTH_PLACE_NAMES = [
+    "Riverside", "Summit", "Greenfield", "Mercy", "Harbor View", "Oakridge", "Lakeview", "Cedar Park",
+    "Northgate", "Pinecrest", "Westfield", "Maple Grove", "Fairview", "Stonebridge", "Canyon Ridge", "Bayshore",
+]
+
+SYNTH_LOCATIONS = [
+    "Phoenix, AZ", "Denver, CO", "Austin, TX", "Ashburn, VA", "Seattle, WA", "Dallas, TX", "Houston, TX",
+    "Atlanta, GA", "Charlotte, NC", "Raleigh, NC", "Nashville, TN", "Chicago, IL", "Columbus, OH",
+    "Salt Lake City, UT", "Las Vegas, NV", "Portland, OR", "Boston, MA", "San Diego, CA",
+]
+
+
+def synthesize_project(index: int, master_seed: int = DEFAULT_SEED) -> Dict:
+    """Project spec number index (0-based, ids continue after PROJECTS).
+
+    Each spec has its own derived RNG stream, so spec i is the same whether
+    10 or 100,000 projects are requested.
+    """
+    rng = random.Random(derive_seed(master_seed, "projects", index))
+    project_type = rng.choices(list(PROJECT_TYPE_PROFILES),
+                               weights=[p["weight"] for p in PROJECT_TYPE_PROFILES.values()])[0]
+    profile = PROJECT_TYPE_PROFILES[project_type]
     
-    all_data = {
-        "contracts": [],
-        "sov": [],
-        "labor_logs": [],
-        "material_deliveries": [],
-        "change_orders": [],
-        "rfis": [],
-        "field_notes": [],
-        "billing_history": [],
-        "bid_estimates": [],
-    }
+    low, high = profile["sq_ft"]
+    size_pct = rng.random()
+    sq_ft = round(low * (high / low) ** size_pct / 1000) * 1000
+    floors = max(1, min(MAX_FLOORS, round(sq_ft / rng.uniform(*profile["floor_plate"]))))
+    min_months, max_months = profile["months"]
+    duration = round(min_months + (max_months - min_months) * size_pct) + rng.randint(-2, 2)
     
-    for project in PROJECTS:
-        print(f"Generating data for: {project['name']}")
-        
-        # Generate contract
-        contract = generate_contract_value(project)
-        all_data["contracts"].append(contract)
-        
+    return {
+        "id": f"PRJ-2024-{index + 1:03d}",
+        "name": f"{rng.choice(profile['names']).format(rng.choice(SYNTH_PLACE_NAMES))} - {rng.choice(profile['scopes'])}",
+        "type": project_type,
+        "location": rng.choice(SYNTH_LOCATIONS),
+        "sq_ft": sq_ft,
+        "floors": floors,
+        "duration_months": max(min_months, min(max_months, duration)),
+        "complexity": rng.choices(["low", "medium", "high"], weights=profile["complexity"])[0],
+    }
+
+
+def project_count(scale: float = 1.0) -> int:
+    """Number of projects in a run of the given scale factor."""
+    return max(1, round(len(PROJECTS) * scale))
+
+
+def project_specs(scale: float = 1.0, master_seed: int = DEFAULT_SEED) -> Iterator[Dict]:
+    """Lazily yield the projects for a run of the given scale factor.
+
+    Scale 1 is the hand-written PROJECTS; scale s is round(s * len(PROJECTS))
+    projects (PROJECTS first, then synthesized specs), so every table grows
+    proportionally with s. Specs are produced one at a time as they are
+    consumed.
+    """
+    total = project_count(scale)
+    yield from PROJECTS[:total]
+    for index in range(len(PROJECTS), total):
+        yield synthesize_project(index, master_seed)
+
+
+# =============================================================================
+# PER-PROJECT GENERATION
+# =============================================================================
+
+@dataclass
+class GenerationOptions:
+    """Engine choices for a generation run (must be picklable for workers)."""
+    labor_engine: str = "python"  # "python" or "numpy" (vectorized_engines.py)
+    billing_engine: str = "python"  # "python" or "numpy" (vectorized_engines.py; different draws, not equivalent output)
+    compact_text: bool = False    # emit template codes instead of rendered text (COMPACT_TEXT_COLUMNS)
+    calendar: str = "weekdays"    # working-day calendar, one of CALENDAR_MODES
+    through: Optional[str] = None # YYYY-MM-DD: only generate records up to this day (checkpointed)
+    instrument: bool = False      # time every stage and emit STATS_STREAM (see StageStats)
+    trace_memory: bool = False    # with instrument, also track peak allocation via tracemalloc
+    extra_tables: Tuple[str, ...] = ()  # declarative tables from table_specs.py to generate as well
+
+
+# Pseudo-table carrying a project's checkpoint state at the end of its record stream
+CHECKPOINT_STREAM = "_checkpoint"
+
+# Pseudo-table carrying a project's StageStats stages (with options.instrument)
+STATS_STREAM = "_stats"
+
+# Projects generated together when a vectorized engine is on, so the engine
+# runs once per batch rather than once per project
+ENGINE_BATCH_PROJECTS = 16
+
+
+def generate_engine_batch(projects: Sequence[Dict], master_seed: int = DEFAULT_SEED,
+                          options: Optional[GenerationOptions] = None) -> List[Dict[str, Any]]:
+    """Tables of the vectorized engines for a batch of projects, in one pass.
+
+    Returns one dict per project mapping table name to its records, to pass
+    to iter_project_records as batched (empty dicts when no vectorized
+    engine batches). Each project draws from its own generator, so its
+    records are the same in any batch. With options.instrument the batch's
+    StageStats figures are split across the projects by rows, under
+    STATS_STREAM.
+    """
+    options = options or GenerationOptions()
+    batched = [{} for _ in projects]
+    if options.billing_engine != "numpy" or not projects:
+        return batched
+    import numpy as np
+    from vectorized_engines import generate_billing_history_batch
+
+    jobs = []
+    for project in projects:
+        contract = generate_contract_value(project, table_rng(master_seed, project["id"], "contracts"))
         contract_value = contract["original_contract_value"]
-        start_date = datetime.strptime(contract["contract_date"], "%Y-%m-%d")
-        
-        # Generate SOV
-        sov_lines = generate_sov(project, contract_value)
-        all_data["sov"].extend(sov_lines)
-        
-        # Generate labor logs
-        labor_logs = generate_labor_logs(project, sov_lines, start_date)
-        all_data["labor_logs"].extend(labor_logs)
-        
-        # Generate material deliveries
-        deliveries = generate_material_deliveries(project, sov_lines, start_date)
-        all_data["material_deliveries"].extend(deliveries)
-        
-        # Generate change orders
-        cos = generate_change_orders(project, contract_value, sov_lines, start_date)
-        all_data["change_orders"].extend(cos)
-        
-        # Generate RFIs
-        rfis = generate_rfis(project, start_date)
-        all_data["rfis"].extend(rfis)
-        
-        # Generate field notes
-        notes = generate_field_notes(project, start_date)
-        all_data["field_notes"].extend(notes)
-        
-        # Generate billing history
-        billing = generate_billing_history(project, sov_lines, contract_value, start_date)
-        all_data["billing_history"].extend(billing)
-        
-        # Generate bid estimate
-        bid = generate_bid_estimate(project, contract_value, sov_lines)
-        all_data["bid_estimates"].append(bid)
-    
-    # Save outputs
-    output_dir = "/home/claude/hvac_dataset"
-    
-    # Save as JSON
-    with open(f"{output_dir}/hvac_construction_dataset.json", "w") as f:
-        json.dump(all_data, f, indent=2)
-    
-    # Save individual CSVs for flat tables
-    for table_name in ["contracts", "sov", "labor_logs", "material_deliveries", "change_orders", "rfis", "field_notes"]:
-        data = all_data[table_name]
-        if data:
-            with open(f"{output_dir}/{table_name}.csv", "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
+        jobs.append((project, generate_sov(project, contract_value, table_rng(master_seed, project["id"], "sov")),
+                     datetime.strptime(contract["contract_date"], "%Y-%m-%d"),
+                     work_calendar(project["location"], options.calendar)))
+    rngs = [np.random.default_rng(derive_seed(master_seed, project["id"], "billing_history")) for project in projects]
+
+    stats = StageStats(options.trace_memory) if options.instrument else None
+    if stats is None:
+        per_project = generate_billing_history_batch(jobs, rngs)
+    else:
+        if options.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        with stats.timer("billing_history") as entry:
+            per_project = generate_billing_history_batch(jobs, rngs)
+        rows = sum(map(len, per_project))
+    for project_tables, records in zip(batched, per_project):
+        project_tables["billing_history"] = records
+        if stats is not None:
+            share = len(records) / rows if rows else 1 / len(projects)
+            project_tables[STATS_STREAM] = {"billing_history": {
+                "wall_s": entry["wall_s"] * share, "cpu_s": entry["cpu_s"] * share,
+                "rows": len(records), "peak_bytes": entry["peak_bytes"],
+            }}
+    return batched
+
+
+def iter_project_tables(project: Dict, master_seed: int = DEFAULT_SEED,
+                        options: Optional[GenerationOptions] = None,
+                        shard: int = 0, resume: Optional[Dict] = None,
+                        batched: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """Generate every table for a single project as a stream of (table, RecordBuffer).
+
+    Each table draws from its own stream seeded from (master_seed, project id,
+    table name), so a project's output does not depend on which other projects
+    were generated, in what order, or on which worker process. shard (the
+    project's position in the run) selects the project's ID range. Tables go
+    from the generators to the writers as RecordBuffers (see
+    DatasetWriter.write_table), never as lists of dicts.
+
+    With options.through only records dated on or before that day are
+    generated, and the stream ends with a (CHECKPOINT_STREAM, state) pair.
+    Passing that state back as resume continues the project: pay
+    applications pick up from the saved RNG state and progress, labor logs
+    and field notes redraw the block of working days they stopped in and
+    carry on, the scattered tables (deliveries, COs, RFIs) are regenerated,
+    only records after the previous cutoff are emitted, and contracts, SOV
+    and bid estimates are not repeated.
+
+    options.extra_tables adds the named table_specs.py tables (and the spec
+    tables they reference) after bid estimates; like the scattered tables
+    they are regenerated on resume and windowed by their date column.
+
+    batched holds this project's tables from generate_engine_batch, which
+    are emitted instead of running the vectorized engine for one project.
+
+    With options.instrument every generator is timed and the stream ends
+    with a (STATS_STREAM, stages) pair of StageStats figures.
+    """
+    options = options or GenerationOptions()
+    pid = project["id"]
+    since = resume["through"] if resume else None
+    through = options.through
+    through_day = date.fromisoformat(through).toordinal() if through else None
+    if through and (options.labor_engine != "python" or options.billing_engine != "python"):
+        raise ValueError("Generating through a date (append mode) needs the python labor and billing engines")
+    state = {"through": through}
+    batched = batched or {}
+    stats = StageStats(options.trace_memory) if options.instrument else None
+    if options.trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()  # worker processes trace from their first project on
+    if stats is not None and STATS_STREAM in batched:
+        stats.merge(batched[STATS_STREAM])
+
+    def call(table: str, fn: Callable, *args, **kwargs):
+        return fn(*args, **kwargs) if stats is None else stats.call(table, fn, *args, **kwargs)
+
+    def rng(table: str) -> random.Random:
+        return table_rng(master_seed, pid, table)
+
+    def ids(table: str) -> IdAllocator:
+        return IdAllocator(master_seed, table, shard)
+
+    def resumable(table: str) -> Tuple[random.Random, IdAllocator, Dict]:
+        """RNG, ID allocator and progress for a table generated in date order."""
+        saved = dict(resume[table]) if resume else {}
+        stream_rng = rng(table)
+        if "rng" in saved:
+            stream_rng.setstate(decode_rng_state(saved.pop("rng")))
+        return stream_rng, IdAllocator(master_seed, table, shard, start=saved.pop("ids", 0)), saved
+
+    def blocked(table: str) -> Tuple[IdAllocator, Dict]:
+        """ID allocator and progress for a table drawn in blocks of working days (see generate_labor_logs)."""
+        saved = resume[table] if resume else {}
+        if "rng" in saved:
+            raise ValueError(f"The checkpoint's {table} state predates block generation - regenerate the dataset")
+        return IdAllocator(master_seed, table, shard, start=saved.get("ids", 0)), {"block": saved.get("block", 0)}
+
+    def window(table: str, records: "RecordBuffer", date_key: str) -> Iterator[Tuple[str, "RecordBuffer"]]:
+        """The rows dated after the resumed cutoff and on or before through."""
+        if len(records) and (since is not None or through is not None):
+            records = records.take([row for row, day in enumerate(records.column(date_key))
+                                    if (since is None or day > since) and (through is None or day <= through)])
+        state.setdefault(table, {})["emitted"] = (resume[table]["emitted"] if resume else 0) + len(records)
+        yield table, records
+
+    contract = call("contracts", generate_contract_value, project, rng("contracts"))
+    contract_value = contract["original_contract_value"]
+    start_date = datetime.strptime(contract["contract_date"], "%Y-%m-%d")
+    calendar = work_calendar(project["location"], options.calendar)
+    sov_lines = call("sov", generate_sov, project, contract_value, rng("sov"))
+    if not resume:
+        yield "contracts", RecordBuffer([contract])
+        yield "sov", RecordBuffer(sov_lines)
+
+    if options.labor_engine == "numpy":
+        import numpy as np
+        from vectorized_engines import generate_labor_logs_numpy
+        yield "labor_logs", call(
+            "labor_logs", generate_labor_logs_numpy, project, sov_lines, start_date,
+            np.random.default_rng(derive_seed(master_seed, pid, "labor_logs")), ids("labor_logs"), calendar)
+    else:
+        labor_ids, labor_progress = blocked("labor_logs")
+        yield from window("labor_logs", call(
+            "labor_logs", generate_labor_logs, project, sov_lines, start_date, master_seed, labor_ids, calendar,
+            through_day, labor_progress), "date")
+        state["labor_logs"].update(labor_progress)
+
+    yield from window("material_deliveries", call(
+        "material_deliveries", generate_material_deliveries,
+        project, sov_lines, start_date, rng("material_deliveries"), ids("material_deliveries"), calendar), "date")
+    rfis = call("rfis", generate_rfis, project, start_date, rng("rfis"),
+                compact_text=options.compact_text, calendar=calendar)
+    yield from window("change_orders", call(
+        "change_orders", generate_change_orders, project, contract_value, sov_lines, start_date,
+        rng("change_orders"), compact_text=options.compact_text, calendar=calendar, rfis=rfis), "date_submitted")
+    yield from window("rfis", rfis, "date_submitted")
+    notes_ids, notes_progress = blocked("field_notes")
+    yield from window("field_notes", call(
+        "field_notes", generate_field_notes, project, start_date, master_seed, notes_ids, options.compact_text,
+        calendar, through_day, notes_progress), "date")
+    state["field_notes"].update(notes_progress)
+
+    if "billing_history" in batched:
+        yield "billing_history", RecordBuffer(batched["billing_history"])
+    elif options.billing_engine == "numpy":
+        import numpy as np
+        from vectorized_engines import generate_billing_history_numpy
+        yield "billing_history", call(
+            "billing_history", lambda *args: RecordBuffer(generate_billing_history_numpy(*args)), project, sov_lines,
+            start_date, np.random.default_rng(derive_seed(master_seed, pid, "billing_history")), calendar)
+    else:
+        billing_rng, _, billing_progress = resumable("billing_history")
+        yield "billing_history", call("billing_history", lambda: RecordBuffer(generate_billing_history(
+            project, sov_lines, contract_value, start_date, billing_rng, calendar, through_day, billing_progress)))
+        state["billing_history"] = dict(billing_progress, rng=encode_rng_state(billing_rng))
+
+    if not resume:
+        yield "bid_estimates", RecordBuffer([call("bid_estimates", generate_bid_estimate,
+                                                  project, contract_value, sov_lines, rng("bid_estimates"))])
+    if options.extra_tables:
+        parents = {"contracts": table_columns([contract]), "sov": table_columns(sov_lines)}
+        for spec in resolve_specs(options.extra_tables):
+            table = call(spec.name, spec_table, spec, SpecEnv(project, rng(spec.name), start_date, calendar, parents))
+            parents[spec.name] = {name: table.column(name) for name in table.names}
+            yield from window(spec.name, table, spec.date_column)
+    if through:
+        # Labor logs and pay applications are a project's latest records; once both
+        # are exhausted, later cutoffs add nothing for this project
+        labor_done = state["labor_logs"]["done"]
+        state["complete"] = labor_done and state["billing_history"].get("month", 0) > project["duration_months"]
+        yield CHECKPOINT_STREAM, state
+    if stats is not None:
+        yield STATS_STREAM, stats.stages
+
+
+def iter_table_records(tables: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Dict]]:
+    """Flatten a (table, RecordBuffer) stream to (table, record) pairs; pseudo-tables pass through."""
+    for table_name, table in tables:
+        if isinstance(table, RecordBuffer):
+            for record in table.records():
+                yield table_name, record
+        else:
+            yield table_name, table
+
+
+def buffer_tables(records: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Any]]:
+    """Group a (table, record) stream back into (table, RecordBuffer) runs; pseudo-tables pass through."""
+    buffer_name, buffer = None, None
+    for table_name, record in records:
+        if table_name in (CHECKPOINT_STREAM, STATS_STREAM):
+            if buffer is not None:
+                yield buffer_name, buffer
+                buffer_name, buffer = None, None
+            yield table_name, record
+            continue
+        if table_name != buffer_name:
+            if buffer is not None:
+                yield buffer_name, buffer
+            buffer_name, buffer = table_name, RecordBuffer()
+        buffer.append(record)
+    if buffer is not None:
+        yield buffer_name, buffer
+
+
+def iter_project_records(project: Dict, master_seed: int = DEFAULT_SEED,
+                         options: Optional[GenerationOptions] = None,
+                         shard: int = 0, resume: Optional[Dict] = None,
+                         batched: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict]]:
+    """iter_project_tables as a stream of (table, record), for consumers that work row by row."""
+    return iter_table_records(iter_project_tables(project, master_seed, options, shard, resume, batched))
+
+
+def spec_table(spec: TableSpec, env: SpecEnv) -> RecordBuffer:
+    """A project's rows of a spec table."""
+    return RecordBuffer.from_columns(generate_columns(spec, env))
+
+
+def generate_project(project: Dict, master_seed: int = DEFAULT_SEED,
+                     options: Optional[GenerationOptions] = None, shard: int = 0,
+                     resume: Optional[Dict] = None, batched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Generate every table for a single project, grouped by table name.
+
+    Tables are held as RecordBuffers; the CHECKPOINT_STREAM and STATS_STREAM
+    pseudo-tables stay lists.
+    """
+    data = {table_name: RecordBuffer() for table_name in TABLE_NAMES}
+    data.update({CHECKPOINT_STREAM: [], STATS_STREAM: []})
+    for table_name, table in iter_project_tables(project, master_seed, options, shard, resume, batched):
+        if table_name in (CHECKPOINT_STREAM, STATS_STREAM):
+            data[table_name].append(table)
+        elif len(data.get(table_name, ())):
+            data[table_name].extend(table.records())
+        else:
+            data[table_name] = table
+    return data
+
+
+def project_tables(data: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """generate_project's tables as the (table, RecordBuffer) stream iter_project_tables gives."""
+    for table_name, table in data.items():
+        if table_name not in (CHECKPOINT_STREAM, STATS_STREAM):
+            if len(table):
+                yield table_name, table
+        else:
+            for payload in table:
+                yield table_name, payload
+
+
+def generate_project_batch(batch: Sequence[Tuple[int, Dict]], master_seed: int = DEFAULT_SEED,
+                           options: Optional[GenerationOptions] = None,
+                           resumes: Optional[Sequence[Optional[Dict]]] = None) -> List[Dict[str, Any]]:
+    """generate_project for each (shard, project) of batch, with the vectorized engines run once for all."""
+    resumes = resumes or [None] * len(batch)
+    batched = generate_engine_batch([project for _, project in batch], master_seed, options)
+    return [generate_project(project, master_seed, options, shard, resume, tables)
+            for (shard, project), resume, tables in zip(batch, resumes, batched)]
+
+
+def _engine_batch_size(options: Optional[GenerationOptions]) -> int:
+    return ENGINE_BATCH_PROJECTS if options is not None and options.billing_engine == "numpy" else 1
+
+
+def iter_dataset_tables(projects: Iterable[Dict], master_seed: int = DEFAULT_SEED, workers: int = 1,
+                        options: Optional[GenerationOptions] = None, first_shard: int = 0,
+                        resume: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[Dict, Iterator[Tuple[str, Any]]]]:
+    """Yield (project, table stream) for each project, in input order.
+
+    Each table stream is iter_project_tables' (table, RecordBuffer) pairs.
+    With workers > 1 projects are generated on a process pool and their
+    buffers pickled back (see generate_project). With a vectorized engine
+    on, projects go through it ENGINE_BATCH_PROJECTS at a time (see
+    generate_engine_batch), and each pool task is one such batch. At most
+    2 * workers tasks are in flight at once, so memory stays bounded by a
+    handful of projects no matter how many are requested. Projects take ID
+    shards first_shard, first_shard + 1, ... in input order; runs split across
+    machines stay collision-free by giving each a distinct first_shard range.
+    resume maps project ids to checkpoint states (see iter_project_tables).
+    """
+    resume = resume or {}
+    shards = enumerate(projects, start=first_shard)
+    batch_size = _engine_batch_size(options)
+    batches = iter(lambda: list(islice(shards, batch_size)), [])
+    if workers <= 1:
+        for batch in batches:
+            batched = generate_engine_batch([project for _, project in batch], master_seed, options)
+            for (shard, project), tables in zip(batch, batched):
+                yield project, iter_project_tables(project, master_seed, options, shard,
+                                                   resume.get(project["id"]), tables)
+        return
+
+    def submit(batch):
+        return batch, executor.submit(generate_project_batch, batch, master_seed, options,
+                                      [resume.get(project["id"]) for _, project in batch])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(submit(batch) for batch in islice(batches, workers * 2))
+        while pending:
+            batch, future = pending.popleft()
+            batch_data = future.result()
+            pending.extend(submit(next_batch) for next_batch in islice(batches, 1))
+            for (_, project), project_data in zip(batch, batch_data):
+                yield project, project_tables(project_data)
+
+
+def iter_dataset(projects: Iterable[Dict], master_seed: int = DEFAULT_SEED, workers: int = 1,
+                 options: Optional[GenerationOptions] = None, first_shard: int = 0,
+                 resume: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[Dict, Iterator[Tuple[str, Dict]]]]:
+    """iter_dataset_tables with each project's tables flattened to (table, record) pairs."""
+    for project, tables in iter_dataset_tables(projects, master_seed, workers, options, first_shard, resume):
+        yield project, iter_table_records(tables)
+
+
+# =============================================================================
+# OUTPUT WRITERS
+# =============================================================================
+
+def flatten_billing_record(bill: Dict) -> Dict:
+    """Billing history row for CSV: nested line_items replaced by a count."""
+    bill_copy = {k: v for k, v in bill.items() if k != "line_items"}
+    bill_copy["line_item_count"] = len(bill.get("line_items", []))
+    return bill_copy
+
+
+def iter_billing_line_items(bill: Dict) -> Iterator[Dict]:
+    """Billing line item rows for CSV, keyed back to their pay application."""
+    for line in bill.get("line_items", []):
+        line_copy = line.copy()
+        line_copy["project_id"] = bill["project_id"]
+        line_copy["application_number"] = bill["application_number"]
+        yield line_copy
+
+
+# Rows per chunk of columns DatasetWriter.write_table hands to the sinks
+WRITE_CHUNK_ROWS = 4096
+
+
+class DatasetWriter:
+    """Fans generated records out to the configured output formats.
+
+    json   - single nested hvac_construction_dataset.json
+    csv    - one CSV per flat table plus flattened billing/line-item CSVs
+    ndjson - one newline-delimited JSON file per table (nested fields kept),
+             optionally compressed with gzip, bz2 or lzma
+    parquet/arrow/npz - one columnar file per table (see columnar_export.py)
+
+    With partition, the date-bearing tables (PARTITION_DATE_COLUMNS) of the
+    csv and ndjson formats are written as Hive-style project/month
+    partitions instead (see PartitionedTableSink), and MANIFEST_FILE lists
+    every partition file.
+
+    Records are written as they are produced, so peak memory does not grow
+    with the number of projects or months generated. With compact_text the
+    field note, RFI subject and CO description columns are written as
+    template codes; otherwise any coded records are rendered to text here.
+    With append, records are added to existing csv/ndjson files.
+
+    extra_tables names table_specs.py tables written alongside the built-in
+    ones, in every format; they are partitioned by their spec's date column.
+    """
+
+    def __init__(self, output_dir: str, formats: Iterable[str] = DEFAULT_FORMATS,
+                 compression: Optional[str] = None, compress_workers: Optional[int] = None,
+                 compact_text: bool = False, append: bool = False, partition: bool = False,
+                 extra_tables: Sequence[str] = ()):
+        formats = list(formats)
+        unknown = set(formats) - set(OUTPUT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output format(s): {sorted(unknown)}")
+        if append and set(formats) - set(APPENDABLE_FORMATS):
+            raise ValueError(f"Only {', '.join(APPENDABLE_FORMATS)} output can be appended to")
+        if compression and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.compact_text = compact_text
+        self.append = append
+        self.partition = partition
+        self.date_columns = dict(PARTITION_DATE_COLUMNS)
+        if extra_tables:
+            self.date_columns.update((table_name, TABLE_SPECS[table_name].date_column) for table_name in extra_tables)
+        extra_tables = list(extra_tables)
+        self.partitions = {table_name: [] for table_name in self.date_columns} if partition else {}
+        self.json_sink = None
+        self.csv_sinks = {}
+        self.ndjson_sinks = {}
+        self.columnar_sinks = {}
+        self._compress_executor = None
+
+        if "json" in formats:
+            self.json_sink = JsonDatasetSink(f"{output_dir}/hvac_construction_dataset.json",
+                                             TABLE_NAMES + extra_tables)
+        if partition and not append:
+            # Partitions of an earlier run would otherwise be mixed into this one
+            for table_name in self.date_columns:
+                shutil.rmtree(os.path.join(output_dir, table_name), ignore_errors=True)
+        if "csv" in formats:
+            self.csv_sinks = {
+                table_name: (PartitionedTableSink(output_dir, table_name, "csv", self.partitions[table_name],
+                                                  date_column=self.date_columns[table_name])
+                             if table_name in self.partitions else
+                             CsvTableSink(f"{output_dir}/{table_name}.csv", append))
+                for table_name in CSV_TABLES + ["billing_history", "billing_line_items"] + extra_tables
+            }
+        if "ndjson" in formats:
+            if compression:
+                self._compress_executor = ThreadPoolExecutor(max_workers=compress_workers or os.cpu_count())
+            self.ndjson_sinks = {
+                table_name: (PartitionedTableSink(output_dir, table_name, "ndjson", self.partitions[table_name],
+                                                  compression, self._compress_executor,
+                                                  self.date_columns[table_name])
+                             if table_name in self.partitions else
+                             NdjsonTableSink(f"{output_dir}/{table_name}.ndjson", compression, self._compress_executor,
+                                             append=append))
+                for table_name in TABLE_NAMES + extra_tables
+            }
+
+        columnar_formats = [fmt for fmt in formats if fmt in ("parquet", "arrow", "npz")]
+        if columnar_formats:
+            from columnar_export import ColumnarTableSink, resolve_columnar_format
+            # Without pyarrow, parquet and arrow become npz: one sink per resolved format
+            columnar_formats = list(dict.fromkeys(map(resolve_columnar_format, columnar_formats)))
+            self.columnar_sinks = {
+                table_name: [ColumnarTableSink(f"{output_dir}/{table_name}", table_schema(table_name, compact_text), fmt)
+                             for fmt in columnar_formats]
+                for table_name in COLUMNAR_TABLES + extra_tables
+            }
+
+        self.counts = {table_name: 0 for table_name in TABLE_NAMES + extra_tables}
+        self.total_contract_value = 0
+
+    def write(self, table_name: str, record: Dict):
+        self.counts[table_name] += 1
+        if not self.compact_text:
+            record = expand_text_codes(table_name, record)
+        if self.json_sink is not None:
+            self.json_sink.write(table_name, record)
+        if table_name in self.ndjson_sinks:
+            self.ndjson_sinks[table_name].write(record)
+
+        if table_name == "billing_history":
+            if self.csv_sinks or self.columnar_sinks:
+                # Billing history needs special handling (nested structure)
+                self._write_flat("billing_history", flatten_billing_record(record))
+                for line in iter_billing_line_items(record):
+                    self._write_flat("billing_line_items", line, record["period_end"])
+        else:
+            self._write_flat(table_name, record)
+
+        if table_name == "contracts":
+            self.total_contract_value += record["original_contract_value"]
+
+    def write_table(self, table_name: str, table: RecordBuffer):
+        """Write a whole table (one project's RecordBuffer) WRITE_CHUNK_ROWS rows at a time.
+
+        The csv, ndjson and columnar sinks are handed each chunk's columns (as
+        row tuples or whole lists), so no dict is built per row except for
+        the json and ndjson encoders and the nested billing line items.
+        """
+        if table.sparse:
+            for record in table.records():
+                self.write(table_name, record)
+            return
+        self.counts[table_name] += len(table)
+        names = list(table.names)
+        for start in range(0, len(table), WRITE_CHUNK_ROWS):
+            self._write_columns(table_name, names,
+                                [table.column(name, start, start + WRITE_CHUNK_ROWS) for name in names])
+
+    def _write_columns(self, table_name: str, names: List[str], columns: List[List]):
+        if not self.compact_text:
+            names, columns = expand_text_columns(table_name, names, columns)
+        if self.json_sink is not None:
+            for row in zip(*columns):
+                self.json_sink.write(table_name, dict(zip(names, row)))
+        if table_name in self.ndjson_sinks:
+            self.ndjson_sinks[table_name].write_rows(names, zip(*columns))
+
+        if table_name == "billing_history":
+            if self.csv_sinks or self.columnar_sinks:
+                # Same rows as flatten_billing_record and iter_billing_line_items
+                column = dict(zip(names, columns))
+                flat = [name for name in names if name != "line_items"]
+                self._write_flat_columns("billing_history", flat + ["line_item_count"],
+                                         [column[name] for name in flat] + [list(map(len, column["line_items"]))])
+                line_names, line_rows, line_days = None, [], []
+                for items, project_id, application, day in zip(column["line_items"], column["project_id"],
+                                                               column["application_number"], column["period_end"]):
+                    for line in items:
+                        line_names = line_names or list(line) + ["project_id", "application_number"]
+                        line_rows.append((*line.values(), project_id, application))
+                        line_days.append(day)
+                if line_rows:
+                    self._write_flat_columns("billing_line_items", line_names, list(map(list, zip(*line_rows))),
+                                             line_days)
+        else:
+            self._write_flat_columns(table_name, names, columns)
+
+        if table_name == "contracts":
+            self.total_contract_value += sum(columns[names.index("original_contract_value")])
+
+    def _write_flat_columns(self, table_name: str, names: List[str], columns: List[List],
+                            days: Optional[List[str]] = None):
+        """_write_flat for a chunk of columns."""
+        if table_name in self.csv_sinks:
+            if table_name in self.partitions:
+                self.csv_sinks[table_name].write_rows(names, zip(*columns), days)
+            else:
+                self.csv_sinks[table_name].write_columns(names, columns)
+        for sink in self.columnar_sinks.get(table_name, ()):
+            sink.write_columns(dict(zip(names, columns)))
+
+    def _write_flat(self, table_name: str, record: Dict, day: Optional[str] = None):
+        """Write a flat row; day dates rows without their own date column (billing line items)."""
+        if table_name in self.csv_sinks:
+            if table_name in self.partitions:
+                self.csv_sinks[table_name].write(record, day)
+            else:
+                self.csv_sinks[table_name].write(record)
+        for sink in self.columnar_sinks.get(table_name, ()):
+            sink.write(record)
+
+    def close(self):
+        for sink in self.csv_sinks.values():
+            sink.close()
+        for sink in self.ndjson_sinks.values():
+            sink.close()
+        for sinks in self.columnar_sinks.values():
+            for sink in sinks:
+                sink.close()
+        if self._compress_executor is not None:
+            self._compress_executor.shutdown()
+        if self.json_sink is not None:
+            self.json_sink.close()
+        if self.partition:
+            self._write_manifest()
+
+    def _write_manifest(self):
+        """Write MANIFEST_FILE, adding to the existing manifest when appending."""
+        path = os.path.join(self.output_dir, MANIFEST_FILE)
+        if self.append and os.path.exists(path):
+            manifest = load_manifest(self.output_dir)
+        else:
+            manifest = {"layout": "hive", "partition_keys": ["project_id", "month"], "tables": {}}
+        for table_name, entries in self.partitions.items():
+            if entries:
+                table = manifest["tables"].setdefault(
+                    table_name, {"date_column": self.date_columns[table_name], "partitions": []})
+                table["partitions"].extend(entries)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# =============================================================================
+# CHECKPOINTS
+# =============================================================================
+
+def load_checkpoint(output_dir: str) -> Dict:
+    """Read the checkpoint written by a previous run with --through."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {CHECKPOINT_FILE} in {output_dir} - run with --through first")
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(output_dir: str, checkpoint: Dict):
+    """Write the checkpoint atomically, so an interrupted run keeps the previous one."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def main(workers: int = 1, seed: int = DEFAULT_SEED, output_dir: str = DEFAULT_OUTPUT_DIR,
+         formats: Iterable[str] = DEFAULT_FORMATS, compression: Optional[str] = None,
+         compress_workers: Optional[int] = None, options: Optional[GenerationOptions] = None,
+         scale: float = 1.0, append: bool = False, progress_interval: float = 10.0, partition: bool = False,
+         as_of: Optional[str] = None):
+    """Generate complete dataset for all projects.
+
+    Each project's tables go from the generators to the output files as
+    RecordBuffers (see DatasetWriter.write_table). With
+    workers > 1 projects are generated on a process pool; results are still
+    written in project order and every project uses its own derived RNG
+    streams, so the output is identical for any worker count. scale sets the
+    number of projects (see project_specs).
+
+    With options.through the dataset stops at that day and a checkpoint is
+    saved next to it. append extends such a dataset to a later options.through,
+    reusing the checkpoint's seed, scale, options, formats and layout, and
+    only generating (and appending) the new records.
+
+    With partition, csv and ndjson tables that carry a date are written as
+    <table>/project_id=<id>/month=<YYYY-MM>/part-<n> files plus a manifest
+    of partitions, row counts and date ranges (see PartitionedTableSink).
+
+    With options.instrument every generator and writer call is timed (see
+    StageStats), progress with an ETA is printed to stderr every
+    progress_interval seconds, and a run report (settings, per-stage wall/CPU
+    time, rows, throughput, peak memory and bytes per output file) is written
+    to run_report.json next to the outputs.
+
+    With as_of the output is the snapshot of the dataset at the end of that
+    day (see snapshots.py): later records are left out and change orders,
+    RFIs and pay applications carry the status they had then.
+    """
+    started_at = datetime.now()
+    started, started_cpu = time.perf_counter(), time.process_time()
     
-    # Billing history needs special handling (nested structure)
-    billing_flat = []
-    for bill in all_data["billing_history"]:
-        bill_copy = {k: v for k, v in bill.items() if k != "line_items"}
-        bill_copy["line_item_count"] = len(bill.get("line_items", []))
-        billing_flat.append(bill_copy)
+    options = options or GenerationOptions()
+    formats = list(formats)
+    resume = None
+    if append:
+        checkpoint = load_checkpoint(output_dir)
+        if not options.through or options.through <= checkpoint["through"]:
+            raise ValueError(f"Append needs a --through date after {checkpoint['through']}")
+        seed, scale, compression = checkpoint["seed"], checkpoint["scale"], checkpoint["compression"]
+        partition = checkpoint.get("partition", False)
+        options = GenerationOptions(**dict(checkpoint["options"], through=options.through,
+                                           instrument=options.instrument, trace_memory=options.trace_memory))
+        formats = checkpoint["formats"]
+        resume = checkpoint["projects"]
+    if options.extra_tables:
+        options.extra_tables = tuple(spec.name for spec in resolve_specs(options.extra_tables))
+    if as_of:
+        if options.through or append:
+            raise ValueError("--as-of snapshots complete records; it cannot be combined with --through or --append")
+        from snapshots import snapshot_date_columns, snapshot_project
+        snapshot_columns = snapshot_date_columns(options.extra_tables)
+    checkpoint = {
+        "seed": seed, "scale": scale, "formats": formats, "compression": compression, "partition": partition,
+        "options": asdict(options), "through": options.through, "projects": {},
+    }
     
-    with open(f"{output_dir}/billing_history.csv", "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=billing_flat[0].keys())
-        writer.writeheader()
-        writer.writerows(billing_flat)
+    write_formats = formats
+    if append:
+        write_formats = [fmt for fmt in formats if fmt in APPENDABLE_FORMATS]
+        if write_formats != formats:
+            print(f"Cannot append to {', '.join(sorted(set(formats) - set(write_formats)))} output - skipping it")
+    elif os.path.exists(os.path.join(output_dir, CHECKPOINT_FILE)):
+        os.remove(os.path.join(output_dir, CHECKPOINT_FILE))
     
-    # Save billing line items separately
-    billing_lines = []
-    for bill in all_data["billing_history"]:
-        for line in bill.get("line_items", []):
-            line_copy = line.copy()
-            line_copy["project_id"] = bill["project_id"]
-            line_copy["application_number"] = bill["application_number"]
-            billing_lines.append(line_copy)
+    stats = progress = None
+    if options.instrument:
+        stats = StageStats(options.trace_memory)
+        progress = ProgressReporter(len(resume) if append else project_count(scale), progress_interval)
+        write_stages = {table_name: f"write:{table_name}" for table_name in TABLE_NAMES + list(options.extra_tables)}
+    started_tracing = options.trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
     
-    if billing_lines:
-        with open(f"{output_dir}/billing_line_items.csv", "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=billing_lines[0].keys())
-            writer.writeheader()
-            writer.writerows(billing_lines)
+    writer = DatasetWriter(output_dir, write_formats, compression, compress_workers, options.compact_text, append,
+                           partition, options.extra_tables)
+    projects_done = 0
+    try:
+        for project, tables in iter_dataset_tables(project_specs(scale, seed), seed, workers, options,
+                                                   resume=resume):
+            if as_of:
+                tables = buffer_tables(snapshot_project(iter_table_records(tables), as_of, snapshot_columns, seed))
+            for table_name, table in tables:
+                if table_name == CHECKPOINT_STREAM:
+                    checkpoint["projects"][project["id"]] = table
+                elif table_name == STATS_STREAM:
+                    stats.merge(table)
+                elif stats is None:
+                    writer.write_table(table_name, table)
+                else:
+                    with stats.timer(write_stages[table_name], rows=len(table)):
+                        writer.write_table(table_name, table)
+            print(f"{'Appended' if append else 'Generated'} data for: {project['name']}")
+            projects_done += 1
+            if progress is not None:
+                progress.update(projects_done, sum(writer.counts.values()))
+    finally:
+        if stats is None:
+            writer.close()
+        else:
+            with stats.timer("write:close"):
+                writer.close()
+    if options.through:
+        save_checkpoint(output_dir, checkpoint)
     
     # Print summary
     print("\n" + "="*60)
     print("DATASET GENERATION COMPLETE")
     print("="*60)
-    print(f"\nProjects generated: {len(PROJECTS)}")
-    print(f"Total contract value: ${sum(c['original_contract_value'] for c in all_data['contracts']):,.0f}")
+    print(f"\nProjects generated: {len(checkpoint['projects']) if append else writer.counts['contracts']}")
+    print(f"Total contract value: ${writer.total_contract_value:,.0f}")
+    if options.through:
+        print(f"Generated through: {options.through}")
+    if as_of:
+        print(f"Snapshot as of: {as_of}")
     print(f"\nRecord counts:")
-    for table_name, data in all_data.items():
-        if isinstance(data, list):
-            print(f"  {table_name}: {len(data):,} records")
+    for table_name, count in writer.counts.items():
+        print(f"  {table_name}: {count:,} records")
+    
+    if stats is not None:
+        progress.update(projects_done, sum(writer.counts.values()), force=True)
+        elapsed = time.perf_counter() - started
+        rows = sum(writer.counts.values())
+        stage_summary = stats.summary()
+        slowest = max(stage_summary, key=lambda stage: stage_summary[stage]["wall_s"], default=None)
+        write_run_report(output_dir, {
+            "started": started_at.isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "settings": {
+                "workers": workers, "seed": seed, "scale": scale, "formats": write_formats,
+                "compression": compression, "partition": partition, "append": append, "as_of": as_of,
+                "options": asdict(options),
+            },
+            "environment": {"python": sys.version.split()[0], "platform": sys.platform, "cpu_count": os.cpu_count()},
+            "projects": projects_done,
+            "rows": rows,
+            "wall_s": round(elapsed, 3),
+            "cpu_s_main": round(time.process_time() - started_cpu, 3),
+            "rows_per_s": round(rows / max(elapsed, 1e-9), 1),
+            "record_counts": writer.counts,
+            "stages": stage_summary,
+            "slowest_stage": slowest,
+            "peak_traced_mb": (round(max((e["peak_bytes"] for e in stats.stages.values()), default=0) / 2**20, 2)
+                               if options.trace_memory else None),
+            "max_rss_mb": max_rss_mb(),
+            "output_bytes": output_file_sizes(output_dir),
+        })
+        print(f"\nRun report: {os.path.join(output_dir, RUN_REPORT_FILE)} "
+              f"({elapsed:.1f}s, {rows / max(elapsed, 1e-9):,.0f} rows/s, slowest stage: {slowest})")
+    if started_tracing:
+        tracemalloc.stop()
     
     print(f"\nFiles saved to: {output_dir}/")
 
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the synthetic HVAC construction dataset.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (one project per task). Output is identical for any value.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="Master seed; per-project/per-table seeds are derived from it.")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help="Directory to write the output files to.")
+    parser.add_argument("--format", default=",".join(DEFAULT_FORMATS),
+                        help=f"Comma-separated output formats: {', '.join(OUTPUT_FORMATS)}.")
+    parser.add_argument("--partition", action="store_true",
+                        help=f"Write the dated {' and '.join(PARTITION_FORMATS)} tables as Hive-style "
+                             f"<table>/project_id=.../month=YYYY-MM/ partitions with a {MANIFEST_FILE}.")
+    parser.add_argument("--compression", choices=sorted(COMPRESSORS),
+                        help="Compress the NDJSON tables with this codec.")
+    parser.add_argument("--compress-workers", type=int, default=None,
+                        help="Threads used for compression (default: CPU count).")
+    parser.add_argument("--labor-engine", choices=["python", "numpy"], default="python",
+                        help="Labor log generator: pure Python, or the vectorized NumPy engine.")
+    parser.add_argument("--billing-engine", choices=["python", "numpy"], default="python",
+                        help="Billing history generator: pure Python, or the vectorized NumPy engine "
+                             "(same distributions, different draws: not the python engine's output).")
+    parser.add_argument("--compact-text", action="store_true",
+                        help="Store field notes, RFI subjects and CO descriptions as template codes "
+                             "(content_code, subject_code, description_code) instead of text.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Scale factor: generate round(scale * 5) projects (the 5 built-in projects, "
+                             "then synthesized ones). Every table grows proportionally.")
+    parser.add_argument("--through", metavar="YYYY-MM-DD",
+                        help="Only generate records dated up to this day and save a checkpoint for --append.")
+    parser.add_argument("--append", action="store_true",
+                        help="Extend the dataset in --output-dir from its checkpoint up to --through "
+                             "(settings come from the checkpoint; csv and ndjson output only).")
+    parser.add_argument("--calendar", choices=CALENDAR_MODES, default="weekdays",
+                        help="Working days: Monday-Friday, minus construction holidays, "
+                             "or also minus holidays local to each project's location.")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Time every generator and writer, print progress with an ETA and write "
+                             "run_report.json next to the outputs.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also record peak allocation per stage with tracemalloc (implies --instrument; slower).")
+    parser.add_argument("--progress-interval", type=float, default=10.0,
+                        help="Seconds between progress lines with --instrument.")
+    parser.add_argument("--extra-tables", default="",
+                        help="Comma-separated declarative tables from table_specs.py to generate as well "
+                             "(e.g. submittals,equipment_startup).")
+    parser.add_argument("--as-of", metavar="YYYY-MM-DD",
+                        help="Write the dataset as known at the end of this day (see snapshots.py).")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(workers=args.workers, seed=args.seed, output_dir=args.output_dir,
+         formats=args.format.split(","), compression=args.compression,
+         compress_workers=args.compress_workers, scale=args.scale, append=args.append,
+         progress_interval=args.progress_interval, partition=args.partition, as_of=args.as_of,
+         options=GenerationOptions(labor_engine=args.labor_engine, billing_engine=args.billing_engine,
+                                   compact_text=args.compact_text,
+                                   calendar=args.calendar, through=args.through,
+                                   instrument=args.instrument or args.trace_memory,
+                                   trace_memory=args.trace_memory,
+                                   extra_tables=tuple(filter(None, args.extra_tables.split(",")))))
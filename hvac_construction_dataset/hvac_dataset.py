@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Typed, lazily loaded access to a dataset written by generate_hvac_dataset.py.
+
+HVACDataset knows the schema of every table the generator writes
+(TABLE_SCHEMAS, plus table_specs.py tables) and parses a table the first
+time it is accessed, with proper types: dates as datetime64, low-cardinality
+columns as categoricals, booleans as bool, nullable integers as Int64 and
+list/JSON columns as Python objects.
+
+    from hvac_dataset import HVACDataset
+
+    ds = HVACDataset("./out")
+    ds.labor_logs                                   # pandas DataFrame
+    ds.columns("labor_logs", ["date", "hours_st"])  # NumPy arrays, no pandas needed
+
+Tables are read from the csv files if there are any, else the ndjson files
+(compressed or not), else hvac_construction_dataset.json; --partition
+layouts are read through their manifest. Billing line items come from the
+nested pay applications when there is no billing_line_items.csv.
+
+Parsed columns are cached under <dataset>/.hvac_cache as .npy files keyed by
+a SHA-256 of the source files (a file is only re-hashed when its size or
+mtime changes). Later opens memory-map the cache instead of parsing:
+numbers, dates and category codes are used in place, and strings are stored
+as UTF-8 data plus offsets, which become pyarrow-backed pandas strings
+without a copy when pyarrow is installed.
+"""
+
+import argparse
+import ast
+import csv
+import hashlib
+import json
+import os
+import shutil
+import time
+from operator import itemgetter, not_
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional dependency
+    pd = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+from columnar_export import Categorical
+from dataset_specs import TABLE_NAMES
+from generate_hvac_dataset import (
+    COLUMNAR_TABLES, DEFAULT_OUTPUT_DIR, flatten_billing_record, iter_billing_line_items, table_schema,
+)
+from table_sinks import MANIFEST_FILE, iter_ndjson, load_manifest, table_files
+
+CACHE_DIR_NAME = ".hvac_cache"
+HASHES_FILE = "hashes.json"
+JSON_DATASET_FILE = "hvac_construction_dataset.json"
+
+# Bumped whenever the cache layout changes, so old entries are not read
+CACHE_VERSION = 1
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def dataset_tables() -> List[str]:
+    """Every table the generator can write: the flat tables plus registered spec tables."""
+    from table_specs import TABLE_SPECS
+    return COLUMNAR_TABLES + [name for name in TABLE_SPECS if name not in COLUMNAR_TABLES]
+
+
+def full_schema(table_name: str) -> Dict[str, str]:
+    """Column types of a table, including its --compact-text code column."""
+    return {**table_schema(table_name), **table_schema(table_name, compact_text=True)}
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+def find_source(path: str, table_name: str, manifest: Optional[Dict] = None) -> Optional[Tuple[str, List[str]]]:
+    """(format, files) a table is read from, or None if the dataset does not have it.
+
+    Billing line items without a CSV of their own come from billing_history.
+    Spec tables are only read from csv or ndjson files.
+    """
+    for fmt in ("csv", "ndjson"):
+        files = table_files(path, table_name, fmt, manifest)
+        if files:
+            return fmt, files
+    if table_name == "billing_line_items":
+        files = table_files(path, "billing_history", "ndjson", manifest)
+        if files:
+            return "ndjson", files
+    json_path = os.path.join(path, JSON_DATASET_FILE)
+    if os.path.exists(json_path) and (table_name in TABLE_NAMES or table_name == "billing_line_items"):
+        return "json", [json_path]
+    return None
+
+
+def read_source_columns(table_name: str, fmt: str, files: List[str]) -> Dict[str, List[Any]]:
+    """A table's raw column values, in source order: CSV cells stay text, "" marks a null."""
+    if fmt == "csv":
+        columns = {}
+        for path in files:
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                rows = len(next(iter(columns.values()), ()))
+                records = list(reader)
+                for i, name in enumerate(header):
+                    columns.setdefault(name, [""] * rows).extend(map(itemgetter(i), records))
+                for values in columns.values():
+                    values.extend([""] * (rows + len(records) - len(values)))  # columns this file lacks
+        return columns
+
+    nested_billing = table_name in ("billing_history", "billing_line_items")
+    if fmt == "json":
+        with open(files[0]) as f:
+            records = json.load(f).get("billing_history" if nested_billing else table_name, [])
+    else:
+        records = (record for path in files for record in iter_ndjson(path))
+    if nested_billing and table_name == "billing_history":
+        records = (flatten_billing_record(record) for record in records)
+    elif nested_billing:
+        records = (line for record in records for line in iter_billing_line_items(record))
+    return _record_columns(records)
+
+
+def _record_columns(records: Iterable[Dict]) -> Dict[str, List[Any]]:
+    columns = {}
+    rows = 0
+    for record in records:
+        if len(record) != len(columns) or record.keys() != columns.keys():
+            for name in record:
+                if name not in columns:
+                    columns[name] = [None] * rows  # a column missing from earlier records
+        for name, values in columns.items():
+            values.append(record.get(name))
+        rows += 1
+    return columns
+
+
+class SourceHashes:
+    """SHA-256 of source files, remembered by (size, mtime) in the cache directory."""
+
+    def __init__(self, cache_dir: str):
+        self.path = os.path.join(cache_dir, HASHES_FILE)
+        self._hashes = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self._hashes = json.load(f)
+        self._dirty = False
+
+    def file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        known = self._hashes.get(key)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+                digest.update(block)
+        self._hashes[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        self._dirty = True
+        return digest.hexdigest()
+
+    def source_key(self, table_name: str, fmt: str, files: List[str]) -> str:
+        """Cache key of a table: its name, source format and the hashes of its files, in order."""
+        digest = hashlib.sha256(f"{CACHE_VERSION}/{table_name}/{fmt}".encode())
+        for path in files:
+            digest.update(self.file_hash(path).encode())
+        return digest.hexdigest()[:24]
+
+    def save(self):
+        if self._dirty:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self._hashes, f)
+            os.replace(self.path + ".tmp", self.path)
+            self._dirty = False
+
+
+# =============================================================================
+# COLUMN ENCODING
+# =============================================================================
+
+# A cached column is a dict of arrays:
+#   int/float/bool - values (+ mask where null; floats use NaN instead)
+#   date           - values as datetime64[D], NaT for null
+#   category       - codes (int32, -1 for null) + categories (str)
+#   string         - data (UTF-8 bytes) + offsets (int64, rows + 1) + mask
+#   list/json      - as string, holding JSON text
+
+def _parse_list(value: Any) -> Any:
+    """A list cell: Python repr in CSV, a list in NDJSON/JSON."""
+    return ast.literal_eval(value) if isinstance(value, str) else value
+
+
+def encode_column(kind: str, values: List[Any]) -> Dict[str, Any]:
+    """Arrays for one column (see above) from its raw values."""
+    if kind in ("category", "date", "string"):
+        nulls = list(map(not_, values))  # None or "" (these columns hold text)
+    else:
+        nulls = [value is None or value == "" for value in values]
+    mask = np.array(nulls, dtype=bool)
+    has_nulls = bool(mask.any())
+    arrays = {}
+
+    if kind == "int":
+        filled = [0 if null else value for value, null in zip(values, nulls)]
+        try:
+            arrays["values"] = np.array(filled, dtype=np.int64)
+        except ValueError:
+            arrays["values"] = np.array(filled, dtype=np.float64).astype(np.int64)  # e.g. "1200.0"
+    elif kind == "float":
+        arrays["values"] = np.array([np.nan if null else value for value, null in zip(values, nulls)],
+                                    dtype=np.float64)
+        has_nulls = False
+    elif kind == "bool":
+        arrays["values"] = np.array([value is True or value == "True" for value in values], dtype=bool)
+    elif kind == "date":
+        arrays["values"] = np.array(["NaT" if null else value for value, null in zip(values, nulls)],
+                                    dtype="datetime64[D]")
+        has_nulls = False
+    elif kind == "category":
+        categories = [value for value in dict.fromkeys(values) if value is not None and value != ""]
+        codes = dict(zip(categories, range(len(categories))), **{"": -1})
+        codes[None] = -1
+        arrays["codes"] = np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values))
+        arrays["categories"] = np.array(categories, dtype=str)
+        has_nulls = False
+    else:
+        if kind in ("list", "json"):
+            values = [None if null else json.dumps(_parse_list(value) if kind == "list" else
+                                                   json.loads(value) if isinstance(value, str) else value)
+                      for value, null in zip(values, nulls)]
+        encoded = [b"" if null else str(value).encode("utf-8") for value, null in zip(values, nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        arrays["data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        arrays["offsets"] = offsets
+    if has_nulls:
+        arrays["mask"] = mask
+    return arrays
+
+
+def decode_strings(arrays: Dict[str, Any]) -> Any:
+    """Object array of str (None for null) from a string column's data and offsets."""
+    data = arrays["data"].tobytes()
+    offsets = arrays["offsets"].tolist()
+    values = np.array([data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])], dtype=object)
+    if "mask" in arrays:
+        values[arrays["mask"]] = None
+    return values
+
+
+def column_array(kind: str, arrays: Dict[str, Any]) -> Any:
+    """A cached column as a NumPy value: arrays (masked where ints/bools are null),
+    Categorical(codes, categories) for categories, and object arrays for text."""
+    if kind == "category":
+        return Categorical(arrays["codes"], arrays["categories"])
+    if kind in ("string", "list", "json"):
+        values = decode_strings(arrays)
+        if kind != "string":
+            parsed = np.empty(len(values), dtype=object)  # filled one by one: np.array() would nest equal-length lists
+            for i, value in enumerate(values):
+                parsed[i] = None if value is None else json.loads(value)
+            values = parsed
+        return values
+    if "mask" in arrays:
+        return np.ma.MaskedArray(arrays["values"], arrays["mask"])
+    return arrays["values"]
+
+
+def column_series(kind: str, arrays: Dict[str, Any]) -> Any:
+    """A cached column as pandas data for a DataFrame, reusing the arrays where pandas allows."""
+    if kind == "category":
+        return pd.Categorical.from_codes(arrays["codes"], categories=pd.Index(arrays["categories"], dtype=object))
+    if kind == "string" and pa is not None:
+        valid = None
+        if "mask" in arrays:
+            valid = pa.py_buffer(np.packbits(~arrays["mask"], bitorder="little"))
+        strings = pa.LargeStringArray.from_buffers(len(arrays["offsets"]) - 1, pa.py_buffer(arrays["offsets"]),
+                                                   pa.py_buffer(arrays["data"]), valid)
+        return pd.arrays.ArrowStringArray(strings)
+    if kind in ("string", "list", "json"):
+        return column_array(kind, arrays)
+    if kind == "int" and "mask" in arrays:
+        return pd.arrays.IntegerArray(np.asarray(arrays["values"]), np.asarray(arrays["mask"]))
+    if kind == "bool" and "mask" in arrays:
+        return pd.arrays.BooleanArray(np.asarray(arrays["values"]), np.asarray(arrays["mask"]))
+    return arrays["values"]
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+def parse_table(table_name: str, columns: Dict[str, List[Any]]) -> Tuple[Dict, Dict[str, Dict[str, Any]]]:
+    """(meta, column arrays) of a table from its raw column values (consumed)."""
+    rows = len(next(iter(columns.values()), ()))
+    schema_types = full_schema(table_name)
+    schema = {name: schema_types.get(name, "string") for name in columns}
+    arrays = {name: encode_column(kind, columns.pop(name)) for name, kind in schema.items()}
+    meta = {"version": CACHE_VERSION, "table": table_name, "rows": rows, "schema": schema,
+            "arrays": {name: list(parts) for name, parts in arrays.items()}}
+    return meta, arrays
+
+
+def write_cache_entry(entry_dir: str, meta: Dict, arrays: Dict[str, Dict[str, Any]]):
+    """Save a parsed table as one .npy file per array plus meta.json, replacing entry_dir atomically."""
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, parts in arrays.items():
+        for part, array in parts.items():
+            np.save(os.path.join(tmp_dir, f"{name}.{part}.npy"), array, allow_pickle=False)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+
+def read_cache_entry(entry_dir: str, meta: Dict, names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Memory-map the arrays of the named columns of a cache entry."""
+    return {
+        name: {part: np.load(os.path.join(entry_dir, f"{name}.{part}.npy"), mmap_mode="r", allow_pickle=False)
+               for part in meta["arrays"][name]}
+        for name in names
+    }
+
+
+# =============================================================================
+# DATASET
+# =============================================================================
+
+class HVACDataset:
+    """A generated dataset directory whose tables load on first access.
+
+    ds.<table> or ds["<table>"] returns a typed pandas DataFrame (kept for
+    later accesses); ds.columns(table, names) returns NumPy arrays of just
+    the named columns straight from the cache. With cache=False tables are
+    parsed from their source and kept in memory, and nothing is written to
+    cache_dir.
+    """
+
+    def __init__(self, path: str = DEFAULT_OUTPUT_DIR, cache_dir: Optional[str] = None, cache: bool = True):
+        if np is None:
+            raise ImportError("HVACDataset needs numpy")
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No dataset directory {path}")
+        self.path = path
+        self.cache_dir = cache_dir or os.path.join(path, CACHE_DIR_NAME)
+        self.cache = cache
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        self.manifest = load_manifest(path) if os.path.exists(manifest_path) else None
+        self._sources = {}
+        for table_name in dataset_tables():
+            source = find_source(path, table_name, self.manifest)
+            if source is not None:
+                self._sources[table_name] = source
+        self._hashes = SourceHashes(self.cache_dir) if cache else None
+        self._entries = {}
+        self._frames = {}
+
+    @property
+    def tables(self) -> List[str]:
+        """Tables this dataset has."""
+        return list(self._sources)
+
+    def __contains__(self, table_name: str) -> bool:
+        return table_name in self._sources
+
+    def __getitem__(self, table_name: str):
+        return self.table(table_name)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in self.__dict__.get("_sources", {}):
+            raise AttributeError(name)
+        return self.table(name)
+
+    def __dir__(self):
+        return list(super().__dir__()) + self.tables
+
+    def __repr__(self) -> str:
+        return f"HVACDataset({self.path!r}, tables={self.tables})"
+
+    def _entry(self, table_name: str) -> Tuple[Optional[str], Dict, Optional[Dict]]:
+        """(cache entry directory, meta, in-memory arrays) of a table, parsing its source on a miss.
+
+        Cached tables have no in-memory arrays; uncached ones have no directory.
+        """
+        if table_name not in self._sources:
+            raise KeyError(f"{self.path} has no {table_name} table (has: {', '.join(self.tables)})")
+        entry = self._entries.get(table_name)
+        if entry is not None:
+            return entry
+        fmt, files = self._sources[table_name]
+        if not self.cache:
+            entry = None, *parse_table(table_name, read_source_columns(table_name, fmt, files))
+        else:
+            key = self._hashes.source_key(table_name, fmt, files)
+            self._hashes.save()
+            entry_dir = os.path.join(self.cache_dir, f"{table_name}-{key}")
+            meta_path = os.path.join(entry_dir, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            else:
+                meta, arrays = parse_table(table_name, read_source_columns(table_name, fmt, files))
+                write_cache_entry(entry_dir, meta, arrays)
+                del arrays  # read back memory-mapped, like any later open
+                self._prune(table_name, entry_dir)
+            entry = entry_dir, meta, None
+        self._entries[table_name] = entry
+        return entry
+
+    def _arrays(self, table_name: str, columns: Optional[Iterable[str]]) -> Tuple[Dict, Dict[str, Dict[str, Any]]]:
+        """(meta, arrays of the requested columns) of a table."""
+        entry_dir, meta, arrays = self._entry(table_name)
+        names = list(columns) if columns is not None else list(meta["schema"])
+        unknown = [name for name in names if name not in meta["schema"]]
+        if unknown:
+            raise KeyError(f"{table_name} has no column(s) {unknown}")
+        if arrays is not None:
+            return meta, {name: arrays[name] for name in names}
+        return meta, read_cache_entry(entry_dir, meta, names)
+
+    def _prune(self, table_name: str, keep: str):
+        """Remove a table's cache entries for earlier versions of its source."""
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(f"{table_name}-") and path != keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def schema(self, table_name: str) -> Dict[str, str]:
+        """Column -> TABLE_SCHEMAS type of a table as stored in this dataset."""
+        return dict(self._entry(table_name)[1]["schema"])
+
+    def rows(self, table_name: str) -> int:
+        return self._entry(table_name)[1]["rows"]
+
+    def columns(self, table_name: str, columns: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """NumPy columns of a table (see column_array); only the named columns are mapped."""
+        meta, arrays = self._arrays(table_name, columns)
+        return {name: column_array(meta["schema"][name], parts) for name, parts in arrays.items()}
+
+    def table(self, table_name: str, columns: Optional[Iterable[str]] = None):
+        """A table as a typed pandas DataFrame; the full table is kept for later calls."""
+        if pd is None:
+            raise ImportError("HVACDataset.table needs pandas; use columns() for NumPy arrays")
+        if columns is None and table_name in self._frames:
+            return self._frames[table_name]
+        meta, arrays = self._arrays(table_name, columns)
+        frame = pd.DataFrame({name: column_series(meta["schema"][name], parts) for name, parts in arrays.items()},
+                             copy=False)
+        if columns is None:
+            self._frames[table_name] = frame
+        return frame
+
+    def load_all(self) -> Dict[str, Any]:
+        """Every table, as DataFrames."""
+        return {table_name: self.table(table_name) for table_name in self.tables}
+
+    def clear_cache(self):
+        """Delete the parsed cache of this dataset."""
+        self._entries = {}
+        self._frames = {}
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if self.cache:
+            self._hashes = SourceHashes(self.cache_dir)
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build (or rebuild) the parsed cache of an HVAC dataset.")
+    parser.add_argument("--input-dir", default=DEFAULT_OUTPUT_DIR, help="Output directory of generate_hvac_dataset.py.")
+    parser.add_argument("--cache-dir", help=f"Cache directory (default: <input-dir>/{CACHE_DIR_NAME}).")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the cache first.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    dataset = HVACDataset(args.input_dir, args.cache_dir)
+    if args.rebuild:
+        dataset.clear_cache()
+    for table_name in dataset.tables:
+        started = time.perf_counter()
+        rows = dataset.rows(table_name)
+        print(f"  {table_name}: {rows:,} rows ({time.perf_counter() - started:.2f}s)")
+    print(f"Cache: {dataset.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
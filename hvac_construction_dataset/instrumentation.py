@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Run instrumentation for the HVAC dataset generator.
+
+StageStats accumulates wall time, CPU time, rows and peak traced memory per
+generator and writer stage; ProgressReporter prints progress with an ETA;
+write_run_report() saves the machine-readable run report of a --instrument
+run.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Any, Callable, Optional
+
+RUN_REPORT_FILE = "run_report.json"
+
+
+class StageStats:
+    """Wall time, CPU time, rows and peak traced memory accumulated per stage.
+
+    Stages are the generate_* functions (keyed by table) and the writer
+    ("write:<table>"). With trace_memory, tracemalloc's peak is reset when a
+    stage step starts and the highest peak seen during any step is kept;
+    tracemalloc must already be running.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, stage: str) -> Dict[str, float]:
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {"wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "peak_bytes": 0}
+        return entry
+
+    @contextmanager
+    def timer(self, stage: str, rows: int = 0):
+        """Charge the with-block (and rows) to stage; yields the stage's entry."""
+        entry = self._entry(stage)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+            entry["rows"] += rows
+            if self.trace_memory:
+                entry["peak_bytes"] = max(entry["peak_bytes"], tracemalloc.get_traced_memory()[1])
+
+    def call(self, stage: str, fn: Callable, *args, **kwargs):
+        """Return fn(*args, **kwargs) timed as stage; a list or RecordBuffer result counts as its rows, a dict as one."""
+        with self.timer(stage) as entry:
+            result = fn(*args, **kwargs)
+        entry["rows"] += 1 if isinstance(result, dict) else len(result) if hasattr(result, "__len__") else 0
+        return result
+
+    def merge(self, stages: Dict[str, Dict[str, float]]):
+        """Add another StageStats' stages (e.g. a worker's, from STATS_STREAM)."""
+        for stage, other in stages.items():
+            entry = self._entry(stage)
+            for key in ("wall_s", "cpu_s", "rows"):
+                entry[key] += other[key]
+            entry["peak_bytes"] = max(entry["peak_bytes"], other["peak_bytes"])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage figures for the run report, with throughput and peaks in MB."""
+        summary = {}
+        for stage, entry in self.stages.items():
+            summary[stage] = {
+                "wall_s": round(entry["wall_s"], 3),
+                "cpu_s": round(entry["cpu_s"], 3),
+                "rows": entry["rows"],
+                "rows_per_s": round(entry["rows"] / entry["wall_s"], 1) if entry["wall_s"] else None,
+            }
+            if self.trace_memory:
+                summary[stage]["peak_traced_mb"] = round(entry["peak_bytes"] / 2**20, 2)
+        return summary
+
+
+def _format_seconds(seconds: float) -> str:
+    return str(timedelta(seconds=int(seconds)))
+
+
+class ProgressReporter:
+    """Prints projects done, rows, throughput and ETA to stderr every interval seconds."""
+
+    def __init__(self, total_projects: int, interval: float = 10.0):
+        self.total_projects = total_projects
+        self.interval = interval
+        self.started = self._last = time.perf_counter()
+
+    def update(self, projects_done: int, rows: int, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.started
+        eta = elapsed / projects_done * (self.total_projects - projects_done) if projects_done else 0
+        print(f"[{projects_done:,}/{self.total_projects:,} projects, {projects_done / self.total_projects:.1%}] "
+              f"{rows:,} rows, {rows / max(elapsed, 1e-9):,.0f} rows/s, "
+              f"elapsed {_format_seconds(elapsed)}, ETA {_format_seconds(eta)}", file=sys.stderr, flush=True)
+
+
+def output_file_sizes(output_dir: str) -> Dict[str, int]:
+    """Bytes per entry of output_dir, partitioned table directories summed (the run report excluded)."""
+    sizes = {}
+    for name in sorted(os.listdir(output_dir)):
+        path = os.path.join(output_dir, name)
+        if os.path.isdir(path):
+            sizes[name] = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+        elif name != RUN_REPORT_FILE:
+            sizes[name] = os.path.getsize(path)
+    return sizes
+
+
+def max_rss_mb() -> Optional[Dict[str, float]]:
+    """Peak resident set size of this process and of its (finished) workers, where supported."""
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return {
+        "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "workers": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def write_run_report(output_dir: str, report: Dict):
+    with open(os.path.join(output_dir, RUN_REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
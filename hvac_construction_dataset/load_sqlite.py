@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Bulk SQLite loader for the HVAC construction dataset.
+
+Builds a typed SQLite database from the CSV tables written by
+generate_hvac_dataset.py or straight from the generators. Column types come
+from TABLE_SCHEMAS: numbers are stored as INTEGER/REAL, booleans as 0/1,
+dates as ISO-8601 text in DATE columns (so SQLite's date functions and
+range comparisons work), and JSON/list columns as JSON text. Change order
+affected_sov_lines is normalized into the change_order_sov_lines child table.
+
+Rows are inserted with batched executemany inside a single transaction with
+journaling and syncing off; indexes are created after the load.
+
+    python load_sqlite.py --input-dir ./out --db hvac.db
+    python load_sqlite.py --generate --scale 200 --workers 8 --db hvac.db
+"""
+
+import argparse
+import ast
+import csv
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+from typing import List, Dict, Callable, Iterable, Iterator, Optional, Tuple
+
+from dataset_specs import CALENDAR_MODES
+from generate_hvac_dataset import (
+    COLUMNAR_TABLES, DEFAULT_SEED, GenerationOptions, TABLE_SCHEMAS,
+    expand_text_codes, flatten_billing_record, iter_billing_line_items, iter_dataset, project_specs,
+)
+
+SQL_TYPES = {
+    "string": "TEXT", "category": "TEXT", "date": "DATE", "int": "INTEGER",
+    "float": "REAL", "bool": "INTEGER", "list": "TEXT", "json": "TEXT",
+}
+
+# Tables loaded, in load order (billing in its flat form, as in the CSVs)
+SQLITE_TABLES = COLUMNAR_TABLES
+
+# change_orders.affected_sov_lines is loaded into this child table instead of a column
+CO_SOV_TABLE = "change_order_sov_lines"
+CO_SOV_COLUMNS = {"project_id": "TEXT", "co_number": "TEXT", "sov_line_id": "TEXT", "position": "INTEGER"}
+
+# Columns indexed (after the load) wherever a table has them
+INDEX_COLUMNS = ["project_id", "sov_line_id", "status", "date", "date_submitted", "period_end"]
+
+BULK_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA threads = 4",  # helper threads for the index-build sorter
+]
+
+DEFAULT_BATCH_ROWS = 50_000
+
+# The only columns whose CSV cells can be empty (None in the generators and
+# in as-of snapshots); just these go through NULLIF when loading CSV text
+NULLABLE_COLUMNS = {
+    "rfis": {"date_responded", "response_summary"},
+    "change_orders": {"approved_by", "related_rfi"},
+    "billing_history": {"payment_date"},
+}
+
+
+def table_columns(table_name: str) -> Dict[str, str]:
+    """Column -> schema type for a loaded table (affected_sov_lines moves to CO_SOV_TABLE)."""
+    schema = dict(TABLE_SCHEMAS[table_name])
+    if table_name == "change_orders":
+        del schema["affected_sov_lines"]
+    return schema
+
+
+def create_tables(conn: sqlite3.Connection):
+    for table_name in SQLITE_TABLES:
+        columns = ", ".join(f'"{name}" {SQL_TYPES[kind]}' for name, kind in table_columns(table_name).items())
+        conn.execute(f'CREATE TABLE "{table_name}" ({columns})')
+    columns = ", ".join(f'"{name}" {kind}' for name, kind in CO_SOV_COLUMNS.items())
+    conn.execute(f'CREATE TABLE "{CO_SOV_TABLE}" ({columns})')
+
+
+def create_indexes(conn: sqlite3.Connection):
+    for table_name in SQLITE_TABLES + [CO_SOV_TABLE]:
+        columns = CO_SOV_COLUMNS if table_name == CO_SOV_TABLE else table_columns(table_name)
+        for column in INDEX_COLUMNS:
+            if column in columns:
+                conn.execute(f'CREATE INDEX "ix_{table_name}_{column}" ON "{table_name}" ("{column}")')
+    conn.execute(f'CREATE INDEX "ix_{CO_SOV_TABLE}_co" ON "{CO_SOV_TABLE}" (project_id, co_number)')
+
+
+# =============================================================================
+# ROW SOURCES
+# =============================================================================
+
+# Each source yields (table, rows) where rows is an iterable of row sequences
+# in table_columns() order. Change order SOV links are yielded as CO_SOV_TABLE.
+
+def _csv_row_converter(header: List[str], columns: Dict[str, str]) -> Optional[Callable[[List[str]], List]]:
+    """Map a CSV row to table_columns() order.
+
+    Cells stay text here: the INSERT turns "" into NULL and INTEGER/REAL
+    column affinity converts numbers inside SQLite, which is much cheaper than
+    converting each cell in Python. Rows already in column order pass through
+    untouched; only booleans and lists (written as Python reprs) are parsed.
+    """
+    positions = [header.index(name) if name in header else None for name in columns]
+    special = [(i, kind) for i, kind in enumerate(columns.values()) if kind in ("bool", "list")]
+    if positions == list(range(len(header))) and not special:
+        return None
+
+    def convert(row: List[str]) -> List:
+        values = [None if pos is None else row[pos] or None for pos in positions]
+        for i, kind in special:
+            if values[i] is not None:
+                values[i] = values[i] == "True" if kind == "bool" else json.dumps(ast.literal_eval(values[i]))
+        return values
+
+    return convert
+
+
+def iter_csv_rows(input_dir: str) -> Iterator[Tuple[str, Iterable[Tuple]]]:
+    """Typed rows from the CSV tables in input_dir (missing tables are skipped)."""
+    for table_name in SQLITE_TABLES:
+        path = os.path.join(input_dir, f"{table_name}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            convert = _csv_row_converter(header, table_columns(table_name))
+            if table_name == "change_orders":
+                sov_lines_pos = header.index("affected_sov_lines")
+                yield from _split_change_orders((convert(row), ast.literal_eval(row[sov_lines_pos])) for row in reader)
+            else:
+                yield table_name, reader if convert is None else map(convert, reader)
+
+
+def _split_change_orders(rows: Iterable[Tuple[Tuple, List[str]]]) -> Iterator[Tuple[str, Iterable[Tuple]]]:
+    """Yield change order rows, collecting their SOV links for CO_SOV_TABLE."""
+    links = []
+    project_pos = list(table_columns("change_orders")).index("project_id")
+    co_pos = list(table_columns("change_orders")).index("co_number")
+
+    def change_orders():
+        for row, sov_lines in rows:
+            links.extend((row[project_pos], row[co_pos], sov_line_id, i) for i, sov_line_id in enumerate(sov_lines))
+            yield row
+
+    yield "change_orders", change_orders()
+    yield CO_SOV_TABLE, links
+
+
+def _record_row(record: Dict, columns: Dict[str, str]) -> Tuple:
+    return tuple(
+        json.dumps(record.get(name)) if kind in ("list", "json") and record.get(name) is not None
+        else record.get(name)
+        for name, kind in columns.items()
+    )
+
+
+def iter_generated_rows(seed: int = DEFAULT_SEED, scale: float = 1.0, workers: int = 1,
+                        options: Optional[GenerationOptions] = None) -> Iterator[Tuple[str, Iterable[Tuple]]]:
+    """Typed rows straight from the generators, a record (plus its child rows) at a time."""
+    options = options or GenerationOptions()
+    columns = {table_name: table_columns(table_name) for table_name in SQLITE_TABLES}
+    for project, records in iter_dataset(project_specs(scale, seed), seed, workers, options):
+        for table_name, record in records:
+            record = expand_text_codes(table_name, record)
+            if table_name == "billing_history":
+                yield "billing_history", [_record_row(flatten_billing_record(record), columns["billing_history"])]
+                yield "billing_line_items", [_record_row(line, columns["billing_line_items"])
+                                             for line in iter_billing_line_items(record)]
+            elif table_name == "change_orders":
+                yield "change_orders", [_record_row(record, columns["change_orders"])]
+                yield CO_SOV_TABLE, [(record["project_id"], record["co_number"], sov_line_id, i)
+                                     for i, sov_line_id in enumerate(record["affected_sov_lines"])]
+            elif table_name in columns:
+                yield table_name, [_record_row(record, columns[table_name])]
+
+
+# =============================================================================
+# LOADER
+# =============================================================================
+
+def load_database(db_path: str, sources: Iterable[Tuple[str, Iterable[Tuple]]],
+                  batch_rows: int = DEFAULT_BATCH_ROWS, csv_text: bool = True) -> Dict[str, int]:
+    """Create db_path (replacing it) and bulk-load the rows from sources.
+
+    Rows are buffered per table and inserted batch_rows at a time, all in one
+    transaction; indexes are built once the data is in. With csv_text the
+    rows are CSV cells, and empty cells in NULLABLE_COLUMNS are stored as
+    NULL; typed rows (iter_generated_rows) already hold None. Returns row
+    counts.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in BULK_PRAGMAS:
+        conn.execute(pragma)
+    create_tables(conn)
+
+    inserts = {}
+    for table_name in SQLITE_TABLES + [CO_SOV_TABLE]:
+        columns = CO_SOV_COLUMNS if table_name == CO_SOV_TABLE else table_columns(table_name)
+        nullable = NULLABLE_COLUMNS.get(table_name, ()) if csv_text else ()
+        placeholders = ", ".join("NULLIF(?, '')" if name in nullable else "?" for name in columns)
+        inserts[table_name] = f'INSERT INTO "{table_name}" VALUES ({placeholders})'
+    counts = {table_name: 0 for table_name in inserts}
+    pending = {table_name: [] for table_name in inserts}
+
+    def flush(table_name: str):
+        conn.executemany(inserts[table_name], pending[table_name])
+        counts[table_name] += len(pending[table_name])
+        pending[table_name] = []
+
+    conn.execute("BEGIN")
+    try:
+        for table_name, rows in sources:
+            rows = iter(rows)
+            while True:
+                buffer = pending[table_name]
+                buffer.extend(islice(rows, batch_rows - len(buffer)))
+                if len(buffer) < batch_rows:
+                    break
+                flush(table_name)
+        for table_name in pending:
+            flush(table_name)
+        create_indexes(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.close()
+        os.remove(db_path)
+        raise
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-load the HVAC dataset into a typed SQLite database.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Load the CSV tables in this directory.")
+    source.add_argument("--generate", action="store_true",
+                        help="Load straight from the generators (see --seed, --scale, --workers).")
+    parser.add_argument("--db", default="hvac_dataset.db", help="SQLite database to create (replaced if present).")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS,
+                        help="Rows per executemany batch.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--calendar", choices=CALENDAR_MODES, default="weekdays")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.generate:
+        sources = iter_generated_rows(args.seed, args.scale, args.workers, GenerationOptions(calendar=args.calendar))
+    else:
+        sources = iter_csv_rows(args.input_dir)
+
+    started = time.perf_counter()
+    counts = load_database(args.db, sources, args.batch_rows, csv_text=not args.generate)
+    elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    print(f"Loaded {total:,} rows into {args.db} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    for table_name, count in counts.items():
+        print(f"  {table_name}: {count:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted prompt context for the HVAC construction dataset.
+
+ContextPacker turns one project's tables into the data block of an LLM
+prompt. For a Scope - a date range, SOV lines and tables - it packs
+precomputed rollups (per-SOV labor, material, change order and billing
+totals) and then the most relevant records into a fixed token budget, in a
+compact pipe-separated text layout:
+
+    packer = ContextPacker.from_dataset("./out")     # or ContextPacker.from_generated(scale=1)
+    scope = Scope("2024-04-01", "2024-06-30", sov_lines=("03", "04"))
+    context = packer.pack("PRJ-2024-001", scope, budget=1500)
+    prompt = f"{context.text}\\n\\nQuestion: ..."
+
+The context is what the project team knew at the end of the scope: records
+dated later are left out and open change orders, RFIs and pay applications
+carry their status as of that day (see snapshots.py). Labor logs are packed
+as weekly crew totals per SOV line rather than worker-days.
+
+Each project is indexed once, on first use: records are rendered to lines
+and token-counted up front, and labor, material and billing figures are
+kept as per-SOV running totals, so a rollup over any date range is a pair
+of bisects. Packing a prompt then scores the in-scope candidates and fills
+the budget greedily, which takes about a millisecond; packed contexts are
+cached by (project, scope, budget).
+
+    python prompt_context.py --input-dir ./out --project PRJ-2024-001 \\
+        --start 2024-04-01 --end 2024-06-30 --sov 03,04 --budget 1500
+"""
+
+import argparse
+import random
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+from generate_hvac_dataset import (
+    DEFAULT_OUTPUT_DIR, DEFAULT_SEED, GenerationOptions, expand_text_codes, generate_project, project_specs,
+)
+from snapshots import STATUS_RESOLVERS
+
+# Tables a Scope covers by default, in the order their sections are written
+CONTEXT_TABLES = ["billing_history", "change_orders", "rfis", "material_deliveries", "labor_logs", "field_notes"]
+
+DEFAULT_BUDGET = 2000
+CACHE_SIZE = 4096     # packed contexts kept (LRU)
+MAX_PROJECTS = 64     # project indexes kept (LRU)
+
+# Record relevance: a per-table weight, raised for notable records (large
+# COs, urgent RFIs, damaged deliveries, issue/safety notes, overtime), halved
+# for every RECENCY_HALF_LIFE days before the scope end
+TABLE_WEIGHTS = {
+    "billing_history": 3.0,
+    "change_orders": 3.0,
+    "rfis": 2.0,
+    "material_deliveries": 1.0,
+    "labor_logs": 1.2,
+    "field_notes": 1.5,
+}
+RECENCY_HALF_LIFE = 30
+RECENCY_FLOOR = 0.3   # share of the weight an item keeps however old it is
+
+# Section columns of the text layout (labor_logs is packed weekly per SOV line)
+SECTION_COLUMNS = {
+    "billing_history": "app|period_end|this_period|cumulative|status|paid",
+    "change_orders": "co|date|reason|amount|status|rfi|sov|description",
+    "rfis": "rfi|date|priority|assigned|status|responded|subject",
+    "material_deliveries": "date|sov|item|qty|total|vendor|condition",
+    "labor_logs": "week|sov|worker_days|st_h|ot_h|cost",
+    "field_notes": "date|type|author|note",
+}
+
+
+# =============================================================================
+# TOKEN ESTIMATION
+# =============================================================================
+
+# Words, up to 3 digits (BPE vocabularies split numbers into 1-3 digit
+# pieces) or a single other character
+_TOKEN_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """Offline token count for BPE tokenizers such as cl100k, erring high.
+
+    A word counts as one token per 6 letters (common words are single
+    tokens, long or rare ones split), every 1-3 digits and every other
+    non-space character count as one; whitespace is free.
+    """
+    return sum((len(piece) + 5) // 6 if piece[0].isalpha() else 1 for piece in _TOKEN_PIECES.findall(text))
+
+
+# =============================================================================
+# SCOPES & PACKED CONTEXTS
+# =============================================================================
+
+@dataclass(frozen=True)
+class Scope:
+    """What a question is about: a date range, SOV lines and tables.
+
+    start/end are YYYY-MM-DD (None: the project's first/last record);
+    sov_lines are sov_line_ids or line numbers ("03", 3), empty for all;
+    tables is a subset of CONTEXT_TABLES.
+    """
+    start: Optional[str] = None
+    end: Optional[str] = None
+    sov_lines: Tuple[Any, ...] = ()
+    tables: Tuple[str, ...] = tuple(CONTEXT_TABLES)
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    text: str
+    tokens: int                       # estimated (see estimate_tokens)
+    records: Dict[str, Tuple[int, int]]  # table -> (records packed, records in scope)
+
+
+def _cell(value: Any) -> str:
+    """A value in the text layout: no separators or newlines, floats rounded."""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        if value.is_integer() or abs(value) >= 100:
+            return f"{value:.0f}"
+        return f"{value:.1f}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _line(*values: Any) -> str:
+    return "|".join(map(_cell, values))
+
+
+def _monday(day: str) -> str:
+    parsed = date.fromisoformat(day)
+    return (parsed - timedelta(days=parsed.weekday())).isoformat()
+
+
+# =============================================================================
+# PROJECT INDEX
+# =============================================================================
+
+class _Section:
+    """A table's candidate items in day order, rendered and token-counted."""
+    __slots__ = ("days", "ordinals", "sov", "weights", "lines", "tokens", "records")
+
+    def __init__(self):
+        self.days: List[str] = []
+        self.ordinals: List[int] = []
+        self.sov: List[Optional[Tuple[str, ...]]] = []  # SOV lines an item belongs to (None: any)
+        self.weights: List[float] = []
+        self.lines: List[str] = []
+        self.tokens: List[int] = []
+        self.records: List[Optional[Dict]] = []         # kept where the status depends on the day
+
+    def add(self, day: str, sov: Optional[Tuple[str, ...]], weight: float, line: str,
+            estimator: Callable[[str], int], record: Optional[Dict] = None):
+        self.days.append(day)
+        self.ordinals.append(date.fromisoformat(day).toordinal())
+        self.sov.append(sov)
+        self.weights.append(weight)
+        self.lines.append(line)
+        self.tokens.append(estimator(line))
+        self.records.append(record)
+
+
+class _Timeline:
+    """Per-key values over days, read back as of a day."""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = list(fields)
+        self.days: Dict[str, List[str]] = defaultdict(list)
+        self.values: Dict[str, List[List[float]]] = defaultdict(list)
+
+    def add(self, key: str, day: str, *values: float):
+        self.days[key].append(day)
+        self.values[key].append(list(values))
+
+    def last(self, key: str, end: str) -> Optional[List[float]]:
+        """Values of key's latest entry dated on or before end."""
+        i = bisect_right(self.days.get(key, ()), end)
+        return self.values[key][i - 1] if i else None
+
+
+class _RunningTotals(_Timeline):
+    """Per-key running totals over days (entries added in day order), summed over a range by bisection."""
+
+    def add(self, key: str, day: str, *values: float):
+        totals = self.values[key]
+        last = totals[-1] if totals else [0.0] * len(self.fields)
+        super().add(key, day, *(total + value for total, value in zip(last, values)))
+
+    def range(self, key: str, start: str, end: str) -> List[float]:
+        """Totals of key's entries dated start..end."""
+        days = self.days.get(key, ())
+        lo, hi = bisect_left(days, start), bisect_right(days, end)
+        if hi <= lo:
+            return [0.0] * len(self.fields)
+        before = self.values[key][lo - 1] if lo else [0.0] * len(self.fields)
+        return [total - prior for total, prior in zip(self.values[key][hi - 1], before)]
+
+
+class ProjectIndex:
+    """One project's tables prepared for packing (see ContextPacker).
+
+    tables maps table names to records as the generator yields them (pay
+    applications with their line_items, or a separate billing_line_items
+    table); compact-text codes are expanded.
+    """
+
+    def __init__(self, tables: Dict[str, Iterable[Dict]], estimator: Callable[[str], int] = estimate_tokens):
+        self.estimator = estimator
+        contract = next(iter(tables["contracts"]))
+        self.project_id = contract["project_id"]
+        self.contract_value = contract["original_contract_value"]
+        self.sov_lines = sorted(tables["sov"], key=lambda line: line["line_number"])
+        self.sov_codes = {line["sov_line_id"]: f"{line['line_number']:02d}" for line in self.sov_lines}
+        self._sov_lookup = dict(
+            [(line["sov_line_id"], line["sov_line_id"]) for line in self.sov_lines] +
+            [(code, sov_id) for sov_id, code in self.sov_codes.items()] +
+            [(line["line_number"], line["sov_line_id"]) for line in self.sov_lines])
+        self.header = (f"# {self.project_id} {contract['project_name']}\n"
+                       + _line("contract", contract["original_contract_value"], contract["contract_date"],
+                               contract["substantial_completion_date"], contract["gc_name"],
+                               f"retention {contract['retention_pct']:.0%}", contract["payment_terms"]))
+        self.first_day = contract["contract_date"]
+
+        self.sections = {table: _Section() for table in CONTEXT_TABLES}
+        self.labor = _RunningTotals(["hours", "ot_hours", "cost"])
+        self.materials = _RunningTotals(["cost"])
+        self.billed = _Timeline(["total_billed"])
+        self.billing = _Timeline(["cumulative", "retention"])
+        self.change_orders: List[Dict] = []
+        self.rfis: List[Dict] = []
+
+        line_items = defaultdict(list)
+        for item in tables.get("billing_line_items", ()):
+            line_items[item["application_number"]].append(item)
+        for table in CONTEXT_TABLES:
+            records = (expand_text_codes(table, record) for record in tables.get(table, ()))
+            getattr(self, f"_index_{table}")(records, line_items)
+        self.last_day = max([self.first_day] + [days[-1] for days in self.labor.days.values()] +
+                            [section.days[-1] for section in self.sections.values() if section.days])
+
+    def _index_billing_history(self, records: Iterable[Dict], line_items: Dict[int, List[Dict]]):
+        section = self.sections["billing_history"]
+        for bill in sorted(records, key=lambda bill: bill["period_end"]):
+            day = bill["period_end"]
+            self.billing.add("project", day, bill["cumulative_billed"], bill["retention_held"])
+            for item in bill.get("line_items") or line_items.get(bill["application_number"], ()):
+                self.billed.add(item["sov_line_id"], day, item["total_billed"])
+            section.add(day, None, TABLE_WEIGHTS["billing_history"], self._billing_line(bill), self.estimator, bill)
+
+    def _billing_line(self, bill: Dict) -> str:
+        return _line(bill["application_number"], bill["period_end"], bill["period_total"], bill["cumulative_billed"],
+                     bill["status"], bill["payment_date"])
+
+    def _index_change_orders(self, records: Iterable[Dict], _):
+        section = self.sections["change_orders"]
+        for co in sorted(records, key=lambda co: co["date_submitted"]):
+            self.change_orders.append(co)
+            sov = tuple(co["affected_sov_lines"] or ()) or None
+            weight = TABLE_WEIGHTS["change_orders"] + min(abs(co["amount"]) / max(self.contract_value, 1) * 100, 2)
+            section.add(co["date_submitted"], sov, weight, self._change_order_line(co), self.estimator, co)
+
+    def _change_order_line(self, co: Dict) -> str:
+        sov = ",".join(self.sov_codes.get(sov_id, sov_id) for sov_id in co["affected_sov_lines"] or ())
+        return _line(co["co_number"], co["date_submitted"], co["reason_category"], co["amount"], co["status"],
+                     co["related_rfi"], sov, co["description"])
+
+    def _index_rfis(self, records: Iterable[Dict], _):
+        section = self.sections["rfis"]
+        for rfi in sorted(records, key=lambda rfi: rfi["date_submitted"]):
+            self.rfis.append(rfi)
+            weight = (TABLE_WEIGHTS["rfis"] + (rfi["priority"] in ("High", "Critical"))
+                      + 0.5 * bool(rfi["cost_impact"] or rfi["schedule_impact"]))
+            section.add(rfi["date_submitted"], None, weight, self._rfi_line(rfi), self.estimator, rfi)
+
+    def _rfi_line(self, rfi: Dict) -> str:
+        return _line(rfi["rfi_number"], rfi["date_submitted"], rfi["priority"], rfi["assigned_to"], rfi["status"],
+                     rfi["date_responded"], rfi["subject"])
+
+    def _index_material_deliveries(self, records: Iterable[Dict], _):
+        section = self.sections["material_deliveries"]
+        for delivery in sorted(records, key=lambda delivery: delivery["date"]):
+            sov_id = delivery["sov_line_id"]
+            self.materials.add(sov_id, delivery["date"], delivery["total_cost"])
+            weight = (TABLE_WEIGHTS["material_deliveries"] + (delivery["condition_notes"] != "Good condition")
+                      + min(delivery["total_cost"] / 100_000, 1))
+            section.add(delivery["date"], (sov_id,), weight, _line(
+                delivery["date"], self.sov_codes.get(sov_id, sov_id), delivery["item_description"],
+                f"{delivery['quantity']} {delivery['unit']}", delivery["total_cost"], delivery["vendor"],
+                delivery["condition_notes"]), self.estimator)
+
+    def _index_labor_logs(self, records: Iterable[Dict], _):
+        weeks = defaultdict(lambda: [0, 0.0, 0.0, 0.0])  # (monday, sov) -> worker-days, st, ot, cost
+        mondays = {}
+        for log in records:
+            day, sov_id = log["date"], log["sov_line_id"]
+            hours_st, hours_ot = log["hours_st"], log["hours_ot"]
+            cost = (hours_st + hours_ot * 1.5) * log["hourly_rate"] * log["burden_multiplier"]
+            self.labor.add(sov_id, day, hours_st + hours_ot, hours_ot, cost)
+            if day not in mondays:
+                mondays[day] = _monday(day)
+            week = weeks[mondays[day], sov_id]
+            week[0] += 1
+            week[1] += hours_st
+            week[2] += hours_ot
+            week[3] += cost
+        section = self.sections["labor_logs"]
+        for (monday, sov_id), (worker_days, hours_st, hours_ot, cost) in sorted(weeks.items()):
+            weight = TABLE_WEIGHTS["labor_logs"] + min(hours_ot / max(hours_st, 1) * 4, 1)
+            section.add(monday, (sov_id,), weight, _line(
+                monday, self.sov_codes.get(sov_id, sov_id), worker_days, hours_st, hours_ot, cost), self.estimator)
+
+    def _index_field_notes(self, records: Iterable[Dict], _):
+        section = self.sections["field_notes"]
+        for note in sorted(records, key=lambda note: note["date"]):
+            weight = TABLE_WEIGHTS["field_notes"] + (note["note_type"] in ("Issue Log", "Safety Log"))
+            section.add(note["date"], None, weight, _line(note["date"], note["note_type"], note["author"],
+                                                          note["content"]), self.estimator)
+
+    # -------------------------------------------------------------------------
+
+    def resolve_sov_lines(self, sov_lines: Iterable[Any]) -> Tuple[str, ...]:
+        """sov_line_ids for ids, two-digit codes or line numbers, in line order."""
+        resolved = set()
+        for sov_line in sov_lines:
+            key = sov_line
+            if isinstance(sov_line, str) and sov_line.isdigit():
+                key = int(sov_line)
+            if key not in self._sov_lookup:
+                raise KeyError(f"{self.project_id} has no SOV line {sov_line!r}")
+            resolved.add(self._sov_lookup[key])
+        return tuple(sov_id for sov_id in self.sov_codes if sov_id in resolved)
+
+    def rollups(self, start: str, end: str, sov_lines: Tuple[str, ...], seed: int = DEFAULT_SEED) -> List[str]:
+        """Rollup lines for the scope: per SOV line, then project totals (seed: see snapshots.py)."""
+        lines = ["## sov (line|description|scheduled|billed_pct|labor_h|ot_h|labor_cost|material_cost|co_amount)"]
+        co_amounts = defaultdict(float)
+        for co in self.change_orders:
+            if start <= co["date_submitted"] <= end:
+                for sov_id in co["affected_sov_lines"] or ():
+                    co_amounts[sov_id] += co["amount"] / len(co["affected_sov_lines"])
+        totals = [0.0, 0.0, 0.0, 0.0]
+        for line in self.sov_lines:
+            sov_id = line["sov_line_id"]
+            if sov_lines and sov_id not in sov_lines:
+                continue
+            hours, ot_hours, cost = self.labor.range(sov_id, start, end)
+            material, = self.materials.range(sov_id, start, end)
+            billed = (self.billed.last(sov_id, end) or [0.0])[0]
+            totals = [total + value for total, value in zip(totals, (hours, ot_hours, cost, material))]
+            lines.append(_line(self.sov_codes[sov_id], line["description"], line["scheduled_value"],
+                               100.0 * billed / max(line["scheduled_value"], 1), hours, ot_hours, cost, material,
+                               co_amounts.get(sov_id, 0.0)))
+
+        resolve_co, resolve_rfi = STATUS_RESOLVERS["change_orders"], STATUS_RESOLVERS["rfis"]
+        cos = [resolve_co(co, end, seed) for co in self.change_orders if start <= co["date_submitted"] <= end
+               and (not sov_lines or set(co["affected_sov_lines"] or ()) & set(sov_lines))]
+        approved = [co["amount"] for co in cos if co["status"] == "Approved"]
+        rfis = [rfi for rfi in self.rfis if rfi["date_submitted"] <= end]
+        open_rfis = sum(1 for rfi in rfis if resolve_rfi(rfi, end, seed)["date_responded"] is None)
+        responded = [rfi for rfi in rfis if start <= rfi["date_submitted"] and rfi["date_responded"]
+                     and rfi["date_responded"] <= end]
+        response_days = (sum(date.fromisoformat(rfi["date_responded"]).toordinal()
+                             - date.fromisoformat(rfi["date_submitted"]).toordinal() for rfi in responded)
+                         / len(responded)) if responded else None
+        billing = self.billing.last("project", end)
+        lines.append("## totals")
+        lines.append(_line("labor_h", totals[0], "ot_h", totals[1], "labor_cost", totals[2],
+                           "material_cost", totals[3]))
+        lines.append(_line("cos", len(cos), "approved", len(approved), "approved_amount", sum(approved),
+                           "open", sum(1 for co in cos if co["status"] in ("Pending", "Under Review"))))
+        lines.append(_line("rfis", sum(1 for rfi in rfis if rfi["date_submitted"] >= start), "open_at_end",
+                           open_rfis, "avg_response_days", response_days))
+        if billing is not None:
+            lines.append(_line("billed_to_date", billing[0], "billed_pct",
+                               100.0 * billing[0] / max(self.contract_value, 1), "retention", billing[1]))
+        return lines
+
+
+# =============================================================================
+# PACKER
+# =============================================================================
+
+class ContextPacker:
+    """Packs project data into token-budgeted prompt context.
+
+    load_project(project_id) returns a project's tables (see ProjectIndex);
+    use from_dataset() for a generated dataset directory or
+    from_generated() to run the generators on demand. seed is the seed the
+    data was generated with, which fixes when open change orders are decided
+    (see snapshots.py). Project indexes and packed contexts are kept in LRU
+    caches.
+    """
+
+    def __init__(self, load_project: Callable[[str], Dict[str, Iterable[Dict]]],
+                 estimator: Callable[[str], int] = estimate_tokens,
+                 cache_size: int = CACHE_SIZE, max_projects: int = MAX_PROJECTS, seed: int = DEFAULT_SEED):
+        self.load_project = load_project
+        self.seed = seed
+        self.estimator = estimator
+        self.cache_size = cache_size
+        self.max_projects = max_projects
+        self._indexes: "OrderedDict[str, ProjectIndex]" = OrderedDict()
+        self._cache: "OrderedDict[Tuple, PackedContext]" = OrderedDict()
+
+    @classmethod
+    def from_generated(cls, scale: float = 1.0, seed: int = DEFAULT_SEED,
+                       options: Optional[GenerationOptions] = None, **kwargs) -> "ContextPacker":
+        """Generate a project's tables (as RecordBuffers) when it is first packed."""
+        shards = {}
+
+        def load_project(project_id: str) -> Dict[str, Iterable[Dict]]:
+            if not shards:
+                shards.update((spec["id"], (shard, spec)) for shard, spec in enumerate(project_specs(scale, seed)))
+            shard, spec = shards[project_id]
+            return generate_project(spec, seed, options, shard)
+
+        return cls(load_project, seed=seed, **kwargs)
+
+    @classmethod
+    def from_dataset(cls, path: str = DEFAULT_OUTPUT_DIR, **kwargs) -> "ContextPacker":
+        """Read projects from a dataset directory through HVACDataset (needs numpy)."""
+        from hvac_dataset import HVACDataset
+        return cls(_DatasetProjects(HVACDataset(path)), **kwargs)
+
+    def index(self, project_id: str) -> ProjectIndex:
+        index = self._indexes.get(project_id)
+        if index is None:
+            index = ProjectIndex(self.load_project(project_id), self.estimator)
+            self._indexes[project_id] = index
+            if len(self._indexes) > self.max_projects:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(project_id)
+        return index
+
+    def pack(self, project_id: str, scope: Scope = Scope(), budget: int = DEFAULT_BUDGET) -> PackedContext:
+        """The project's context for scope in at most budget (estimated) tokens."""
+        index = self.index(project_id)
+        unknown = set(scope.tables) - set(CONTEXT_TABLES)
+        if unknown:
+            raise ValueError(f"Unknown context table(s): {sorted(unknown)}")
+        start, end = scope.start or index.first_day, scope.end or index.last_day
+        sov_lines = index.resolve_sov_lines(scope.sov_lines)
+        tables = tuple(table for table in CONTEXT_TABLES if table in scope.tables)
+        key = (project_id, start, end, sov_lines, tables, budget)
+        packed = self._cache.get(key)
+        if packed is None:
+            packed = self._pack(index, start, end, sov_lines, tables, budget)
+            self._cache[key] = packed
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return packed
+
+    def _pack(self, index: ProjectIndex, start: str, end: str, sov_lines: Tuple[str, ...],
+              tables: Tuple[str, ...], budget: int) -> PackedContext:
+        estimate = self.estimator
+        scope_line = _line("scope", f"{start}..{end}",
+                           "sov " + (",".join(index.sov_codes[sov_id] for sov_id in sov_lines) or "all"),
+                           f"as of {end}")
+        fixed = [index.header, scope_line] + index.rollups(start, end, set(sov_lines), self.seed)
+        lines, used = [], 0
+        for line in fixed:
+            tokens = estimate(line) + 1
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+
+        # Candidates: (score, table, position); a resolved line replaces the base line
+        end_day = date.fromisoformat(end).toordinal()
+        candidates, resolved = [], {}
+        in_scope = {}
+        sov_filter = set(sov_lines)
+        for table in tables:
+            section = index.sections[table]
+            lo = bisect_left(section.days, _monday(start) if table == "labor_logs" else start)
+            hi = bisect_right(section.days, end)
+            resolve = STATUS_RESOLVERS.get(table)
+            count = 0
+            for i in range(lo, hi):
+                sov = section.sov[i]
+                if sov_filter and sov is not None and sov_filter.isdisjoint(sov):
+                    continue
+                count += 1
+                tokens = section.tokens[i]
+                if resolve is not None:
+                    record = section.records[i]
+                    current = resolve(record, end, self.seed)
+                    if current is not record:
+                        line = (index._billing_line if table == "billing_history" else
+                                index._change_order_line if table == "change_orders" else index._rfi_line)(current)
+                        resolved[table, i] = line
+                        tokens = estimate(line)
+                age = end_day - section.ordinals[i]
+                recency = RECENCY_FLOOR + (1 - RECENCY_FLOOR) * 0.5 ** (age / RECENCY_HALF_LIFE)
+                candidates.append((section.weights[i] * recency, table, i, tokens))
+            in_scope[table] = count
+
+        # Every table's best record goes first, so one busy table cannot crowd out the rest
+        candidates.sort(key=lambda candidate: -candidate[0])
+        leaders = {}
+        for candidate in candidates:
+            leaders.setdefault(candidate[1], candidate)
+        candidates = list(leaders.values()) + [candidate for candidate in candidates
+                                               if leaders[candidate[1]] is not candidate]
+        headers = {table: f"## {table} ({SECTION_COLUMNS[table]})" for table in tables}
+        header_tokens = {table: estimate(header) + estimate(f" {in_scope[table]} of {in_scope[table]}") + 1
+                         for table, header in headers.items()}
+        chosen = defaultdict(list)
+        remaining = budget - used
+        for _, table, i, tokens in candidates:
+            cost = tokens + 1 + (0 if table in chosen else header_tokens[table])
+            if cost <= remaining:
+                chosen[table].append(i)
+                remaining -= cost
+            elif remaining < 8:
+                break
+
+        for table in tables:
+            if table not in chosen:
+                continue
+            section = index.sections[table]
+            lines.append(f"{headers[table]} {len(chosen[table])} of {in_scope[table]}")
+            lines.extend(resolved.get((table, i), section.lines[i]) for i in sorted(chosen[table]))
+        text = "\n".join(lines)
+        return PackedContext(text, estimate(text),
+                             {table: (len(chosen.get(table, ())), in_scope[table]) for table in tables})
+
+    def cache_clear(self):
+        self._cache.clear()
+
+
+class _DatasetProjects:
+    """load_project for a dataset directory: rows of each table grouped by project_id."""
+
+    def __init__(self, dataset):
+        import numpy as np
+        self.np = np
+        self.dataset = dataset
+        self._groups = {}
+
+    def _table_groups(self, table: str):
+        """(columns, project_id -> row indices) of a table, built on first use."""
+        if table not in self._groups:
+            np = self.np
+            columns = self.dataset.columns(table)
+            project_ids = columns["project_id"]
+            if hasattr(project_ids, "codes"):  # Categorical
+                codes, categories = project_ids.codes, project_ids.categories
+            else:
+                categories, codes = np.unique(project_ids.astype(str), return_inverse=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+            rows = {str(category): order[bounds[i]:bounds[i + 1]] for i, category in enumerate(categories)}
+            self._groups[table] = columns, rows
+        return self._groups[table]
+
+    def _values(self, column: Any, rows: Any) -> List[Any]:
+        np = self.np
+        if hasattr(column, "codes"):  # Categorical
+            categories = column.categories.tolist()
+            return [categories[code] if code >= 0 else None for code in column.codes[rows].tolist()]
+        values = column[rows]
+        if values.dtype.kind == "M":
+            return [None if day == "NaT" else day for day in np.datetime_as_string(values, unit="D").tolist()]
+        return values.tolist()  # masked entries become None
+
+    def __call__(self, project_id: str) -> Dict[str, List[Dict]]:
+        tables = {}
+        for table in ["contracts", "sov", "billing_line_items"] + CONTEXT_TABLES:
+            if table not in self.dataset:
+                continue
+            columns, groups = self._table_groups(table)
+            rows = groups.get(project_id)
+            if rows is None:
+                continue
+            names = list(columns)
+            values = [self._values(columns[name], rows) for name in names]
+            tables[table] = [dict(zip(names, row)) for row in zip(*values)]
+        if "contracts" not in tables:
+            raise KeyError(f"No project {project_id} in {self.dataset.path}")
+        return tables
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Print token-budgeted prompt context for an HVAC project.")
+    parser.add_argument("--input-dir", default=DEFAULT_OUTPUT_DIR, help="Output directory of generate_hvac_dataset.py.")
+    parser.add_argument("--generate", action="store_true",
+                        help="Generate projects on demand instead of reading --input-dir.")
+    parser.add_argument("--scale", type=float, default=1.0, help="With --generate: the dataset scale.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="Seed the dataset was (or is) generated with.")
+    parser.add_argument("--project", default="PRJ-2024-001", help="Project ID.")
+    parser.add_argument("--start", help="First day of the scope (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Last day of the scope (YYYY-MM-DD); the context is as of this day.")
+    parser.add_argument("--sov", default="", help="Comma-separated SOV lines (line numbers or sov_line_ids).")
+    parser.add_argument("--tables", default=",".join(CONTEXT_TABLES), help="Comma-separated tables to include.")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="Token budget.")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N",
+                        help="Instead of printing, time N packs of random scopes of the project.")
+    return parser.parse_args(argv)
+
+
+def benchmark(packer: ContextPacker, project_id: str, n: int, budget: int):
+    """Time packing n random scopes (uncached, then cached)."""
+    index = packer.index(project_id)
+    rng = random.Random(0)
+    first, last = date.fromisoformat(index.first_day).toordinal(), date.fromisoformat(index.last_day).toordinal()
+    scopes = []
+    for _ in range(n):
+        start = rng.randint(first, last - 1)
+        end = rng.randint(start, min(start + 120, last))
+        sov_lines = tuple(rng.sample(list(index.sov_codes.values()), rng.choice([0, 1, 2, 3])))
+        scopes.append(Scope(date.fromordinal(start).isoformat(), date.fromordinal(end).isoformat(), sov_lines))
+    for label in ("uncached", "cached"):
+        started = time.perf_counter()
+        tokens = sum(packer.pack(project_id, scope, budget).tokens for scope in scopes)
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {elapsed / n * 1000:.3f} ms per pack ({tokens / n:,.0f} tokens on average)")
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    packer = (ContextPacker.from_generated(args.scale, args.seed) if args.generate
+              else ContextPacker.from_dataset(args.input_dir, seed=args.seed))
+    started = time.perf_counter()
+    packer.index(args.project)
+    print(f"Indexed {args.project} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if args.benchmark:
+        benchmark(packer, args.project, args.benchmark, args.budget)
+        return
+    scope = Scope(args.start, args.end, tuple(filter(None, args.sov.split(","))),
+                  tuple(filter(None, args.tables.split(","))))
+    context = packer.pack(args.project, scope, args.budget)
+    print(context.text)
+    print(f"\n~{context.tokens} tokens; records packed/in scope: "
+          + ", ".join(f"{table} {packed}/{total}" for table, (packed, total) in context.records.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Chronological event replay for the HVAC construction dataset.
+
+Merges the event tables (labor logs, material deliveries, change orders,
+RFIs, field notes and pay applications) of every project into one
+date-ordered stream - the interleaved feed a project-management system
+produces - and serves it as NDJSON events on stdout, a TCP socket or an HTTP
+endpoint, optionally paced in simulated time.
+
+Events come either from the CSV tables written by generate_hvac_dataset.py,
+k-way merged through small per-project read buffers, or straight from the
+generators, one calendar month at a time using the --through checkpoint
+machinery. Neither source holds the whole dataset in memory.
+
+    python replay_events.py --input-dir ./out --speedup 86400
+    python replay_events.py --generate --scale 20 --serve http --port 8765
+"""
+
+import argparse
+import asyncio
+import csv
+import heapq
+import json
+import os
+import sys
+from dataclasses import replace
+from datetime import date, timedelta
+from itertools import groupby, islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from dataset_specs import CALENDAR_MODES
+from generate_hvac_dataset import (
+    CHECKPOINT_STREAM, DEFAULT_SEED, GenerationOptions, iter_dataset, project_specs, table_schema,
+)
+from table_sinks import csv_records
+
+# Event tables and the column that dates each event. Events on the same day
+# are ordered by this table order, then by project.
+EVENT_TABLES = {
+    "labor_logs": "date",
+    "material_deliveries": "date",
+    "change_orders": "date_submitted",
+    "rfis": "date_submitted",
+    "field_notes": "date",
+    "billing_history": "period_end",
+}
+TABLE_ORDER = {table: i for i, table in enumerate(EVENT_TABLES)}
+
+# Rows buffered across all CSV project runs while merging
+CSV_BUFFER_ROWS = 200_000
+
+DEFAULT_PORT = 8765
+
+# (date, table, record)
+Event = Tuple[str, str, Dict]
+
+
+# =============================================================================
+# CSV SOURCE
+# =============================================================================
+
+def _csv_rows(f) -> Iterator[List[str]]:
+    """CSV rows read line by line, so f.tell() stays at the next row boundary."""
+    return csv.reader(line.decode("utf-8") for line in iter(f.readline, b""))
+
+
+def index_csv_runs(path: str) -> Tuple[List[str], List[int]]:
+    """Header and byte offsets where each run of one project's rows starts.
+
+    Tables are written project by project (appended datasets add further
+    runs per project), and rows within a run are in date order.
+    """
+    offsets = []
+    with open(path, "rb") as f:
+        rows = _csv_rows(f)
+        header = next(rows)
+        project_col = header.index("project_id")
+        current = None
+        offset = f.tell()
+        for row in rows:
+            if row[project_col] != current:
+                current = row[project_col]
+                offsets.append(offset)
+            offset = f.tell()
+    return header, offsets
+
+
+def _iter_csv_run(f, header: List[str], offset: int, table: str, batch_rows: int) -> Iterator[Event]:
+    """Events of one project run, read batch_rows at a time through a shared file handle.
+
+    Records are typed through the table's schema, like the generated ones.
+    """
+    date_column = EVENT_TABLES[table]
+    schema = table_schema(table)
+    project_col = header.index("project_id")
+    project = None
+    while True:
+        f.seek(offset)
+        batch = list(islice(_csv_rows(f), batch_rows))
+        offset = f.tell()
+        if not batch:
+            return
+        for row, record in zip(batch, csv_records(header, batch, schema)):
+            if project is None:
+                project = row[project_col]
+            elif row[project_col] != project:
+                return
+            yield record[date_column], table, record
+
+
+def iter_csv_events(input_dir: str, tables: Iterable[str] = EVENT_TABLES,
+                    buffer_rows: int = CSV_BUFFER_ROWS) -> Iterator[Event]:
+    """Date-ordered events from the CSV tables in input_dir.
+
+    Each table is indexed in one streaming pass, then every project run is
+    read through a buffer of buffer_rows / runs rows and the runs are
+    k-way merged by date. Billing events are the flat billing_history rows.
+    """
+    handles = []
+    streams = []
+    runs = []
+    for table in tables:
+        path = os.path.join(input_dir, f"{table}.csv")
+        if os.path.exists(path):
+            header, offsets = index_csv_runs(path)
+            runs.append((table, path, header, offsets))
+
+    batch_rows = max(16, buffer_rows // max(1, sum(len(offsets) for _, _, _, offsets in runs)))
+    try:
+        for table, path, header, offsets in runs:
+            f = open(path, "rb")
+            handles.append(f)
+            streams.extend(_iter_csv_run(f, header, offset, table, batch_rows) for offset in offsets)
+        yield from heapq.merge(*streams, key=lambda event: event[0])
+    finally:
+        for f in handles:
+            f.close()
+
+
+# =============================================================================
+# GENERATOR SOURCE
+# =============================================================================
+
+def _month_end(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1) - timedelta(days=1)
+
+
+def iter_generated_events(seed: int = DEFAULT_SEED, scale: float = 1.0, workers: int = 1,
+                          options: Optional[GenerationOptions] = None, start: str = "2024-01-01",
+                          tables: Iterable[str] = EVENT_TABLES) -> Iterator[Event]:
+    """Date-ordered events generated a calendar month at a time.
+
+    Each window runs every project with through set to the month end and
+    resumes from the previous window's checkpoint states, so only one month
+    of events is held (and sorted) at once. Records dated before start come
+    out with the first window. Stops once every project is complete.
+    """
+    options = options or GenerationOptions()
+    tables = set(tables)
+    resume = {}
+    window_end = _month_end(date.fromisoformat(start))
+    while True:
+        window_options = replace(options, through=window_end.isoformat())
+        events = []
+        complete = True
+        for project, records in iter_dataset(project_specs(scale, seed), seed, workers, window_options,
+                                             resume=resume):
+            for table, record in records:
+                if table == CHECKPOINT_STREAM:
+                    resume[project["id"]] = record
+                    complete = complete and record["complete"]
+                elif table in tables:
+                    events.append((record[EVENT_TABLES[table]], table, record))
+        events.sort(key=lambda event: (event[0], TABLE_ORDER[event[1]]))
+        yield from events
+        if complete:
+            return
+        window_end = _month_end(window_end + timedelta(days=1))
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+def encode_event(event: Event) -> bytes:
+    day, table, record = event
+    return (json.dumps({"date": day, "table": table, "record": record}, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def _produce(events: Iterator[Event], queue: asyncio.Queue, limit: Optional[int]):
+    """Feed one day of events per queue item; the bounded queue applies backpressure."""
+    days = groupby(islice(events, limit), key=lambda event: event[0])
+    while True:
+        item = await asyncio.to_thread(lambda: next(((day, list(group)) for day, group in days), None))
+        if item is None:
+            break
+        await queue.put(item)
+    await queue.put(None)
+
+
+async def replay(events: Iterator[Event], send: Callable[[bytes], Any], speedup: Optional[float] = None,
+                 limit: Optional[int] = None, queue_days: int = 8) -> int:
+    """Send events through send (an async callable that waits for the receiver).
+
+    With speedup, dataset time is mapped to wall time (86400 plays one day
+    per second) and each day's events are spread evenly across its slot;
+    otherwise events go out as fast as the receiver takes them. Reading and
+    merging run in a worker thread at most queue_days ahead of the sender.
+    Returns the number of events sent.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_days)
+    producer = asyncio.create_task(_produce(events, queue, limit))
+    sent = 0
+    first_day = start_time = None
+    try:
+        while (item := await queue.get()) is not None:
+            day, day_events = item
+            if not speedup:
+                await send(b"".join(encode_event(event) for event in day_events))
+                sent += len(day_events)
+                continue
+            ordinal = date.fromisoformat(day).toordinal()
+            if first_day is None:
+                first_day, start_time = ordinal, loop.time()
+            day_seconds = 86400 / speedup
+            for i, event in enumerate(day_events):
+                delay = start_time + (ordinal - first_day + i / len(day_events)) * day_seconds - loop.time()
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+                await send(encode_event(event))
+                sent += 1
+        await producer
+    finally:
+        producer.cancel()
+    return sent
+
+
+# =============================================================================
+# SERVERS
+# =============================================================================
+
+async def serve_stdout(make_events: Callable[[], Iterator[Event]], speedup: Optional[float], limit: Optional[int]):
+    out = sys.stdout.buffer
+
+    async def send(data: bytes):
+        out.write(data)
+        out.flush()
+
+    sent = await replay(make_events(), send, speedup, limit)
+    print(f"Replayed {sent:,} events", file=sys.stderr)
+
+
+async def serve_socket(make_events: Callable[[], Iterator[Event]], speedup: Optional[float], limit: Optional[int],
+                       host: str = "127.0.0.1", port: int = DEFAULT_PORT, http: bool = False):
+    """Serve a full replay to every client that connects, over raw TCP or chunked HTTP."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        try:
+            if http:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                             b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+            async def send(data: bytes):
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data) if http else data)
+                await writer.drain()
+
+            sent = await replay(make_events(), send, speedup, limit)
+            if http:
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            print(f"Replayed {sent:,} events to {peer}", file=sys.stderr)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            print(f"Client {peer} disconnected", file=sys.stderr)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Serving {'HTTP' if http else 'TCP'} event replay on {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay the HVAC dataset as a date-ordered event stream.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Replay the CSV tables in this directory.")
+    source.add_argument("--generate", action="store_true",
+                        help="Replay straight from the generators (see --seed, --scale, --calendar).")
+    parser.add_argument("--serve", choices=["stdout", "tcp", "http"], default="stdout",
+                        help="Where to send events. tcp/http replay the stream to every client that connects.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speedup", type=float, default=None,
+                        help="Simulated seconds per wall-clock second (86400 = one day per second). "
+                             "Default: as fast as the receiver reads.")
+    parser.add_argument("--tables", default=",".join(EVENT_TABLES),
+                        help=f"Comma-separated event tables: {', '.join(EVENT_TABLES)}.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many events.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--calendar", choices=CALENDAR_MODES, default="weekdays")
+    parser.add_argument("--start", default="2024-01-01",
+                        help="First month replayed from the generators (earlier records come with it).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    tables = args.tables.split(",")
+    unknown = set(tables) - set(EVENT_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown event table(s): {sorted(unknown)}")
+
+    if args.generate:
+        options = GenerationOptions(calendar=args.calendar)
+
+        def make_events():
+            return iter_generated_events(args.seed, args.scale, args.workers, options, args.start, tables)
+    else:
+        def make_events():
+            return iter_csv_events(args.input_dir, tables)
+
+    if args.serve == "stdout":
+        coroutine = serve_stdout(make_events, args.speedup, args.limit)
+    else:
+        coroutine = serve_socket(make_events, args.speedup, args.limit, args.host, args.port, args.serve == "http")
+    try:
+        asyncio.run(coroutine)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
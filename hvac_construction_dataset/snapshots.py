@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+As-of-date snapshots of the HVAC construction dataset.
+
+The generators produce each record's whole life: a change order's final
+outcome, an RFI's response date and answer, a pay application's payment
+date. A snapshot is the dataset as a project manager saw it at the end of
+one day: records dated after that day are dropped, and change orders, RFIs,
+pay applications and submittals still open on that day get the status they
+had then (see STATUS_RESOLVERS).
+
+Snapshots are derived from the base records, so up to MAX_OPEN_SNAPSHOTS
+of them come out of each generation pass. Each project is generated once
+per pass, and its records are filtered and resolved for every day of the
+pass:
+
+    python snapshots.py --output-dir ./snapshots --month-ends 2024-01:2025-12
+    python snapshots.py --output-dir ./snapshots --as-of 2024-09-30 --format csv,ndjson
+
+writes one dataset per day to <output-dir>/as_of=<YYYY-MM-DD>/. A single
+snapshot can also be written by generate_hvac_dataset.py --as-of.
+"""
+
+import argparse
+import calendar
+import os
+from datetime import date
+from typing import List, Dict, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+from dataset_specs import CALENDAR_MODES, derive_seed
+from generate_hvac_dataset import (
+    CHECKPOINT_STREAM, DEFAULT_FORMATS, DEFAULT_SEED, OUTPUT_FORMATS, STATS_STREAM, DatasetWriter,
+    GenerationOptions, iter_dataset, project_specs,
+)
+from table_sinks import COMPRESSORS, PARTITION_DATE_COLUMNS
+
+# Column that dates each table's records; records dated after the as-of day
+# are not part of the snapshot. SOV lines are known once their contract is.
+SNAPSHOT_DATE_COLUMNS = dict(PARTITION_DATE_COLUMNS, bid_estimates="bid_date")
+
+# A change order is Pending for its first CO_PENDING_DAYS, then Under Review
+# until the owner decides, CO_DECISION_DAYS (low, high) after submission
+CO_PENDING_DAYS = 7
+CO_DECISION_DAYS = (14, 45)
+
+# Unpaid pay applications are Pending until approved this many days after period end
+PAY_APPROVAL_DAYS = 14
+
+# Snapshots written per generation pass. Each one holds a DatasetWriter's
+# files open (tables x formats), so this bounds the open file descriptors.
+MAX_OPEN_SNAPSHOTS = 12
+
+
+def snapshot_date_columns(extra_tables: Sequence[str] = ()) -> Dict[str, str]:
+    """SNAPSHOT_DATE_COLUMNS plus the date columns of table_specs.py tables."""
+    date_columns = dict(SNAPSHOT_DATE_COLUMNS)
+    if extra_tables:
+        from table_specs import TABLE_SPECS
+        date_columns.update((name, TABLE_SPECS[name].date_column) for name in extra_tables)
+    return date_columns
+
+
+def _days_between(first: str, last: str) -> int:
+    return date.fromisoformat(last).toordinal() - date.fromisoformat(first).toordinal()
+
+
+# =============================================================================
+# STATUS RESOLUTION
+# =============================================================================
+
+# Each resolver takes a base record known by as_of and the seed the dataset
+# was generated with, and returns the record as it stood that day: the record
+# itself when its final state was already reached, or a copy with the later
+# fields cleared.
+
+def co_decision_days(record: Dict, seed: int = DEFAULT_SEED) -> int:
+    """Days from submission to the owner's decision, fixed for each change order of a seed's dataset."""
+    low, high = CO_DECISION_DAYS
+    return low + derive_seed(seed, "co_decision", record["project_id"], record["co_number"]) % (high - low)
+
+
+def resolve_change_order(record: Dict, as_of: str, seed: int = DEFAULT_SEED) -> Dict:
+    age = _days_between(record["date_submitted"], as_of)
+    if age >= co_decision_days(record, seed):
+        return record
+    return dict(record, status="Pending" if age < CO_PENDING_DAYS else "Under Review", approved_by=None)
+
+
+def resolve_rfi(record: Dict, as_of: str, seed: int = DEFAULT_SEED) -> Dict:
+    responded = record["date_responded"]
+    if responded is None or responded <= as_of:
+        return record
+    return dict(record, status="Open", date_responded=None, response_summary=None)
+
+
+def resolve_pay_application(record: Dict, as_of: str, seed: int = DEFAULT_SEED) -> Dict:
+    paid = record["payment_date"]
+    if paid is None or paid <= as_of:
+        return record
+    approved = _days_between(record["period_end"], as_of) >= PAY_APPROVAL_DAYS
+    return dict(record, status="Approved" if approved else "Pending", payment_date=None)
+
+
+def resolve_submittal(record: Dict, as_of: str, seed: int = DEFAULT_SEED) -> Dict:
+    returned = record["date_returned"]
+    if returned is None or returned <= as_of:
+        return record
+    return dict(record, status="Under Review", date_returned=None, resubmittals=0)
+
+
+STATUS_RESOLVERS: Dict[str, Callable[[Dict, str, int], Dict]] = {
+    "change_orders": resolve_change_order,
+    "rfis": resolve_rfi,
+    "billing_history": resolve_pay_application,
+    "submittals": resolve_submittal,
+}
+
+
+def snapshot_project(records: Iterable[Tuple[str, Dict]], as_of: str,
+                     date_columns: Optional[Dict[str, str]] = None,
+                     seed: int = DEFAULT_SEED) -> Iterator[Tuple[str, Dict]]:
+    """A project's (table, record) stream as known at the end of day as_of.
+
+    seed is the master seed the records were generated with.
+
+    date_columns maps tables to the column that dates them (default
+    SNAPSHOT_DATE_COLUMNS; see snapshot_date_columns for spec tables). Tables
+    without one, and the CHECKPOINT_STREAM/STATS_STREAM pseudo-tables, pass
+    through, except SOV lines of a contract signed after as_of. Base records
+    are never modified.
+    """
+    date_columns = SNAPSHOT_DATE_COLUMNS if date_columns is None else date_columns
+    signed = True
+    for table, record in records:
+        column = date_columns.get(table)
+        if table == "contracts":
+            signed = record[column] <= as_of
+        if (column is not None and record[column] > as_of) or (table == "sov" and not signed):
+            continue
+        resolve = STATUS_RESOLVERS.get(table)
+        yield table, record if resolve is None else resolve(record, as_of, seed)
+
+
+def month_ends(first: str, last: str) -> List[str]:
+    """Last day of every month from first to last (both YYYY-MM), in order."""
+    year, month = map(int, first.split("-"))
+    end = tuple(map(int, last.split("-")))
+    days = []
+    while (year, month) <= end:
+        days.append(date(year, month, calendar.monthrange(year, month)[1]).isoformat())
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return days
+
+
+# =============================================================================
+# SNAPSHOT WRITER
+# =============================================================================
+
+def write_snapshots(days: Sequence[str], output_dir: str, formats: Iterable[str] = DEFAULT_FORMATS,
+                    seed: int = DEFAULT_SEED, scale: float = 1.0, workers: int = 1,
+                    options: Optional[GenerationOptions] = None, compression: Optional[str] = None,
+                    partition: bool = False, max_open: int = MAX_OPEN_SNAPSHOTS) -> Dict[str, Dict[str, int]]:
+    """Generate the dataset and write a snapshot for each day in days.
+
+    Snapshots go to <output_dir>/as_of=<day>/ in the given formats, laid out
+    as generate_hvac_dataset.py would write them. Days are written max_open
+    at a time, one generation pass each, so at most max_open writers have
+    their files open. Within a pass each project's records are held while its
+    snapshots are written, so memory is bounded by the largest project, not
+    by the number of snapshots. Returns each snapshot's record counts.
+    """
+    options = options or GenerationOptions()
+    if options.through:
+        raise ValueError("Snapshots are taken from complete base records; drop --through")
+    if options.extra_tables:
+        from table_specs import resolve_specs
+        options.extra_tables = tuple(spec.name for spec in resolve_specs(options.extra_tables))
+    formats = list(formats)
+    days = sorted(set(days))
+    for day in days:
+        date.fromisoformat(day)
+    counts = {}
+    for first in range(0, len(days), max_open):
+        counts.update(_write_snapshot_pass(days[first:first + max_open], output_dir, formats, seed, scale,
+                                           workers, options, compression, partition))
+    return counts
+
+
+def _write_snapshot_pass(days: Sequence[str], output_dir: str, formats: List[str], seed: int, scale: float,
+                         workers: int, options: GenerationOptions, compression: Optional[str],
+                         partition: bool) -> Dict[str, Dict[str, int]]:
+    """Write the snapshots of days from one generation pass."""
+    date_columns = snapshot_date_columns(options.extra_tables)
+    writers = {}
+    try:
+        for day in days:
+            writers[day] = DatasetWriter(os.path.join(output_dir, f"as_of={day}"), formats, compression,
+                                         compact_text=options.compact_text, partition=partition,
+                                         extra_tables=options.extra_tables)
+        for project, records in iter_dataset(project_specs(scale, seed), seed, workers, options):
+            project_records = [(table, record) for table, record in records
+                               if table not in (CHECKPOINT_STREAM, STATS_STREAM)]
+            for day, writer in writers.items():
+                for table, record in snapshot_project(project_records, day, date_columns, seed):
+                    writer.write(table, record)
+            print(f"Snapshotted: {project['name']}")
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {day: writer.counts for day, writer in writers.items()}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Write as-of-date snapshots of the HVAC dataset from a single generation pass.")
+    parser.add_argument("--output-dir", default="hvac_snapshots",
+                        help="Directory for the as_of=<YYYY-MM-DD> snapshot directories.")
+    parser.add_argument("--as-of", default="",
+                        help="Comma-separated snapshot days (YYYY-MM-DD).")
+    parser.add_argument("--month-ends", metavar="YYYY-MM:YYYY-MM",
+                        help="Also snapshot the last day of every month in this range.")
+    parser.add_argument("--format", default=",".join(DEFAULT_FORMATS),
+                        help=f"Comma-separated output formats: {', '.join(OUTPUT_FORMATS)}.")
+    parser.add_argument("--compression", choices=sorted(COMPRESSORS), help="Compress the NDJSON tables with this codec.")
+    parser.add_argument("--partition", action="store_true",
+                        help="Write the dated csv/ndjson tables as project/month partitions.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Scale factor: round(scale * 5) projects (see generate_hvac_dataset.py).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for generation.")
+    parser.add_argument("--calendar", choices=CALENDAR_MODES, default="weekdays")
+    parser.add_argument("--compact-text", action="store_true",
+                        help="Store field notes, RFI subjects and CO descriptions as template codes.")
+    parser.add_argument("--extra-tables", default="",
+                        help="Comma-separated declarative tables from table_specs.py to include.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    days = list(filter(None, args.as_of.split(",")))
+    if args.month_ends:
+        days += month_ends(*args.month_ends.split(":"))
+    if not days:
+        raise SystemExit("Nothing to do: give --as-of and/or --month-ends")
+    options = GenerationOptions(calendar=args.calendar, compact_text=args.compact_text,
+                                extra_tables=tuple(filter(None, args.extra_tables.split(","))))
+    counts = write_snapshots(days, args.output_dir, args.format.split(","), args.seed, args.scale, args.workers,
+                             options, args.compression, args.partition)
+    print(f"\n{len(counts)} snapshots written to {args.output_dir}/")
+    for day, table_counts in counts.items():
+        print(f"  as_of={day}: {sum(table_counts.values()):,} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Per-table output sinks of the HVAC dataset generator.
+
+CSV, NDJSON (optionally compressed) and Hive-style partitioned files, the
+single nested JSON file, and the helpers that find and read those files
+back (partition manifest, table files, NDJSON and typed CSV readers). DatasetWriter in
+generate_hvac_dataset.py fans records out to them; the columnar formats
+live in columnar_export.py.
+"""
+
+import ast
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+# Formats written as Hive-style partitions with --partition, and the
+# partition manifest written next to them
+PARTITION_FORMATS = ["csv", "ndjson"]
+MANIFEST_FILE = "_manifest.json"
+
+# Date column each table is partitioned by month on with --partition. Billing
+# line items go with their pay application's period_end; tables without a
+# date (sov, bid_estimates) stay one file each.
+PARTITION_DATE_COLUMNS = {
+    "contracts": "contract_date",
+    "labor_logs": "date",
+    "material_deliveries": "date",
+    "change_orders": "date_submitted",
+    "rfis": "date_submitted",
+    "field_notes": "date",
+    "billing_history": "period_end",
+    "billing_line_items": "period_end",
+}
+
+
+# Characters that make csv.writer quote a field (excel dialect)
+_CSV_SPECIAL = (",", '"', "\r", "\n")
+
+
+def _csv_column(values: Sequence) -> Optional[Sequence[str]]:
+    """A column's fields as csv.writer writes them; None if it needs csv.writer.
+
+    Strings needing no quotes pass through as they are, and single-type
+    numeric columns are formatted once per distinct value (None as an empty
+    field). Quoted strings, mixed types and floats with a zero (0.0 and -0.0
+    share a dict key) are left to csv.writer.
+    """
+    kinds = set(map(type, values))
+    if kinds == {str}:
+        text = "\x00".join(values)
+        return None if any(char in text for char in _CSV_SPECIAL) else values
+    kinds.discard(type(None))
+    if len(kinds) != 1 or not kinds <= {int, float, bool}:
+        return None
+    distinct = set(values)
+    if float in kinds and 0.0 in distinct:
+        return None
+    fields = {value: "" if value is None else str(value) for value in distinct}
+    return list(map(fields.__getitem__, values))
+
+
+class CsvTableSink:
+    """Streams one table to a CSV file. The header is taken from the first record.
+
+    With append, rows are added to an existing file (the header is only
+    written if the file is new or empty).
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.append = append
+        self._file = None
+        self._writer = None
+
+    def _open(self, fieldnames: List[str]):
+        has_header = self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, "a" if self.append else "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if not has_header:
+            self._writer.writeheader()
+
+    def write(self, record: Dict):
+        if self._writer is None:
+            self._open(list(record.keys()))
+        self._writer.writerow(record)
+
+    def write_rows(self, names: List[str], rows: Iterable[Sequence]):
+        """Write rows given as value tuples in names order, straight through csv.writer."""
+        if self._writer is None:
+            self._open(list(names))
+        if list(names) == self._writer.fieldnames:
+            self._writer.writer.writerows(rows)
+        else:
+            self._writer.writerows(dict(zip(names, row)) for row in rows)
+
+    def write_columns(self, names: List[str], columns: Sequence[Sequence]):
+        """Write rows given as whole columns in names order, formatted a column at a time.
+
+        Falls back to write_rows for a chunk with a column _csv_column cannot
+        format; either way the file is what csv.writer writes.
+        """
+        if self._writer is None:
+            self._open(list(names))
+        fields = []
+        if len(names) > 1 and list(names) == self._writer.fieldnames:
+            for values in columns:
+                values = _csv_column(values)
+                if values is None:
+                    break
+                fields.append(values)
+        if len(fields) < len(names):
+            self.write_rows(names, zip(*columns))
+        elif columns and len(columns[0]):
+            self._file.write("\r\n".join(map(",".join, zip(*fields))) + "\r\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class JsonDatasetSink:
+    """Streams every table into the single nested JSON file.
+
+    Records are spooled to one temporary file per table as they arrive and the
+    spools are concatenated in table order on close. The result is byte-for-byte
+    what json.dump(all_data, f, indent=2) produces, without holding the tables
+    in memory.
+    """
+
+    def __init__(self, path: str, table_names: List[str]):
+        self.path = path
+        self.table_names = table_names
+        self._spools = {}
+
+    def write(self, table_name: str, record: Dict):
+        spool = self._spools.get(table_name)
+        if spool is None:
+            spool = tempfile.TemporaryFile("w+", dir=os.path.dirname(self.path) or ".")
+            self._spools[table_name] = spool
+        else:
+            spool.write(",\n")
+        spool.write("    " + json.dumps(record, indent=2).replace("\n", "\n    "))
+
+    def close(self):
+        with open(self.path, "w") as f:
+            f.write("{")
+            for i, table_name in enumerate(self.table_names):
+                f.write(",\n  " if i else "\n  ")
+                f.write(json.dumps(table_name) + ": ")
+                spool = self._spools.pop(table_name, None)
+                if spool is None:
+                    f.write("[]")
+                    continue
+                f.write("[\n")
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+                f.write("\n  ]")
+            f.write("\n}")
+
+
+# Each chunk is compressed as an independent gzip member / bz2 stream / xz
+# stream. Concatenated streams are valid files for gzip.open, bz2.open and
+# lzma.open, which lets chunks of one table compress in parallel.
+COMPRESSORS = {
+    "gzip": (".gz", partial(gzip.compress, compresslevel=6, mtime=0)),
+    "bz2": (".bz2", partial(bz2.compress, compresslevel=9)),
+    "lzma": (".xz", partial(lzma.compress, preset=6)),
+}
+
+NDJSON_CHUNK_BYTES = 1 << 20
+
+
+class NdjsonTableSink:
+    """Streams one table to a newline-delimited JSON file, optionally compressed.
+
+    Records keep their nested fields (billing line_items, bid estimate
+    sections). With compression, encoded lines are gathered into ~1 MiB chunks
+    and handed to a shared thread pool; finished chunks are written back in
+    order, and at most max_pending chunks are queued per table so a slow
+    compressor applies backpressure instead of buffering the table. With
+    append, chunks are added to an existing file (compressed chunks are
+    independent streams, so the result still reads as one file).
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, max_pending: int = 8,
+                 append: bool = False):
+        self._compress = None
+        if compression:
+            suffix, self._compress = COMPRESSORS[compression]
+            path += suffix
+        self.path = path
+        self.append = append
+        self.bytes_written = 0
+        self._executor = executor
+        self._max_pending = max_pending
+        self._file = None
+        self._chunk = []
+        self._chunk_bytes = 0
+        self._pending = deque()
+
+    def write(self, record: Dict):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        self._chunk.append(line)
+        self._chunk_bytes += len(line)
+        if self._chunk_bytes >= NDJSON_CHUNK_BYTES:
+            self._flush_chunk()
+
+    def write_rows(self, names: List[str], rows: Iterable[Sequence]):
+        """Write rows given as value tuples in names order."""
+        for row in rows:
+            self.write(dict(zip(names, row)))
+
+    def _flush_chunk(self):
+        if not self._chunk:
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab" if self.append else "wb")
+        data = b"".join(self._chunk)
+        self._chunk = []
+        self._chunk_bytes = 0
+
+        if self._compress is None:
+            self._write_out(data)
+        elif self._executor is None:
+            self._write_out(self._compress(data))
+        else:
+            self._pending.append(self._executor.submit(self._compress, data))
+            while len(self._pending) > self._max_pending:
+                self._write_out(self._pending.popleft().result())
+
+    def _write_out(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        self._flush_chunk()
+        while self._pending:
+            self._write_out(self._pending.popleft().result())
+        if self._file is not None:
+            self._file.close()
+
+
+class PartitionedTableSink:
+    """Streams one table as Hive-style partitions, one directory per project and month:
+
+        <output_dir>/<table>/project_id=<id>/month=<YYYY-MM>/part-<n>.csv|.ndjson[.gz]
+
+    A project's records arrive together, so its open partitions are closed
+    when the next project's first record comes in. Every closed partition
+    file is appended to manifest with its row count, min/max date and size.
+    Partition directories that already hold parts (from an earlier run being
+    appended to) get the next part number.
+    """
+
+    def __init__(self, output_dir: str, table_name: str, fmt: str, manifest: List[Dict],
+                 compression: Optional[str] = None, executor: Optional[ThreadPoolExecutor] = None,
+                 date_column: Optional[str] = None):
+        self.output_dir = output_dir
+        self.table_name = table_name
+        self.fmt = fmt
+        self.date_column = date_column or PARTITION_DATE_COLUMNS[table_name]
+        self.manifest = manifest
+        self.compression = compression
+        self.executor = executor
+        self._project = None
+        self._partitions = {}
+
+    def write(self, record: Dict, day: Optional[str] = None):
+        """Write record to its partition; day overrides the record's date column."""
+        self.write_rows(list(record), [tuple(record.values())], None if day is None else [day])
+
+    def write_rows(self, names: List[str], rows: Iterable[Sequence], days: Optional[Iterable[str]] = None):
+        """Write rows given as value tuples in names order; days override their date column.
+
+        Consecutive rows of the same project and month go to their partition
+        in one call.
+        """
+        project_at = names.index("project_id")
+        date_at = names.index(self.date_column) if days is None else None
+        days = iter(days) if days is not None else None
+        run, run_days, run_month = [], [], None
+        for row in rows:
+            day = row[date_at] if days is None else next(days)
+            month = day[:7]
+            if row[project_at] != self._project or month != run_month:
+                self._write_run(names, run, run_days, run_month)
+                if row[project_at] != self._project:
+                    self._close_partitions()
+                    self._project = row[project_at]
+                run, run_days, run_month = [], [], month
+            run.append(row)
+            run_days.append(day)
+        self._write_run(names, run, run_days, run_month)
+
+    def _write_run(self, names: List[str], rows: List[Sequence], days: List[str], month: Optional[str]):
+        if not rows:
+            return
+        partition = self._partitions.get(month)
+        if partition is None:
+            partition = self._partitions[month] = self._open_partition(month)
+        sink, entry = partition
+        sink.write_rows(names, rows)
+        entry["rows"] += len(rows)
+        first, last = min(days), max(days)
+        if entry["min_date"] is None or first < entry["min_date"]:
+            entry["min_date"] = first
+        if entry["max_date"] is None or last > entry["max_date"]:
+            entry["max_date"] = last
+
+    def _open_partition(self, month: str):
+        directory = os.path.join(self.output_dir, self.table_name, f"project_id={self._project}", f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        part = sum(1 for name in os.listdir(directory) if name.startswith("part-") and f".{self.fmt}" in name)
+        path = os.path.join(directory, f"part-{part}.{self.fmt}")
+        if self.fmt == "csv":
+            sink = CsvTableSink(path)
+        else:
+            sink = NdjsonTableSink(path, self.compression, self.executor)
+        entry = {"format": self.fmt, "project_id": self._project, "month": month, "path": None,
+                 "rows": 0, "min_date": None, "max_date": None, "bytes": 0}
+        return sink, entry
+
+    def _close_partitions(self):
+        for sink, entry in self._partitions.values():
+            sink.close()
+            entry["path"] = os.path.relpath(sink.path, self.output_dir).replace(os.sep, "/")
+            entry["bytes"] = os.path.getsize(sink.path)
+            self.manifest.append(entry)
+        self._partitions = {}
+
+    def close(self):
+        self._close_partitions()
+
+
+def load_manifest(output_dir: str) -> Dict:
+    """Read the partition manifest written by a --partition run."""
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def select_partitions(manifest: Dict, table_name: str, project_ids: Optional[Iterable[str]] = None,
+                      start: Optional[str] = None, end: Optional[str] = None,
+                      fmt: Optional[str] = None) -> List[Dict]:
+    """Manifest entries of table_name that may hold rows for the given projects and dates.
+
+    Pruning uses only the manifest's project ids and min/max dates (start and
+    end are inclusive YYYY-MM-DD), so no partition file is opened. Entry
+    paths are relative to the output directory.
+    """
+    project_ids = set(project_ids) if project_ids is not None else None
+    return [
+        entry for entry in manifest["tables"][table_name]["partitions"]
+        if (fmt is None or entry["format"] == fmt)
+        and (project_ids is None or entry["project_id"] in project_ids)
+        and (start is None or entry["max_date"] >= start)
+        and (end is None or entry["min_date"] <= end)
+    ]
+
+
+def table_files(input_dir: str, table_name: str, fmt: str, manifest: Optional[Dict] = None) -> List[str]:
+    """The csv or ndjson files holding a table in an output directory.
+
+    These are its partitions (per manifest, from load_manifest) if it was
+    partitioned, else the flat file, compressed or not; [] if there is none.
+    """
+    if manifest and table_name in manifest["tables"]:
+        paths = [os.path.join(input_dir, entry["path"]) for entry in manifest["tables"][table_name]["partitions"]
+                 if entry["format"] == fmt]
+        if paths:
+            return paths
+    suffixes = [""] if fmt == "csv" else [""] + [suffix for suffix, _ in COMPRESSORS.values()]
+    for suffix in suffixes:
+        path = os.path.join(input_dir, f"{table_name}.{fmt}{suffix}")
+        if os.path.exists(path):
+            return [path]
+    return []
+
+
+def open_ndjson(path: str):
+    """Open an NDJSON table for line-by-line text reading, by file suffix."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_ndjson(path: str) -> Iterator[Dict]:
+    """Read an NDJSON table one record at a time."""
+    with open_ndjson(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _int(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)  # e.g. "1200.0"
+
+
+# Parsers of the CSV fields of each column type (dates and text stay strings)
+CSV_CONVERTERS = {"int": _int, "float": float, "bool": lambda v: v == "True", "list": ast.literal_eval}
+
+
+def csv_records(header: List[str], rows: Iterable[List[str]], schema: Mapping[str, str]) -> Iterator[Dict]:
+    """Typed records from CSV rows of a table with column types schema.
+
+    Numbers, booleans and lists are parsed and empty fields read as None, so
+    the records match the ones the generators wrote.
+    """
+    typed = [(name, CSV_CONVERTERS[schema[name]]) for name in header if schema.get(name) in CSV_CONVERTERS]
+    for row in rows:
+        record = dict(zip(header, row))
+        if "" in record.values():
+            record = {name: value or None for name, value in record.items()}
+        for name, convert in typed:
+            value = record[name]
+            if value is not None:
+                record[name] = convert(value)
+        yield record
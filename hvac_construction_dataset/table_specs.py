@@ -0,0 +1,794 @@
+#!/usr/bin/env python3
+"""
+Declarative table specs for the HVAC dataset generators.
+
+A TableSpec declares a per-project table as a list of columns, each with a
+schema type and a distribution: random choices and ranges, dates placed
+within the project's schedule, foreign keys into parent tables and columns
+derived from other columns of the same rows. generate_columns() draws a
+project's table column by column: every distribution draws its whole column
+in one call (see ColumnRNG) and the result is a dict of column lists.
+
+Tables either have a row count drawn per project or a frame of working days
+(Workdays): frame columns are drawn once per day and a repeat column turns
+each day into that many rows (workers on a labor log day, 0 or 1 field
+notes). Frame tables can be drawn in blocks of days, each block from its own
+RNG stream, so generation can stop at a cutoff day and later resume from the
+block it stopped in.
+
+dataset_specs.py declares the built-in tables (contracts, SOV, labor
+logs, RFIs, field notes) as specs, and gemini_synthetic_data_script.py
+declares its tables with the same engine. The tables registered here with
+register_table_spec() are optional extras, enabled with --extra-tables:
+
+    python generate_hvac_dataset.py --extra-tables submittals,equipment_startup
+
+This module only needs the standard library (NumPy is used for long
+columns when installed, with identical results) and takes its calendar and
+ID allocator from the caller, so both generators can import it.
+"""
+
+import random
+import string
+import sys
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columns at least this long are mapped with NumPy (when installed)
+NUMPY_MIN_ROWS = 256
+
+_UNIT = 2.0 ** -53
+
+
+@lru_cache(maxsize=None)
+def _day_string(day: int) -> str:
+    return date.fromordinal(day).isoformat()
+
+
+@lru_cache(maxsize=None)
+def _day_ordinal(day: str) -> int:
+    return date.fromisoformat(day).toordinal()
+
+
+# =============================================================================
+# COLUMN RNG
+# =============================================================================
+
+def _broadcast(value: Any, n: int) -> List:
+    return value if isinstance(value, list) else [value] * n
+
+
+class ColumnRNG:
+    """Whole columns of draws from one random.Random stream.
+
+    Each draw takes its raw words from rng.randbytes() in one call (32 bits
+    per integer, 64 per float) and maps them to values for the whole
+    column, with NumPy when it is installed and the column has at least
+    NUMPY_MIN_ROWS values, else with the array module. Both mappings are
+    exact, so a stream gives the same values either way. Bounds can be
+    scalars or per-row lists.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def _words(self, n: int, bits: int):
+        raw = self.rng.randbytes(n * bits // 8)
+        if np is not None and n >= NUMPY_MIN_ROWS:
+            return np.frombuffer(raw, dtype="<u4" if bits == 32 else "<u8")
+        words = array("I" if bits == 32 else "Q", raw)
+        if sys.byteorder == "big":
+            words.byteswap()
+        return words
+
+    def _unit(self, n: int):
+        """n floats in [0, 1) with 53 random bits each (a list or an ndarray)."""
+        words = self._words(n, 64)
+        if isinstance(words, array):
+            return [(word >> 11) * _UNIT for word in words]
+        return (words >> np.uint64(11)).astype(np.float64) * _UNIT
+
+    def ints(self, low: Any, high: Any, n: int) -> List[int]:
+        """Integers uniform in [low, high] (spans up to 2**31)."""
+        if not n:
+            return []
+        words = self._words(n, 32)
+        if isinstance(words, array):
+            if isinstance(low, list) or isinstance(high, list):
+                return [lo + ((word * (hi - lo + 1)) >> 32)
+                        for word, lo, hi in zip(words, _broadcast(low, n), _broadcast(high, n))]
+            span = high - low + 1
+            return [low + ((word * span) >> 32) for word in words]
+        low, high = np.asarray(low, dtype=np.int64), np.asarray(high, dtype=np.int64)
+        return (low + ((words.astype(np.int64) * (high - low + 1)) >> 32)).tolist()
+
+    def randint(self, low: int, high: int) -> int:
+        return self.ints(low, high, 1)[0]
+
+    def floats(self, n: int) -> List[float]:
+        unit = self._unit(n) if n else []
+        return unit if isinstance(unit, list) else unit.tolist()
+
+    def uniform(self, low: Any, high: Any, n: int) -> List[float]:
+        if not n:
+            return []
+        unit = self._unit(n)
+        if isinstance(unit, list):
+            if isinstance(low, list) or isinstance(high, list):
+                return [float(lo) + (float(hi) - float(lo)) * x
+                        for x, lo, hi in zip(unit, _broadcast(low, n), _broadcast(high, n))]
+            low, span = float(low), float(high) - float(low)
+            return [low + span * x for x in unit]
+        low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+        return (low + (high - low) * unit).tolist()
+
+    def bernoulli(self, p: float, n: int) -> List[bool]:
+        if not n:
+            return []
+        unit = self._unit(n)
+        return [x < p for x in unit] if isinstance(unit, list) else (unit < p).tolist()
+
+    def choice(self, values: Sequence, n: int, weights: Optional[Sequence[float]] = None) -> List:
+        """n values picked with replacement, optionally weighted."""
+        if not n:
+            return []
+        if weights is None:
+            index = self.ints(0, len(values) - 1, n)
+        else:
+            cumulative = list(accumulate(float(weight) for weight in weights))
+            total, last = cumulative[-1], len(cumulative) - 1
+            unit = self._unit(n)
+            if isinstance(unit, list):
+                index = [min(bisect_right(cumulative, x * total), last) for x in unit]
+            else:
+                index = np.minimum(np.searchsorted(np.asarray(cumulative), unit * total, side="right"),
+                                   last).tolist()
+        return [values[i] for i in index]
+
+    def permutations(self, groups: int, size: int) -> List[List[int]]:
+        """A random permutation of range(size) for each of groups groups."""
+        if not groups or not size:
+            return [[] for _ in range(groups)]
+        keys = self._unit(groups * size)
+        if isinstance(keys, list):
+            return [sorted(range(size), key=keys[g * size:(g + 1) * size].__getitem__) for g in range(groups)]
+        return np.argsort(keys.reshape(groups, size), axis=1, kind="stable").tolist()
+
+
+# =============================================================================
+# CONTEXT
+# =============================================================================
+
+@dataclass
+class SpecEnv:
+    """What a project brings to a spec table: its spec, schedule, RNG streams and parents.
+
+    calendar needs workdays(start, count) and roll_forward(day) (see
+    dataset_specs.WorkCalendar); ids needs take(n) and issued (see
+    IdAllocator). block_rng gives the stream of each block of a blocked
+    frame; other tables draw from rng. parents maps table names to column
+    dicts.
+    """
+    project: Dict
+    rng: random.Random
+    start_date: Optional[date] = None
+    calendar: Any = None
+    parents: Dict[str, Dict[str, List]] = field(default_factory=dict)
+    ids: Any = None
+    block_rng: Optional[Callable[[int], random.Random]] = None
+
+
+@dataclass
+class SpecContext:
+    """What a distribution can see while a block of rows is drawn."""
+    env: SpecEnv
+    rng: ColumnRNG
+    n: int = 0
+    columns: Dict[str, List] = field(default_factory=dict)
+    frame_rows: int = 0                       # days in the frame block (frame tables)
+    frame_index: Optional[List[int]] = None   # frame row of each row (repeated frames)
+    slot: Optional[List[int]] = None          # position of each row within its frame row
+
+    @property
+    def project(self) -> Dict:
+        return self.env.project
+
+    @property
+    def parents(self) -> Dict[str, Dict[str, List]]:
+        return self.env.parents
+
+    @property
+    def start_day(self) -> int:
+        return self.env.start_date.toordinal()
+
+    @property
+    def duration_days(self) -> int:
+        return self.project["duration_months"] * 30
+
+
+def _resolve(value: Any, ctx: SpecContext) -> Any:
+    """A bound or value list: a column name, a function of the project, or the value itself."""
+    if isinstance(value, str):
+        return ctx.columns[value]
+    if callable(value):
+        return value(ctx.project)
+    return value
+
+
+# =============================================================================
+# DISTRIBUTIONS
+# =============================================================================
+
+# Each distribution draws a whole column: sample(ctx) returns ctx.n values.
+# Values of earlier columns of the same rows are in ctx.columns. Bounds
+# (low, high) are numbers, functions of the project or column names.
+
+@dataclass(frozen=True)
+class Constant:
+    """The same value in every row."""
+    value: Any
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return [self.value] * ctx.n
+
+
+@dataclass(frozen=True)
+class ProjectField:
+    """A field of the project spec, the same for every row."""
+    key: str
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return [ctx.project[self.key]] * ctx.n
+
+
+@dataclass(frozen=True)
+class RowIndex:
+    """0, 1, 2, ... in draw order."""
+
+    def sample(self, ctx: SpecContext) -> List[int]:
+        return list(range(ctx.n))
+
+
+@dataclass(frozen=True)
+class Choice:
+    """Values picked at random, optionally weighted."""
+    values: Sequence[Any]
+    weights: Optional[Sequence[float]] = None
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return ctx.rng.choice(self.values, ctx.n, self.weights)
+
+
+@dataclass(frozen=True)
+class IntRange:
+    """Integers uniform in [low, high]."""
+    low: Any
+    high: Any
+
+    def sample(self, ctx: SpecContext) -> List[int]:
+        return ctx.rng.ints(_resolve(self.low, ctx), _resolve(self.high, ctx), ctx.n)
+
+
+@dataclass(frozen=True)
+class Uniform:
+    """Floats uniform in [low, high], rounded to digits (None: unrounded)."""
+    low: Any
+    high: Any
+    digits: Optional[int] = 2
+
+    def sample(self, ctx: SpecContext) -> List[float]:
+        values = ctx.rng.uniform(_resolve(self.low, ctx), _resolve(self.high, ctx), ctx.n)
+        return values if self.digits is None else [round(value, self.digits) for value in values]
+
+
+@dataclass(frozen=True)
+class Bernoulli:
+    """True with probability p."""
+    p: float
+
+    def sample(self, ctx: SpecContext) -> List[bool]:
+        return ctx.rng.bernoulli(self.p, ctx.n)
+
+
+@dataclass(frozen=True)
+class Distinct:
+    """Values without repeats within each frame row (or the whole table).
+
+    The first len(values) rows of a frame row take a random permutation of
+    values; any further rows draw from fallback (default: values).
+    """
+    values: Any
+    fallback: Optional[Sequence[Any]] = None
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        values = _resolve(self.values, ctx)
+        size = len(values)
+        if ctx.frame_index is None:
+            groups, group_of, slots = 1, [0] * ctx.n, range(ctx.n)
+        else:
+            groups, group_of, slots = ctx.frame_rows, ctx.frame_index, ctx.slot
+        permutations = ctx.rng.permutations(groups, size)
+        extra = sum(1 for slot in slots if slot >= size)
+        fallback = iter(ctx.rng.choice(self.fallback or values, extra))
+        return [values[permutations[group][slot]] if slot < size else next(fallback)
+                for group, slot in zip(group_of, slots)]
+
+
+@dataclass(frozen=True)
+class PickFrom:
+    """A random element of the sequence in column (per row)."""
+    column: str
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return [options[int(x * len(options))] for x, options in zip(ctx.rng.floats(ctx.n), ctx.columns[self.column])]
+
+
+@dataclass(frozen=True)
+class Lookup:
+    """values[key] for each key in column (values a sequence or a dict)."""
+    values: Any
+    column: str
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return list(map(self.values.__getitem__, ctx.columns[self.column]))
+
+
+@dataclass(frozen=True)
+class ProjectDate:
+    """Working days placed between fractions low and high of the project's duration."""
+    low: float
+    high: float
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        low, high = int(ctx.duration_days * self.low), int(ctx.duration_days * self.high)
+        roll, start = ctx.env.calendar.roll_forward, ctx.start_day
+        return [_day_string(roll(start + offset)) for offset in ctx.rng.ints(low, high, ctx.n)]
+
+
+@dataclass(frozen=True)
+class DayOffset:
+    """Days low..high after base (default: the project start), rolled to a working day when roll is set."""
+    low: Any
+    high: Any
+    base: Optional[date] = None
+    roll: bool = True
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        start = ctx.start_day if self.base is None else self.base.toordinal()
+        offsets = ctx.rng.ints(_resolve(self.low, ctx), _resolve(self.high, ctx), ctx.n)
+        if not self.roll:
+            return [_day_string(start + offset) for offset in offsets]
+        roll = ctx.env.calendar.roll_forward
+        return [_day_string(roll(start + offset)) for offset in offsets]
+
+
+@dataclass(frozen=True)
+class DateAfter:
+    """The working day days_column days after date_column (None where either is None)."""
+    date_column: str
+    days_column: str
+
+    def sample(self, ctx: SpecContext) -> List[Optional[str]]:
+        roll = ctx.env.calendar.roll_forward
+        return [
+            _day_string(roll(_day_ordinal(day) + days)) if day is not None and days is not None else None
+            for day, days in zip(ctx.columns[self.date_column], ctx.columns[self.days_column])
+        ]
+
+
+@dataclass(frozen=True)
+class DayString:
+    """YYYY-MM-DD of the day ordinals in column."""
+    column: str
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        return list(map(_day_string, ctx.columns[self.column]))
+
+
+@dataclass(frozen=True)
+class ForeignKey:
+    """A column of a random row of a parent table (optionally of the rows where(row) holds).
+
+    None when no parent row qualifies.
+    """
+    table: str
+    column: str
+    where: Optional[Callable[[Dict], bool]] = None
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        parent = ctx.parents[self.table]
+        values = parent[self.column]
+        rows = range(len(values))
+        if self.where is not None:
+            names = list(parent)
+            rows = [i for i, row in enumerate(zip(*parent.values())) if self.where(dict(zip(names, row)))]
+        if not rows:
+            return [None] * ctx.n
+        return [values[rows[i]] for i in ctx.rng.ints(0, len(rows) - 1, ctx.n)]
+
+
+@dataclass(frozen=True)
+class ParentLookup:
+    """column of the parent row whose key equals this row's on column."""
+    table: str
+    column: str
+    key: str
+    on: str
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        parent = ctx.parents[self.table]
+        lookup = dict(zip(parent[self.key], parent[self.column]))
+        return list(map(lookup.__getitem__, ctx.columns[self.on]))
+
+
+@dataclass(frozen=True)
+class Derived:
+    """fn applied row by row to the values of the columns in depends_on."""
+    fn: Callable[..., Any]
+    depends_on: Tuple[str, ...]
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return list(map(self.fn, *(ctx.columns[name] for name in self.depends_on)))
+
+
+@dataclass(frozen=True)
+class ColumnFn:
+    """fn(ctx, *columns) computing a whole column from the columns in depends_on."""
+    fn: Callable[..., List[Any]]
+    depends_on: Tuple[str, ...] = ()
+
+    def sample(self, ctx: SpecContext) -> List[Any]:
+        return self.fn(ctx, *(ctx.columns[name] for name in self.depends_on))
+
+
+@dataclass(frozen=True)
+class Template:
+    """str.format of pattern with the row's values of the columns it names."""
+    pattern: str
+
+    @property
+    def depends_on(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(name for _, name, _, _ in string.Formatter().parse(self.pattern) if name))
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        # Format positionally: the pattern with each named field replaced by its column's position
+        names = self.depends_on
+        positional = "".join(
+            literal.replace("{", "{{").replace("}", "}}")
+            + ("" if name is None else "{%d%s%s}" % (names.index(name), "!" + conversion if conversion else "",
+                                                      ":" + spec if spec else ""))
+            for literal, name, spec, conversion in string.Formatter().parse(self.pattern))
+        return list(map(positional.format, *(ctx.columns[name] for name in names)))
+
+
+@dataclass(frozen=True)
+class Numbered:
+    """Row numbers formatted with pattern ({n} starts at 1, {project} is the project), assigned in date order."""
+    pattern: str
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        return [self.pattern.format(n=i + 1, project=ctx.project) for i in range(ctx.n)]
+
+
+@dataclass(frozen=True)
+class RecordIds:
+    """Record IDs from the table's ID allocator, one block per draw."""
+
+    def sample(self, ctx: SpecContext) -> List[str]:
+        return ctx.env.ids.take(ctx.n)
+
+
+def _dependencies(dist: Any) -> Tuple[str, ...]:
+    """Columns of the same rows a distribution reads."""
+    names = list(getattr(dist, "depends_on", ()))
+    for attr in ("date_column", "days_column", "on", "low", "high", "values"):
+        value = getattr(dist, attr, None)
+        if isinstance(value, str):
+            names.append(value)
+    if isinstance(dist, (PickFrom, Lookup, DayString)):
+        names.append(dist.column)
+    return tuple(names)
+
+
+# =============================================================================
+# SPECS
+# =============================================================================
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    kind: str           # TABLE_SCHEMAS type: string, category, date, int, float, bool, list, json
+    dist: Any           # a distribution (see above)
+    output: bool = True # False for helper columns other columns derive from
+
+
+@dataclass(frozen=True)
+class Workdays:
+    """A frame of count(project) working days from the project start.
+
+    Gives frame columns day (ordinal), day_index and phase (day_index /
+    count). With block set, days are drawn block days at a time, each block
+    from its own stream (SpecEnv.block_rng).
+    """
+    count: Callable[[Dict], int]
+    block: Optional[int] = None
+
+
+FRAME_COLUMNS = ("day", "day_index", "phase")
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """A per-project table: how many rows, which columns, and how they are drawn.
+
+    Either rows(project, rng) gives the row count, or frame gives one row
+    per working day; frame_columns are drawn per day, and repeat names the
+    frame column holding each day's row count. Columns are drawn in order,
+    so a column can depend on any column before it (frame columns
+    included). Rows of non-frame tables are sorted by date_column (used for
+    --through windows and partitioning), then Numbered columns are
+    assigned. output gives the written columns in order (default: the
+    output columns as declared). parents lists the tables ForeignKey and
+    ParentLookup columns refer to.
+    """
+    name: str
+    columns: Tuple[Column, ...]
+    date_column: Optional[str] = None
+    rows: Optional[Callable[[Dict, ColumnRNG], int]] = None
+    frame: Optional[Workdays] = None
+    frame_columns: Tuple[Column, ...] = ()
+    repeat: Optional[str] = None
+    parents: Tuple[str, ...] = ()
+    output: Tuple[str, ...] = ()
+
+    def output_columns(self) -> Tuple[str, ...]:
+        return self.output or tuple(column.name for column in self.frame_columns + self.columns if column.output)
+
+    def schema(self) -> Dict[str, str]:
+        kinds = {column.name: column.kind for column in self.frame_columns + self.columns}
+        return {name: kinds[name] for name in self.output_columns()}
+
+
+def check_table_spec(spec: TableSpec, parent_tables: Sequence[str] = ()) -> TableSpec:
+    """Check that a spec's columns only read earlier columns and known parent tables; returns spec."""
+    if (spec.rows is None) == (spec.frame is None):
+        raise ValueError(f"{spec.name}: give exactly one of rows and frame")
+    if spec.frame is None and spec.frame_columns:
+        raise ValueError(f"{spec.name}: frame columns need a frame")
+    known = list(FRAME_COLUMNS) if spec.frame is not None else []
+    for column in spec.frame_columns + spec.columns:
+        for dependency in _dependencies(column.dist):
+            if dependency not in known:
+                raise ValueError(f"{spec.name}.{column.name} depends on {dependency}, which is not an earlier column")
+        if isinstance(column.dist, (ForeignKey, ParentLookup)) and column.dist.table not in spec.parents:
+            raise ValueError(f"{spec.name}.{column.name}: {column.dist.table} is not in parents")
+        if isinstance(column.dist, Numbered) and spec.frame is not None:
+            raise ValueError(f"{spec.name}.{column.name}: Numbered columns need a rows table")
+        known.append(column.name)
+    if spec.repeat is not None and spec.repeat not in [column.name for column in spec.frame_columns]:
+        raise ValueError(f"{spec.name}: repeat column {spec.repeat} is not a frame column")
+    for name in spec.output_columns() + ((spec.date_column,) if spec.date_column else ()):
+        if name not in known:
+            raise ValueError(f"{spec.name}: {name} is not a column")
+    for parent in spec.parents:
+        if parent not in parent_tables:
+            raise ValueError(f"{spec.name}: unknown parent table {parent}")
+    return spec
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+def _draw(spec: TableSpec, env: SpecEnv, rng: random.Random,
+          frame: Optional[Tuple[Sequence[int], int, int]] = None) -> Dict[str, List]:
+    """Draw one block of a table: all rows, or the rows of frame (days, first day index, frame length)."""
+    ctx = SpecContext(env, ColumnRNG(rng))
+    if frame is None:
+        ctx.n = spec.rows(env.project, ctx.rng)
+    else:
+        days, offset, total = frame
+        ctx.n = ctx.frame_rows = len(days)
+        day_index = list(range(offset, offset + len(days)))
+        ctx.columns.update(day=list(days), day_index=day_index, phase=[i / total for i in day_index])
+        for column in spec.frame_columns:
+            ctx.columns[column.name] = column.dist.sample(ctx)
+        if spec.repeat is not None:
+            counts = ctx.columns[spec.repeat]
+            ctx.frame_index = [f for f, count in enumerate(counts) for _ in range(count)]
+            ctx.slot = [slot for count in counts for slot in range(count)]
+            ctx.columns = {name: list(map(values.__getitem__, ctx.frame_index))
+                           for name, values in ctx.columns.items()}
+            ctx.n = len(ctx.frame_index)
+
+    numbered = []
+    for column in spec.columns:
+        if isinstance(column.dist, Numbered):
+            numbered.append(column)
+        else:
+            ctx.columns[column.name] = column.dist.sample(ctx)
+    if frame is None and spec.date_column is not None:
+        order = sorted(range(ctx.n), key=ctx.columns[spec.date_column].__getitem__)
+        ctx.columns = {name: list(map(values.__getitem__, order)) for name, values in ctx.columns.items()}
+    for column in numbered:
+        ctx.columns[column.name] = column.dist.sample(ctx)
+    return {name: ctx.columns[name] for name in spec.output_columns()}
+
+
+def concat_columns(parts: Sequence[Dict[str, List]]) -> Dict[str, List]:
+    """Column dicts with the same columns joined end to end."""
+    if len(parts) == 1:
+        return parts[0]
+    return {name: [value for part in parts for value in part[name]] for name in (parts[0] if parts else {})}
+
+
+def generate_columns(spec: TableSpec, env: SpecEnv, progress: Optional[Dict] = None,
+                     through_day: Optional[int] = None) -> Dict[str, List]:
+    """A project's rows of spec, as a dict of output column lists.
+
+    Frame tables with blocks stop after the block holding through_day (an
+    ordinal) without drawing later blocks; rows of that block after
+    through_day are the caller's to drop. progress["block"] is the block to
+    continue from and progress["ids"] the IDs issued before it, so a later
+    call with the same progress and an ID allocator started at
+    progress["ids"] redraws that block identically and carries on;
+    progress["done"] is set once the frame is exhausted.
+    """
+    if spec.frame is None:
+        return _draw(spec, env, env.rng)
+    total = spec.frame.count(env.project)
+    days = env.calendar.workdays(env.start_date, total)
+    block = spec.frame.block or max(total, 1)
+    progress = progress if progress is not None else {}
+    parts = []
+    for number in range(progress.get("block", 0), -(-total // block)):
+        block_days = days[number * block:(number + 1) * block]
+        if through_day is not None and block_days[0] > through_day:
+            break
+        progress["block"], progress["ids"] = number, env.ids.issued if env.ids is not None else 0
+        rng = env.block_rng(number) if spec.frame.block else env.rng
+        parts.append(_draw(spec, env, rng, (block_days, number * block, total)))
+        if through_day is not None and block_days[-1] > through_day:
+            break
+    progress["done"] = not days or through_day is None or days[-1] <= through_day
+    return concat_columns(parts) if parts else {name: [] for name in spec.output_columns()}
+
+
+def table_columns(records: Sequence[Dict]) -> Dict[str, List]:
+    """Column dict of a list of records (e.g. a parent table given as rows)."""
+    return {name: [record[name] for record in records] for name in (records[0] if records else {})}
+
+
+def column_records(columns: Dict[str, List]) -> List[Dict]:
+    """Records of a column dict, keys in column order."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+TABLE_SPECS: Dict[str, TableSpec] = {}
+
+# Per-project tables spec tables can reference with ForeignKey
+BASE_PARENT_TABLES = ("contracts", "sov")
+
+
+def register_table_spec(spec: TableSpec) -> TableSpec:
+    """Add a spec to TABLE_SPECS after checking its columns and parent tables."""
+    if spec.name in TABLE_SPECS:
+        raise ValueError(f"Table spec {spec.name} is already registered")
+    if spec.date_column is None:
+        raise ValueError(f"{spec.name}: extra tables need a date column")
+    TABLE_SPECS[spec.name] = check_table_spec(spec, BASE_PARENT_TABLES + tuple(TABLE_SPECS))
+    return spec
+
+
+def resolve_specs(names: Sequence[str]) -> List[TableSpec]:
+    """Specs for names plus the spec tables they depend on, parents first."""
+    resolved = []
+
+    def add(name: str):
+        if name not in TABLE_SPECS:
+            raise ValueError(f"Unknown spec table: {name} (known: {', '.join(TABLE_SPECS)})")
+        for parent in TABLE_SPECS[name].parents:
+            if parent in TABLE_SPECS:
+                add(parent)
+        if TABLE_SPECS[name] not in resolved:
+            resolved.append(TABLE_SPECS[name])
+
+    for name in names:
+        add(name)
+    return resolved
+
+
+# =============================================================================
+# TABLES
+# =============================================================================
+
+SPEC_SECTIONS = {
+    "23 05 13": "Motors for HVAC Equipment",
+    "23 05 93": "Testing, Adjusting and Balancing",
+    "23 07 13": "Duct Insulation",
+    "23 09 23": "Direct Digital Control System",
+    "23 21 13": "Hydronic Piping",
+    "23 31 13": "Metal Ducts",
+    "23 33 00": "Air Duct Accessories",
+    "23 37 13": "Diffusers, Registers and Grilles",
+    "23 64 23": "Scroll Water Chillers",
+    "23 74 13": "Packaged Rooftop Air-Conditioning Units",
+    "23 82 19": "Fan Coil Units",
+}
+
+register_table_spec(TableSpec(
+    name="submittals",
+    rows=lambda project, rng: rng.randint(2, 4) * project["duration_months"],
+    date_column="date_submitted",
+    parents=("sov",),
+    columns=(
+        Column("project_id", "category", ProjectField("id")),
+        Column("submittal_number", "string", Numbered("SUB-{n:03d}")),
+        Column("spec_section", "category", Choice(list(SPEC_SECTIONS))),
+        Column("sov_line_id", "category", ForeignKey("sov", "sov_line_id")),
+        Column("document", "category", Choice(["Product Data", "Shop Drawings", "Samples", "O&M Manual",
+                                               "Warranty", "Coordination Drawings"]), output=False),
+        Column("description", "string", Derived(lambda section, document: SPEC_SECTIONS[section] + " - " + document,
+                                                ("spec_section", "document"))),
+        Column("date_submitted", "date", ProjectDate(0.02, 0.70)),
+        Column("review_days", "int", Choice([5, 7, 10, 14, 21], [0.1, 0.3, 0.3, 0.2, 0.1])),
+        Column("date_returned", "date", DateAfter("date_submitted", "review_days")),
+        Column("status", "category", Choice(["Approved", "Approved as Noted", "Revise and Resubmit", "Rejected"],
+                                            [0.45, 0.35, 0.15, 0.05])),
+        Column("resubmit_count", "int", Choice([1, 1, 2]), output=False),
+        Column("resubmittals", "int", Derived(lambda status, count: 0 if status.startswith("Approved") else count,
+                                              ("status", "resubmit_count"))),
+        Column("reviewer", "category", Choice(["Architect", "MEP Engineer", "Owner's Rep"], [0.3, 0.6, 0.1])),
+    ),
+))
+
+EQUIPMENT_TYPES = {
+    "RTU": "Rooftop Unit", "AHU": "Air Handling Unit", "FCU": "Fan Coil Unit",
+    "EF": "Exhaust Fan", "CH": "Chiller", "B": "Boiler", "P": "Pump", "VRF": "VRF Condensing Unit",
+}
+
+STARTUP_DEFICIENCIES = [
+    "Belt tension out of spec", "Low refrigerant charge", "Controls point not mapped",
+    "Reversed fan rotation", "Condensate drain not trapped", "High static pressure",
+    "Damper actuator not stroking", "Missing disconnect label",
+]
+
+register_table_spec(TableSpec(
+    name="equipment_startup",
+    rows=lambda project, rng: rng.randint(3, 6) + project["floors"] // 2,
+    date_column="date",
+    parents=("submittals",),
+    columns=(
+        Column("project_id", "category", ProjectField("id")),
+        Column("startup_id", "string", Numbered("SU-{n:03d}")),
+        Column("equipment_type", "category", Choice(list(EQUIPMENT_TYPES), [3, 2, 4, 3, 0.5, 0.5, 1.5, 1])),
+        Column("unit", "int", IntRange(1, 12), output=False),
+        Column("equipment_tag", "string", Template("{equipment_type}-{unit}")),
+        Column("submittal_number", "string",
+               ForeignKey("submittals", "submittal_number", where=lambda row: row["status"].startswith("Approved"))),
+        Column("date", "date", ProjectDate(0.75, 0.97)),
+        Column("technician", "category", Choice(["Factory Rep", "Controls Tech", "Service Tech", "Foreman"])),
+        Column("supply_air_temp_f", "float", Uniform(52.0, 58.0, 1)),
+        Column("static_pressure_in_wc", "float", Uniform(0.4, 2.5, 2)),
+        Column("run_hours", "int", IntRange(1, 8)),
+        Column("result", "category", Choice(["Pass", "Pass with Deficiencies", "Fail - Retest"], [0.7, 0.22, 0.08])),
+        Column("possible_deficiency", "string", Choice(STARTUP_DEFICIENCIES), output=False),
+        Column("deficiency", "string", Derived(lambda result, deficiency: None if result == "Pass" else deficiency,
+                                               ("result", "possible_deficiency"))),
+    ),
+))
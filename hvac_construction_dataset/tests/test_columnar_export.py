@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+import columnar_export
+from columnar_export import Categorical, read_columnar, read_npz_table
+from generate_hvac_dataset import DatasetWriter, main
+from table_sinks import iter_ndjson
+
+
+def npz_records(path):
+    columns = read_npz_table(path)
+    columns = {name: values.decode() if isinstance(values, Categorical) else values
+               for name, values in columns.items()}
+    names = list(columns)
+    rows = []
+    for values in zip(*columns.values()):
+        row = {}
+        for name, value in zip(names, values):
+            if isinstance(value, np.datetime64):
+                value = None if np.isnat(value) else str(value)
+            elif isinstance(value, np.generic):
+                value = value.item()
+            row[name] = None if isinstance(value, float) and np.isnan(value) else value
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def columnar_dataset(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("columnar"))
+    formats = ["ndjson", "npz"] + (["parquet"] if columnar_export.pa is not None else [])
+    main(output_dir=output_dir, formats=formats, scale=0.4)
+    return output_dir
+
+
+@pytest.mark.parametrize("table_name", ["labor_logs", "change_orders", "rfis", "bid_estimates"])
+def test_npz_round_trip(columnar_dataset, table_name):
+    expected = list(iter_ndjson(os.path.join(columnar_dataset, f"{table_name}.ndjson")))
+    assert npz_records(os.path.join(columnar_dataset, f"{table_name}.npz")) == expected
+
+
+def test_parquet_round_trip(columnar_dataset):
+    pytest.importorskip("pyarrow")
+    expected = list(iter_ndjson(os.path.join(columnar_dataset, "change_orders.ndjson")))
+    table = read_columnar(os.path.join(columnar_dataset, "change_orders.parquet"))
+    records = [{name: str(value) if name == "date_submitted" else value for name, value in row.items()}
+               for row in table.to_pylist()]
+    assert records == expected
+
+
+def test_fallback_writes_one_npz_per_table_and_warns_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar_export, "pa", None)
+    with pytest.warns(RuntimeWarning, match="npz instead of parquet") as warned:
+        writer = DatasetWriter(str(tmp_path), ["parquet", "npz"])
+    writer.close()
+    assert len(warned) == 1
+    assert all(len(sinks) == 1 for sinks in writer.columnar_sinks.values())
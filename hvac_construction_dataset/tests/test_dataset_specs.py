@@ -0,0 +1,88 @@
+import random
+from datetime import date
+
+import pytest
+
+from dataset_specs import (
+    CALENDAR_MODES, CHANGE_ORDER_TEXT, CONSTRUCTION_HOLIDAYS, FIELD_NOTE_TEXT, HOLIDAY_RULES, RFI_SUBJECT_TEXT,
+    IdAllocator, permute_id, work_calendar,
+)
+
+TEMPLATE_SETS = {"field_notes": FIELD_NOTE_TEXT, "rfis": RFI_SUBJECT_TEXT, "change_orders": CHANGE_ORDER_TEXT}
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATE_SETS))
+def test_templates_render_as_str_format(name):
+    templates, rng = TEMPLATE_SETS[name], random.Random(1)
+    for _ in range(500):
+        template_id, indices = templates.sample(rng)
+        values = {slot: templates.slots[slot][i] for slot, i in zip(templates.slot_names(template_id), indices)}
+        assert templates.render(template_id, indices) == templates.templates[template_id].format(**values)
+
+
+def test_render_batch_follows_the_rng():
+    first = FIELD_NOTE_TEXT.render_batch(random.Random(7), 200)
+    assert FIELD_NOTE_TEXT.render_batch(random.Random(7), 200) == first
+    assert FIELD_NOTE_TEXT.render_batch(random.Random(8), 200) != first
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATE_SETS))
+def test_codes_decode_to_what_was_encoded(name):
+    templates, rng = TEMPLATE_SETS[name], random.Random(1)
+    for _ in range(500):
+        template_id, indices = templates.sample(rng)
+        code = templates.encode(template_id, indices)
+        assert code < 1 << 24
+        assert templates.decode(code) == (template_id, indices)
+        assert templates.render_code(code) == templates.render(template_id, indices)
+
+
+def test_ids_are_unique_across_shards_and_follow_the_seed():
+    ids = [i for shard in range(8) for i in IdAllocator(1, "labor_logs", shard).take(2000)]
+    assert len(set(ids)) == len(ids)
+    assert all(len(i) == 12 for i in ids)
+    assert IdAllocator(1, "labor_logs", 3).take(2000) == ids[3 * 2000:4 * 2000]
+    assert IdAllocator(2, "labor_logs", 3).take(2000) != ids[3 * 2000:4 * 2000]
+
+
+def test_ids_resume_and_iterate_like_take():
+    allocator = IdAllocator(1, "rfis", 5, block_size=7)
+    first = [next(allocator) for _ in range(10)]
+    resumed = IdAllocator(1, "rfis", 5, start=allocator.issued)
+    assert allocator.issued == 10
+    assert first + resumed.take(5) == IdAllocator(1, "rfis", 5).take(15)
+
+
+def test_permute_id_arrays_match_ints():
+    np = pytest.importorskip("numpy")
+    key = IdAllocator(1, "labor_logs").key
+    raw = list(range(1 << 28, (1 << 28) + 1000)) + [(1 << 48) - 1]
+    assert permute_id(np.array(raw, dtype=np.uint64), key).tolist() == [permute_id(r, key) for r in raw]
+
+
+def test_holiday_rules_observe_weekend_dates():
+    assert HOLIDAY_RULES["thanksgiving"](2024) == date(2024, 11, 28)
+    assert HOLIDAY_RULES["day_after_thanksgiving"](2024) == date(2024, 11, 29)
+    assert HOLIDAY_RULES["memorial_day"](2024) == date(2024, 5, 27)
+    assert HOLIDAY_RULES["independence_day"](2026) == date(2026, 7, 3)  # Saturday, observed Friday
+    assert HOLIDAY_RULES["christmas"](2022) == date(2022, 12, 26)  # Sunday, observed Monday
+
+
+def test_calendar_modes_drop_holidays_and_weekends():
+    start = date(2024, 1, 1)
+    year = {mode: work_calendar("Austin, TX", mode).workdays(start, 300) for mode in CALENDAR_MODES}
+    in_2024 = {mode: [day for day in days if date.fromordinal(day).year == 2024] for mode, days in year.items()}
+    assert {mode: len(days) for mode, days in in_2024.items()} == {"weekdays": 262, "holidays": 255, "local": 254}
+    assert all(date.fromordinal(day).weekday() < 5 for day in year["weekdays"])
+    assert date(2024, 6, 19).toordinal() in in_2024["holidays"]
+    assert date(2024, 6, 19).toordinal() not in in_2024["local"]
+    assert work_calendar("Denver, CO", "local").holiday_rules == tuple(CONSTRUCTION_HOLIDAYS + ["cesar_chavez_day"])
+
+
+def test_roll_forward_and_back_skip_holidays():
+    calendar = work_calendar("Boston, MA", "holidays")
+    july_4 = date(2026, 7, 4).toordinal()
+    assert date.fromordinal(calendar.roll_forward(july_4)) == date(2026, 7, 6)
+    assert date.fromordinal(calendar.roll_back(july_4)) == date(2026, 7, 2)
+    with pytest.raises(ValueError, match="Unknown calendar mode"):
+        work_calendar("Boston, MA", "lunar")
@@ -0,0 +1,66 @@
+import os
+import random
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from gemini_synthetic_data_script import (
+    OVERTIME_HOURS, PoolIds, build_value_pools, crew_types, load_value_pools, main,
+)
+
+
+@pytest.fixture(scope="module", params=["vectorized", "rows"])
+def dataset(request):
+    return main(num_projects=4, labor_engine=request.param, pool_size=300, pool_cache_dir=None)
+
+
+def test_labor_logs_cover_each_weekday_with_sov_cost_codes(dataset):
+    df_projects, df_sov, df_labor, df_notes, _ = dataset
+    for project in df_projects.to_dict("records"):
+        logs = df_labor[df_labor["Project_ID"] == project["Project_ID"]]
+        days = [project["Start_Date"] + timedelta(days=offset)
+                for offset in range((project["End_Date"] - project["Start_Date"]).days + 1)]
+        per_day = logs["Date"].value_counts()
+        assert sorted(per_day.index) == [day for day in days if day.weekday() < 5]
+        assert per_day.between(1, 3).all()
+        project_codes = set(df_sov.loc[df_sov["Project_ID"] == project["Project_ID"], "Cost_Code"])
+        assert set(logs["Cost_Code"]) <= project_codes
+    assert set(df_labor["Role"]) <= set(crew_types)
+    assert df_labor["Hours_Regular"].between(4, 8).all()
+    assert set(df_labor["Hours_Overtime"]) <= set(OVERTIME_HOURS)
+    ids = pd.concat([df_sov["SOV_ID"], df_labor["Log_ID"], df_notes["Note_ID"]])
+    assert ids.is_unique
+
+
+def test_the_vectorized_engine_follows_the_seed():
+    first = main(num_projects=2, pool_size=300, pool_cache_dir=None)
+    again = main(num_projects=2, pool_size=300, pool_cache_dir=None)
+    other = main(num_projects=2, seed=7, pool_size=300, pool_cache_dir=None)
+    for frame, same in zip(first, again):
+        pd.testing.assert_frame_equal(frame, same)
+    assert not first[2].equals(other[2])
+
+
+def test_value_pools_are_cached_per_seed_and_size(tmp_path):
+    cache_dir = str(tmp_path)
+    built = load_value_pools(3, 300, cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = load_value_pools(3, 300, cache_dir)
+    fresh = build_value_pools(3, 300)
+    for name in ("first_name", "company", "id"):
+        assert cached[name].tolist() == built[name].tolist() == fresh[name].tolist()
+    assert len(fresh["id"]) == len(set(fresh["id"].tolist()))
+    load_value_pools(4, 300, cache_dir)
+    load_value_pools(3, 200, cache_dir)
+    assert len(os.listdir(cache_dir)) == 3
+    first, _, _, _, _ = main(num_projects=2, seed=3, pool_size=300, pool_cache_dir=cache_dir)
+    assert {name.replace(" HQ HVAC Retrofit", "") for name in first["Project_Name"]} <= set(built["company"].tolist())
+
+
+def test_pool_ids_stay_distinct_past_the_pool():
+    ids = PoolIds(["aaaaaaaa", "bbbbbbbb", "cccccccc"], random.Random(1))
+    taken = ids.take(2) + ids.take(50)
+    assert sorted(taken[:3]) == ["aaaaaaaa", "bbbbbbbb", "cccccccc"]
+    assert len(set(taken)) == 52 and all(len(value) == 8 for value in taken)
+    assert ids.issued == 52
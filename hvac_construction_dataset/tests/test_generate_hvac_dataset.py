@@ -0,0 +1,96 @@
+import csv
+import os
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from dataset_specs import COMPACT_TEXT_COLUMNS, work_calendar
+from generate_hvac_dataset import (
+    CHECKPOINT_FILE, MAX_FLOORS, PROJECT_TYPE_PROFILES, PROJECTS, GenerationOptions, expand_text_codes, main,
+    project_specs,
+)
+from table_sinks import iter_ndjson
+
+
+def output_files(output_dir):
+    files = {}
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, output_dir)] = f.read()
+    return files
+
+
+def csv_rows(output_dir):
+    rows = {}
+    for name in os.listdir(output_dir):
+        if name.endswith(".csv"):
+            with open(os.path.join(output_dir, name), newline="", encoding="utf-8") as f:
+                rows[name] = Counter(map(tuple, csv.reader(f)))
+    return rows
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_output_does_not_depend_on_workers(tmp_path, engine):
+    options = GenerationOptions(labor_engine=engine, billing_engine=engine,
+                                extra_tables=("submittals", "equipment_startup"))
+    for workers in (1, 4):
+        main(workers=workers, output_dir=str(tmp_path / str(workers)), formats=["json", "csv", "ndjson"],
+             options=options)
+    single, pooled = output_files(tmp_path / "1"), output_files(tmp_path / "4")
+    assert single.keys() == pooled.keys()
+    for name in single:
+        assert single[name] == pooled[name], name
+
+
+def test_through_then_append_matches_a_full_run(tmp_path):
+    full, live = str(tmp_path / "full"), str(tmp_path / "live")
+    main(output_dir=full, formats=["csv"], scale=0.4)
+    main(output_dir=live, formats=["csv"], scale=0.4, options=GenerationOptions(through="2024-06-30"))
+    assert os.path.exists(os.path.join(live, CHECKPOINT_FILE))
+    for through in ("2024-11-30", "2030-12-31"):
+        main(output_dir=live, append=True, options=GenerationOptions(through=through))
+    assert csv_rows(live) == csv_rows(full)
+
+
+def test_append_needs_a_later_through(tmp_path):
+    main(output_dir=str(tmp_path), formats=["csv"], scale=0.4, options=GenerationOptions(through="2024-06-30"))
+    with pytest.raises(ValueError, match="after 2024-06-30"):
+        main(output_dir=str(tmp_path), append=True, options=GenerationOptions(through="2024-06-30"))
+
+
+def test_compact_text_expands_to_the_full_text_output(tmp_path):
+    full, compact = str(tmp_path / "full"), str(tmp_path / "compact")
+    main(output_dir=full, formats=["ndjson"], scale=0.4)
+    main(output_dir=compact, formats=["ndjson"], scale=0.4, options=GenerationOptions(compact_text=True))
+    for table_name, (text_column, code_column, _) in COMPACT_TEXT_COLUMNS.items():
+        coded = list(iter_ndjson(os.path.join(compact, f"{table_name}.ndjson")))
+        assert coded and all(code_column in record and text_column not in record for record in coded)
+        expanded = [expand_text_codes(table_name, record) for record in coded]
+        assert expanded == list(iter_ndjson(os.path.join(full, f"{table_name}.ndjson"))), table_name
+
+
+def test_labor_and_field_notes_fall_on_local_working_days(tmp_path):
+    main(output_dir=str(tmp_path), formats=["ndjson"], scale=0.4, options=GenerationOptions(calendar="local"))
+    locations = {p["id"]: p["location"] for p in project_specs(0.4)}
+    for table_name in ("labor_logs", "field_notes"):
+        for record in iter_ndjson(str(tmp_path / f"{table_name}.ndjson")):
+            day = date.fromisoformat(record["date"]).toordinal()
+            assert work_calendar(locations[record["project_id"]], "local").is_workday(day), (table_name, record)
+
+
+def test_scale_adds_synthesized_projects_after_the_built_in_ones():
+    assert list(project_specs(1)) == PROJECTS
+    assert [p["id"] for p in project_specs(0.4)] == [p["id"] for p in PROJECTS[:2]]
+    projects = list(project_specs(20))
+    assert len(projects) == 100 and projects[:len(PROJECTS)] == PROJECTS
+    assert len({p["id"] for p in projects}) == 100
+    # Spec i does not depend on how many projects were asked for, only on the seed
+    assert list(project_specs(40))[:100] == projects
+    assert list(project_specs(20, master_seed=7))[len(PROJECTS):] != projects[len(PROJECTS):]
+    for project in projects[len(PROJECTS):]:
+        profile = PROJECT_TYPE_PROFILES[project["type"]]
+        assert profile["months"][0] <= project["duration_months"] <= profile["months"][1]
+        assert 1 <= project["floors"] <= MAX_FLOORS
@@ -0,0 +1,25 @@
+import os
+
+from generate_hvac_dataset import main
+from hvac_dataset import CACHE_DIR_NAME, HVACDataset
+
+
+def assert_same_table(left, right):
+    # Cached columns are memory-mapped, so compare values and dtypes rather than array classes
+    assert list(left.dtypes.items()) == list(right.dtypes.items())
+    assert left.equals(right)
+
+
+def test_cached_tables_match_a_fresh_parse(tmp_path):
+    output_dir = str(tmp_path)
+    main(output_dir=output_dir, formats=["csv", "ndjson"], scale=0.4)
+    first = HVACDataset(output_dir).load_all()
+    assert os.listdir(os.path.join(output_dir, CACHE_DIR_NAME))
+
+    reloaded = HVACDataset(output_dir)
+    fresh = HVACDataset(output_dir, cache=False)
+    assert reloaded.tables == fresh.tables
+    for table_name in fresh.tables:
+        assert_same_table(reloaded.table(table_name), fresh.table(table_name))
+        assert_same_table(first[table_name], fresh.table(table_name))
+        assert reloaded.schema(table_name) == fresh.schema(table_name)
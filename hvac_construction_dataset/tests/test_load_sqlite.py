@@ -0,0 +1,57 @@
+import ast
+import csv
+import os
+import sqlite3
+
+import pytest
+
+from generate_hvac_dataset import main
+from load_sqlite import CO_SOV_TABLE, SQLITE_TABLES, iter_csv_rows, iter_generated_rows, load_database
+
+
+@pytest.fixture(scope="module")
+def csv_dataset(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("csv"))
+    main(output_dir=output_dir, formats=["csv"], scale=0.4)
+    return output_dir
+
+
+def csv_tables(output_dir):
+    return [table_name for table_name in SQLITE_TABLES if os.path.exists(os.path.join(output_dir, f"{table_name}.csv"))]
+
+
+def read_csv(output_dir, table_name):
+    with open(os.path.join(output_dir, f"{table_name}.csv"), newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def table_rows(db_path, table_name):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(conn.execute(f'SELECT * FROM "{table_name}"'), key=repr)
+
+
+def test_csv_load_counts_every_row_and_sov_link(csv_dataset, tmp_path):
+    db_path = str(tmp_path / "hvac.db")
+    # Small batches, so tables are flushed many times
+    counts = load_database(db_path, iter_csv_rows(csv_dataset), batch_rows=100)
+    for table_name in csv_tables(csv_dataset):
+        assert counts[table_name] == len(read_csv(csv_dataset, table_name)), table_name
+    links = [(co["project_id"], co["co_number"], sov_line_id, i) for co in read_csv(csv_dataset, "change_orders")
+             for i, sov_line_id in enumerate(ast.literal_eval(co["affected_sov_lines"]))]
+    assert links and counts[CO_SOV_TABLE] == len(links)
+    assert table_rows(db_path, CO_SOV_TABLE) == sorted(links, key=repr)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT DISTINCT typeof(hours_st) FROM labor_logs").fetchall() == [("integer",)]
+        assert conn.execute("SELECT count(*) FROM labor_logs WHERE project_id NOT IN "
+                            "(SELECT project_id FROM contracts)").fetchone() == (0,)
+
+
+def test_generated_load_matches_the_csv_load(csv_dataset, tmp_path):
+    from_csv, generated = str(tmp_path / "csv.db"), str(tmp_path / "generated.db")
+    csv_counts = load_database(from_csv, iter_csv_rows(csv_dataset))
+    generated_counts = load_database(generated, iter_generated_rows(scale=0.4), csv_text=False)
+    # Tables without a CSV form (bid estimates) are only loaded from the generators
+    tables = csv_tables(csv_dataset) + [CO_SOV_TABLE]
+    assert {t: generated_counts[t] for t in tables} == {t: csv_counts[t] for t in tables}
+    for table_name in tables:
+        assert table_rows(generated, table_name) == table_rows(from_csv, table_name), table_name
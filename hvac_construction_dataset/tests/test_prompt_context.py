@@ -0,0 +1,50 @@
+import pytest
+
+from prompt_context import ContextPacker, Scope, estimate_tokens
+
+PROJECT = "PRJ-2024-001"
+SCOPE = Scope("2024-04-01", "2024-06-30", sov_lines=("03", "04"))
+
+
+@pytest.fixture(scope="module")
+def packer():
+    return ContextPacker.from_generated(scale=0.4)
+
+
+@pytest.mark.parametrize("budget", [150, 500, 1500, 4000])
+def test_packs_stay_within_the_budget(packer, budget):
+    for scope in (Scope(), SCOPE):
+        packed = packer.pack(PROJECT, scope, budget)
+        assert packed.tokens == estimate_tokens(packed.text) <= budget
+        assert all(chosen <= in_scope for chosen, in_scope in packed.records.values())
+
+
+def test_a_larger_budget_packs_more_records(packer):
+    small, large = packer.pack(PROJECT, SCOPE, 500), packer.pack(PROJECT, SCOPE, 4000)
+    assert sum(chosen for chosen, _ in large.records.values()) > sum(chosen for chosen, _ in small.records.values())
+    assert {table: in_scope for table, (_, in_scope) in large.records.items()} == \
+        {table: in_scope for table, (_, in_scope) in small.records.items()}
+
+
+def test_projects_are_indexed_once_and_packs_cached():
+    loads = []
+    generated = ContextPacker.from_generated(scale=0.4)
+
+    def load_project(project_id):
+        loads.append(project_id)
+        return generated.load_project(project_id)
+
+    packer = ContextPacker(load_project, cache_size=2)
+    first = packer.pack(PROJECT, SCOPE)
+    assert packer.pack(PROJECT, SCOPE) is first
+    # Scope spellings that resolve to the same SOV lines share a cache entry
+    assert packer.pack(PROJECT, Scope("2024-04-01", "2024-06-30", sov_lines=(3, 4))) is first
+    packer.pack(PROJECT, Scope())
+    packer.pack(PROJECT, SCOPE, budget=500)
+    again = packer.pack(PROJECT, SCOPE)
+    assert again is not first and again == first
+    packer.cache_clear()
+    assert packer.pack(PROJECT, SCOPE) == first
+    assert loads == [PROJECT]
+    with pytest.raises(ValueError, match="Unknown context table"):
+        packer.pack(PROJECT, Scope(tables=("submittals",)))
@@ -0,0 +1,93 @@
+import pickle
+from array import array
+
+from record_buffer import CODE_CHECK_EVERY, CodedColumn, RecordBuffer
+
+
+def roundtrip(records):
+    buffer = RecordBuffer(records)
+    assert list(buffer.records()) == records
+    for stored, record in zip(buffer.records(), records):
+        assert {k: type(v) for k, v in stored.items()} == {k: type(v) for k, v in record.items()}
+    return buffer
+
+
+def test_records_match_appended_dicts():
+    records = [
+        {"id": "a", "n": 1, "x": 1.5, "ok": True, "tags": ["x"]},
+        {"id": "b", "n": -300, "x": 0.0, "ok": False, "tags": []},
+        {"id": "a", "n": 2 ** 40, "x": -2.25, "ok": True, "tags": ["y", "z"]},
+    ]
+    buffer = roundtrip(records)
+    assert len(buffer) == 3
+    assert buffer.names == ["id", "n", "x", "ok", "tags"]
+    assert buffer[1].to_dict() == records[1]
+    assert buffer[-1]["n"] == 2 ** 40
+
+
+def test_missing_keys():
+    records = [{"a": 1, "b": "x"}, {"a": 2}, {"b": "y", "c": 3.0}, {"c": None, "a": 4}]
+    buffer = roundtrip(records)
+    assert buffer.sparse
+    assert "b" not in buffer[1]
+    assert dict(buffer[2]) == records[2]
+
+
+def test_none_in_numeric_columns():
+    records = [{"i": 1, "f": 0.5, "b": True}, {"i": None, "f": None, "b": None}, {"i": 3, "f": 2.0, "b": False}]
+    buffer = roundtrip(records)
+    assert buffer.column("i") == [1, None, 3]
+    assert buffer.column("f", 1) == [None, 2.0]
+
+
+def test_none_before_numbers():
+    roundtrip([{"v": None}, {"v": None}, {"v": 7}, {"v": None}])
+    roundtrip([{"v": None}, {"v": 1.25}])
+
+
+def test_mixed_types_fall_back_to_values():
+    roundtrip([{"v": 1}, {"v": "one"}, {"v": 2.0}, {"v": None}, {"v": True}])
+
+
+def test_strings_demoted_to_record_ids():
+    ids = [f"{n * 7919:012x}" for n in range(CODE_CHECK_EVERY * 2)]
+    records = [{"log_id": value, "project": "P1"} for value in ids] + [{"log_id": None, "project": "P1"}]
+    buffer = roundtrip(records)
+    assert buffer._modes["log_id"] == "id"
+    assert buffer._modes["project"] == "coded"
+
+
+def test_strings_demoted_to_plain_values():
+    records = [{"po": f"PO-{n}"} for n in range(CODE_CHECK_EVERY * 2)]
+    buffer = roundtrip(records)
+    assert buffer._modes["po"] == "object"
+
+
+def test_from_columns_matches_append():
+    columns = {
+        "project_id": CodedColumn(array("B", [0, 0, 1]), ["P1", "P2"]),
+        "log_id": CodedColumn(array("q", [1, 2 ** 40, 3])),
+        "hours": array("b", [8, 8, 10]),
+        "rate": [72.0, 74.5, None],
+        "note": ["a", None, "c"],
+    }
+    records = [
+        {"project_id": "P1", "log_id": "000000000001", "hours": 8, "rate": 72.0, "note": "a"},
+        {"project_id": "P1", "log_id": "010000000000", "hours": 8, "rate": 74.5, "note": None},
+        {"project_id": "P2", "log_id": "000000000003", "hours": 10, "rate": None, "note": "c"},
+    ]
+    assert list(RecordBuffer.from_columns(columns).records()) == records
+    assert list(RecordBuffer.from_columns(columns).take([2, 0]).records()) == [records[2], records[0]]
+
+
+def test_pickle_roundtrip():
+    records = ([{"id": f"{n:012x}", "role": "Foreman" if n % 3 else None, "hours": n % 12, "rate": n / 4}
+                for n in range(CODE_CHECK_EVERY + 10)]
+               + [{"id": "not-an-id", "hours": None, "extra": [1, 2]}])
+    buffer = RecordBuffer(records)
+    restored = pickle.loads(pickle.dumps(buffer))
+    assert list(restored.records()) == list(buffer.records()) == records
+    # The value -> code maps are rebuilt, so the copy keeps growing like the original
+    restored.append({"id": "x", "role": "Foreman", "hours": 1, "rate": 0.5})
+    buffer.append({"id": "x", "role": "Foreman", "hours": 1, "rate": 0.5})
+    assert list(restored.records()) == list(buffer.records())
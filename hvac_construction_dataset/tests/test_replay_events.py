@@ -0,0 +1,26 @@
+import json
+from collections import Counter
+
+from generate_hvac_dataset import flatten_billing_record, main
+from replay_events import EVENT_TABLES, iter_csv_events, iter_generated_events
+
+
+def event_counts(events):
+    return Counter((table, json.dumps(record, sort_keys=True)) for _, table, record in events)
+
+
+def test_csv_events_match_generated_events(tmp_path):
+    main(output_dir=str(tmp_path), formats=["csv"], scale=0.4)
+    generated = ((day, table, flatten_billing_record(record) if table == "billing_history" else record)
+                 for day, table, record in iter_generated_events(scale=0.4))
+    assert event_counts(iter_csv_events(str(tmp_path))) == event_counts(generated)
+
+
+def test_csv_events_are_typed(tmp_path):
+    main(output_dir=str(tmp_path), formats=["csv"], scale=0.4)
+    seen = {}
+    for _, table, record in iter_csv_events(str(tmp_path), EVENT_TABLES):
+        seen.setdefault(table, record)
+    assert isinstance(seen["labor_logs"]["hours_st"], int)
+    assert isinstance(seen["change_orders"]["affected_sov_lines"], list)
+    assert isinstance(seen["rfis"]["cost_impact"], bool)
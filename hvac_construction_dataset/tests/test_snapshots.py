@@ -0,0 +1,62 @@
+import csv
+import os
+import re
+from datetime import date, timedelta
+
+from generate_hvac_dataset import main
+from snapshots import co_decision_days, snapshot_project, write_snapshots
+
+DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+def read_files(output_dir):
+    files = {}
+    for name in os.listdir(output_dir):
+        with open(os.path.join(output_dir, name), "rb") as f:
+            files[name] = f.read()
+    return files
+
+
+def last_date(output_dir):
+    """The latest date in any column of the CSV tables."""
+    days = []
+    for name in os.listdir(output_dir):
+        if name.endswith(".csv"):
+            with open(os.path.join(output_dir, name), newline="", encoding="utf-8") as f:
+                days.extend(cell for row in csv.reader(f) for cell in row if DATE.match(cell))
+    return max(days)
+
+
+def test_snapshot_at_the_end_date_equals_the_base_output(tmp_path):
+    base = str(tmp_path / "base")
+    main(output_dir=base, formats=["csv", "ndjson"], scale=0.4)
+    end = last_date(base)
+
+    single = str(tmp_path / "single")
+    main(output_dir=single, formats=["csv", "ndjson"], scale=0.4, as_of=end)
+    day_before = (date.fromisoformat(end) - timedelta(days=1)).isoformat()
+    write_snapshots([day_before, end], str(tmp_path / "snapshots"), formats=["csv", "ndjson"], scale=0.4)
+
+    expected = read_files(base)
+    assert read_files(single) == expected
+    assert read_files(str(tmp_path / "snapshots" / f"as_of={end}")) == expected
+    assert read_files(str(tmp_path / "snapshots" / f"as_of={day_before}")) != expected
+
+
+def test_change_order_decisions_follow_the_seed():
+    records = [{"project_id": "PRJ-2024-001", "co_number": f"CO-{n:03d}", "date_submitted": "2024-03-01",
+                "status": "Approved", "approved_by": "Owner Rep"} for n in range(1, 21)]
+    assert [co_decision_days(r, 1) for r in records] != [co_decision_days(r, 2) for r in records]
+    # A CO decided within 30 days under one seed but not under the other
+    record = next(r for r in records if (co_decision_days(r, 1) <= 30) != (co_decision_days(r, 2) <= 30))
+    statuses = [next(snapshot_project([("change_orders", record)], "2024-03-31", seed=seed))[1]["status"]
+                for seed in (1, 2)]
+    assert sorted(statuses) == ["Approved", "Under Review"]
+
+
+def test_snapshot_passes_do_not_change_the_output(tmp_path):
+    days = ["2024-06-30", "2024-09-30", "2024-12-31"]
+    write_snapshots(days, str(tmp_path / "one"), formats=["csv"], scale=0.4)
+    write_snapshots(days, str(tmp_path / "many"), formats=["csv"], scale=0.4, max_open=2)
+    for day in days:
+        assert read_files(str(tmp_path / "many" / f"as_of={day}")) == read_files(str(tmp_path / "one" / f"as_of={day}"))
@@ -0,0 +1,72 @@
+import csv
+import os
+
+import pytest
+
+import table_sinks
+from generate_hvac_dataset import main
+from table_sinks import COMPRESSORS, PARTITION_DATE_COLUMNS, iter_ndjson, load_manifest, select_partitions
+
+
+@pytest.fixture(scope="module")
+def plain_ndjson(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("plain"))
+    main(output_dir=output_dir, formats=["ndjson"], scale=0.4)
+    return output_dir
+
+
+@pytest.mark.parametrize("compression", sorted(COMPRESSORS))
+def test_compressed_ndjson_round_trip(plain_ndjson, tmp_path, monkeypatch, compression):
+    # Small chunks, so tables are written as many compressed members across the workers
+    monkeypatch.setattr(table_sinks, "NDJSON_CHUNK_BYTES", 1 << 14)
+    main(output_dir=str(tmp_path), formats=["ndjson"], scale=0.4, compression=compression, compress_workers=2)
+    suffix = COMPRESSORS[compression][0]
+    for name in sorted(os.listdir(plain_ndjson)):
+        if name.endswith(".ndjson"):
+            compressed = os.path.join(str(tmp_path), name + suffix)
+            assert list(iter_ndjson(compressed)) == list(iter_ndjson(os.path.join(plain_ndjson, name))), name
+
+
+def test_partition_manifest_describes_its_files(plain_ndjson, tmp_path):
+    output_dir = str(tmp_path)
+    main(output_dir=output_dir, formats=["ndjson"], scale=0.4, partition=True)
+    manifest = load_manifest(output_dir)
+    # Billing line items stay nested in billing_history in NDJSON
+    assert list(manifest["tables"]) == [table_name for table_name in PARTITION_DATE_COLUMNS
+                                        if os.path.exists(os.path.join(plain_ndjson, f"{table_name}.ndjson"))]
+    for table_name, table in manifest["tables"].items():
+        date_column = table["date_column"]
+        records = []
+        for entry in table["partitions"]:
+            assert entry["path"] == (f"{table_name}/project_id={entry['project_id']}/month={entry['month']}/"
+                                     "part-0.ndjson")
+            rows = list(iter_ndjson(os.path.join(output_dir, entry["path"])))
+            dates = [row[date_column] for row in rows]
+            assert entry["rows"] == len(rows) > 0
+            assert (entry["min_date"], entry["max_date"]) == (min(dates), max(dates))
+            assert {row["project_id"] for row in rows} == {entry["project_id"]}
+            assert {day[:7] for day in dates} == {entry["month"]}
+            records.extend(rows)
+        flat = list(iter_ndjson(os.path.join(plain_ndjson, f"{table_name}.ndjson")))
+        assert sorted(map(repr, records)) == sorted(map(repr, flat)), table_name
+
+
+def test_select_partitions_keeps_every_matching_row(tmp_path):
+    output_dir = str(tmp_path)
+    main(output_dir=output_dir, formats=["csv"], scale=0.4, partition=True)
+    manifest = load_manifest(output_dir)
+    everything = select_partitions(manifest, "labor_logs")
+    selected = select_partitions(manifest, "labor_logs", ["PRJ-2024-002"], "2024-06-15", "2024-08-10")
+    assert [entry["month"] for entry in selected] == ["2024-06", "2024-07", "2024-08"]
+    assert {entry["project_id"] for entry in selected} == {"PRJ-2024-002"}
+
+    def matching(entries):
+        rows = []
+        for entry in entries:
+            with open(os.path.join(output_dir, entry["path"]), newline="", encoding="utf-8") as f:
+                rows.extend(row for row in csv.DictReader(f)
+                            if row["project_id"] == "PRJ-2024-002" and "2024-06-15" <= row["date"] <= "2024-08-10")
+        return rows
+
+    assert matching(selected) == matching(everything) != []
+    assert select_partitions(manifest, "labor_logs", fmt="ndjson") == []
@@ -0,0 +1,25 @@
+import random
+
+from table_specs import ColumnRNG, ForeignKey, SpecContext, SpecEnv
+
+SUBMITTALS = {"submittal_number": ["SUB-001", "SUB-002", "SUB-003"],
+              "status": ["Rejected", "Approved as Noted", "Revise and Resubmit"]}
+
+
+def sample(distribution, parents, n=50):
+    env = SpecEnv(project={"id": "PRJ-TEST"}, rng=random.Random(1), parents=parents)
+    return distribution.sample(SpecContext(env, ColumnRNG(random.Random(1)), n))
+
+
+def test_foreign_key_keeps_to_rows_where_holds():
+    approved = ForeignKey("submittals", "submittal_number", where=lambda row: row["status"].startswith("Approved"))
+    assert set(sample(approved, {"submittals": SUBMITTALS})) == {"SUB-002"}
+    assert set(sample(ForeignKey("submittals", "submittal_number"), {"submittals": SUBMITTALS})) == {
+        "SUB-001", "SUB-002", "SUB-003"}
+
+
+def test_foreign_key_without_a_qualifying_row_is_none():
+    rejected = dict(SUBMITTALS, status=["Rejected"] * 3)
+    approved = ForeignKey("submittals", "submittal_number", where=lambda row: row["status"].startswith("Approved"))
+    assert sample(approved, {"submittals": rejected}, 5) == [None] * 5
+    assert sample(ForeignKey("submittals", "submittal_number"), {"submittals": {"submittal_number": []}}, 2) == [None] * 2
@@ -0,0 +1,56 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from generate_hvac_dataset import main
+from validate_dataset import validate_dataset
+
+
+@pytest.fixture(scope="module")
+def base_dataset(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("base"))
+    main(output_dir=output_dir, formats=["csv"], scale=0.4)
+    return output_dir
+
+
+def edit_table(output_dir, table, edit):
+    path = os.path.join(output_dir, f"{table}.csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    fieldnames = list(rows[0])
+    rows = edit(rows)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def violations(output_dir):
+    report = validate_dataset(output_dir, workers=1)
+    return {check: entry["violations"] for check, entry in report["checks"].items() if entry["violations"]}
+
+
+def test_generated_dataset_is_valid(base_dataset):
+    assert violations(base_dataset) == {}
+
+
+def test_injected_violations_are_flagged(base_dataset, tmp_path):
+    output_dir = str(tmp_path / "broken")
+    shutil.copytree(base_dataset, output_dir)
+
+    def break_labor_logs(rows):
+        rows[0]["project_id"] = "PRJ-0000-000"
+        return rows + [dict(rows[1])]
+
+    def break_sov(rows):
+        rows[0]["scheduled_value"] = str(int(rows[0]["scheduled_value"]) + 1000)
+        return rows
+
+    edit_table(output_dir, "labor_logs", break_labor_logs)
+    edit_table(output_dir, "sov", break_sov)
+    found = violations(output_dir)
+    assert found["labor_logs.project_fk"] == 1
+    assert found["labor_logs.duplicate_id"] == 1
+    assert found["sov.sum_mismatch"] == 1
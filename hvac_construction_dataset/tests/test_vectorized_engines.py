@@ -0,0 +1,82 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from dataset_specs import IdAllocator, table_rng, work_calendar
+from generate_hvac_dataset import generate_billing_history, generate_contract_value, generate_sov, project_specs
+from vectorized_engines import (
+    generate_billing_history_batch, generate_billing_history_numpy, generate_labor_log_columns, labor_log_table,
+)
+
+PROJECT = {"id": "PRJ-TEST", "duration_months": 6, "complexity": "high", "floors": 3}
+
+
+def labor_jobs(line_numbers):
+    sov_lines = [{"line_number": n, "sov_line_id": f"SOV-{n}"} for n in line_numbers]
+    return [(PROJECT, sov_lines, datetime(2024, 1, 1), work_calendar("Dallas, TX"))]
+
+
+def test_labor_lines_come_from_the_project_sov():
+    jobs = labor_jobs([3, 7, 12])
+    columns = generate_labor_log_columns(jobs, np.random.default_rng(1))
+    assert set(columns["line_number"].tolist()) == {3, 7, 12}
+    table = labor_log_table(jobs, columns, [IdAllocator(1, "labor_logs")])
+    for record in table.records():
+        assert record["sov_line_id"] == f"SOV-{record['cost_code']}"
+
+
+def test_labor_line_outside_the_sov_is_rejected():
+    jobs = labor_jobs([3, 7, 12])
+    columns = generate_labor_log_columns(jobs, np.random.default_rng(1))
+    columns["line_number"][5] = 5
+    with pytest.raises(ValueError, match="SOV line 5"):
+        labor_log_table(jobs, columns, [IdAllocator(1, "labor_logs")])
+
+
+def billing_jobs():
+    jobs = []
+    for project in project_specs(1):
+        contract = generate_contract_value(project, table_rng(1, project["id"], "contracts"))
+        sov_lines = generate_sov(project, contract["original_contract_value"], table_rng(1, project["id"], "sov"))
+        jobs.append((project, sov_lines, datetime.strptime(contract["contract_date"], "%Y-%m-%d"),
+                     work_calendar(project["location"], "holidays")))
+    return jobs
+
+
+def test_billing_records_keep_the_pay_application_invariants():
+    jobs = billing_jobs()
+    per_job = generate_billing_history_batch(jobs, [np.random.default_rng(j) for j in range(len(jobs))])
+    for (project, sov_lines, start_date, calendar), records in zip(jobs, per_job):
+        scheduled = {line["sov_line_id"]: line["scheduled_value"] for line in sov_lines}
+        python_layout = next(iter(generate_billing_history(project, sov_lines, sum(scheduled.values()), start_date,
+                                                           random.Random(1), calendar)))
+        assert records
+        billed = dict.fromkeys(scheduled, 0)
+        previous_end = ""
+        for record in records:
+            assert record.keys() == python_layout.keys()
+            assert record["project_id"] == project["id"]
+            assert record["period_end"] > previous_end
+            assert calendar.is_workday(datetime.strptime(record["period_end"], "%Y-%m-%d").toordinal())
+            previous_end = record["period_end"]
+            assert record["period_total"] == sum(item["this_period"] for item in record["line_items"]) > 0
+            for item in record["line_items"]:
+                assert item["previous_billed"] == billed[item["sov_line_id"]]
+                assert item["total_billed"] == item["previous_billed"] + item["this_period"]
+                assert item["total_billed"] + item["balance_to_finish"] == scheduled[item["sov_line_id"]]
+                assert item["balance_to_finish"] >= 0 and item["this_period"] % 100 == 0
+                billed[item["sov_line_id"]] = item["total_billed"]
+            assert record["cumulative_billed"] == sum(billed.values())
+            assert record["retention_held"] == pytest.approx(record["cumulative_billed"] * 0.10)
+            assert record["net_payment_due"] == pytest.approx(record["cumulative_billed"] * 0.90)
+        assert records[-1]["status"] == "Pending"
+
+
+def test_billing_batches_match_single_projects():
+    jobs = billing_jobs()
+    batch = generate_billing_history_batch(jobs, [np.random.default_rng(j) for j in range(len(jobs))])
+    for j, (project, sov_lines, start_date, calendar) in enumerate(jobs):
+        single = generate_billing_history_numpy(project, sov_lines, start_date, np.random.default_rng(j), calendar)
+        assert list(single) == batch[j]
@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""
+Streaming referential-integrity validator for the HVAC construction dataset.
+
+Checks the guarantees the README makes about a dataset written by
+generate_hvac_dataset.py: every foreign key (project, SOV line, related RFI,
+pay application, and the submittal and SOV references of --extra-tables
+tables) resolves, primary keys are unique, SOV lines sum to the
+contract value, billing never exceeds scheduled values, retention and net
+payment follow from cumulative billing, pay applications chain, and dated
+records do not precede their contract or the records they refer to. See
+CHECKS for the full list.
+
+Reads csv or ndjson output, flat or --partition layouts (via _manifest.json),
+compressed or not, streaming each table once:
+
+1. contracts, SOV and RFIs (small) are read into hash indexes keyed by
+   project;
+2. the other tables are split into tasks - partition files, and byte ranges
+   of large uncompressed files - checked row by row on a process pool.
+   Primary keys are spooled to temporary files bucketed by hash, and pay
+   applications are reduced to one small tuple each;
+3. the key buckets are sorted and scanned for duplicates, and pay
+   applications are checked against each other and their line items.
+
+Memory stays bounded by the indexes, one task's rows and one key bucket,
+however many labor log rows there are. The result is a JSON report of
+violation counts and the first few examples per check.
+
+    python validate_dataset.py --input-dir ./out
+    python validate_dataset.py --input-dir ./out --format ndjson --workers 8 --report violations.json
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+from generate_hvac_dataset import table_schema
+from table_sinks import MANIFEST_FILE, csv_records, load_manifest, open_ndjson, table_files
+
+# Check name -> what a violation means
+CHECKS = {
+    "contracts.duplicate_project": "project_id appears in more than one contract",
+    "contracts.completion_before_start": "substantial_completion_date is not after contract_date",
+    "contracts.retention_pct": "retention_pct is outside [0, 1)",
+    "sov.project_fk": "project_id has no contract",
+    "sov.duplicate_line": "sov_line_id appears more than once",
+    "sov.negative_value": "scheduled_value is negative",
+    "sov.sum_mismatch": "a project's scheduled values do not sum to its contract value",
+    "sov.missing": "a contract has no SOV lines",
+    "rfis.project_fk": "project_id has no contract",
+    "rfis.duplicate_number": "rfi_number appears more than once in a project",
+    "rfis.date_before_contract": "date_submitted is before the contract date",
+    "rfis.date_order": "date_required or date_responded is before date_submitted",
+    "labor_logs.project_fk": "project_id has no contract",
+    "labor_logs.sov_fk": "sov_line_id is not an SOV line of the project",
+    "labor_logs.cost_code": "cost_code is not the SOV line's line_number",
+    "labor_logs.hours": "hours_st/hours_ot are negative or add up to more than 24",
+    "labor_logs.date_before_contract": "date is before the contract date",
+    "labor_logs.duplicate_id": "log_id appears more than once",
+    "material_deliveries.project_fk": "project_id has no contract",
+    "material_deliveries.sov_fk": "sov_line_id is not an SOV line of the project",
+    "material_deliveries.total_cost": "total_cost is not quantity x unit_cost (within rounding)",
+    "material_deliveries.date_before_contract": "date is before the contract date",
+    "material_deliveries.duplicate_id": "delivery_id appears more than once",
+    "field_notes.project_fk": "project_id has no contract",
+    "field_notes.date_before_contract": "date is before the contract date",
+    "field_notes.duplicate_id": "note_id appears more than once",
+    "change_orders.project_fk": "project_id has no contract",
+    "change_orders.sov_fk": "an affected_sov_lines entry is not an SOV line of the project",
+    "change_orders.rfi_fk": "related_rfi is not an RFI of the project",
+    "change_orders.rfi_after_co": "related_rfi was submitted after the change order",
+    "change_orders.date_before_contract": "date_submitted is before the contract date",
+    "change_orders.duplicate_number": "co_number appears more than once in a project",
+    "billing_history.project_fk": "project_id has no contract",
+    "billing_history.retention": "retention_held is not cumulative_billed x retention_pct",
+    "billing_history.net_payment": "net_payment_due is not cumulative_billed - retention_held",
+    "billing_history.over_contract": "cumulative_billed exceeds the contract value",
+    "billing_history.cumulative_chain": "cumulative_billed is not the previous application's plus period_total",
+    "billing_history.period_order": "period_end is not after the previous application's",
+    "billing_history.payment_before_period": "payment_date is before period_end",
+    "billing_history.date_before_contract": "period_end is before the contract date",
+    "billing_history.duplicate_application": "application_number appears more than once in a project",
+    "billing_history.line_total": "the line items' this_period do not sum to period_total",
+    "billing_history.line_count": "line_item_count is not the number of line items",
+    "billing_line_items.application_fk": "no pay application matches project_id/application_number",
+    "billing_line_items.sov_fk": "sov_line_id is not an SOV line of the project",
+    "billing_line_items.scheduled_value": "scheduled_value is not the SOV line's",
+    "billing_line_items.over_scheduled": "total_billed exceeds scheduled_value",
+    "billing_line_items.running_total": "previous_billed + this_period is not total_billed",
+    "billing_line_items.balance": "balance_to_finish is not scheduled_value - total_billed",
+    "bid_estimates.project_fk": "project_id has no contract",
+    "submittals.project_fk": "project_id has no contract",
+    "submittals.sov_fk": "sov_line_id is not an SOV line of the project",
+    "submittals.duplicate_number": "submittal_number appears more than once in a project",
+    "submittals.date_before_contract": "date_submitted is before the contract date",
+    "submittals.date_order": "date_returned is before date_submitted",
+    "equipment_startup.project_fk": "project_id has no contract",
+    "equipment_startup.submittal_fk": "submittal_number is not a submittal of the project",
+    "equipment_startup.unapproved_submittal": "submittal_number refers to a submittal that was not approved",
+    "equipment_startup.date_before_contract": "date is before the contract date",
+    "equipment_startup.duplicate_id": "startup_id appears more than once in a project",
+}
+
+# Tables read into the indexes, then the tables checked on the pool. submittals
+# and equipment_startup are only there when written with --extra-tables.
+INDEX_TABLES = ["contracts", "sov", "rfis", "submittals"]
+STREAMED_TABLES = ["labor_logs", "material_deliveries", "field_notes", "change_orders",
+                   "billing_history", "billing_line_items", "bid_estimates", "equipment_startup"]
+
+# Tables whose CSV cells never hold a newline (no free text), so their files
+# can be split at line boundaries. NDJSON lines never hold one.
+LINE_SAFE_CSV_TABLES = ["labor_logs", "material_deliveries", "billing_history", "billing_line_items"]
+
+# table -> (duplicate check, key function) for keys checked across tasks
+PRIMARY_KEYS = {
+    "labor_logs": ("labor_logs.duplicate_id", lambda r: r["log_id"]),
+    "material_deliveries": ("material_deliveries.duplicate_id", lambda r: r["delivery_id"]),
+    "field_notes": ("field_notes.duplicate_id", lambda r: r["note_id"]),
+    "change_orders": ("change_orders.duplicate_number", lambda r: f"{r['project_id']}/{r['co_number']}"),
+    "equipment_startup": ("equipment_startup.duplicate_id", lambda r: f"{r['project_id']}/{r['startup_id']}"),
+}
+
+KEY_BUCKETS = 64
+DEFAULT_CHUNK_BYTES = 64 << 20
+MAX_EXAMPLES = 5
+
+# Money is compared to the cent
+TOLERANCE = 0.01
+
+
+class Violations:
+    """Violation counts and the first max_examples examples per check."""
+
+    def __init__(self, max_examples: int = MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self.counts = {}
+        self.examples = {}
+
+    def add(self, check: str, **example):
+        count = self.counts.get(check, 0)
+        self.counts[check] = count + 1
+        if count < self.max_examples:
+            self.examples.setdefault(check, []).append(example)
+
+    def merge(self, other: "Violations"):
+        for check, count in other.counts.items():
+            self.counts[check] = self.counts.get(check, 0) + count
+            examples = self.examples.setdefault(check, [])
+            examples.extend(other.examples.get(check, [])[:self.max_examples - len(examples)])
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+def detect_format(input_dir: str, manifest: Optional[Dict]) -> str:
+    """csv if the contracts table was written as CSV, else ndjson."""
+    if os.path.exists(os.path.join(input_dir, "contracts.csv")):
+        return "csv"
+    if manifest and any(entry["format"] == "csv"
+                        for entry in manifest["tables"].get("contracts", {}).get("partitions", [])):
+        return "csv"
+    return "ndjson"
+
+
+@dataclass(frozen=True)
+class Task:
+    """One file of a table, or the byte range [start, end) of an uncompressed one."""
+    table: str
+    path: str
+    fmt: str
+    start: int = 0
+    end: Optional[int] = None
+
+
+def _line_range(path: str, start: int, end: int) -> Iterator[str]:
+    """Lines starting in [start, end) (a line straddling start belongs to the previous range)."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def iter_task_records(task: Task) -> Iterator[Dict]:
+    """Typed records of a task."""
+    if task.fmt == "ndjson":
+        if task.end is None:
+            with open_ndjson(task.path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            for line in _line_range(task.path, task.start, task.end):
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with open(task.path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if task.end is None:
+            yield from csv_records(header, reader, table_schema(task.table))
+            return
+    yield from csv_records(header, csv.reader(_line_range(task.path, task.start, task.end)), table_schema(task.table))
+
+
+def plan_tasks(input_dir: str, fmt: str, manifest: Optional[Dict], table_names: Iterable[str],
+               chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Task]:
+    """Tasks covering every row of table_names once, large line-safe files split into chunk_bytes ranges."""
+    tasks = []
+    for table_name in table_names:
+        for path in table_files(input_dir, table_name, fmt, manifest):
+            size = os.path.getsize(path)
+            splittable = (path.endswith(f".{fmt}")
+                          and (fmt == "ndjson" or table_name in LINE_SAFE_CSV_TABLES))
+            if not splittable or size <= chunk_bytes:
+                tasks.append(Task(table_name, path, fmt))
+                continue
+            start = 0
+            if fmt == "csv":
+                with open(path, "rb") as f:
+                    start = len(f.readline())  # the header is read separately by every range
+            while start < size:
+                tasks.append(Task(table_name, path, fmt, start, min(start + chunk_bytes, size)))
+                start += chunk_bytes
+    return tasks
+
+
+# =============================================================================
+# INDEXES
+# =============================================================================
+
+@dataclass
+class KeyIndex:
+    """Primary keys of the small parent tables, by project."""
+    contracts: Dict[str, Tuple[float, float, str]]      # project_id -> (contract value, retention_pct, contract_date)
+    sov: Dict[str, Dict[str, Tuple[float, int]]]        # project_id -> sov_line_id -> (scheduled_value, line_number)
+    rfis: Dict[str, Dict[str, str]]                     # project_id -> rfi_number -> date_submitted
+    submittals: Dict[str, Dict[str, str]]               # project_id -> submittal_number -> status
+
+
+def build_index(input_dir: str, fmt: str, manifest: Optional[Dict], violations: Violations,
+                rows: Dict[str, int]) -> KeyIndex:
+    """Read contracts, SOV, RFIs and submittals into a KeyIndex, checking them on the way."""
+    index = KeyIndex({}, defaultdict(dict), defaultdict(dict), defaultdict(dict))
+
+    for task in plan_tasks(input_dir, fmt, manifest, ["contracts"], chunk_bytes=float("inf")):
+        for record in iter_task_records(task):
+            rows["contracts"] += 1
+            pid = record["project_id"]
+            if pid in index.contracts:
+                violations.add("contracts.duplicate_project", project_id=pid)
+            index.contracts[pid] = (record["original_contract_value"], record["retention_pct"],
+                                    record["contract_date"])
+            if record["substantial_completion_date"] <= record["contract_date"]:
+                violations.add("contracts.completion_before_start", project_id=pid,
+                               contract_date=record["contract_date"],
+                               substantial_completion_date=record["substantial_completion_date"])
+            if not 0 <= record["retention_pct"] < 1:
+                violations.add("contracts.retention_pct", project_id=pid, retention_pct=record["retention_pct"])
+
+    for task in plan_tasks(input_dir, fmt, manifest, ["sov"], chunk_bytes=float("inf")):
+        for record in iter_task_records(task):
+            rows["sov"] += 1
+            pid, line_id = record["project_id"], record["sov_line_id"]
+            if pid not in index.contracts:
+                violations.add("sov.project_fk", project_id=pid, sov_line_id=line_id)
+            if line_id in index.sov[pid]:
+                violations.add("sov.duplicate_line", project_id=pid, sov_line_id=line_id)
+            if record["scheduled_value"] < 0:
+                violations.add("sov.negative_value", project_id=pid, sov_line_id=line_id,
+                               scheduled_value=record["scheduled_value"])
+            index.sov[pid][line_id] = (record["scheduled_value"], record["line_number"])
+    for pid, (contract_value, _, _) in index.contracts.items():
+        if pid not in index.sov:
+            violations.add("sov.missing", project_id=pid)
+            continue
+        total = sum(value for value, _ in index.sov[pid].values())
+        if abs(total - contract_value) > TOLERANCE:
+            violations.add("sov.sum_mismatch", project_id=pid, sov_total=total, contract_value=contract_value)
+
+    for task in plan_tasks(input_dir, fmt, manifest, ["rfis"], chunk_bytes=float("inf")):
+        for record in iter_task_records(task):
+            rows["rfis"] += 1
+            pid, number, submitted = record["project_id"], record["rfi_number"], record["date_submitted"]
+            contract = index.contracts.get(pid)
+            if contract is None:
+                violations.add("rfis.project_fk", project_id=pid, rfi_number=number)
+            elif submitted < contract[2]:
+                violations.add("rfis.date_before_contract", project_id=pid, rfi_number=number,
+                               date_submitted=submitted, contract_date=contract[2])
+            if number in index.rfis[pid]:
+                violations.add("rfis.duplicate_number", project_id=pid, rfi_number=number)
+            if (record["date_required"] and record["date_required"] < submitted
+                    or record["date_responded"] and record["date_responded"] < submitted):
+                violations.add("rfis.date_order", project_id=pid, rfi_number=number, date_submitted=submitted,
+                               date_required=record["date_required"], date_responded=record["date_responded"])
+            index.rfis[pid][number] = submitted
+
+    for task in plan_tasks(input_dir, fmt, manifest, ["submittals"], chunk_bytes=float("inf")):
+        for record in iter_task_records(task):
+            rows["submittals"] += 1
+            pid, number, submitted = record["project_id"], record["submittal_number"], record["date_submitted"]
+            if not _check_dated("submittals", record, "date_submitted", index, violations, "submittal_number"):
+                continue
+            if record["sov_line_id"] not in index.sov.get(pid, {}):
+                violations.add("submittals.sov_fk", project_id=pid, submittal_number=number,
+                               sov_line_id=record["sov_line_id"])
+            if number in index.submittals[pid]:
+                violations.add("submittals.duplicate_number", project_id=pid, submittal_number=number)
+            if record["date_returned"] is not None and record["date_returned"] < submitted:
+                violations.add("submittals.date_order", project_id=pid, submittal_number=number,
+                               date_submitted=submitted, date_returned=record["date_returned"])
+            index.submittals[pid][number] = record["status"]
+
+    index.sov = dict(index.sov)
+    index.rfis = dict(index.rfis)
+    index.submittals = dict(index.submittals)
+    return index
+
+
+# =============================================================================
+# ROW CHECKS
+# =============================================================================
+
+# Each checker gets one record and returns nothing; violations go to v.
+
+def _check_dated(table: str, record: Dict, date_key: str, index: KeyIndex, v: Violations, key: str) -> bool:
+    """Project foreign key and not-before-contract date; False if the project is unknown."""
+    pid = record["project_id"]
+    contract = index.contracts.get(pid)
+    if contract is None:
+        v.add(f"{table}.project_fk", project_id=pid, **{key: record.get(key)})
+        return False
+    day = record[date_key]
+    if day is not None and day < contract[2]:
+        v.add(f"{table}.date_before_contract", project_id=pid, **{key: record.get(key), date_key: day,
+                                                                  "contract_date": contract[2]})
+    return True
+
+
+def check_labor_log(record: Dict, index: KeyIndex, v: Violations):
+    if not _check_dated("labor_logs", record, "date", index, v, "log_id"):
+        return
+    line = index.sov.get(record["project_id"], {}).get(record["sov_line_id"])
+    if line is None:
+        v.add("labor_logs.sov_fk", project_id=record["project_id"], log_id=record["log_id"],
+              sov_line_id=record["sov_line_id"])
+    elif record["cost_code"] != line[1]:
+        v.add("labor_logs.cost_code", log_id=record["log_id"], cost_code=record["cost_code"], line_number=line[1])
+    hours_st, hours_ot = record["hours_st"], record["hours_ot"]
+    if hours_st < 0 or hours_ot < 0 or hours_st + hours_ot > 24:
+        v.add("labor_logs.hours", log_id=record["log_id"], hours_st=hours_st, hours_ot=hours_ot)
+
+
+def check_material_delivery(record: Dict, index: KeyIndex, v: Violations):
+    if not _check_dated("material_deliveries", record, "date", index, v, "delivery_id"):
+        return
+    if record["sov_line_id"] not in index.sov.get(record["project_id"], {}):
+        v.add("material_deliveries.sov_fk", project_id=record["project_id"], delivery_id=record["delivery_id"],
+              sov_line_id=record["sov_line_id"])
+    # unit_cost is rounded to the cent, so the product may be off by half a cent per unit
+    quantity = record["quantity"]
+    if abs(quantity * record["unit_cost"] - record["total_cost"]) > 0.005 * abs(quantity) + TOLERANCE:
+        v.add("material_deliveries.total_cost", delivery_id=record["delivery_id"], quantity=quantity,
+              unit_cost=record["unit_cost"], total_cost=record["total_cost"])
+
+
+def check_field_note(record: Dict, index: KeyIndex, v: Violations):
+    _check_dated("field_notes", record, "date", index, v, "note_id")
+
+
+def check_change_order(record: Dict, index: KeyIndex, v: Violations):
+    if not _check_dated("change_orders", record, "date_submitted", index, v, "co_number"):
+        return
+    pid, number = record["project_id"], record["co_number"]
+    sov = index.sov.get(pid, {})
+    for line_id in record["affected_sov_lines"] or ():
+        if line_id not in sov:
+            v.add("change_orders.sov_fk", project_id=pid, co_number=number, sov_line_id=line_id)
+    related = record["related_rfi"]
+    if related is not None:
+        submitted = index.rfis.get(pid, {}).get(related)
+        if submitted is None:
+            v.add("change_orders.rfi_fk", project_id=pid, co_number=number, related_rfi=related)
+        elif submitted > record["date_submitted"]:
+            v.add("change_orders.rfi_after_co", project_id=pid, co_number=number, related_rfi=related,
+                  rfi_submitted=submitted, co_submitted=record["date_submitted"])
+
+
+def check_equipment_startup(record: Dict, index: KeyIndex, v: Violations):
+    if not _check_dated("equipment_startup", record, "date", index, v, "startup_id"):
+        return
+    pid, number = record["project_id"], record["submittal_number"]
+    if number is None:
+        return
+    status = index.submittals.get(pid, {}).get(number)
+    if status is None:
+        v.add("equipment_startup.submittal_fk", project_id=pid, startup_id=record["startup_id"],
+              submittal_number=number)
+    elif not status.startswith("Approved"):
+        v.add("equipment_startup.unapproved_submittal", project_id=pid, startup_id=record["startup_id"],
+              submittal_number=number, status=status)
+
+
+def check_bid_estimate(record: Dict, index: KeyIndex, v: Violations):
+    if record["project_id"] not in index.contracts:
+        v.add("bid_estimates.project_fk", project_id=record["project_id"])
+
+
+def check_billing_line_item(line: Dict, index: KeyIndex, v: Violations):
+    pid, line_id = line["project_id"], line["sov_line_id"]
+    example = {"project_id": pid, "application_number": line["application_number"], "sov_line_id": line_id}
+    sov_line = index.sov.get(pid, {}).get(line_id)
+    if sov_line is None:
+        v.add("billing_line_items.sov_fk", **example)
+    elif abs(line["scheduled_value"] - sov_line[0]) > TOLERANCE:
+        v.add("billing_line_items.scheduled_value", **example, scheduled_value=line["scheduled_value"],
+              sov_scheduled_value=sov_line[0])
+    if line["total_billed"] > line["scheduled_value"] + TOLERANCE:
+        v.add("billing_line_items.over_scheduled", **example, total_billed=line["total_billed"],
+              scheduled_value=line["scheduled_value"])
+    if abs(line["previous_billed"] + line["this_period"] - line["total_billed"]) > TOLERANCE:
+        v.add("billing_line_items.running_total", **example, previous_billed=line["previous_billed"],
+              this_period=line["this_period"], total_billed=line["total_billed"])
+    if abs(line["scheduled_value"] - line["total_billed"] - line["balance_to_finish"]) > TOLERANCE:
+        v.add("billing_line_items.balance", **example, balance_to_finish=line["balance_to_finish"])
+
+
+def check_pay_application(record: Dict, index: KeyIndex, v: Violations):
+    """Row checks of a pay application (the chain and line totals are checked in check_billing_chains)."""
+    if not _check_dated("billing_history", record, "period_end", index, v, "application_number"):
+        return
+    pid = record["project_id"]
+    contract_value, retention_pct, _ = index.contracts[pid]
+    example = {"project_id": pid, "application_number": record["application_number"]}
+    cumulative, retention = record["cumulative_billed"], record["retention_held"]
+    if abs(retention - cumulative * retention_pct) > TOLERANCE:
+        v.add("billing_history.retention", **example, cumulative_billed=cumulative, retention_held=retention,
+              retention_pct=retention_pct)
+    if abs(cumulative - retention - record["net_payment_due"]) > TOLERANCE:
+        v.add("billing_history.net_payment", **example, net_payment_due=record["net_payment_due"])
+    if cumulative > contract_value + TOLERANCE:
+        v.add("billing_history.over_contract", **example, cumulative_billed=cumulative,
+              contract_value=contract_value)
+    if record["payment_date"] is not None and record["payment_date"] < record["period_end"]:
+        v.add("billing_history.payment_before_period", **example, period_end=record["period_end"],
+              payment_date=record["payment_date"])
+
+
+ROW_CHECKS = {
+    "labor_logs": check_labor_log,
+    "material_deliveries": check_material_delivery,
+    "field_notes": check_field_note,
+    "change_orders": check_change_order,
+    "bid_estimates": check_bid_estimate,
+    "billing_line_items": check_billing_line_item,
+    "equipment_startup": check_equipment_startup,
+}
+
+
+# =============================================================================
+# TASKS
+# =============================================================================
+
+@dataclass
+class TaskResult:
+    table: str
+    rows: int
+    violations: Violations
+    applications: List[Tuple]                        # (project_id, application_number, period_end, period_total, cumulative_billed, line_item_count)
+    line_totals: Dict[Tuple[str, int], List[float]]  # (project_id, application_number) -> [sum of this_period, line count]
+
+
+def _spool_keys(spool_dir: str, table: str, buckets: List[List[str]]):
+    """Append a task's primary keys to this process' bucket files."""
+    for bucket, keys in enumerate(buckets):
+        if keys:
+            with open(os.path.join(spool_dir, f"{table}.{bucket}.{os.getpid()}"), "a", encoding="utf-8") as f:
+                f.write("\n".join(keys) + "\n")
+
+
+def run_task(task: Task, index: KeyIndex, spool_dir: str, max_examples: int = MAX_EXAMPLES) -> TaskResult:
+    """Check every record of a task."""
+    v = Violations(max_examples)
+    result = TaskResult(task.table, 0, v, [], defaultdict(lambda: [0, 0]))
+    primary_key = PRIMARY_KEYS.get(task.table)
+    buckets = [[] for _ in range(KEY_BUCKETS)] if primary_key else None
+    check = ROW_CHECKS.get(task.table)
+    rows = 0
+
+    for record in iter_task_records(task):
+        rows += 1
+        if task.table == "billing_history":
+            check_pay_application(record, index, v)
+            lines = record.get("line_items")
+            if lines is not None:
+                # NDJSON keeps the line items nested in their pay application
+                for line in lines:
+                    line = dict(line, project_id=record["project_id"],
+                                application_number=record["application_number"])
+                    check_billing_line_item(line, index, v)
+                    totals = result.line_totals[(line["project_id"], line["application_number"])]
+                    totals[0] += line["this_period"]
+                    totals[1] += 1
+            result.applications.append((
+                record["project_id"], record["application_number"], record["period_end"], record["period_total"],
+                record["cumulative_billed"], len(lines) if lines is not None else record["line_item_count"],
+            ))
+            continue
+        check(record, index, v)
+        if task.table == "billing_line_items":
+            totals = result.line_totals[(record["project_id"], record["application_number"])]
+            totals[0] += record["this_period"]
+            totals[1] += 1
+        if primary_key:
+            key = primary_key[1](record)
+            buckets[zlib.crc32(key.encode("utf-8")) % KEY_BUCKETS].append(key)
+
+    if primary_key:
+        _spool_keys(spool_dir, task.table, buckets)
+    result.rows = rows
+    result.line_totals = dict(result.line_totals)
+    return result
+
+
+def find_duplicate_keys(spool_dir: str, table: str, bucket: int, max_examples: int = MAX_EXAMPLES) -> Violations:
+    """Sort one key bucket of a table and report the keys seen more than once."""
+    v = Violations(max_examples)
+    keys = []
+    for path in glob.glob(os.path.join(spool_dir, f"{table}.{bucket}.*")):
+        with open(path, encoding="utf-8") as f:
+            keys.extend(f.read().splitlines())
+    keys.sort()
+    check = PRIMARY_KEYS[table][0]
+    for previous, key in zip(keys, keys[1:]):
+        if key == previous:
+            v.add(check, key=key)
+    return v
+
+
+def check_billing_chains(applications: List[Tuple], line_totals: Dict[Tuple[str, int], List[float]],
+                         has_line_table: bool, v: Violations):
+    """Checks across a project's pay applications, and against their line items."""
+    applications.sort(key=lambda a: (a[0], a[1]))
+    previous = None
+    for pid, number, period_end, period_total, cumulative, line_count in applications:
+        example = {"project_id": pid, "application_number": number}
+        same_project = previous is not None and previous[0] == pid
+        if same_project and previous[1] == number:
+            v.add("billing_history.duplicate_application", **example)
+        expected = (previous[4] if same_project else 0) + period_total
+        if abs(cumulative - expected) > TOLERANCE:
+            v.add("billing_history.cumulative_chain", **example, cumulative_billed=cumulative, expected=expected)
+        if same_project and period_end <= previous[2]:
+            v.add("billing_history.period_order", **example, period_end=period_end,
+                  previous_period_end=previous[2])
+        totals = line_totals.pop((pid, number), None)
+        if totals is not None or has_line_table:
+            line_sum, lines = totals or (0, 0)
+            if abs(line_sum - period_total) > TOLERANCE:
+                v.add("billing_history.line_total", **example, period_total=period_total, line_items_total=line_sum)
+            if lines != line_count:
+                v.add("billing_history.line_count", **example, line_item_count=line_count, line_items=lines)
+        previous = (pid, number, period_end, period_total, cumulative)
+    for pid, number in line_totals:
+        v.add("billing_line_items.application_fk", project_id=pid, application_number=number)
+
+
+_WORKER_INDEX = None
+
+
+def _init_worker(index: KeyIndex):
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+
+
+def _run_task_in_worker(task: Task, spool_dir: str, max_examples: int) -> TaskResult:
+    return run_task(task, _WORKER_INDEX, spool_dir, max_examples)
+
+
+# =============================================================================
+# VALIDATION
+# =============================================================================
+
+def validate_dataset(input_dir: str, fmt: str = "auto", workers: Optional[int] = None,
+                     chunk_bytes: int = DEFAULT_CHUNK_BYTES, max_examples: int = MAX_EXAMPLES) -> Dict:
+    """Validate the dataset in input_dir and return the violation report.
+
+    fmt picks the csv or ndjson copy of the tables ("auto": csv if written).
+    The row checks and duplicate scans run on a process pool of workers
+    processes (default: one per CPU; 1 runs them in this process); the report is the same for any worker count except for which
+    examples are kept when a check fails more than max_examples times.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    manifest = load_manifest(input_dir) if os.path.exists(os.path.join(input_dir, MANIFEST_FILE)) else None
+    if fmt == "auto":
+        fmt = detect_format(input_dir, manifest)
+    if not table_files(input_dir, "contracts", fmt, manifest):
+        raise FileNotFoundError(f"No {fmt} contracts table in {input_dir}")
+
+    violations = Violations(max_examples)
+    rows = defaultdict(int)
+    index = build_index(input_dir, fmt, manifest, violations, rows)
+    tasks = plan_tasks(input_dir, fmt, manifest, STREAMED_TABLES, chunk_bytes)
+    applications, line_totals = [], defaultdict(lambda: [0, 0])
+
+    def collect(result: TaskResult):
+        rows[result.table] += result.rows
+        violations.merge(result.violations)
+        applications.extend(result.applications)
+        for key, (line_sum, lines) in result.line_totals.items():
+            line_totals[key][0] += line_sum
+            line_totals[key][1] += lines
+
+    with tempfile.TemporaryDirectory(prefix="hvac-validate-") as spool_dir:
+        key_tables = [table for table in PRIMARY_KEYS if any(task.table == table for task in tasks)]
+        buckets = [(table, bucket) for table in key_tables for bucket in range(KEY_BUCKETS)]
+        if workers <= 1:
+            for task in tasks:
+                collect(run_task(task, index, spool_dir, max_examples))
+            for table, bucket in buckets:
+                violations.merge(find_duplicate_keys(spool_dir, table, bucket, max_examples))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as executor:
+                # Largest tasks first, so the pool does not wait on one big file at the end
+                tasks.sort(key=lambda t: -((t.end or os.path.getsize(t.path)) - t.start))
+                for result in executor.map(_run_task_in_worker, tasks, [spool_dir] * len(tasks),
+                                           [max_examples] * len(tasks)):
+                    collect(result)
+                for found in executor.map(find_duplicate_keys, [spool_dir] * len(buckets),
+                                          [table for table, _ in buckets], [bucket for _, bucket in buckets],
+                                          [max_examples] * len(buckets)):
+                    violations.merge(found)
+
+    if applications or line_totals:
+        check_billing_chains(applications, dict(line_totals), rows["billing_line_items"] > 0, violations)
+
+    checked = [table for table in INDEX_TABLES + STREAMED_TABLES if rows.get(table)]
+    if rows.get("billing_history") and fmt == "ndjson":
+        checked.append("billing_line_items")  # nested in billing_history
+    total = violations.total
+    return {
+        "input_dir": input_dir,
+        "format": fmt,
+        "partitioned": manifest is not None,
+        "validated": datetime.now().isoformat(timespec="seconds"),
+        "wall_s": round(time.perf_counter() - started, 3),
+        "rows": dict(rows),
+        "valid": total == 0,
+        "violations": total,
+        "checks": {
+            check: {
+                "description": description,
+                "violations": violations.counts.get(check, 0),
+                "examples": violations.examples.get(check, []),
+            }
+            for check, description in CHECKS.items() if check.split(".")[0] in checked
+        },
+    }
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the referential integrity of a generated HVAC dataset.")
+    parser.add_argument("--input-dir", required=True, help="Output directory of generate_hvac_dataset.py.")
+    parser.add_argument("--format", choices=["auto", "csv", "ndjson"], default="auto",
+                        help="Which copy of the tables to validate (auto: csv if present).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes for the row checks (default: one per CPU).")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES >> 20,
+                        help="Split uncompressed files larger than this into ranges checked in parallel.")
+    parser.add_argument("--max-examples", type=int, default=MAX_EXAMPLES,
+                        help="Examples kept per failing check.")
+    parser.add_argument("--report", help="Write the JSON violation report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    args = parse_args(argv)
+    report = validate_dataset(args.input_dir, args.format, args.workers, args.chunk_mb << 20, args.max_examples)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    rows = sum(report["rows"].values())
+    print(f"Validated {rows:,} rows ({report['format']}) in {report['wall_s']:.1f}s: "
+          f"{report['violations']:,} violations")
+    for check, result in report["checks"].items():
+        if result["violations"]:
+            print(f"  {check}: {result['violations']:,} - {result['description']}")
+            for example in result["examples"]:
+                print(f"      {json.dumps(example)}")
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main()["valid"] else 1)
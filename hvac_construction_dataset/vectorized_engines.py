@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Vectorized NumPy generation engines for the HVAC dataset generator.
+
+These are alternative backends for the hottest generate_* functions in
+generate_hvac_dataset.py. They follow the same rules (phase-based crew
+sizing, overtime probabilities, SOV phase activation, S-curve billing) but
+draw whole projects - or batches of projects - as NumPy arrays. Labor logs
+go from the arrays into a RecordBuffer column by column; billing builds its
+pay application dicts at the output boundary.
+
+They are not equivalent output: each engine consumes a numpy.random.Generator
+instead of the table's random.Random stream, so for the same seed the
+numbers, dates and statuses differ from the pure-Python generators (the
+rules and value distributions are the same). Batches take one Generator per
+project, so a project's output does not depend on the batch it is in.
+
+Measured on 36- and 60-month projects (1 CPU, best-of-9 CPU time) against
+the default engine, the table-spec generator in generate_labor_logs() that
+also fills a RecordBuffer: the labor engine fills its buffers at 2.0-2.4M
+rows/s against 170-185k rows/s (11-14x). Including file formatting it is
+~400k rows/s to CSV against 105-130k (3-4x), where CSV formatting then
+dominates, and 85-105k rows/s to npz against 55-70k, where the npz writer does.
+"""
+
+from array import array
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Sequence, Tuple
+
+import numpy as np
+
+from dataset_specs import (
+    CLOSEOUT_CREW, CLOSEOUT_START, COMMON_ROLES, CREW_ROLES, MOBILIZATION_CREW, MOBILIZATION_END, PEAK_CREW,
+    PEAK_CREW_HIGH, SOV_PHASE_BOUNDS, SOV_PHASE_LINES, IdAllocator, WorkCalendar, day_string, permute_id,
+    sov_phase_lines,
+)
+from record_buffer import CodedColumn, RecordBuffer
+
+_ROLE_NAMES = np.array([r["role"] for r in CREW_ROLES], dtype=object)
+_ROLE_RATES = np.array([r["hourly_rate"] for r in CREW_ROLES])
+_ROLE_BURDEN = np.array([r["burden_rate"] for r in CREW_ROLES])
+# Indices of COMMON_ROLES in CREW_ROLES
+_COMMON_ROLE_INDEX = np.array([CREW_ROLES.index(r) for r in COMMON_ROLES])
+# Employee numbers are drawn from [_EMPLOYEE_LOW, _EMPLOYEE_HIGH); their labels, formatted once
+_EMPLOYEE_LOW, _EMPLOYEE_HIGH = 1000, 10000
+_EMPLOYEE_LABELS = np.array([f"EMP-{emp}" for emp in range(_EMPLOYEE_LOW, _EMPLOYEE_HIGH)], dtype=object)
+
+LaborJob = Tuple[Dict, List[Dict], datetime, WorkCalendar]
+
+# Offset from date ordinals to datetime64[D] (days since 1970-01-01)
+_EPOCH_ORDINAL = 719163
+
+
+def _as_array(values: np.ndarray, typecode: str) -> array:
+    """values as an array.array of typecode (numpy reads the same type codes)."""
+    result = array(typecode)
+    result.frombytes(values.astype(typecode).tobytes())
+    return result
+
+
+def _code_array(codes: np.ndarray) -> array:
+    """Codes in the narrowest unsigned array that holds them, as RecordBuffer stores them."""
+    top = int(codes.max()) if len(codes) else 0
+    return _as_array(codes, "B" if top < 1 << 8 else "H" if top < 1 << 16 else "I")
+
+
+def _take_id_numbers(allocator: IdAllocator, n: int) -> array:
+    """The integers behind allocator.take(n), permuted in one vector pass."""
+    raw = allocator.reserve(n)
+    return _as_array(permute_id(np.arange(raw.start, raw.stop, dtype=np.uint64), allocator.key), "q")
+
+
+# =============================================================================
+# LABOR LOGS
+# =============================================================================
+
+def generate_labor_log_columns(jobs: Sequence[LaborJob], rng: np.random.Generator) -> Dict[str, Any]:
+    """Generate worker-day rows for a batch of projects as column arrays.
+
+    jobs is a sequence of (project, sov_lines, start_date, calendar). Returns integer
+    index columns (project, day, role, SOV line) plus the drawn values; use
+    labor_log_table() to turn them into a generator-style table.
+    """
+    n_roles = len(CREW_ROLES)
+
+    # --- Worker-days: one entry per (project, business day) ------------------
+    n_days = np.array([p["duration_months"] * 22 for p, _, _, _ in jobs])
+    day_project = np.repeat(np.arange(len(jobs)), n_days)
+    day_starts = np.concatenate(([0], np.cumsum(n_days)[:-1]))
+    day_count = np.arange(n_days.sum()) - day_starts[day_project]
+    phase = day_count / n_days[day_project]
+
+    # Working days come from each project's calendar (computed once per project)
+    day_dates = np.concatenate([
+        np.array(calendar.workdays(start, n), dtype=np.int64)
+        for (_, _, start, calendar), n in zip(jobs, n_days.tolist())
+    ]) - _EPOCH_ORDINAL
+    day_dates = day_dates.astype("datetime64[D]")
+
+    # --- Crew size per day ---------------------------------------------------
+    high = np.array([p["complexity"] == "high" for p, _, _, _ in jobs])[day_project]
+    peak_low = np.where(high, PEAK_CREW_HIGH[0], PEAK_CREW[0])
+    peak_high = np.where(high, PEAK_CREW_HIGH[1], PEAK_CREW[1])
+    in_phase = [phase < MOBILIZATION_END, phase < CLOSEOUT_START]
+    crew_low = np.select(in_phase, [MOBILIZATION_CREW[0], peak_low], CLOSEOUT_CREW[0])
+    crew_high = np.select(in_phase, [MOBILIZATION_CREW[1], peak_high], CLOSEOUT_CREW[1])
+    crew = rng.integers(crew_low, crew_high + 1)
+
+    # --- Expand to one row per worker ----------------------------------------
+    total = int(crew.sum())
+    row_day = np.repeat(np.arange(len(crew)), crew)
+    row_slot = np.arange(total) - np.repeat(np.cumsum(crew) - crew, crew)
+
+    # First min(crew, n_roles) workers are distinct roles (a per-day random
+    # permutation); any extra workers are drawn from the common trades.
+    role_perm = np.argsort(rng.random((len(crew), n_roles)), axis=1)
+    role = np.empty(total, dtype=np.intp)
+    distinct = row_slot < n_roles
+    role[distinct] = role_perm[row_day[distinct], row_slot[distinct]]
+    role[~distinct] = _COMMON_ROLE_INDEX[rng.integers(0, len(_COMMON_ROLE_INDEX), int((~distinct).sum()))]
+
+    # --- SOV line assignment by phase ----------------------------------------
+    # Each project's phase lines are those of its own SOV (see sov_phase_lines)
+    by_job = [sov_phase_lines([line["line_number"] for line in sov_lines]) for _, sov_lines, _, _ in jobs]
+    max_lines = max(len(lines) for by_phase in by_job for lines in by_phase)
+    phase_lines = np.zeros((len(jobs), len(SOV_PHASE_LINES), max_lines), dtype=np.intp)
+    phase_counts = np.zeros((len(jobs), len(SOV_PHASE_LINES)), dtype=np.intp)
+    for j, by_phase in enumerate(by_job):
+        for i, lines in enumerate(by_phase):
+            phase_lines[j, i, :len(lines)] = lines
+            phase_counts[j, i] = len(lines)
+    row_project = day_project[row_day]
+    row_phase = np.searchsorted(SOV_PHASE_BOUNDS, phase[row_day], side="right")
+    pick = (rng.random(total) * phase_counts[row_project, row_phase]).astype(np.intp)
+    line_number = phase_lines[row_project, row_phase, pick]
+
+    # --- Hours ---------------------------------------------------------------
+    overtime = rng.random(total) < 0.15
+    short_day = ~overtime & (rng.random(total) <= 0.1)
+    hours_ot = np.where(overtime, rng.choice(np.array([2, 4]), total), 0)
+    hours_st = np.where(short_day, rng.choice(np.array([4, 6, 10]), total), 8)
+
+    # --- Per-row identifiers -------------------------------------------------
+    floors = np.array([p["floors"] for p, _, _, _ in jobs])[row_project]
+
+    return {
+        "project": row_project,
+        "date": day_dates[row_day],
+        "role": role,
+        "line_number": line_number,
+        "hours_st": hours_st,
+        "hours_ot": hours_ot,
+        "employee": rng.integers(_EMPLOYEE_LOW, _EMPLOYEE_HIGH, total),
+        "floor": rng.integers(1, floors + 1),
+    }
+
+
+def labor_log_table(jobs: Sequence[LaborJob], columns: Dict[str, Any],
+                    id_allocators: Sequence[IdAllocator]) -> RecordBuffer:
+    """Turn labor log columns into a RecordBuffer with the generate_labor_logs() layout.
+
+    This is the output boundary, and no Python runs per row: string columns
+    are handed to the buffer as codes into small value lists (one date
+    string per distinct day, one SOV id per line, one label per employee
+    and floor), numbers as whole columns, and log IDs as the integers from
+    each job's allocator, one block per project.
+    """
+    project = columns["project"]
+    log_ids = array("q")
+    for allocator, n in zip(id_allocators, np.bincount(project, minlength=len(jobs)).tolist()):
+        log_ids.extend(_take_id_numbers(allocator, n))
+
+    # SOV lines of all jobs in one list; line_code maps (job, line number) into it,
+    # and -1 marks line numbers that are not in the job's SOV
+    sov_ids = [line["sov_line_id"] for _, sov_lines, _, _ in jobs for line in sov_lines]
+    max_line = max(line["line_number"] for _, sov_lines, _, _ in jobs for line in sov_lines)
+    line_code = np.full((len(jobs), max_line + 1), -1, dtype=np.intp)
+    offset = 0
+    for j, (_, sov_lines, _, _) in enumerate(jobs):
+        for i, line in enumerate(sov_lines):
+            line_code[j, line["line_number"]] = offset + i
+        offset += len(sov_lines)
+    sov_codes = line_code[project, columns["line_number"]]
+    if len(sov_codes) and sov_codes.min() < 0:
+        row = int(np.argmin(sov_codes))
+        raise ValueError(f"Labor log row {row} has SOV line {columns['line_number'][row]}, which is not "
+                         f"in the SOV of {jobs[project[row]][0]['id']}")
+
+    dates, date_codes = np.unique(columns["date"], return_inverse=True)
+    employees, employee_codes = np.unique(columns["employee"], return_inverse=True)
+    floors, floor_codes = np.unique(columns["floor"], return_inverse=True)
+    role = columns["role"]
+
+    return RecordBuffer.from_columns({
+        "project_id": CodedColumn(_code_array(project), [p["id"] for p, _, _, _ in jobs]),
+        "log_id": CodedColumn(log_ids),
+        "date": CodedColumn(_code_array(date_codes), np.datetime_as_string(dates, unit="D").tolist()),
+        "employee_id": CodedColumn(_code_array(employee_codes), _EMPLOYEE_LABELS[employees - _EMPLOYEE_LOW].tolist()),
+        "role": CodedColumn(_code_array(role), _ROLE_NAMES.tolist()),
+        "sov_line_id": CodedColumn(_code_array(sov_codes), sov_ids),
+        "hours_st": _as_array(columns["hours_st"], "b"),
+        "hours_ot": _as_array(columns["hours_ot"], "b"),
+        "hourly_rate": _as_array(_ROLE_RATES[role], "d"),
+        "burden_multiplier": _as_array(_ROLE_BURDEN[role], "d"),
+        "work_area": CodedColumn(_code_array(floor_codes), [f"Floor {floor}" for floor in floors.tolist()]),
+        "cost_code": _as_array(columns["line_number"], "b"),
+    })
+
+
+def generate_labor_logs_numpy(project: Dict, sov_lines: List[Dict], start_date: datetime,
+                              rng: np.random.Generator, ids: IdAllocator,
+                              calendar: WorkCalendar) -> RecordBuffer:
+    """Drop-in replacement for generate_labor_logs() backed by NumPy arrays."""
+    jobs = [(project, sov_lines, start_date, calendar)]
+    return labor_log_table(jobs, generate_labor_log_columns(jobs, rng), [ids])
+
+
+# =============================================================================
+# BILLING HISTORY
+# =============================================================================
+
+BillingJob = Tuple[Dict, List[Dict], datetime, WorkCalendar]
+
+_BILLING_STATUSES = np.array(["Paid", "Paid", "Paid", "Pending", "Approved"], dtype=object)
+
+
+def generate_billing_arrays(jobs: Sequence[BillingJob], rngs: Sequence[np.random.Generator]) -> Dict[str, Any]:
+    """Generate pay applications for a batch of projects as (job, month, line) arrays.
+
+    The S-curve targets are computed for every month and SOV line at once;
+    only the running cumulative billing steps month by month, as one vector
+    operation over all projects and lines. Projects are padded to the
+    longest duration and SOV list (padded lines have a zero scheduled value,
+    padded months a zero progress target). rngs holds one Generator per job,
+    and each job's draws come from its own. Use iter_billing_records() to
+    turn the arrays into generate_billing_history()-style pay applications.
+    """
+    n_months = np.array([p["duration_months"] for p, _, _, _ in jobs])
+    months = int(n_months.max()) + 1
+    lines = max(len(sov_lines) for _, sov_lines, _, _ in jobs)
+
+    values = np.zeros((len(jobs), lines), dtype=np.int64)
+    numbers = np.zeros((len(jobs), lines), dtype=np.int64)
+    for j, (_, sov_lines, _, _) in enumerate(jobs):
+        values[j, :len(sov_lines)] = [line["scheduled_value"] for line in sov_lines]
+        numbers[j, :len(sov_lines)] = [line["line_number"] for line in sov_lines]
+
+    # --- S-curve progress per (job, month) -----------------------------------
+    month = np.arange(months)
+    month_pct = month / n_months[:, None]
+    progress = np.select([month_pct < 0.15, month_pct < 0.85],
+                         [month_pct * 2, 0.3 + (month_pct - 0.15)], 0.95 + (month_pct - 0.85) * 0.33)
+    progress = np.minimum(progress, 1.0)[:, :, None]
+    active = month[None, :] <= n_months[:, None]
+
+    # --- Target percentage per (job, month, line) by SOV phase ---------------
+    numbers = numbers[:, None, :]
+    target = np.select(
+        [numbers <= 2, numbers <= 9, numbers <= 12],
+        [np.minimum(progress * 1.3, 1.0), progress, np.maximum(progress - 0.15, 0) * 1.15],
+        np.maximum(progress - 0.3, 0) * 1.4,
+    )
+    target = np.minimum(target, 1.0) * values[:, None, :] * active[:, :, None]
+
+    # --- Random draws, per job from its own generator --------------------------
+    noise = np.ones(target.shape)
+    status = np.empty((len(jobs), months), dtype=object)
+    payment_lag = np.zeros((len(jobs), months), dtype=np.int64)
+    paid = np.zeros((len(jobs), months), dtype=bool)
+    for j, ((project, sov_lines, _, _), rng) in enumerate(zip(jobs, rngs)):
+        n = project["duration_months"] + 1
+        noise[j, :n, :len(sov_lines)] = rng.uniform(0.85, 1.0, (n, len(sov_lines)))
+        status[j, :n] = _BILLING_STATUSES[rng.integers(0, len(_BILLING_STATUSES), n)]
+        payment_lag[j, :n] = rng.integers(25, 41, n)
+        paid[j, :n] = rng.random(n) > 0.2
+
+    # --- Step the cumulative billing through the months ----------------------
+    this_period = np.zeros(target.shape, dtype=np.int64)
+    billed = np.zeros((len(jobs), lines), dtype=np.int64)
+    for m in range(months):
+        amount = np.rint(np.maximum(target[:, m] - billed, 0) * noise[:, m] / 100).astype(np.int64) * 100
+        amount = np.minimum(amount, values - billed)
+        this_period[:, m] = amount
+        billed += amount
+
+    # The last two applications of a project stay pending
+    status[month[None, :] >= n_months[:, None] - 1] = "Pending"
+
+    return {"values": values, "this_period": this_period, "status": status, "payment_lag": payment_lag, "paid": paid}
+
+
+def iter_billing_records(jobs: Sequence[BillingJob], arrays: Dict[str, Any]) -> Iterator[Dict]:
+    """Convert billing arrays to pay applications with the generate_billing_history() layout.
+
+    Months with nothing billed are skipped, as in the Python generator.
+    """
+    cumulative = arrays["this_period"].cumsum(axis=1)
+    period_totals = arrays["this_period"].sum(axis=2).tolist()
+
+    for j, (project, sov_lines, start_date, calendar) in enumerate(jobs):
+        start_day = start_date.toordinal()
+        values = arrays["values"][j].tolist()
+        this_period = arrays["this_period"][j].tolist()
+        totals = cumulative[j].tolist()
+        for m in range(project["duration_months"] + 1):
+            period_total = period_totals[j][m]
+            if period_total <= 0:
+                continue
+            billing_day = calendar.roll_back(start_day + 30 * m + 25)
+            line_items = [
+                {
+                    "sov_line_id": line["sov_line_id"],
+                    "description": line["description"],
+                    "scheduled_value": value,
+                    "previous_billed": total - amount,
+                    "this_period": amount,
+                    "total_billed": total,
+                    "pct_complete": round(total / value * 100, 1),
+                    "balance_to_finish": value - total,
+                }
+                for line, value, amount, total in zip(sov_lines, values, this_period[m], totals[m])
+                if amount > 0
+            ]
+            cumulative_billed = sum(totals[m][:len(sov_lines)])
+            retention = cumulative_billed * 0.10
+            yield {
+                "project_id": project["id"],
+                "application_number": m + 1,
+                "period_end": day_string(billing_day),
+                "period_total": period_total,
+                "cumulative_billed": cumulative_billed,
+                "retention_held": retention,
+                "net_payment_due": cumulative_billed - retention,
+                "status": arrays["status"][j, m],
+                "payment_date": (day_string(calendar.roll_forward(billing_day + int(arrays["payment_lag"][j, m])))
+                                 if arrays["paid"][j, m] else None),
+                "line_items": line_items,
+            }
+
+
+def generate_billing_history_numpy(project: Dict, sov_lines: List[Dict], start_date: datetime,
+                                   rng: np.random.Generator, calendar: WorkCalendar) -> Iterator[Dict]:
+    """Replacement for generate_billing_history() backed by NumPy arrays (different draws, see above)."""
+    jobs = [(project, sov_lines, start_date, calendar)]
+    return iter_billing_records(jobs, generate_billing_arrays(jobs, [rng]))
+
+
+def generate_billing_history_batch(jobs: Sequence[BillingJob],
+                                   rngs: Sequence[np.random.Generator]) -> List[List[Dict]]:
+    """Pay applications for a batch of projects in one vectorized pass, as one list per job.
+
+    Gives each job the same records as generate_billing_history_numpy()
+    with that job's generator.
+    """
+    per_job = [[] for _ in jobs]
+    job_index = {project["id"]: j for j, (project, _, _, _) in enumerate(jobs)}
+    for record in iter_billing_records(jobs, generate_billing_arrays(jobs, rngs)):
+        per_job[job_index[record["project_id"]]].append(record)
+    return per_job